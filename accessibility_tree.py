@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Accessibility Tree for Project Watch Tower
+Parses Appium page sources (XCUITest and UiAutomator2) into an indexed element
+table and answers element lookups from it, falling back to screenshot
+detection only when the tree is unavailable or too sparse to rely on.
+"""
+
+import argparse
+import os
+import re
+import time
+import xml.etree.ElementTree as ET
+from typing import Callable, Dict, List, Optional
+
+import cv2
+
+from change_detector import ChangeDetector
+
+# Element types by class name (XCUIElementType prefix or Java package removed)
+IOS_TYPES = {
+    'Button': 'button', 'Link': 'button', 'Cell': 'cell', 'Switch': 'switch', 'Toggle': 'switch',
+    'TextField': 'input_field', 'SecureTextField': 'input_field', 'SearchField': 'input_field',
+    'TextView': 'input_field', 'StaticText': 'text', 'Image': 'image', 'Icon': 'image',
+    'Tab': 'tab', 'TabBar': 'tab_bar', 'NavigationBar': 'navigation_bar', 'ScrollView': 'scroll_view',
+    'Table': 'list', 'CollectionView': 'list',
+}
+ANDROID_TYPES = {
+    'Button': 'button', 'ImageButton': 'button', 'Switch': 'switch', 'ToggleButton': 'switch',
+    'CheckBox': 'switch', 'EditText': 'input_field', 'AutoCompleteTextView': 'input_field',
+    'TextView': 'text', 'ImageView': 'image', 'TabWidget': 'tab_bar', 'Toolbar': 'navigation_bar',
+    'ScrollView': 'scroll_view', 'RecyclerView': 'list', 'ListView': 'list',
+}
+# Types a user can act on; elements of these types count towards completeness
+ACTIONABLE_TYPES = {'button', 'cell', 'switch', 'input_field', 'tab'}
+# A tree with fewer labeled, visible elements than this is treated as incomplete
+# (e.g. a Flutter screen without Semantics exposes one large opaque element)
+MIN_LABELED_ELEMENTS = 3
+
+ANDROID_BOUNDS = re.compile(r'\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]')
+
+
+def _flag(value: Optional[str], default: bool = True) -> bool:
+    return default if value is None else value.lower() == 'true'
+
+
+def _parse_node(node: ET.Element, depth: int) -> Optional[Dict]:
+    """Platform-independent element record of one page source node, None for containers without bounds"""
+    attributes = node.attrib
+    if 'bounds' in attributes:
+        match = ANDROID_BOUNDS.match(attributes['bounds'])
+        if match is None:
+            return None
+        x0, y0, x1, y1 = (int(v) for v in match.groups())
+        class_name = attributes.get('class', node.tag)
+        kind = ANDROID_TYPES.get(class_name.rsplit('.', 1)[-1], 'other')
+        element = {
+            'id': attributes.get('resource-id') or None,
+            'label': attributes.get('content-desc') or None,
+            'text': attributes.get('text') or None,
+            'visible': _flag(attributes.get('displayed')),
+            'clickable': _flag(attributes.get('clickable'), False),
+        }
+    elif 'width' in attributes and node.tag.startswith('XCUIElementType'):
+        # UiAutomator2's <hierarchy> root carries width and height too, but is no element
+        x0, y0 = int(float(attributes.get('x', 0))), int(float(attributes.get('y', 0)))
+        x1, y1 = x0 + int(float(attributes['width'])), y0 + int(float(attributes['height']))
+        class_name = attributes.get('type', node.tag)
+        kind = IOS_TYPES.get(class_name.replace('XCUIElementType', ''), 'other')
+        element = {
+            'id': attributes.get('name') or None,
+            'label': attributes.get('label') or None,
+            'text': attributes.get('value') or attributes.get('label') or None,
+            'visible': _flag(attributes.get('visible')),
+            'clickable': kind in ACTIONABLE_TYPES or _flag(attributes.get('accessible'), False),
+        }
+    else:
+        return None
+
+    element.update({
+        'type': kind,
+        'class': class_name,
+        'enabled': _flag(attributes.get('enabled')),
+        'bounds': {'x': x0, 'y': y0, 'width': x1 - x0, 'height': y1 - y0},
+        'depth': depth,
+        'confidence': 1.0,
+        'source': 'accessibility',
+    })
+    return element
+
+
+class ElementTable:
+    """Elements of one page source with indexes for locator queries
+
+    Bounds are converted to screenshot pixels when the screenshot width is
+    known (iOS reports points). Lookups by id, accessibility id, label,
+    text and type are dictionary hits; ``text_contains`` scans the table.
+    """
+
+    def __init__(self, elements: List[Dict]):
+        self.elements = elements
+        self.by_id: Dict[str, List[Dict]] = {}
+        self.by_label: Dict[str, List[Dict]] = {}
+        self.by_text: Dict[str, List[Dict]] = {}
+        self.by_type: Dict[str, List[Dict]] = {}
+        for position, element in enumerate(elements):
+            bounds = element['bounds']
+            element['index'] = position
+            element['center'] = {'x': bounds['x'] + bounds['width'] // 2, 'y': bounds['y'] + bounds['height'] // 2}
+            for index, key in ((self.by_id, element['id']), (self.by_label, element['label']),
+                               (self.by_text, element['text']), (self.by_type, element['type'])):
+                if key:
+                    index.setdefault(key.lower(), []).append(element)
+
+    @classmethod
+    def parse(cls, page_source: str, screen_width: Optional[int] = None) -> 'ElementTable':
+        """Table of every node with bounds in a page source XML string"""
+        root = ET.fromstring(page_source)
+        elements = []
+        stack = [(root, 0)]
+        while stack:
+            node, depth = stack.pop()
+            element = _parse_node(node, depth)
+            if element is not None:
+                elements.append(element)
+            stack.extend((child, depth + 1) for child in reversed(list(node)))
+
+        # The first (outermost) element spans the window; scale its width to the screenshot
+        if screen_width and elements and elements[0]['bounds']['width'] > 0:
+            scale = screen_width / elements[0]['bounds']['width']
+            if abs(scale - 1) > 1e-3:
+                for element in elements:
+                    element['bounds'] = {key: int(round(value * scale)) for key, value in element['bounds'].items()}
+        return cls(elements)
+
+    @property
+    def labeled(self) -> List[Dict]:
+        """Visible elements a locator can name: actionable or carrying text"""
+        return [e for e in self.elements
+                if e['visible'] and (e['id'] or e['label'] or e['text'])
+                and (e['type'] in ACTIONABLE_TYPES or e['type'] == 'text' or e['clickable'])]
+
+    @property
+    def complete(self) -> bool:
+        """Whether the tree exposes enough of the screen to answer queries without CV"""
+        return len(self.labeled) >= MIN_LABELED_ELEMENTS
+
+    def find(self, by: str, value: str) -> List[Dict]:
+        """Visible elements matching a locator, in document order
+
+        ``by`` is one of id, accessibility_id (id or label, as Appium
+        resolves it), label, text, type or text_contains.
+        """
+        value = value.lower()
+        if by == 'text_contains':
+            found = [e for e in self.elements if any(value in (e[key] or '').lower() for key in ('text', 'label'))]
+        elif by == 'accessibility_id':
+            found = self.by_id.get(value, []) + self.by_label.get(value, [])
+        else:
+            index = {'id': self.by_id, 'label': self.by_label, 'text': self.by_text, 'type': self.by_type}.get(by)
+            if index is None:
+                raise ValueError(f"Unsupported locator strategy: {by}")
+            found = index.get(value, [])
+        unique = {e['index']: e for e in found if e['visible']}
+        return [unique[index] for index in sorted(unique)]
+
+    def first(self, by: str, value: str) -> Optional[Dict]:
+        found = self.find(by, value)
+        return found[0] if found else None
+
+
+class HybridElementSource:
+    """Per-device element lookups from the accessibility tree, with CV as fallback
+
+    The page source is fetched once per screen: the step's screenshot goes
+    through a per-device ChangeDetector and the cached table is kept until
+    the screen changes. Screenshot detection (``detect_elements``, called
+    with the screenshot path) only runs when the driver gives no page
+    source or the tree is incomplete. With ``record_dir`` set every fetched
+    page source is saved there, for use as a parsing fixture.
+    """
+
+    def __init__(self, detect_elements: Callable[[str], List[Dict]], record_dir: Optional[str] = None):
+        self.detect_elements = detect_elements
+        self.record_dir = record_dir
+        self.tables: Dict[str, Optional[ElementTable]] = {}
+        self.change_detectors: Dict[str, ChangeDetector] = {}
+        self.stats = {'tree_fetches': 0, 'cache_hits': 0, 'cv_fallbacks': 0}
+
+    def invalidate(self, device_id: str):
+        """Drop a device's cached table, e.g. after an action that changes the screen"""
+        self.tables.pop(device_id, None)
+        detector = self.change_detectors.get(device_id)
+        if detector is not None:
+            detector.reset()
+
+    def table(self, device_id: str, driver, screenshot_path: str) -> Optional[ElementTable]:
+        """The device's element table for the screen in the screenshot, fetched only after a screen change"""
+        gray = cv2.imread(screenshot_path, cv2.IMREAD_GRAYSCALE)
+        detector = self.change_detectors.setdefault(device_id, ChangeDetector())
+        # The detector reports the first frame of a device as a change
+        changed = gray is None or detector.update(gray)['changed']
+
+        if not changed and device_id in self.tables:
+            self.stats['cache_hits'] += 1
+            return self.tables[device_id]
+
+        table = None
+        if driver is not None:
+            try:
+                page_source = driver.page_source
+                self.stats['tree_fetches'] += 1
+                self._record(device_id, page_source)
+                table = ElementTable.parse(page_source, gray.shape[1] if gray is not None else None)
+            except Exception as e:
+                print(f"⚠️ No accessibility tree for {device_id}: {e}")
+        self.tables[device_id] = table
+        return table
+
+    def elements(self, device_id: str, driver, screenshot_path: str) -> Dict:
+        """Elements of the current screen and where they came from ('accessibility' or 'cv')"""
+        table = self.table(device_id, driver, screenshot_path)
+        if table is not None and table.complete:
+            return {'source': 'accessibility', 'elements': table.labeled, 'table': table}
+        self.stats['cv_fallbacks'] += 1
+        return {'source': 'cv', 'elements': self.detect_elements(screenshot_path), 'table': table}
+
+    def find(self, device_id: str, driver, screenshot_path: str, by: str, value: str) -> Optional[Dict]:
+        """First element matching a locator; only ``type`` queries can be answered by CV"""
+        found = self.elements(device_id, driver, screenshot_path)
+        if found['source'] == 'accessibility':
+            return found['table'].first(by, value)
+        if by == 'type':
+            return next((e for e in found['elements'] if e.get('type') == value), None)
+        return None
+
+    def _record(self, device_id: str, page_source: str):
+        if not self.record_dir:
+            return
+        os.makedirs(self.record_dir, exist_ok=True)
+        path = os.path.join(self.record_dir, f"page_source_{device_id}_{time.strftime('%Y%m%d_%H%M%S')}"
+                                             f"_{self.stats['tree_fetches']}.xml")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(page_source)
+
+
+def main():
+    """Parse recorded page sources and run locator queries against them"""
+    parser = argparse.ArgumentParser(description='Accessibility tree element table')
+    parser.add_argument('page_sources', nargs='+', help='Recorded page source XML files')
+    parser.add_argument('--screen-width', type=int, help='Screenshot width, to convert points to pixels')
+    parser.add_argument('--find', action='append', default=[], metavar='BY=VALUE',
+                        help='Locator query, e.g. accessibility_id=login_button (repeatable)')
+    args = parser.parse_args()
+
+    for path in args.page_sources:
+        with open(path, encoding='utf-8') as f:
+            page_source = f.read()
+        start = time.perf_counter()
+        try:
+            table = ElementTable.parse(page_source, args.screen_width)
+        except ET.ParseError as e:
+            print(f"❌ {path}: {e}")
+            continue
+        parse_ms = (time.perf_counter() - start) * 1000
+        types = {}
+        for element in table.labeled:
+            types[element['type']] = types.get(element['type'], 0) + 1
+        status = "✅ complete" if table.complete else "⚠️ incomplete, CV fallback"
+        print(f"🌳 {path}: {len(table.elements)} elements, {len(table.labeled)} labeled ({status}), "
+              f"parsed in {parse_ms:.1f} ms")
+        print(f"   Types: {', '.join(f'{kind} {count}' for kind, count in sorted(types.items())) or 'none'}")
+
+        for query in args.find:
+            by, _, value = query.partition('=')
+            start = time.perf_counter()
+            found = table.find(by, value)
+            query_ms = (time.perf_counter() - start) * 1000
+            print(f"   🔍 {by}={value}: {len(found)} found ({query_ms:.3f} ms)")
+            for element in found[:5]:
+                bounds = element['bounds']
+                print(f"      {element['type']} {element['id'] or element['label'] or element['text']!r} "
+                      f"at ({bounds['x']}, {bounds['y']}) {bounds['width']}x{bounds['height']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,9 +15,20 @@ from datetime import datetime
 from typing import Dict, List, Tuple, Optional
 import logging
 
+from analysis_cache import get_analysis_cache
+from capture import ScreenCapture
+from box_set import dedupe
+from frame_analysis import FrameAnalysis, box_columns, boxes_to_elements, elements_to_boxes
+
+# Bump when detector output changes so cached analyses are not reused
+ANALYZER_VERSION = "2"
+
 class AIVisualTester:
-    def __init__(self):
+    def __init__(self, analysis_scale: float = 1.0):
         self.setup_logging()
+        self.analysis_scale = analysis_scale  # 1.0, 0.5 or 0.25 of device resolution
+        self.analysis_cache = get_analysis_cache()
+        self.screen_capture = ScreenCapture()
         self.test_results = []
         self.screenshots = []
         self.issues_found = []
@@ -37,30 +48,21 @@ class AIVisualTester:
     def capture_screen(self) -> np.ndarray:
         """Capture current screen of the iOS simulator"""
         try:
-            # Use xcrun simctl to capture screen
-            result = subprocess.run([
-                'xcrun', 'simctl', 'io', 'booted', 'screenshot', '/tmp/current_screen.png'
-            ], capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                # Load the screenshot
-                screenshot = cv2.imread('/tmp/current_screen.png')
-                if screenshot is not None:
-                    self.logger.info("Screen captured successfully")
-                    return screenshot
-                else:
-                    self.logger.error("Failed to load screenshot")
-                    return None
+            # Read the screenshot straight from simctl's stdout, no temporary file
+            screenshot = self.screen_capture.capture()
+            if screenshot is not None:
+                self.logger.info("Screen captured successfully")
+                return screenshot
             else:
-                self.logger.error(f"Screenshot capture failed: {result.stderr}")
+                self.logger.error(f"Screenshot capture failed: {self.screen_capture.last_error}")
                 return None
                 
         except Exception as e:
             self.logger.error(f"Error capturing screen: {e}")
             return None
     
-    def analyze_ui_elements(self, screenshot: np.ndarray) -> Dict:
-        """Analyze UI elements using computer vision"""
+    def analyze_ui_elements(self, screenshot: np.ndarray, scale: Optional[float] = None) -> Dict:
+        """Analyze UI elements using computer vision (scale defaults to analysis_scale)"""
         analysis = {
             'text_elements': [],
             'buttons': [],
@@ -70,24 +72,8 @@ class AIVisualTester:
         }
         
         try:
-            # Convert to grayscale for text detection
-            gray = cv2.cvtColor(screenshot, cv2.COLOR_BGR2GRAY)
-            
-            # Detect text using OCR-like approach
-            text_regions = self.detect_text_regions(gray)
-            analysis['text_elements'] = text_regions
-            
-            # Detect buttons and interactive elements
-            buttons = self.detect_buttons(screenshot)
-            analysis['buttons'] = buttons
-            
-            # Detect input fields
-            input_fields = self.detect_input_fields(screenshot)
-            analysis['input_fields'] = input_fields
-            
-            # Check for UI issues
-            issues = self.check_ui_issues(screenshot, analysis)
-            analysis['issues'] = issues
+            # Identical frames are served from the analysis cache
+            analysis.update(self.detect_ui_elements(screenshot, scale))
             
             return analysis
             
@@ -95,41 +81,55 @@ class AIVisualTester:
             self.logger.error(f"Error analyzing UI elements: {e}")
             return analysis
     
-    def detect_text_regions(self, gray_image: np.ndarray) -> List[Dict]:
-        """Detect text regions in the image"""
-        text_regions = []
+    def detect_ui_elements(self, screenshot: np.ndarray, scale: Optional[float] = None) -> Dict:
+        """Run every detector on the screenshot, reusing cached results for identical frames"""
+        scale = self.analysis_scale if scale is None else scale
+        return self.analysis_cache.get_or_compute(
+            screenshot, f"{self.__class__.__name__}.ui_elements@{scale}", ANALYZER_VERSION,
+            lambda: self._detect_ui_elements(screenshot, scale)
+        )
+    
+    def _detect_ui_elements(self, screenshot: np.ndarray, scale: float) -> Dict:
+        """Run every detector on one shared frame analysis"""
+        # Compute grayscale, edges and contours once for every detector
+        frame = FrameAnalysis(screenshot, scale=scale)
         
+        detected = {
+            # Detect text using OCR-like approach
+            'text_elements': self.detect_text_regions(frame),
+            # Detect buttons and interactive elements
+            'buttons': self.detect_buttons(frame),
+            # Detect input fields
+            'input_fields': self.detect_input_fields(frame),
+        }
+        
+        # Check for UI issues
+        detected['issues'] = self.check_ui_issues(frame, detected)
+        
+        return detected
+    
+    def detect_text_regions(self, frame: FrameAnalysis) -> List[Dict]:
+        """Detect text regions in the image"""
         try:
-            # Use edge detection to find text-like regions
-            edges = cv2.Canny(gray_image, 50, 150)
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            x, y, w, h, area, _ = box_columns(frame.boxes)
             
-            for contour in contours:
-                x, y, w, h = cv2.boundingRect(contour)
-                area = w * h
-                
-                # Filter for text-like regions
-                if 20 < w < 400 and 10 < h < 100 and area > 200:
-                    text_regions.append({
-                        'x': x, 'y': y, 'width': w, 'height': h,
-                        'area': area,
-                        'type': 'text_region'
-                    })
+            # Filter for text-like regions
+            text_like = (20 < w) & (w < 400) & (10 < h) & (h < 100) & (area > 200)
             
-            return text_regions
+            # Nested and overlapping contours of one text line would be counted repeatedly
+            text_boxes = frame.boxes[text_like]
+            keep = dedupe(text_boxes)
+            return boxes_to_elements(text_boxes[keep], type='text_region')
             
         except Exception as e:
             self.logger.error(f"Error detecting text regions: {e}")
             return []
     
-    def detect_buttons(self, image: np.ndarray) -> List[Dict]:
+    def detect_buttons(self, frame: FrameAnalysis) -> List[Dict]:
         """Detect button-like elements"""
         buttons = []
         
         try:
-            # Convert to HSV for better color detection
-            hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-            
             # Define button colors (blue, purple, etc.)
             button_colors = [
                 ([100, 50, 50], [130, 255, 255]),  # Blue
@@ -137,61 +137,40 @@ class AIVisualTester:
             ]
             
             for lower, upper in button_colors:
-                mask = cv2.inRange(hsv, np.array(lower), np.array(upper))
-                contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+                boxes = frame.color_boxes(lower, upper)
+                x, y, w, h, area, _ = box_columns(boxes)
                 
-                for contour in contours:
-                    x, y, w, h = cv2.boundingRect(contour)
-                    area = w * h
-                    
-                    # Filter for button-like shapes
-                    if 50 < w < 300 and 30 < h < 80 and area > 1500:
-                        buttons.append({
-                            'x': x, 'y': y, 'width': w, 'height': h,
-                            'area': area,
-                            'type': 'button',
-                            'color': 'blue' if lower[0] == 100 else 'purple'
-                        })
+                # Filter for button-like shapes
+                button_like = (50 < w) & (w < 300) & (30 < h) & (h < 80) & (area > 1500)
+                buttons.extend(boxes_to_elements(boxes[button_like], type='button',
+                                                 color='blue' if lower[0] == 100 else 'purple'))
             
-            return buttons
+            # Both color passes can outline the same button; keep one element per button
+            keep = dedupe(elements_to_boxes(buttons))
+            return [buttons[i] for i in keep]
             
         except Exception as e:
             self.logger.error(f"Error detecting buttons: {e}")
             return []
     
-    def detect_input_fields(self, image: np.ndarray) -> List[Dict]:
+    def detect_input_fields(self, frame: FrameAnalysis) -> List[Dict]:
         """Detect input field elements"""
-        input_fields = []
-        
         try:
-            # Convert to grayscale
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            
-            # Use edge detection to find rectangular shapes
-            edges = cv2.Canny(gray, 50, 150)
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            x, y, w, h, area, aspect_ratio = box_columns(frame.boxes)
             
-            for contour in contours:
-                x, y, w, h = cv2.boundingRect(contour)
-                area = w * h
-                aspect_ratio = w / h if h > 0 else 0
-                
-                # Filter for input field-like shapes (rectangular, specific size)
-                if (100 < w < 400 and 30 < h < 60 and 
-                    area > 3000 and 2 < aspect_ratio < 8):
-                    input_fields.append({
-                        'x': x, 'y': y, 'width': w, 'height': h,
-                        'area': area,
-                        'type': 'input_field'
-                    })
+            # Filter for input field-like shapes (rectangular, specific size)
+            field_like = ((100 < w) & (w < 400) & (30 < h) & (h < 60) &
+                          (area > 3000) & (2 < aspect_ratio) & (aspect_ratio < 8))
             
-            return input_fields
+            field_boxes = frame.boxes[field_like]
+            keep = dedupe(field_boxes)
+            return boxes_to_elements(field_boxes[keep], type='input_field')
             
         except Exception as e:
             self.logger.error(f"Error detecting input fields: {e}")
             return []
     
-    def check_ui_issues(self, screenshot: np.ndarray, analysis: Dict) -> List[Dict]:
+    def check_ui_issues(self, frame: FrameAnalysis, analysis: Dict) -> List[Dict]:
         """Check for common UI issues"""
         issues = []
         
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Analysis Result Cache for Project Watch Tower
+Content-addressed cache of screenshot analysis results with an in-memory LRU
+tier and a size-bounded SQLite tier, so identical frames are analyzed once.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+import cv2
+import numpy as np
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+DEFAULT_CACHE_DB = "analysis_cache.db"
+DEFAULT_MEMORY_ENTRIES = 256
+DEFAULT_MAX_DISK_BYTES = 64 * 1024 * 1024
+# Seconds a statement waits for another process's write lock; a cache that
+# stays locked longer answers from memory instead of stalling the analysis
+DB_BUSY_TIMEOUT = 1.0
+
+
+def pixel_hash(image: np.ndarray) -> str:
+    """Fast content hash of decoded pixels, including shape and dtype"""
+    image = np.ascontiguousarray(image)
+    header = f"{image.shape}|{image.dtype}".encode()
+    if xxhash is not None:
+        digest = xxhash.xxh3_128(header)
+    else:
+        # SHA-256 is hardware accelerated on current CPUs and much faster than blake2b here
+        digest = hashlib.sha256(header)
+    digest.update(image.data)
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """Two-tier cache of JSON-serializable analysis results keyed by frame content
+
+    Keys combine the pixel hash with a namespace (which analyzer, at which
+    settings) and the analyzer version, so changing an analyzer only requires
+    bumping its version. Results are stored as JSON and decoded on every hit,
+    so callers are free to mutate what they get back.
+
+    Several processes may share one database file: it runs in WAL mode so
+    readers do not block the writer, and a locked or failing disk tier
+    degrades to a cache miss (or a memory-only store) rather than an error.
+    """
+
+    def __init__(self, db_path: Optional[str] = DEFAULT_CACHE_DB,
+                 memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+                 max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES):
+        self.db_path = db_path
+        self.memory_entries = memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.memory = OrderedDict()
+        self.file_keys = {}
+        self.lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'disk_errors': 0}
+        self.conn = None
+        if db_path:
+            try:
+                self.conn = self._connect(db_path)
+            except sqlite3.OperationalError:
+                self.stats['disk_errors'] += 1
+                self.conn = None
+
+    @staticmethod
+    def _connect(db_path: str) -> sqlite3.Connection:
+        """Open the disk tier for concurrent use by several processes"""
+        conn = sqlite3.connect(db_path, timeout=DB_BUSY_TIMEOUT, check_same_thread=False)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS analysis_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS file_keys (
+                    path TEXT PRIMARY KEY,
+                    mtime_ns INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    pixel_hash TEXT NOT NULL
+                )
+            ''')
+            conn.commit()
+        except sqlite3.OperationalError:
+            conn.close()
+            raise
+        return conn
+
+    def _disk_failed(self):
+        """Count a locked or failing disk operation and drop its open transaction"""
+        self.stats['disk_errors'] += 1
+        try:
+            self.conn.rollback()
+        except sqlite3.OperationalError:
+            pass
+
+    @staticmethod
+    def make_key(content_hash: str, namespace: str, version: str) -> str:
+        """Combine a content hash with the analyzer namespace and version"""
+        return f"{namespace}@{version}:{content_hash}"
+
+    def get(self, key: str) -> Optional[Any]:
+        """Look up a result, promoting disk hits into memory"""
+        with self.lock:
+            payload = self.memory.get(key)
+            if payload is not None:
+                self.memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return json.loads(payload)
+
+            if self.conn is not None:
+                try:
+                    row = self.conn.execute('SELECT value FROM analysis_cache WHERE key = ?', (key,)).fetchone()
+                except sqlite3.OperationalError:
+                    self._disk_failed()
+                    row = None
+                if row is not None:
+                    # Recency only steers eviction; a hit is still a hit if another process holds the lock
+                    try:
+                        self.conn.execute('UPDATE analysis_cache SET last_access = ? WHERE key = ?',
+                                          (time.time(), key))
+                        self.conn.commit()
+                    except sqlite3.OperationalError:
+                        self._disk_failed()
+                    self._remember(key, row[0])
+                    self.stats['disk_hits'] += 1
+                    return json.loads(row[0])
+
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, key: str, value: Any):
+        """Store a result in both tiers"""
+        payload = json.dumps(value)
+        with self.lock:
+            self._remember(key, payload)
+            if self.conn is not None:
+                try:
+                    self.conn.execute(
+                        'INSERT OR REPLACE INTO analysis_cache (key, value, size, last_access) VALUES (?, ?, ?, ?)',
+                        (key, payload, len(payload), time.time())
+                    )
+                    self._evict_disk()
+                    self.conn.commit()
+                except sqlite3.OperationalError:
+                    self._disk_failed()
+
+    def get_or_compute(self, image: np.ndarray, namespace: str, version: str,
+                       compute: Callable[[], Any]) -> Any:
+        """Return the cached result for these pixels, computing and storing it on a miss"""
+        key = self.make_key(pixel_hash(image), namespace, version)
+        result = self.get(key)
+        if result is None:
+            result = compute()
+            self.put(key, result)
+        return result
+
+    def known_file_hash(self, path: str) -> Optional[str]:
+        """Pixel hash recorded for a file, if it is unchanged since it was last hashed"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        signature = (stat.st_mtime_ns, stat.st_size)
+        path = os.path.abspath(path)
+
+        with self.lock:
+            known = self.file_keys.get(path)
+            if known is None and self.conn is not None:
+                try:
+                    row = self.conn.execute(
+                        'SELECT mtime_ns, size, pixel_hash FROM file_keys WHERE path = ?', (path,)
+                    ).fetchone()
+                except sqlite3.OperationalError:
+                    self._disk_failed()
+                    row = None
+                if row is not None:
+                    known = ((row[0], row[1]), row[2])
+                    self.file_keys[path] = known
+        if known is not None and known[0] == signature:
+            return known[1]
+        return None
+
+    def file_hash(self, path: str, image: np.ndarray) -> str:
+        """Hash a decoded image file and remember the hash against its path, mtime and size"""
+        content_hash = pixel_hash(image)
+        self.record_file_hash(path, content_hash)
+        return content_hash
+
+    def record_file_hash(self, path: str, content_hash: str):
+        """Remember a pixel hash computed elsewhere (e.g. in a worker process) for a file"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        signature = (stat.st_mtime_ns, stat.st_size)
+        path = os.path.abspath(path)
+
+        with self.lock:
+            self.file_keys[path] = (signature, content_hash)
+            if self.conn is not None:
+                try:
+                    self.conn.execute(
+                        'INSERT OR REPLACE INTO file_keys (path, mtime_ns, size, pixel_hash) VALUES (?, ?, ?, ?)',
+                        (path, signature[0], signature[1], content_hash)
+                    )
+                    self.conn.commit()
+                except sqlite3.OperationalError:
+                    self._disk_failed()
+
+    def get_or_compute_file(self, path: str, namespace: str, version: str,
+                            compute: Callable[[np.ndarray], Any]) -> Optional[Any]:
+        """Like get_or_compute for an image file; compute receives the decoded image
+
+        Unchanged files that were seen before are answered without decoding.
+        Returns None if the file cannot be loaded.
+        """
+        content_hash = self.known_file_hash(path)
+        if content_hash is not None:
+            result = self.get(self.make_key(content_hash, namespace, version))
+            if result is not None:
+                return result
+
+        image = cv2.imread(path)
+        if image is None:
+            return None
+        key = self.make_key(self.file_hash(path, image), namespace, version)
+        result = self.get(key)
+        if result is None:
+            result = compute(image)
+            self.put(key, result)
+        return result
+
+    def _remember(self, key: str, payload: str):
+        """Insert into the memory tier, dropping least recently used entries"""
+        self.memory[key] = payload
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def _evict_disk(self):
+        """Delete least recently used rows until the disk tier fits max_disk_bytes"""
+        cursor = self.conn.execute('''
+            DELETE FROM analysis_cache WHERE key IN (
+                SELECT key FROM (
+                    SELECT key, SUM(size) OVER (ORDER BY last_access DESC, key) AS running
+                    FROM analysis_cache
+                ) WHERE running > ?
+            )
+        ''', (self.max_disk_bytes,))
+        self.stats['evictions'] += max(cursor.rowcount, 0)
+
+    def disk_usage(self) -> Dict:
+        """Number of entries and payload bytes in the disk tier"""
+        if self.conn is None:
+            return {'entries': 0, 'bytes': 0}
+        with self.lock:
+            entries, size = self.conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM analysis_cache'
+            ).fetchone()
+        return {'entries': entries, 'bytes': size}
+
+    def clear(self):
+        """Drop every cached result"""
+        with self.lock:
+            self.memory.clear()
+            self.file_keys.clear()
+            if self.conn is not None:
+                self.conn.execute('DELETE FROM analysis_cache')
+                self.conn.execute('DELETE FROM file_keys')
+                self.conn.commit()
+
+    def close(self):
+        """Close the disk tier"""
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_analysis_cache() -> AnalysisCache:
+    """Process-wide cache shared by all analyzers"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = AnalysisCache(os.environ.get('WATCHTOWER_ANALYSIS_CACHE', DEFAULT_CACHE_DB))
+        return _shared_cache
+
+
+def main():
+    """Show cache statistics or clear the cache"""
+    cache = AnalysisCache(os.environ.get('WATCHTOWER_ANALYSIS_CACHE', DEFAULT_CACHE_DB))
+    if len(sys.argv) > 1 and sys.argv[1] == '--clear':
+        cache.clear()
+        print("🧹 Analysis cache cleared")
+        return
+
+    usage = cache.disk_usage()
+    print(f"💾 Analysis cache: {cache.db_path}")
+    print(f"   Entries: {usage['entries']}")
+    print(f"   Size: {usage['bytes'] / 1024:.1f} KB of {cache.max_disk_bytes / 1024 / 1024:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
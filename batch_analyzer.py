@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Batch Screenshot Analyzer for Project Watch Tower
+Spreads decoding and analysis of screenshot backlogs across worker processes,
+streaming results back in completion order and checkpointing them so an
+interrupted run resumes where it stopped.
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import cv2
+
+from analysis_cache import AnalysisCache, get_analysis_cache, pixel_hash
+
+DEFAULT_CHUNK_SIZE = 16
+DEFAULT_CHECKPOINT = "batch_analysis.jsonl"
+# Chunks queued per worker, so results stream back without submitting the whole backlog
+CHUNKS_IN_FLIGHT_PER_WORKER = 2
+
+
+def _init_worker():
+    # One image per process at a time; OpenCV's own thread pool would oversubscribe the cores
+    cv2.setNumThreads(1)
+
+
+def _analyze_chunk(analyze: Callable, paths: List[str]) -> List[Dict]:
+    """Decode and analyze a chunk of screenshots inside a worker process"""
+    records = []
+    for path in paths:
+        image = cv2.imread(path)
+        if image is None:
+            records.append({'path': path, 'error': "Could not decode image"})
+            continue
+        try:
+            records.append({'path': path, 'pixel_hash': pixel_hash(image), 'result': analyze(image)})
+        except Exception as e:
+            records.append({'path': path, 'error': str(e)})
+    return records
+
+
+def find_screenshots(directory: str, extensions=('.png', '.jpg', '.jpeg')) -> List[str]:
+    """Image files in a directory, sorted by name"""
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith(extensions)
+    )
+
+
+class BatchAnalyzer:
+    """Analyze many screenshot files with a process pool
+
+    ``analyze`` receives a decoded BGR image and must be a module-level function
+    so it can be sent to the workers. Files are dispatched in chunks and at most
+    a couple of chunks per worker are queued at once. Results are yielded as
+    chunks complete and appended to a JSONL checkpoint; on the next run, files
+    whose path, mtime and size match a checkpoint entry written by the same
+    analyzer namespace and version are not analyzed again.
+    Files already in the analysis cache are answered without being decoded.
+    """
+
+    def __init__(self, analyze: Callable, namespace: str, version: str,
+                 workers: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 checkpoint_path: Optional[str] = DEFAULT_CHECKPOINT,
+                 cache: Optional[AnalysisCache] = None):
+        self.analyze = analyze
+        self.namespace = namespace
+        self.version = version
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = max(1, chunk_size)
+        self.checkpoint_path = checkpoint_path
+        self.cache = cache if cache is not None else get_analysis_cache()
+        self.stop_event = threading.Event()
+        self.stats = self._empty_stats()
+
+    @staticmethod
+    def _empty_stats() -> Dict:
+        return {
+            'total': 0, 'completed': 0, 'analyzed': 0, 'cached': 0, 'resumed': 0, 'failed': 0,
+            'elapsed': 0.0, 'images_per_second': 0.0,
+        }
+
+    def load_checkpoint(self) -> Dict[str, Dict]:
+        """Checkpoint records by absolute path; later records win"""
+        records = {}
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return records
+        with open(self.checkpoint_path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A run killed mid-write leaves a partial last line
+                    continue
+                records[record['path']] = record
+        return records
+
+    def stop(self):
+        """Ask a running batch to stop after the chunks (or, inline, the file) in progress"""
+        self.stop_event.set()
+
+    def run(self, paths: Iterable[str], restart: bool = False) -> Iterator[Dict]:
+        """Analyze files, yielding one record per file in completion order
+
+        Each record has ``path``, ``mtime_ns``, ``size``, ``namespace``,
+        ``version``, ``source`` (checkpoint, cache or analyzed) and either
+        ``result`` or ``error``.
+        """
+        self.stop_event.clear()
+        self.stats = self._empty_stats()
+        start = time.perf_counter()
+
+        if restart and self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        done = self.load_checkpoint()
+        checkpoint = open(self.checkpoint_path, 'a') if self.checkpoint_path else None
+
+        signatures = {}
+        pending = []
+        try:
+            for path in paths:
+                path = os.path.abspath(path)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                signatures[path] = (stat.st_mtime_ns, stat.st_size)
+                self.stats['total'] += 1
+
+                # Records of another analyzer or an older version of it are stale
+                previous = done.get(path)
+                if (previous is not None and (previous['mtime_ns'], previous['size']) == signatures[path]
+                        and (previous.get('namespace'), previous.get('version')) == (self.namespace, self.version)):
+                    yield self._finish(dict(previous, source='checkpoint'), None, start)
+                    continue
+
+                cached = self._cached_result(path)
+                if cached is not None:
+                    record = self._record(path, signatures[path], 'cache', result=cached)
+                    yield self._finish(record, checkpoint, start)
+                    continue
+                pending.append(path)
+
+            chunks = [pending[i:i + self.chunk_size] for i in range(0, len(pending), self.chunk_size)]
+            if len(chunks) <= 1:
+                # Not worth starting worker processes for a single chunk; its files are
+                # analyzed one at a time so a stop takes effect between them
+                for path in pending:
+                    if self.stop_event.is_set():
+                        break
+                    for record in _analyze_chunk(self.analyze, [path]):
+                        yield self._finish(self._collect(record, signatures), checkpoint, start)
+                return
+
+            pool = ProcessPoolExecutor(max_workers=min(self.workers, len(chunks)), initializer=_init_worker)
+            try:
+                queued = iter(chunks)
+                in_flight = set()
+                while True:
+                    while not self.stop_event.is_set() and len(in_flight) < self.workers * CHUNKS_IN_FLIGHT_PER_WORKER:
+                        chunk = next(queued, None)
+                        if chunk is None:
+                            break
+                        in_flight.add(pool.submit(_analyze_chunk, self.analyze, chunk))
+                    if not in_flight:
+                        break
+
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        for record in future.result():
+                            yield self._finish(self._collect(record, signatures), checkpoint, start)
+                    if checkpoint is not None:
+                        checkpoint.flush()
+            finally:
+                # Chunks that have not started are dropped; the checkpoint picks them up next run
+                pool.shutdown(wait=True, cancel_futures=True)
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
+
+    def _cached_result(self, path: str) -> Optional[Dict]:
+        """Cached analysis for an unchanged file that was hashed before"""
+        content_hash = self.cache.known_file_hash(path)
+        if content_hash is None:
+            return None
+        return self.cache.get(self.cache.make_key(content_hash, self.namespace, self.version))
+
+    def _collect(self, record: Dict, signatures: Dict) -> Dict:
+        """Turn a worker record into a result record, storing successes in the analysis cache"""
+        path = record['path']
+        if 'error' in record:
+            return self._record(path, signatures[path], 'analyzed', error=record['error'])
+
+        self.cache.record_file_hash(path, record['pixel_hash'])
+        self.cache.put(self.cache.make_key(record['pixel_hash'], self.namespace, self.version), record['result'])
+        return self._record(path, signatures[path], 'analyzed', result=record['result'])
+
+    def _record(self, path: str, signature, source: str, **outcome) -> Dict:
+        return dict({'path': path, 'mtime_ns': signature[0], 'size': signature[1],
+                     'namespace': self.namespace, 'version': self.version, 'source': source}, **outcome)
+
+    def _finish(self, record: Dict, checkpoint, start: float) -> Dict:
+        """Update throughput stats and checkpoint a newly produced record"""
+        source = record['source']
+        self.stats['resumed' if source == 'checkpoint' else 'cached' if source == 'cache' else 'analyzed'] += 1
+        if 'error' in record:
+            self.stats['failed'] += 1
+        self.stats['completed'] += 1
+
+        # Throughput counts the images this run actually produced, not resumed ones
+        self.stats['elapsed'] = time.perf_counter() - start
+        produced = self.stats['completed'] - self.stats['resumed']
+        self.stats['images_per_second'] = produced / self.stats['elapsed'] if self.stats['elapsed'] > 0 else 0.0
+
+        if checkpoint is not None and record['source'] != 'checkpoint':
+            checkpoint.write(json.dumps({key: value for key, value in record.items() if key != 'source'}) + '\n')
+        return record
+
+
+def main():
+    """Analyze a directory of screenshots with the code fixer's issue detector"""
+    from independent_code_fixer import ANALYSIS_NAMESPACE, ANALYZER_VERSION, detect_screenshot_issues
+
+    parser = argparse.ArgumentParser(description='Batch screenshot analyzer')
+    parser.add_argument('directory', nargs='?', default='ai_screenshots', help='Directory of screenshots')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Screenshots per task')
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT, help='JSONL file of finished results')
+    parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint and analyze everything')
+    args = parser.parse_args()
+
+    paths = find_screenshots(args.directory)
+    if not paths:
+        print(f"❌ No screenshots found in {args.directory}")
+        return
+
+    analyzer = BatchAnalyzer(detect_screenshot_issues, ANALYSIS_NAMESPACE, ANALYZER_VERSION,
+                             workers=args.workers, chunk_size=args.chunk_size, checkpoint_path=args.checkpoint)
+    print(f"🔍 Analyzing {len(paths)} screenshots with {analyzer.workers} workers")
+
+    issues = 0
+    report_every = max(1, len(paths) // 20)
+    try:
+        for record in analyzer.run(paths, restart=args.restart):
+            if 'error' in record:
+                print(f"   ❌ {os.path.basename(record['path'])}: {record['error']}")
+            else:
+                issues += len(record['result']['issues'])
+            stats = analyzer.stats
+            if stats['completed'] % report_every == 0 or stats['completed'] == stats['total']:
+                print(f"   {stats['completed']}/{stats['total']} done, {stats['images_per_second']:.1f} images/s")
+    except KeyboardInterrupt:
+        print("\n🛑 Interrupted; rerun the same command to resume")
+
+    stats = analyzer.stats
+    print(f"📊 Analyzed: {stats['analyzed']}, from cache: {stats['cached']}, resumed: {stats['resumed']}, "
+          f"failed: {stats['failed']}")
+    print(f"   Issues found: {issues}")
+    print(f"   Throughput: {stats['images_per_second']:.1f} images/s over {stats['elapsed']:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Box Set Utilities for Project Watch Tower
+Vectorized IoU, union area, non-maximum suppression, containment filtering and merging for
+the (x, y, w, h) box arrays that the UI detectors produce.
+"""
+
+import argparse
+import time
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Boxes overlapping a kept box by more than this IoU are duplicates
+NMS_IOU = 0.5
+# A box with at least this share of its area inside a larger box is redundant
+CONTAINMENT = 0.9
+
+
+def _edges(boxes: np.ndarray):
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    return boxes[:, 0], boxes[:, 1], boxes[:, 0] + boxes[:, 2], boxes[:, 1] + boxes[:, 3]
+
+
+def box_areas(boxes: np.ndarray) -> np.ndarray:
+    """Area of each box"""
+    boxes = np.asarray(boxes).reshape(-1, 4)
+    return boxes[:, 2].astype(np.float64) * boxes[:, 3]
+
+
+def intersection_areas(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise intersection areas between two box arrays, shape (len(a), len(b))"""
+    ax0, ay0, ax1, ay1 = _edges(a)
+    bx0, by0, bx1, by1 = _edges(b)
+    ix = (np.minimum(ax1[:, None], bx1[None, :]) - np.maximum(ax0[:, None], bx0[None, :])).clip(min=0)
+    iy = (np.minimum(ay1[:, None], by1[None, :]) - np.maximum(ay0[:, None], by0[None, :])).clip(min=0)
+    return ix * iy
+
+
+def box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise intersection-over-union between two box arrays, shape (len(a), len(b))"""
+    inter = intersection_areas(a, b)
+    union = box_areas(a)[:, None] + box_areas(b)[None, :] - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def union_area(boxes: np.ndarray) -> float:
+    """Area covered by the union of the boxes, counting overlaps once"""
+    x0, y0, x1, y1 = _edges(boxes)
+    if len(x0) == 0:
+        return 0.0
+    # Box edges cut the plane into cells; a cell is covered when its centre is inside any box
+    xs = np.unique(np.concatenate([x0, x1]))
+    ys = np.unique(np.concatenate([y0, y1]))
+    cx = (xs[:-1] + xs[1:]) / 2
+    cy = (ys[:-1] + ys[1:]) / 2
+    inside_x = (x0[:, None] <= cx) & (cx < x1[:, None])
+    inside_y = (y0[:, None] <= cy) & (cy < y1[:, None])
+    covered = (inside_y[:, :, None] & inside_x[:, None, :]).any(axis=0)
+    return float((np.diff(ys)[:, None] * np.diff(xs)[None, :])[covered].sum())
+
+
+def overlapping_pairs(boxes: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Index pairs (i, j) with i < j of intersecting boxes, and their intersection areas
+
+    UI boxes rarely overlap, so instead of a dense pairwise matrix this sorts
+    the boxes along one axis and only pairs each box with the boxes that start
+    before it ends there, using whichever axis yields fewer candidates.
+    """
+    x0, y0, x1, y1 = _edges(boxes)
+    count = len(x0)
+    best = None
+    for start, end in ((x0, x1), (y0, y1)):
+        order = np.argsort(start, kind='stable')
+        stop = np.searchsorted(start[order], end[order], side='left')
+        candidates = np.maximum(stop - np.arange(count) - 1, 0)
+        if best is None or candidates.sum() < best[1].sum():
+            best = (order, candidates)
+
+    order, candidates = best
+    first = np.repeat(np.arange(count), candidates)
+    second = first + 1 + np.arange(len(first)) - np.repeat(np.cumsum(candidates) - candidates, candidates)
+    a, b = order[first], order[second]
+
+    iw = np.minimum(x1[a], x1[b]) - np.maximum(x0[a], x0[b])
+    ih = np.minimum(y1[a], y1[b]) - np.maximum(y0[a], y0[b])
+    hit = (iw > 0) & (ih > 0)
+    a, b = a[hit], b[hit]
+    return np.minimum(a, b), np.maximum(a, b), iw[hit] * ih[hit]
+
+
+def nms(boxes: np.ndarray, scores: Optional[np.ndarray] = None, iou_threshold: float = NMS_IOU) -> np.ndarray:
+    """Greedy non-maximum suppression; returns kept indices in their original order
+
+    Without ``scores`` larger boxes win. The greedy pass only visits boxes
+    that overlap another box by more than the threshold.
+    """
+    boxes = np.asarray(boxes).reshape(-1, 4)
+    scores = box_areas(boxes) if scores is None else np.asarray(scores, dtype=np.float64)
+    order = np.argsort(-scores, kind='stable')
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+
+    a, b, inter = overlapping_pairs(boxes)
+    areas = box_areas(boxes)
+    duplicate = inter / (areas[a] + areas[b] - inter) > iou_threshold
+    ahead = np.minimum(rank[a], rank[b])[duplicate]
+    behind = np.maximum(rank[a], rank[b])[duplicate]
+    by_ahead = np.lexsort((behind, ahead))
+    ahead, behind = ahead[by_ahead], behind[by_ahead]
+
+    # Walk the better box of each pair in rank order; a surviving box suppresses its partners
+    suppressed = np.zeros(len(order), dtype=bool)
+    starts = np.flatnonzero(np.r_[True, ahead[1:] != ahead[:-1]]) if len(ahead) else []
+    for better, partners in zip(ahead[starts], np.split(behind, starts[1:])):
+        if not suppressed[better]:
+            suppressed[partners] = True
+    return np.sort(order[~suppressed])
+
+
+def contained_mask(boxes: np.ndarray, threshold: float = CONTAINMENT) -> np.ndarray:
+    """True for boxes lying mostly inside a larger box (or an identical earlier one)"""
+    boxes = np.asarray(boxes).reshape(-1, 4)
+    areas = box_areas(boxes)
+    contained = np.zeros(len(boxes), dtype=bool)
+
+    a, b, inter = overlapping_pairs(boxes)
+    # a < b, so on equal areas only b can be absorbed (by the earlier a)
+    contained[a[(inter >= threshold * areas[a]) & (areas[b] > areas[a])]] = True
+    contained[b[(inter >= threshold * areas[b]) & (areas[a] >= areas[b])]] = True
+    return contained
+
+
+def dedupe(boxes: np.ndarray, scores: Optional[np.ndarray] = None, iou_threshold: float = NMS_IOU,
+           containment: float = CONTAINMENT) -> np.ndarray:
+    """Indices of the boxes that survive NMS and containment filtering, in original order"""
+    boxes = np.asarray(boxes).reshape(-1, 4)
+    if len(boxes) < 2:
+        return np.arange(len(boxes))
+    keep = nms(boxes, scores, iou_threshold)
+    return keep[~contained_mask(boxes[keep], containment)]
+
+
+def overlap_groups(boxes: np.ndarray, iou_threshold: float = 0.0) -> np.ndarray:
+    """Group label per box, joining boxes that overlap (transitively) by more than the IoU threshold"""
+    boxes = np.asarray(boxes).reshape(-1, 4)
+    a, b, inter = overlapping_pairs(boxes)
+    if iou_threshold > 0:
+        areas = box_areas(boxes)
+        linked = inter / (areas[a] + areas[b] - inter) > iou_threshold
+        a, b = a[linked], b[linked]
+
+    # Spread the smallest index through each group along the overlap edges,
+    # jumping along label chains between rounds so long chains settle quickly
+    labels = np.arange(len(boxes))
+    while True:
+        spread = labels.copy()
+        np.minimum.at(spread, a, labels[b])
+        np.minimum.at(spread, b, labels[a])
+        spread = spread[spread]
+        if np.array_equal(spread, labels):
+            break
+        labels = spread
+    return np.unique(labels, return_inverse=True)[1].astype(np.int32)
+
+
+def merge_boxes(boxes: np.ndarray, iou_threshold: float = 0.0) -> np.ndarray:
+    """Replace each group of overlapping boxes with its union box, ordered by first member"""
+    boxes = np.asarray(boxes).reshape(-1, 4)
+    if len(boxes) < 2:
+        return boxes.astype(np.int32)
+
+    labels = overlap_groups(boxes, iou_threshold)
+    x0, y0, x1, y1 = _edges(boxes)
+    count = labels.max() + 1
+    left = np.full(count, np.inf)
+    top = np.full(count, np.inf)
+    right = np.full(count, -np.inf)
+    bottom = np.full(count, -np.inf)
+    np.minimum.at(left, labels, x0)
+    np.minimum.at(top, labels, y0)
+    np.maximum.at(right, labels, x1)
+    np.maximum.at(bottom, labels, y1)
+
+    order = np.argsort(np.unique(labels, return_index=True)[1])
+    merged = np.stack([left, top, right - left, bottom - top], axis=1)[order]
+    return merged.astype(np.int32)
+
+
+def _loop_nms(boxes: np.ndarray, iou_threshold: float = NMS_IOU) -> list:
+    """Pairwise Python reference for checking and timing nms"""
+    order = sorted(range(len(boxes)), key=lambda i: -int(boxes[i][2]) * int(boxes[i][3]))
+    keep = []
+    for i in order:
+        x, y, w, h = (int(v) for v in boxes[i])
+        overlaps = False
+        for j in keep:
+            kx, ky, kw, kh = (int(v) for v in boxes[j])
+            iw = max(0, min(x + w, kx + kw) - max(x, kx))
+            ih = max(0, min(y + h, ky + kh) - max(y, ky))
+            inter = iw * ih
+            if inter / (w * h + kw * kh - inter) > iou_threshold:
+                overlaps = True
+                break
+        if not overlaps:
+            keep.append(i)
+    return sorted(keep)
+
+
+def main():
+    """Report how much deduplication shrinks the edge-contour boxes of screenshots"""
+    from frame_analysis import FrameAnalysis
+
+    parser = argparse.ArgumentParser(description='Box set deduplication report')
+    parser.add_argument('screenshots', nargs='+', help='Screenshot files')
+    args = parser.parse_args()
+
+    for path in args.screenshots:
+        image = cv2.imread(path)
+        if image is None:
+            print(f"❌ Could not load {path}")
+            continue
+        boxes = FrameAnalysis(image).boxes
+        boxes = boxes[(boxes[:, 2] > 1) & (boxes[:, 3] > 1)]
+
+        start = time.perf_counter()
+        keep = dedupe(boxes)
+        dedupe_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        merged = merge_boxes(boxes[keep])
+        merge_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        same = np.array_equal(nms(boxes), _loop_nms(boxes))
+        loop_ms = (time.perf_counter() - start) * 1000
+
+        print(f"📦 {path}: {len(boxes)} contour boxes")
+        print(f"   After NMS + containment: {len(keep)} ({dedupe_ms:.1f} ms)")
+        print(f"   Merged overlapping groups: {len(merged)} ({merge_ms:.1f} ms)")
+        print(f"   Python loop NMS: {loop_ms:.1f} ms ({'same' if same else 'different'} result)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+In-Memory Screen Capture for Project Watch Tower
+Reads screenshots from the simulator/emulator tool's stdout and decodes them
+straight into NumPy arrays, without temporary files.
+"""
+
+import argparse
+import os
+import shlex
+import subprocess
+import time
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+# Command prefixes can be overridden, e.g. with a stand-in script on Linux
+SIMCTL_ENV = 'WATCHTOWER_SIMCTL'
+ADB_ENV = 'WATCHTOWER_ADB'
+DEFAULT_SIMCTL = 'xcrun simctl'
+DEFAULT_ADB = 'adb'
+
+CAPTURE_TIMEOUT = 10
+
+
+def capture_command(platform: str = 'ios', device: Optional[str] = None) -> List[str]:
+    """Build the command that writes a PNG screenshot to stdout"""
+    if platform == 'ios':
+        simctl = shlex.split(os.environ.get(SIMCTL_ENV, DEFAULT_SIMCTL))
+        return simctl + ['io', device or 'booted', 'screenshot', '-']
+    if platform == 'android':
+        adb = shlex.split(os.environ.get(ADB_ENV, DEFAULT_ADB))
+        target = ['-s', device] if device else []
+        return adb + target + ['exec-out', 'screencap', '-p']
+    raise ValueError(f"Unsupported platform: {platform}")
+
+
+def decode_image(data: bytes, flags: int = cv2.IMREAD_COLOR) -> Optional[np.ndarray]:
+    """Decode encoded image bytes into a BGR array"""
+    if not data:
+        return None
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flags)
+
+
+class ScreenCapture:
+    """Capture screenshots from a booted iOS simulator or Android device in memory
+
+    Nothing is written to disk unless ``save_path`` is passed to capture(),
+    so concurrent monitors never race on a shared temporary file.
+    """
+
+    def __init__(self, platform: str = 'ios', device: Optional[str] = None,
+                 timeout: float = CAPTURE_TIMEOUT):
+        self.platform = platform
+        self.device = device
+        self.timeout = timeout
+        self.last_error = None
+
+    def capture_bytes(self) -> Optional[bytes]:
+        """Run the capture tool and return the encoded PNG bytes"""
+        try:
+            result = subprocess.run(capture_command(self.platform, self.device),
+                                    capture_output=True, timeout=self.timeout)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            self.last_error = str(e)
+            return None
+
+        if result.returncode != 0 or not result.stdout:
+            self.last_error = result.stderr.decode(errors='replace').strip() or f"exit code {result.returncode}"
+            return None
+
+        self.last_error = None
+        return result.stdout
+
+    def capture(self, save_path: Optional[str] = None) -> Optional[np.ndarray]:
+        """Capture and decode a screenshot, optionally persisting the original PNG bytes"""
+        data = self.capture_bytes()
+        if data is None:
+            return None
+
+        image = decode_image(data)
+        if image is None:
+            self.last_error = "Could not decode screenshot"
+            return None
+
+        if save_path:
+            with open(save_path, 'wb') as f:
+                f.write(data)
+        return image
+
+
+def main():
+    """Capture screenshots and report capture timing"""
+    parser = argparse.ArgumentParser(description='In-memory screen capture')
+    parser.add_argument('--platform', choices=['ios', 'android'], default='ios')
+    parser.add_argument('--device', help='Simulator UDID or adb serial (default: booted / only device)')
+    parser.add_argument('--count', type=int, default=5, help='Number of captures to time')
+    parser.add_argument('--save', help='Write the last capture to this PNG file')
+    args = parser.parse_args()
+
+    capture = ScreenCapture(args.platform, args.device)
+    print(f"📸 Capturing with: {' '.join(capture_command(args.platform, args.device))}")
+
+    image = None
+    timings = []
+    for i in range(args.count):
+        start = time.perf_counter()
+        image = capture.capture(save_path=args.save if i == args.count - 1 else None)
+        timings.append((time.perf_counter() - start) * 1000)
+        if image is None:
+            print(f"❌ Capture failed: {capture.last_error}")
+            return
+
+    print(f"   Frame: {image.shape[1]}x{image.shape[0]}")
+    print(f"   Capture + decode: {np.mean(timings):.1f} ms average over {len(timings)}")
+    if args.save:
+        print(f"   Saved: {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Perceptual Change Detector for Project Watch Tower
+Keeps a tiny block-mean signature of the last accepted frame and only looks at
+finer detail in the tiles whose signature moved, reporting the changed regions.
+"""
+
+import argparse
+import time
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+from frame_analysis import FrameAnalysis, downsample
+
+# Signature tiles and comparison cells, in device pixels
+TILE_SIZE = 32
+CELL_SIZE = 4
+
+# A tile is re-examined when its mean gray level moves by more than this
+TILE_TOLERANCE = 1
+# A cell counts as changed when its mean gray level moves by more than this
+CELL_TOLERANCE = 12
+# Same threshold the monitors used for their full-frame pixel diff
+MIN_CHANGED_PIXELS = 1000
+
+
+def block_means(gray: np.ndarray, block: int) -> np.ndarray:
+    """Mean of every block x block square, padding partial edge blocks by replication"""
+    rows = -(-gray.shape[0] // block)
+    cols = -(-gray.shape[1] // block)
+    pad_bottom = rows * block - gray.shape[0]
+    pad_right = cols * block - gray.shape[1]
+    if pad_bottom or pad_right:
+        gray = cv2.copyMakeBorder(gray, 0, pad_bottom, 0, pad_right, cv2.BORDER_REPLICATE)
+    # Integer-ratio INTER_AREA is an exact block average
+    return cv2.resize(gray, (cols, rows), interpolation=cv2.INTER_AREA)
+
+
+def frame_signature(image: np.ndarray, tile_size: int = TILE_SIZE) -> np.ndarray:
+    """Block-mean grayscale signature with one value per tile_size x tile_size tile"""
+    # Halving first is cheaper than converting the full frame to grayscale
+    half = downsample(image, 0.5)
+    gray = cv2.cvtColor(half, cv2.COLOR_BGR2GRAY) if half.ndim == 3 else half
+    signature = block_means(gray, tile_size // 2)
+
+    # Dropping an odd last row/column while halving can shorten the grid by one
+    rows = -(-image.shape[0] // tile_size)
+    cols = -(-image.shape[1] // tile_size)
+    if signature.shape != (rows, cols):
+        signature = cv2.copyMakeBorder(signature, 0, rows - signature.shape[0], 0, cols - signature.shape[1],
+                                       cv2.BORDER_REPLICATE)
+    return signature
+
+
+def cell_means(image: np.ndarray, cell_size: int = CELL_SIZE) -> np.ndarray:
+    """Full-resolution grayscale cell means of an image region"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    return block_means(gray, cell_size)
+
+
+class ChangeDetector:
+    """Detect significant screen changes without keeping the previous frame
+
+    The detector stores the signature and cell means of the last accepted frame
+    (about 1/48 of the BGR frame size). Each update compares signatures first;
+    only tiles whose signature moved are re-read at full resolution and compared
+    cell by cell. A change is accepted when the changed cells cover more than
+    ``min_changed_pixels``, and the reference is then advanced for the moved
+    tiles only, so slow drift still accumulates against the accepted frame.
+    """
+
+    def __init__(self, tile_size: int = TILE_SIZE, cell_size: int = CELL_SIZE,
+                 tile_tolerance: int = TILE_TOLERANCE, cell_tolerance: int = CELL_TOLERANCE,
+                 min_changed_pixels: int = MIN_CHANGED_PIXELS):
+        if tile_size % cell_size or tile_size % 2:
+            raise ValueError("tile_size must be even and a multiple of cell_size")
+        self.tile_size = tile_size
+        self.cell_size = cell_size
+        self.tile_tolerance = tile_tolerance
+        self.cell_tolerance = cell_tolerance
+        self.min_changed_pixels = min_changed_pixels
+        self.reset()
+
+    def reset(self):
+        """Forget the reference frame; the next update reports a full-frame change"""
+        self.frame_shape = None
+        self.signature = None
+        self.cells = None
+
+    def update(self, image: np.ndarray) -> Dict:
+        """Compare a frame with the last accepted one
+
+        Returns a dict with ``changed``, the estimated ``changed_pixels``, the
+        number of ``moved_tiles`` and the changed regions as an (N, 4) array of
+        (x, y, w, h) device-pixel ``boxes``. Whether a frame counts as changed
+        depends on ``cell_tolerance``; the boxes of an accepted change cover
+        every cell of the moved tiles whose mean differs at all.
+        """
+        height, width = image.shape[:2]
+        if self.signature is None or image.shape != self.frame_shape:
+            self.frame_shape = image.shape
+            self.signature = frame_signature(image, self.tile_size)
+            self.cells = cell_means(image, self.cell_size)
+            return {
+                'changed': True,
+                'changed_pixels': height * width,
+                'moved_tiles': self.signature.size,
+                'boxes': np.array([[0, 0, width, height]], dtype=np.int32),
+            }
+
+        signature = frame_signature(image, self.tile_size)
+        moved = cv2.absdiff(signature, self.signature) > self.tile_tolerance
+        moved_tiles = int(np.count_nonzero(moved))
+        if moved_tiles == 0:
+            return self._result(False, 0, 0)
+
+        # Re-read each connected group of moved tiles once at full resolution
+        per_tile = self.tile_size // self.cell_size
+        moved_cells = np.repeat(np.repeat(moved, per_tile, axis=0), per_tile, axis=1)
+        moved_cells = moved_cells[:self.cells.shape[0], :self.cells.shape[1]]
+        changed_cells = np.zeros(self.cells.shape, dtype=bool)
+        differing_cells = np.zeros(self.cells.shape, dtype=bool)
+        regions = []
+
+        count, _, stats, _ = cv2.connectedComponentsWithStats(moved.astype(np.uint8), connectivity=8)
+        for tx, ty, tw, th, _ in stats[1:count]:
+            x0, y0 = tx * self.tile_size, ty * self.tile_size
+            x1 = min((tx + tw) * self.tile_size, width)
+            y1 = min((ty + th) * self.tile_size, height)
+            cells = cell_means(image[y0:y1, x0:x1], self.cell_size)
+
+            cell_slice = (slice(ty * per_tile, ty * per_tile + cells.shape[0]),
+                          slice(tx * per_tile, tx * per_tile + cells.shape[1]))
+            mask = moved_cells[cell_slice]
+            difference = cv2.absdiff(cells, self.cells[cell_slice])
+            changed_cells[cell_slice] |= (difference > self.cell_tolerance) & mask
+            differing_cells[cell_slice] |= (difference > 0) & mask
+            regions.append((cell_slice, cells, mask))
+
+        changed_pixels = int(np.count_nonzero(changed_cells)) * self.cell_size * self.cell_size
+        if changed_pixels <= self.min_changed_pixels:
+            return self._result(False, changed_pixels, moved_tiles)
+
+        # The reference advances for every cell of the moved tiles, so every cell that
+        # differs there is reported, also those below the tolerance; otherwise a patched
+        # analysis would keep stale contours where the reference has already moved on
+        self.signature[moved] = signature[moved]
+        for cell_slice, cells, mask in regions:
+            np.copyto(self.cells[cell_slice], cells, where=mask)
+        return self._result(True, changed_pixels, moved_tiles, self._changed_boxes(differing_cells))
+
+    def _changed_boxes(self, changed_cells: np.ndarray) -> np.ndarray:
+        """Bounding boxes of changed cells, merging cells that are one cell apart"""
+        mask = cv2.dilate(changed_cells.astype(np.uint8), np.ones((3, 3), np.uint8))
+        count, labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+
+        # Shrink each dilated component back to the extent of its changed cells
+        boxes = []
+        for label in range(1, count):
+            x, y, w, h = stats[label, :4]
+            inside = changed_cells[y:y + h, x:x + w] & (labels[y:y + h, x:x + w] == label)
+            rows = np.flatnonzero(inside.any(axis=1))
+            cols = np.flatnonzero(inside.any(axis=0))
+            x0, y0 = (x + cols[0]) * self.cell_size, (y + rows[0]) * self.cell_size
+            x1 = min((x + cols[-1] + 1) * self.cell_size, self.frame_shape[1])
+            y1 = min((y + rows[-1] + 1) * self.cell_size, self.frame_shape[0])
+            boxes.append((x0, y0, x1 - x0, y1 - y0))
+        return np.array(boxes, dtype=np.int32).reshape(-1, 4)
+
+    @staticmethod
+    def _result(changed: bool, changed_pixels: int, moved_tiles: int,
+                boxes: Optional[np.ndarray] = None) -> Dict:
+        return {
+            'changed': changed,
+            'changed_pixels': changed_pixels,
+            'moved_tiles': moved_tiles,
+            'boxes': np.zeros((0, 4), dtype=np.int32) if boxes is None else boxes,
+        }
+
+
+def _full_frame_diff(previous: np.ndarray, current: np.ndarray) -> int:
+    """The monitors' previous detector: changed pixel count of a full grayscale diff"""
+    diff = cv2.absdiff(cv2.cvtColor(current, cv2.COLOR_BGR2GRAY), cv2.cvtColor(previous, cv2.COLOR_BGR2GRAY))
+    return cv2.countNonZero(diff)
+
+
+def main():
+    """Compare the change detector with a full-frame diff on two screenshots"""
+    parser = argparse.ArgumentParser(description='Perceptual change detector')
+    parser.add_argument('before', help='Screenshot before the change')
+    parser.add_argument('after', help='Screenshot after the change')
+    parser.add_argument('--repeat', type=int, default=50, help='Timing iterations')
+    args = parser.parse_args()
+
+    before = cv2.imread(args.before)
+    after = cv2.imread(args.after)
+    if before is None or after is None:
+        print("❌ Could not load both screenshots")
+        return
+
+    def timed(fn):
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            result = fn()
+        return result, (time.perf_counter() - start) / args.repeat * 1000
+
+    detector = ChangeDetector()
+    detector.update(before)
+    _, idle_ms = timed(lambda: detector.update(before))
+    signature = detector.signature.copy()
+    cells = detector.cells.copy()
+
+    def changed_update():
+        detector.signature[:] = signature
+        detector.cells[:] = cells
+        return detector.update(after)
+
+    result, changed_ms = timed(changed_update)
+    pixels, diff_ms = timed(lambda: _full_frame_diff(before, after))
+
+    print(f"🔍 Change detection ({before.shape[1]}x{before.shape[0]})")
+    print(f"   Full-frame diff: {pixels} pixels changed, {diff_ms:.2f} ms")
+    print(f"   Signature only (no change): {idle_ms:.2f} ms")
+    print(f"   Signature + tile diff: {result['changed_pixels']} pixels in {result['moved_tiles']} tiles, "
+          f"{changed_ms:.2f} ms")
+    print(f"   Changed: {result['changed']}")
+    for x, y, w, h in result['boxes']:
+        print(f"     region ({x}, {y}) {w}x{h}")
+
+    # Re-analyzing only the changed regions versus a fresh pass over the new frame
+    previous = FrameAnalysis(before)
+    previous.boxes
+    _, full_ms = timed(lambda: FrameAnalysis(after).boxes)
+    patched, patched_ms = timed(lambda: previous.patched(after, result['boxes']))
+    same = np.array_equal(patched.boxes, FrameAnalysis(after).boxes)
+    print(f"   Edge contour analysis: full {full_ms:.2f} ms, changed regions only {patched_ms:.2f} ms "
+          f"({'identical' if same else 'different'} boxes)")
+
+
+if __name__ == "__main__":
+    main()
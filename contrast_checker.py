@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Text Contrast Checker for Project Watch Tower
+Estimates the foreground and background of every detected text box in one
+vectorized pass over a frame's integral images and rates each box against the
+WCAG 2 contrast-ratio thresholds.
+"""
+
+import argparse
+import time
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+from region_stats import RegionStats
+
+# WCAG 2 AA minimum contrast ratios for normal and large text
+AA_NORMAL = 4.5
+AA_LARGE = 3.0
+# Text boxes at least this tall in device pixels count as large text
+# (18 pt is 24 CSS px, at the 3x pixel ratio of the phones under test)
+LARGE_TEXT_HEIGHT = 72
+# The background is sampled from a ring this share of the box height around it
+RING_SHARE = 0.25
+MIN_RING = 2
+
+
+def srgb_to_luminance(level):
+    """WCAG relative luminance of 8-bit sRGB gray levels (scalar or array)"""
+    channel = np.asarray(level, dtype=np.float64) / 255.0
+    return np.where(channel <= 0.04045, channel / 12.92, ((channel + 0.055) / 1.055) ** 2.4)
+
+
+def contrast_ratio(a, b):
+    """WCAG contrast ratio between two relative luminances, from 1 to 21"""
+    lighter = np.maximum(a, b)
+    darker = np.minimum(a, b)
+    return (lighter + 0.05) / (darker + 0.05)
+
+
+class ContrastChecker:
+    """WCAG contrast estimates for text boxes, computed for all boxes at once
+
+    Each box is modelled as two gray tones. The background tone is the mean
+    of a thin ring around the box; with the box's mean and variance from the
+    integral images, the share of foreground pixels and the foreground tone
+    then follow in closed form. Both tones are linearized to relative
+    luminance before taking the ratio. Gray levels stand in for full color,
+    so hue-only differences between text and background are not seen.
+    """
+
+    def __init__(self, normal_ratio: float = AA_NORMAL, large_ratio: float = AA_LARGE,
+                 large_text_height: int = LARGE_TEXT_HEIGHT):
+        self.normal_ratio = normal_ratio
+        self.large_ratio = large_ratio
+        self.large_text_height = large_text_height
+
+    def measure(self, stats: RegionStats, boxes: np.ndarray) -> Dict[str, np.ndarray]:
+        """Foreground and background gray levels, luminances, ratio and pass flag per box"""
+        boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+        pad = np.maximum(MIN_RING, np.round(boxes[:, 3] * RING_SHARE)).astype(np.int64)
+        outer = np.stack([boxes[:, 0] - pad, boxes[:, 1] - pad,
+                          boxes[:, 2] + 2 * pad, boxes[:, 3] + 2 * pad], axis=1)
+
+        mean = stats.mean(boxes)
+        variance = stats.variance(boxes)
+        ring_area = stats.area(outer) - stats.area(boxes)
+        ring_total = stats.total(outer) - stats.total(boxes)
+        # A box filling the whole frame has no ring; fall back to its own mean
+        background = np.divide(ring_total, ring_area, out=mean.copy(), where=ring_area > 0)
+
+        # Two tones b (background) and f with foreground share p give
+        # mean - b = p (f - b) and variance = p (1 - p) (f - b)^2, so
+        # f = b + ((mean - b)^2 + variance) / (mean - b)
+        offset = mean - background
+        # With no offset the direction is unknown; assume text opposes the background
+        direction = np.where(offset != 0, np.sign(offset), np.where(background > 127.5, -1.0, 1.0))
+        spread = (offset * offset + variance) / np.maximum(np.abs(offset), 0.5)
+        foreground = np.clip(background + direction * spread, 0, 255)
+
+        foreground_luminance = srgb_to_luminance(foreground)
+        background_luminance = srgb_to_luminance(background)
+        ratio = contrast_ratio(foreground_luminance, background_luminance)
+        required = np.where(boxes[:, 3] >= self.large_text_height, self.large_ratio, self.normal_ratio)
+        return {
+            'foreground': foreground,
+            'background': background,
+            'foreground_luminance': foreground_luminance,
+            'background_luminance': background_luminance,
+            'ratio': ratio,
+            'required': required,
+            'passes': ratio >= required,
+        }
+
+    def failures(self, stats: RegionStats, boxes: np.ndarray) -> List[Dict]:
+        """Boxes below their required ratio, worst first, with coordinates and measurements"""
+        boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+        if len(boxes) == 0:
+            return []
+        measured = self.measure(stats, boxes)
+        failing = np.flatnonzero(~measured['passes'])
+        failing = failing[np.argsort(measured['ratio'][failing], kind='stable')]
+        return [{
+            "x": int(boxes[i, 0]), "y": int(boxes[i, 1]),
+            "width": int(boxes[i, 2]), "height": int(boxes[i, 3]),
+            "ratio": round(float(measured['ratio'][i]), 2),
+            "required": float(measured['required'][i]),
+            "foreground": round(float(measured['foreground'][i]), 1),
+            "background": round(float(measured['background'][i]), 1)
+        } for i in failing]
+
+
+def main():
+    """Report text boxes failing WCAG contrast in screenshots"""
+    from text_regions import TextRegionDetector
+
+    parser = argparse.ArgumentParser(description='WCAG contrast check of detected text')
+    parser.add_argument('screenshots', nargs='+', help='Screenshot files')
+    parser.add_argument('--backend', default='gradient', help='Text region backend')
+    args = parser.parse_args()
+
+    detector = TextRegionDetector(args.backend)
+    checker = ContrastChecker()
+    for path in args.screenshots:
+        image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            print(f"❌ Could not load {path}")
+            continue
+        boxes = detector.detect(image)
+
+        start = time.perf_counter()
+        stats = RegionStats(image)
+        stats_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        failures = checker.failures(stats, boxes)
+        check_ms = (time.perf_counter() - start) * 1000
+
+        print(f"🔍 {path}: {len(boxes)} text boxes, {len(failures)} below WCAG AA")
+        print(f"   Integral images: {stats_ms:.1f} ms, contrast check: {check_ms:.2f} ms")
+        for failure in failures[:10]:
+            print(f"   ⚠️ ({failure['x']}, {failure['y']}) {failure['width']}x{failure['height']}: "
+                  f"{failure['ratio']:.2f}:1, needs {failure['required']:.1f}:1")
+
+
+if __name__ == "__main__":
+    main()
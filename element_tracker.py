@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Element Tracker for Project Watch Tower
+Gives detected UI elements stable IDs across consecutive frames by box
+overlap and appearance, reports elements that appeared, moved or disappeared,
+and keeps per-element analysis results while an element stays unchanged.
+"""
+
+import argparse
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+import cv2
+import numpy as np
+
+from box_set import box_iou
+from contrast_checker import ContrastChecker
+from frame_analysis import downsample, elements_to_boxes
+from layout_shift import LayoutShiftMeter
+from region_stats import RegionStats
+
+# Same-type boxes overlapping by at least this IoU continue a track
+TRACK_IOU = 0.3
+# Appearance is the mean absolute difference of the gray means of a 4x4 grid
+# over each box: below APPEARANCE_TOLERANCE a non-overlapping box of similar
+# size is the same element moved; below UNCHANGED_TOLERANCE, at the same
+# place, the element is unchanged and its analysis is reused
+APPEARANCE_GRID = 4
+APPEARANCE_TOLERANCE = 12.0
+UNCHANGED_TOLERANCE = 2.0
+SIZE_TOLERANCE = 0.25
+# Centre displacement in device pixels reported as a move
+MOVE_DISTANCE = 8
+# Frames a track may go undetected before it is reported as disappeared
+MAX_MISSED_FRAMES = 2
+# Appearance is measured on a frame reduced to this scale
+TRACK_SCALE = 0.5
+
+
+def appearance_descriptors(stats: RegionStats, boxes: np.ndarray, scale: float = 1.0) -> np.ndarray:
+    """(N, G*G) gray means of a G x G grid over each device-pixel box, all from one integral image"""
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4) * scale
+    steps = np.linspace(0, 1, APPEARANCE_GRID + 1)
+    xs = np.round(boxes[:, :1] + boxes[:, 2:3] * steps).astype(np.int64)
+    ys = np.round(boxes[:, 1:2] + boxes[:, 3:4] * steps).astype(np.int64)
+
+    # Cell (r, c) of box n spans xs[n, c]..xs[n, c + 1] and ys[n, r]..ys[n, r + 1]
+    x0 = np.broadcast_to(xs[:, None, :-1], (len(boxes), APPEARANCE_GRID, APPEARANCE_GRID))
+    x1 = np.broadcast_to(xs[:, None, 1:], x0.shape)
+    y0 = np.broadcast_to(ys[:, :-1, None], x0.shape)
+    y1 = np.broadcast_to(ys[:, 1:, None], x0.shape)
+    cells = np.stack([x0, y0, x1 - x0, y1 - y0], axis=-1).reshape(-1, 4)
+    return stats.mean(cells).reshape(len(boxes), APPEARANCE_GRID * APPEARANCE_GRID)
+
+
+class ElementTracker:
+    """Stable IDs for detected elements across frames
+
+    Each update matches the new elements to the live tracks of the same
+    type: overlapping boxes continue a track, and a non-overlapping box of
+    similar size and appearance continues it as a move. Matching is greedy
+    on a score that prefers overlap, similar appearance and short moves.
+    Unmatched elements start new tracks; tracks unmatched for more than
+    MAX_MISSED_FRAMES frames end.
+
+    Every track keeps a dictionary of per-element analysis results that
+    ``carry_forward`` reuses while the element stays unchanged. Issues are
+    keyed by the track of their element, so ``new_issues`` returns an
+    issue of a persisting element only once; like tracks, an issue absent
+    for more than MAX_MISSED_FRAMES frames is forgotten and reported
+    again if it returns.
+    """
+
+    def __init__(self, iou_threshold: float = TRACK_IOU, appearance_tolerance: float = APPEARANCE_TOLERANCE,
+                 max_missed_frames: int = MAX_MISSED_FRAMES, scale: float = TRACK_SCALE):
+        self.iou_threshold = iou_threshold
+        self.appearance_tolerance = appearance_tolerance
+        self.max_missed_frames = max_missed_frames
+        self.scale = scale
+        self.tracks: Dict[int, Dict] = {}
+        self.next_id = 1
+        self.frame_index = 0
+        self.reported_issues: Dict[tuple, int] = {}
+        self.stats = {'frames': 0, 'appeared': 0, 'moved': 0, 'disappeared': 0, 'reused': 0, 'computed': 0}
+
+    def reset(self):
+        """Forget every track, e.g. after switching to another app or screen"""
+        self.tracks.clear()
+        self.reported_issues.clear()
+
+    def update(self, elements: List[Dict], image: np.ndarray) -> List[Dict]:
+        """Assign a ``track_id`` to each element dictionary and return this frame's events"""
+        self.frame_index += 1
+        self.stats['frames'] += 1
+        events = []
+
+        boxes = elements_to_boxes(elements)
+        types = np.array([str(element.get('type', '')) for element in elements], dtype=object)
+        gray = downsample(image, self.scale)
+        if gray.ndim == 3:
+            gray = cv2.cvtColor(gray, cv2.COLOR_BGR2GRAY)
+        descriptors = appearance_descriptors(RegionStats(gray), boxes, self.scale)
+
+        track_ids = list(self.tracks)
+        matches = self._match(track_ids, boxes, types, descriptors, image.shape[:2])
+        matched_tracks = set()
+        for i, element in enumerate(elements):
+            box = boxes[i]
+            if i not in matches:
+                track_id = self.next_id
+                self.next_id += 1
+                self.tracks[track_id] = {
+                    'id': track_id, 'type': types[i], 'box': box, 'descriptor': descriptors[i],
+                    'first_frame': self.frame_index, 'last_frame': self.frame_index, 'missed': 0,
+                    'unchanged': False, 'analysis': {},
+                }
+                element['track_id'] = track_id
+                events.append(self._event('appeared', self.tracks[track_id], box))
+                continue
+
+            track = self.tracks[matches[i]]
+            matched_tracks.add(track['id'])
+            shift = (box[:2] + box[2:] / 2) - (track['box'][:2] + track['box'][2:] / 2)
+            if np.hypot(*shift) > MOVE_DISTANCE:
+                events.append(self._event('moved', track, box, previous=track['box']))
+            same_place = np.array_equal(box, track['box'])
+            track['unchanged'] = same_place and np.abs(descriptors[i] - track['descriptor']).mean() <= UNCHANGED_TOLERANCE
+            if not track['unchanged']:
+                track['analysis'] = {}
+            track.update(box=box, descriptor=descriptors[i], last_frame=self.frame_index, missed=0)
+            element['track_id'] = track['id']
+
+        for track_id in track_ids:
+            if track_id in matched_tracks:
+                continue
+            track = self.tracks[track_id]
+            track['missed'] += 1
+            if track['missed'] > self.max_missed_frames:
+                events.append(self._event('disappeared', track, track['box']))
+                del self.tracks[track_id]
+
+        for event in events:
+            self.stats[event['event']] += 1
+        return events
+
+    def _match(self, track_ids: Sequence[int], boxes: np.ndarray, types: np.ndarray,
+               descriptors: np.ndarray, shape) -> Dict[int, int]:
+        """Greedy element index -> track id assignment"""
+        if not track_ids or len(boxes) == 0:
+            return {}
+        tracks = [self.tracks[track_id] for track_id in track_ids]
+        track_boxes = np.array([track['box'] for track in tracks]).reshape(-1, 4)
+        track_types = np.array([track['type'] for track in tracks], dtype=object)
+        track_descriptors = np.array([track['descriptor'] for track in tracks])
+
+        iou = box_iou(track_boxes, boxes)
+        appearance = np.abs(track_descriptors[:, None, :] - descriptors[None, :, :]).mean(axis=-1)
+        areas = boxes[:, 2] * boxes[:, 3]
+        track_areas = track_boxes[:, 2] * track_boxes[:, 3]
+        size_ratio = np.minimum(track_areas[:, None], areas[None]) / np.maximum(
+            np.maximum(track_areas[:, None], areas[None]), 1)
+        centres = boxes[:, :2] + boxes[:, 2:] / 2
+        track_centres = track_boxes[:, :2] + track_boxes[:, 2:] / 2
+        distance = np.hypot(*(track_centres[:, None, :] - centres[None, :, :]).transpose(2, 0, 1))
+
+        looks_alike = (appearance <= self.appearance_tolerance) & (size_ratio >= 1 - SIZE_TOLERANCE)
+        candidate = (track_types[:, None] == types[None, :]) & ((iou >= self.iou_threshold) | looks_alike)
+        similarity = 1 - np.minimum(appearance / self.appearance_tolerance, 1)
+        score = iou + similarity - distance / np.hypot(*shape)
+
+        rows, cols = np.nonzero(candidate)
+        order = np.argsort(-score[rows, cols], kind='stable')
+        used_tracks, matches = set(), {}
+        for row, col in zip(rows[order].tolist(), cols[order].tolist()):
+            if row not in used_tracks and col not in matches:
+                used_tracks.add(row)
+                matches[col] = track_ids[row]
+        return matches
+
+    def _event(self, kind: str, track: Dict, box: np.ndarray, previous: Optional[np.ndarray] = None) -> Dict:
+        x, y, w, h = (int(v) for v in box)
+        event = {'event': kind, 'track_id': track['id'], 'type': track['type'], 'frame': self.frame_index,
+                 'x': x, 'y': y, 'width': w, 'height': h}
+        if previous is not None:
+            event['from'] = {'x': int(previous[0]), 'y': int(previous[1]),
+                             'width': int(previous[2]), 'height': int(previous[3])}
+        if kind == 'disappeared':
+            event['frames_seen'] = track['last_frame'] - track['first_frame'] + 1
+        return event
+
+    def carry_forward(self, elements: List[Dict], key: str, compute: Callable[[List[Dict]], List]) -> List:
+        """Per-element ``key`` results, reusing those of unchanged tracked elements
+
+        ``compute`` receives the elements without a reusable result, in order,
+        and returns one result per element.
+        """
+        results = [None] * len(elements)
+        missing = []
+        for i, element in enumerate(elements):
+            track = self.tracks.get(element.get('track_id'))
+            if track is not None and track['unchanged'] and key in track['analysis']:
+                results[i] = track['analysis'][key]
+            else:
+                missing.append(i)
+
+        if missing:
+            for i, value in zip(missing, compute([elements[i] for i in missing])):
+                results[i] = value
+                track = self.tracks.get(elements[i].get('track_id'))
+                if track is not None:
+                    track['analysis'][key] = value
+        self.stats['reused'] += len(elements) - len(missing)
+        self.stats['computed'] += len(missing)
+        return results
+
+    def new_issues(self, issues: List[Dict], elements: List[Dict]) -> List[Dict]:
+        """Issues not reported before: element issues once per track, frame issues once per description
+
+        Element issues name their element with an ``element`` box; it is
+        looked up among the tracked elements of the current frame.
+        """
+        track_of_box = {(e['x'], e['y'], e['width'], e['height']): e.get('track_id') for e in elements}
+        new = []
+        for issue in issues:
+            element = issue.get('element')
+            track_id = None
+            if element is not None:
+                track_id = track_of_box.get((element['x'], element['y'], element['width'], element['height']))
+            key = (issue.get('type'), track_id) if track_id is not None else (issue.get('type'), issue.get('description'))
+            if key not in self.reported_issues:
+                new.append(issue)
+            self.reported_issues[key] = self.frame_index
+
+        # Issues expire like tracks, so the record does not grow with every issue ever seen
+        expired = [key for key, last_frame in self.reported_issues.items()
+                   if self.frame_index - last_frame > self.max_missed_frames]
+        for key in expired:
+            del self.reported_issues[key]
+        return new
+
+
+def track_frame(tracker: ElementTracker, meter: LayoutShiftMeter, checker: ContrastChecker,
+                screenshot: np.ndarray, analysis: Dict) -> List[Dict]:
+    """Track the frame's elements, rate text contrast and return the issues not reported before
+
+    Adds the tracker ``events`` and the ``layout_shift`` record to the
+    analysis, a ``contrast_ratio`` to each text element and a
+    ``low_contrast`` issue for text below its required ratio.
+    """
+    elements = analysis['text_elements'] + analysis['buttons'] + analysis['input_fields']
+    analysis['events'] = tracker.update(elements, screenshot)
+    analysis['layout_shift'] = meter.record(analysis['events'], len(elements), screenshot.shape)
+
+    # Contrast is only measured for text that changed since the last frame
+    def measure(changed):
+        stats = RegionStats(cv2.cvtColor(screenshot, cv2.COLOR_BGR2GRAY))
+        measured = checker.measure(stats, elements_to_boxes(changed))
+        return [{'ratio': round(float(ratio), 2), 'required': float(required)}
+                for ratio, required in zip(measured['ratio'], measured['required'])]
+
+    text_elements = analysis['text_elements']
+    for element, contrast in zip(text_elements, tracker.carry_forward(text_elements, 'contrast', measure)):
+        element['contrast_ratio'] = contrast['ratio']
+        if contrast['ratio'] < contrast['required']:
+            analysis['issues'].append({
+                'type': 'low_contrast',
+                'description': f'Text at ({element["x"]}, {element["y"]}) has contrast {contrast["ratio"]}:1, '
+                               f'needs {contrast["required"]}:1',
+                'element': {k: element[k] for k in ('x', 'y', 'width', 'height')},
+                'severity': 'medium'
+            })
+    return tracker.new_issues(analysis['issues'], elements)
+
+
+def main():
+    """Track the contour elements of a sequence of screenshots and print the events"""
+    from frame_analysis import FrameAnalysis, boxes_to_elements
+
+    parser = argparse.ArgumentParser(description='Track UI elements across screenshots')
+    parser.add_argument('screenshots', nargs='+', help='Screenshots in capture order')
+    parser.add_argument('--min-area', type=int, default=1000, help='Smallest element box area')
+    args = parser.parse_args()
+
+    tracker = ElementTracker()
+    update_ms = []
+    for path in args.screenshots:
+        image = cv2.imread(path)
+        if image is None:
+            print(f"❌ Could not load {path}")
+            continue
+        boxes = FrameAnalysis(image).boxes
+        elements = boxes_to_elements(boxes[boxes[:, 2] * boxes[:, 3] >= args.min_area], type='element')
+
+        start = time.perf_counter()
+        events = tracker.update(elements, image)
+        update_ms.append((time.perf_counter() - start) * 1000)
+        counts = {kind: sum(event['event'] == kind for event in events) for kind in ('appeared', 'moved', 'disappeared')}
+        print(f"🎞️ {path}: {len(elements)} elements, {len(tracker.tracks)} tracks, "
+              f"{counts['appeared']} appeared, {counts['moved']} moved, {counts['disappeared']} disappeared "
+              f"({update_ms[-1]:.1f} ms)")
+
+    if update_ms:
+        print(f"📊 {tracker.stats['frames']} frames, mean update {np.mean(update_ms):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,8 @@ from datetime import datetime
 import base64
 import threading
 
+from screen_classifier import get_screen_classifier
+
 class EnhancedAITester:
     def __init__(self):
         self.simulator_device = None
@@ -24,6 +26,9 @@ class EnhancedAITester:
         self.screenshots_dir = "ai_screenshots"
         self.is_running = False
         
+        # Trained screen classifier, loaded once; None until one is trained
+        self.screen_classifier = get_screen_classifier()
+        
         # Create screenshots directory
         os.makedirs(self.screenshots_dir, exist_ok=True)
         
@@ -185,6 +190,11 @@ class EnhancedAITester:
     def detect_screen_type(self, image):
         """Detect what type of screen this is"""
         try:
+            if self.screen_classifier is not None:
+                screen_type, _ = self.screen_classifier.predict(image)
+                return screen_type
+            
+            # Line-count heuristics until a classifier has been trained
             gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
             edges = cv2.Canny(gray, 50, 150)
             
@@ -0,0 +1,590 @@
+#!/usr/bin/env python3
+"""
+Shared Frame Analysis for Project Watch Tower
+Computes grayscale, HSV, edges, contours and bounding boxes once per screenshot
+so every UI detector works from the same intermediate results.
+"""
+
+import argparse
+import cv2
+import math
+import numpy as np
+import struct
+import time
+from functools import cached_property
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from box_set import box_iou, dedupe
+
+# Canny thresholds used by every edge-based detector in the monitors
+CANNY_LOW = 50
+CANNY_HIGH = 150
+
+# Supported analysis scales: full resolution, half and quarter
+ANALYSIS_SCALES = (1.0, 0.5, 0.25)
+
+# HSV ranges of the app's blue and purple buttons
+BUTTON_COLORS = (
+    ([100, 50, 50], [130, 255, 255]),
+    ([140, 50, 50], [180, 255, 255]),
+)
+
+# Bump when the shared detectors' output changes so the monitors' cached analyses are not reused
+DETECTOR_VERSION = "3"
+
+# imread flags that decode straight to a reduced resolution
+_REDUCED_READ_FLAGS = {
+    0.5: cv2.IMREAD_REDUCED_COLOR_2,
+    0.25: cv2.IMREAD_REDUCED_COLOR_4,
+}
+
+# Incremental re-analysis: device-pixel margin added around changed regions,
+# analysis-pixel context read around each dirty rectangle so Canny sees the
+# same neighbourhood as on the full frame, and the dirty fraction of the frame
+# above which a fresh analysis is cheaper than patching
+DIRTY_MARGIN = 16
+CROP_PAD = 4
+MAX_DIRTY_FRACTION = 0.5
+
+# Per-contour geometry table used by the range-mask classifiers
+FEATURE_DTYPE = np.dtype([
+    ('x', np.int32), ('y', np.int32), ('w', np.int32), ('h', np.int32),
+    ('area', np.int64), ('aspect', np.float64),
+])
+
+
+def contours_to_boxes(contours: Sequence[np.ndarray]) -> np.ndarray:
+    """Compute (x, y, w, h) bounding boxes for all contours in one vectorized pass"""
+    if len(contours) == 0:
+        return np.zeros((0, 4), dtype=np.int32)
+
+    lengths = np.fromiter(map(len, contours), dtype=np.int64, count=len(contours))
+    points = np.concatenate(contours).reshape(-1, 2)
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+    x_min = np.minimum.reduceat(points[:, 0], offsets)
+    y_min = np.minimum.reduceat(points[:, 1], offsets)
+    x_max = np.maximum.reduceat(points[:, 0], offsets)
+    y_max = np.maximum.reduceat(points[:, 1], offsets)
+
+    # Same convention as cv2.boundingRect: inclusive pixel extents
+    return np.stack([x_min, y_min, x_max - x_min + 1, y_max - y_min + 1], axis=1).astype(np.int32)
+
+
+def to_device_boxes(boxes: np.ndarray, scale: float) -> np.ndarray:
+    """Map (x, y, w, h) boxes measured at an analysis scale back to device pixels"""
+    boxes = np.asarray(boxes).reshape(-1, 4)
+    if scale == 1.0:
+        return boxes.astype(np.int32, copy=False)
+
+    # Scale the box edges rather than the sizes so neighbouring boxes stay aligned
+    x0 = np.rint(boxes[:, 0] / scale)
+    y0 = np.rint(boxes[:, 1] / scale)
+    x1 = np.rint((boxes[:, 0] + boxes[:, 2]) / scale)
+    y1 = np.rint((boxes[:, 1] + boxes[:, 3]) / scale)
+    return np.stack([x0, y0, x1 - x0, y1 - y0], axis=1).astype(np.int32)
+
+
+def downsample(image: np.ndarray, scale: float) -> np.ndarray:
+    """Area-average an image down by scale, halving repeatedly for power-of-two scales"""
+    # OpenCV's exact 2x INTER_AREA path is several times faster than a single 4x
+    # resize; it only applies to even sizes, so an odd last row/column is dropped
+    while scale <= 0.5 and min(image.shape[:2]) >= 2:
+        height, width = image.shape[0] // 2, image.shape[1] // 2
+        image = cv2.resize(image[:height * 2, :width * 2], (width, height), interpolation=cv2.INTER_AREA)
+        scale *= 2
+    if scale != 1.0:
+        image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return image
+
+
+def read_image_size(path: str) -> Optional[Tuple[int, int]]:
+    """Read (width, height) from a PNG header without decoding the pixels"""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(24)
+        if header[:8] == b'\x89PNG\r\n\x1a\n':
+            return struct.unpack('>II', header[16:24])
+    except OSError:
+        pass
+    return None
+
+
+def boxes_to_elements(boxes: np.ndarray, **fields) -> List[Dict]:
+    """Convert an (N, 4) box array into the element dictionaries the monitors report
+
+    Extra keyword fields are copied onto every element; NumPy arrays are
+    treated as per-element values.
+    """
+    boxes = np.asarray(boxes).reshape(-1, 4)
+    fields = {key: value.tolist() if isinstance(value, np.ndarray) else value
+              for key, value in fields.items()}
+    per_element = {key for key, value in fields.items() if isinstance(value, list)}
+
+    elements = []
+    for i, (x, y, w, h) in enumerate(boxes.tolist()):
+        element = {'x': x, 'y': y, 'width': w, 'height': h, 'area': w * h}
+        for key, value in fields.items():
+            element[key] = value[i] if key in per_element else value
+        elements.append(element)
+
+    return elements
+
+
+def contour_order(contours: Sequence[np.ndarray], width: int) -> np.ndarray:
+    """Raster index of each contour's first point
+
+    findContours returns external contours in descending order of this index,
+    so merged contour lists sorted by it come out as a full pass would.
+    """
+    if len(contours) == 0:
+        return np.zeros(0, dtype=np.int64)
+    first = np.array([c[0, 0] for c in contours], dtype=np.int64)
+    return first[:, 1] * width + first[:, 0]
+
+
+def _touching(boxes: np.ndarray, rect: Sequence[int]) -> np.ndarray:
+    """Mask of (x0, y0, x1, y1) boxes that overlap or touch an (x0, y0, x1, y1) rectangle"""
+    return ((boxes[:, 0] <= rect[2]) & (boxes[:, 2] >= rect[0]) &
+            (boxes[:, 1] <= rect[3]) & (boxes[:, 3] >= rect[1]))
+
+
+def _corner_boxes(contours: Sequence[np.ndarray]) -> np.ndarray:
+    """(x0, y0, x1, y1) bounds of contours with exclusive far edges"""
+    boxes = contours_to_boxes(contours).astype(np.int64)
+    boxes[:, 2:] += boxes[:, :2]
+    return boxes
+
+
+def _merge_rects(rects: List[List[int]]) -> List[List[int]]:
+    """Union (x0, y0, x1, y1) rectangles that overlap or touch"""
+    merged = []
+    for rect in rects:
+        rect = list(rect)
+        overlapping = [other for other in merged if _touching(np.array([other]), rect)[0]]
+        for other in overlapping:
+            merged.remove(other)
+            rect = [min(rect[0], other[0]), min(rect[1], other[1]), max(rect[2], other[2]), max(rect[3], other[3])]
+        merged.append(rect)
+    return merged
+
+
+def grow_dirty_rects(rects: List[List[int]], contours: Sequence[np.ndarray], boxes: np.ndarray,
+                     pad: int = CROP_PAD) -> Tuple[List[List[int]], np.ndarray]:
+    """Grow dirty (x0, y0, x1, y1) rectangles until no contour straddles their border
+
+    Every contour whose box touches a rectangle is absorbed into it and marked
+    stale, so all other contours can be carried over unchanged. The exception
+    is a container whose outline stays clear of the padded rectangle: it is
+    unaffected by the change, and a rectangle lying inside it is dropped
+    because external contours never include anything nested in another one.
+    Returns the rectangles and the stale mask over ``contours``.
+    """
+    enclosure = {}
+    while True:
+        grown = []
+        stale = np.zeros(len(boxes), dtype=bool)
+        for rect in _merge_rects(rects):
+            hit = _touching(boxes, rect)
+            encloses = hit & (boxes[:, 0] < rect[0]) & (boxes[:, 1] < rect[1]) & \
+                (boxes[:, 2] > rect[2]) & (boxes[:, 3] > rect[3])
+
+            nested = False
+            center = ((rect[0] + rect[2] - 1) / 2, (rect[1] + rect[3] - 1) / 2)
+            reach = math.hypot(rect[2] - rect[0], rect[3] - rect[1]) / 2 + pad + 1
+            for index in np.flatnonzero(encloses):
+                key = (int(index), tuple(rect))
+                if key not in enclosure:
+                    enclosure[key] = cv2.pointPolygonTest(contours[index], center, True)
+                if enclosure[key] > reach:
+                    nested = True
+                    break
+                if enclosure[key] < -reach:
+                    hit[index] = False
+            if nested:
+                continue
+
+            if hit.any():
+                rect = [min(rect[0], int(boxes[hit, 0].min())), min(rect[1], int(boxes[hit, 1].min())),
+                        max(rect[2], int(boxes[hit, 2].max())), max(rect[3], int(boxes[hit, 3].max()))]
+            stale |= hit
+            grown.append(rect)
+
+        if grown == rects:
+            return grown, stale
+        rects = grown
+
+
+def patch_contours(image: np.ndarray, old: Sequence[np.ndarray], rects: List[List[int]],
+                   find, step: int) -> Optional[Tuple[np.ndarray, ...]]:
+    """Recompute the contours of one mask type inside dirty rectangles of a new image
+
+    ``find(crop, offset)`` extracts contours from an image crop in full-image
+    coordinates. Contours found in a padded crop are kept if they touch their
+    rectangle; one that runs into the crop border continues outside it, so its
+    rectangle grows by ``step`` and the pass repeats. The carried-over and new
+    contours are merged in findContours order. Returns None when the dirty
+    area grows past MAX_DIRTY_FRACTION and a full pass is cheaper.
+    """
+    height, width = image.shape[:2]
+    boxes = _corner_boxes(old)
+    while True:
+        rects, stale = grow_dirty_rects(rects, old, boxes)
+        if sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in rects) > MAX_DIRTY_FRACTION * width * height:
+            return None
+
+        fresh = []
+        truncated = []
+        for rect in rects:
+            # Read a little context so edges on the rectangle border match a full pass
+            x0, y0 = max(rect[0] - CROP_PAD, 0), max(rect[1] - CROP_PAD, 0)
+            x1, y1 = min(rect[2] + CROP_PAD, width), min(rect[3] + CROP_PAD, height)
+            found = find(image[y0:y1, x0:x1], (x0, y0))
+            found_boxes = _corner_boxes(found)
+            keep = _touching(found_boxes, rect)
+            fresh.extend(c for c, kept in zip(found, keep) if kept)
+
+            clipped = keep & (((found_boxes[:, 0] <= x0) & (x0 > 0)) | ((found_boxes[:, 1] <= y0) & (y0 > 0)) |
+                              ((found_boxes[:, 2] >= x1) & (x1 < width)) | ((found_boxes[:, 3] >= y1) & (y1 < height)))
+            truncated.extend(found_boxes[clipped].tolist())
+
+        if not truncated:
+            break
+        rects = rects + [[max(bx0 - step, 0), max(by0 - step, 0), min(bx1 + step, width), min(by1 + step, height)]
+                         for bx0, by0, bx1, by1 in truncated]
+
+    contours = [c for c, drop in zip(old, stale) if not drop] + fresh
+    order = np.argsort(-contour_order(contours, width), kind='stable')
+    return tuple(contours[i] for i in order)
+
+
+class FrameAnalysis:
+    """Lazily computed intermediate images for a single screenshot
+
+    Each property is computed on first access and then reused, so a frame pays
+    for one grayscale conversion, one Canny pass and one contour extraction no
+    matter how many detectors look at it.
+
+    With a scale below 1 the intermediate images are computed on a downsampled
+    copy, while ``width``, ``height``, ``boxes`` and ``color_boxes`` stay in
+    device pixels. Detectors therefore keep their device-pixel thresholds,
+    which is equivalent to scaling the thresholds down to the analysis size.
+    Pass ``device_size`` when the image has already been reduced by ``scale``.
+    """
+
+    def __init__(self, image: np.ndarray, scale: float = 1.0,
+                 device_size: Optional[Tuple[int, int]] = None):
+        if device_size is None:
+            self.height, self.width = image.shape[:2]
+            if scale != 1.0:
+                image = downsample(image, scale)
+        else:
+            self.width, self.height = device_size
+        self.image = image
+        self.scale = scale
+        self._color_contours = {}
+        self._color_boxes = {}
+
+    @classmethod
+    def of(cls, image, scale: float = 1.0) -> 'FrameAnalysis':
+        """Return the given frame analysis, or wrap a raw image in a new one"""
+        if isinstance(image, FrameAnalysis):
+            return image
+        return cls(image, scale=scale)
+
+    @classmethod
+    def load(cls, path: str, scale: float = 1.0) -> Optional['FrameAnalysis']:
+        """Load a screenshot, decoding directly at the analysis scale when possible"""
+        flag = _REDUCED_READ_FLAGS.get(scale)
+        if flag is None:
+            image = cv2.imread(path)
+            return cls(image, scale=scale) if image is not None else None
+
+        image = cv2.imread(path, flag)
+        if image is None:
+            return None
+        device_size = read_image_size(path)
+        if device_size is None:
+            device_size = (round(image.shape[1] / scale), round(image.shape[0] / scale))
+        return cls(image, scale=scale, device_size=device_size)
+
+    def crop(self, x: int, y: int, w: int, h: int) -> 'FrameAnalysis':
+        """Analysis of a device-pixel rectangle; its boxes are relative to the crop"""
+        s = self.scale
+        x0, y0 = int(round(x * s)), int(round(y * s))
+        x1, y1 = int(round((x + w) * s)), int(round((y + h) * s))
+        return FrameAnalysis(self.image[y0:y1, x0:x1], scale=s, device_size=(w, h))
+
+    def patched(self, image: np.ndarray, dirty_boxes: np.ndarray, margin: int = DIRTY_MARGIN) -> 'FrameAnalysis':
+        """Analysis of a new frame that differs from this one only inside ``dirty_boxes``
+
+        Edge and color contours near a dirty region (device-pixel boxes plus
+        ``margin``) are recomputed from crops of the new frame and all others
+        are carried over, so detectors see the same boxes as after a full pass.
+        Contour types whose dirty area grows too large are left to be computed
+        from the full frame on first use.
+        """
+        frame = FrameAnalysis(image, scale=self.scale)
+        if frame.image.shape != self.image.shape:
+            return frame
+
+        s = self.scale
+        height, width = frame.image.shape[:2]
+        rects = [[max(math.floor((x - margin) * s), 0), max(math.floor((y - margin) * s), 0),
+                  min(math.ceil((x + w + margin) * s), width), min(math.ceil((y + h + margin) * s), height)]
+                 for x, y, w, h in np.asarray(dirty_boxes).reshape(-1, 4).tolist()]
+        step = max(math.ceil(margin * s), CROP_PAD)
+
+        def find_edges(crop, offset):
+            gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+            contours, _ = cv2.findContours(cv2.Canny(gray, CANNY_LOW, CANNY_HIGH), cv2.RETR_EXTERNAL,
+                                           cv2.CHAIN_APPROX_SIMPLE, offset=offset)
+            return contours
+
+        # Seed the cached properties; everything derived from contours follows
+        contours = patch_contours(frame.image, self.contours, rects, find_edges, step)
+        if contours is not None:
+            frame.__dict__['contours'] = contours
+
+        for key, old in self._color_contours.items():
+            lower, upper = np.array(key[0]), np.array(key[1])
+
+            def find_color(crop, offset, lower=lower, upper=upper):
+                mask = cv2.inRange(cv2.cvtColor(crop, cv2.COLOR_BGR2HSV), lower, upper)
+                contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=offset)
+                return contours
+
+            contours = patch_contours(frame.image, old, rects, find_color, step)
+            if contours is not None:
+                frame._color_contours[key] = contours
+        return frame
+
+    @cached_property
+    def gray(self) -> np.ndarray:
+        if self.image.ndim == 2:
+            return self.image
+        return cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+
+    @cached_property
+    def hsv(self) -> np.ndarray:
+        return cv2.cvtColor(self.image, cv2.COLOR_BGR2HSV)
+
+    @cached_property
+    def edges(self) -> np.ndarray:
+        return cv2.Canny(self.gray, CANNY_LOW, CANNY_HIGH)
+
+    @cached_property
+    def contours(self) -> Tuple[np.ndarray, ...]:
+        contours, _ = cv2.findContours(self.edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        return contours
+
+    @cached_property
+    def boxes(self) -> np.ndarray:
+        """(N, 4) int32 array of device-pixel (x, y, w, h) for every external edge contour"""
+        return to_device_boxes(contours_to_boxes(self.contours), self.scale)
+
+    @cached_property
+    def features(self) -> np.ndarray:
+        """Structured FEATURE_DTYPE array with one row per external edge contour"""
+        return box_features(self.boxes)
+
+    @cached_property
+    def contour_areas(self) -> np.ndarray:
+        """Polygon area of every external edge contour (cv2.contourArea) in device pixels"""
+        areas = np.array([cv2.contourArea(c) for c in self.contours], dtype=np.float64)
+        return areas / (self.scale * self.scale)
+
+    def color_boxes(self, lower: Sequence[int], upper: Sequence[int]) -> np.ndarray:
+        """Device-pixel bounding boxes of external contours inside an HSV color range"""
+        key = (tuple(lower), tuple(upper))
+        if key not in self._color_boxes:
+            if key not in self._color_contours:
+                mask = cv2.inRange(self.hsv, np.array(lower), np.array(upper))
+                self._color_contours[key], _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            self._color_boxes[key] = to_device_boxes(contours_to_boxes(self._color_contours[key]), self.scale)
+        return self._color_boxes[key]
+
+
+def box_columns(boxes: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Split a box array into x, y, w, h, area and aspect-ratio columns"""
+    x, y, w, h = (boxes[:, i].astype(np.int64) for i in range(4))
+    area = w * h
+    aspect = np.divide(w, h, out=np.zeros(len(w), dtype=np.float64), where=h > 0)
+    return x, y, w, h, area, aspect
+
+
+def box_features(boxes: np.ndarray) -> np.ndarray:
+    """Build a FEATURE_DTYPE table from an (N, 4) box array"""
+    x, y, w, h, area, aspect = box_columns(np.asarray(boxes).reshape(-1, 4))
+    features = np.empty(len(x), dtype=FEATURE_DTYPE)
+    features['x'], features['y'], features['w'], features['h'] = x, y, w, h
+    features['area'], features['aspect'] = area, aspect
+    return features
+
+
+def range_masks(features: np.ndarray, rules: Sequence[Dict[str, Tuple[Optional[float], Optional[float]]]]) -> np.ndarray:
+    """Evaluate open-interval range rules against a feature table in one pass
+
+    Each rule maps a feature name to a (low, high) pair; ``None`` leaves that
+    side unbounded. Returns a (len(rules), len(features)) boolean mask.
+    """
+    fields = sorted({name for rule in rules for name in rule})
+    mask = np.ones((len(rules), len(features)), dtype=bool)
+    for name in fields:
+        low = np.array([rule.get(name, (None, None))[0] for rule in rules], dtype=np.float64)
+        high = np.array([rule.get(name, (None, None))[1] for rule in rules], dtype=np.float64)
+        low[np.isnan(low)] = -np.inf
+        high[np.isnan(high)] = np.inf
+        column = features[name][np.newaxis, :]
+        mask &= (column > low[:, np.newaxis]) & (column < high[:, np.newaxis])
+    return mask
+
+
+def elements_to_boxes(elements: Sequence[Dict]) -> np.ndarray:
+    """Collect (x, y, width, height) from element dictionaries into an (N, 4) array"""
+    return np.array([[e['x'], e['y'], e['width'], e['height']] for e in elements],
+                    dtype=np.int64).reshape(-1, 4)
+
+
+def text_region_boxes(frame: FrameAnalysis) -> np.ndarray:
+    """Boxes of text-like regions, one per text line"""
+    x, y, w, h, area, aspect_ratio = box_columns(frame.boxes)
+    text_like = ((20 < w) & (w < frame.width * 0.8) & (10 < h) & (h < frame.height * 0.1) &
+                 (area > 200) & (1 < aspect_ratio) & (aspect_ratio < 20))
+    # Nested and overlapping contours of one text line would be counted repeatedly
+    text_boxes = frame.boxes[text_like]
+    return text_boxes[dedupe(text_boxes)]
+
+
+def button_boxes(frame: FrameAnalysis) -> np.ndarray:
+    """Boxes of blue and purple button-like regions, one per button"""
+    passes = []
+    for lower, upper in BUTTON_COLORS:
+        boxes = frame.color_boxes(lower, upper)
+        x, y, w, h, area, _ = box_columns(boxes)
+        passes.append(boxes[(50 < w) & (w < 300) & (30 < h) & (h < 80) & (area > 1500)])
+    # Both color passes can outline the same button; keep one box per button
+    boxes = np.concatenate(passes).reshape(-1, 4)
+    return boxes[dedupe(boxes)]
+
+
+def input_field_boxes(frame: FrameAnalysis) -> np.ndarray:
+    """Boxes of input-field-like regions, one per field"""
+    x, y, w, h, area, aspect_ratio = box_columns(frame.boxes)
+    field_like = ((100 < w) & (w < 400) & (30 < h) & (h < 60) & (area > 3000) &
+                  (2 < aspect_ratio) & (aspect_ratio < 8))
+    field_boxes = frame.boxes[field_like]
+    return field_boxes[dedupe(field_boxes)]
+
+
+def match_boxes(reference: np.ndarray, candidate: np.ndarray, iou_threshold: float = 0.5) -> Dict:
+    """Greedily match candidate boxes to reference boxes and summarise the agreement"""
+    reference = np.asarray(reference).reshape(-1, 4)
+    candidate = np.asarray(candidate).reshape(-1, 4)
+    iou = box_iou(reference, candidate)
+
+    matched_iou = []
+    if iou.size:
+        used_ref = np.zeros(len(reference), dtype=bool)
+        used_cand = np.zeros(len(candidate), dtype=bool)
+        for flat in np.argsort(iou, axis=None)[::-1]:
+            i, j = divmod(int(flat), len(candidate))
+            if iou[i, j] < iou_threshold:
+                break
+            if not used_ref[i] and not used_cand[j]:
+                used_ref[i] = used_cand[j] = True
+                matched_iou.append(iou[i, j])
+
+    matched = len(matched_iou)
+    return {
+        'reference': len(reference),
+        'candidate': len(candidate),
+        'matched': matched,
+        'recall': matched / len(reference) if len(reference) else 1.0,
+        'precision': matched / len(candidate) if len(candidate) else 1.0,
+        'mean_iou': float(np.mean(matched_iou)) if matched_iou else 0.0,
+    }
+
+
+def compare_scales(analyze, image: np.ndarray, scale: float, keys: Sequence[str]) -> Dict:
+    """Run an analysis at full resolution and at a reduced scale and report the accuracy loss
+
+    ``analyze(image, scale)`` must return a dict of element lists; ``keys`` picks
+    which lists to compare.
+    """
+    start = time.perf_counter()
+    full = analyze(image, 1.0)
+    full_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    reduced = analyze(image, scale)
+    reduced_ms = (time.perf_counter() - start) * 1000
+
+    return {
+        'scale': scale,
+        'full_ms': full_ms,
+        'reduced_ms': reduced_ms,
+        'elements': {key: match_boxes(elements_to_boxes(full.get(key, [])),
+                                      elements_to_boxes(reduced.get(key, [])))
+                     for key in keys},
+    }
+
+
+def print_scale_report(report: Dict):
+    """Print the output of compare_scales"""
+    print(f"   Scale {report['scale']}: {report['full_ms']:.1f} ms -> {report['reduced_ms']:.1f} ms")
+    for key, stats in report['elements'].items():
+        print(f"   {key}: {stats['matched']}/{stats['reference']} matched "
+              f"({stats['candidate']} found at reduced scale), "
+              f"recall {stats['recall']:.0%}, precision {stats['precision']:.0%}, "
+              f"mean IoU {stats['mean_iou']:.2f}")
+
+
+def _legacy_pass_count(image: np.ndarray) -> int:
+    """Reproduce the old per-detector work: a grayscale, edge and contour pass per detector"""
+    total = 0
+    for _ in range(3):
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        edges = cv2.Canny(gray, CANNY_LOW, CANNY_HIGH)
+        contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        total += sum(1 for c in contours if cv2.boundingRect(c)[2] > 0)
+    return total
+
+
+def main():
+    """Benchmark the shared frame analysis against per-detector recomputation"""
+    parser = argparse.ArgumentParser(description='Benchmark shared frame analysis')
+    parser.add_argument('screenshots', nargs='+', help='Screenshot files to analyze')
+    parser.add_argument('--scale', type=float, choices=ANALYSIS_SCALES[1:],
+                        help='Also report speed and box accuracy at a reduced analysis scale')
+    args = parser.parse_args()
+
+    for path in args.screenshots:
+        image = cv2.imread(path)
+        if image is None:
+            print(f"❌ Could not load {path}")
+            continue
+
+        start = time.perf_counter()
+        _legacy_pass_count(image)
+        legacy_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        frame = FrameAnalysis(image)
+        frame.boxes
+        shared_ms = (time.perf_counter() - start) * 1000
+
+        print(f"📸 {path} ({frame.width}x{frame.height})")
+        print(f"   Contours: {len(frame.contours)}")
+        print(f"   Per-detector passes: {legacy_ms:.1f} ms")
+        print(f"   Shared frame analysis: {shared_ms:.1f} ms")
+
+        if args.scale:
+            report = compare_scales(
+                lambda img, scale: {'boxes': boxes_to_elements(FrameAnalysis(img, scale=scale).boxes)},
+                image, args.scale, ['boxes'])
+            print_scale_report(report)
+
+
+if __name__ == "__main__":
+    main()
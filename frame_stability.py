@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Frame Stability Wait for Project Watch Tower
+Replaces fixed sleeps before captures: samples low-resolution frame signatures
+until several consecutive samples agree and no loading spinner is turning,
+so a step waits exactly as long as the app needs to settle.
+"""
+
+import argparse
+import asyncio
+import time
+from concurrent.futures import Executor
+from typing import Callable, Dict, Optional
+
+import cv2
+import numpy as np
+
+from capture import ScreenCapture, decode_image
+from change_detector import frame_signature
+
+# Signature tiles in device pixels; frames captured at a reduced scale use
+# proportionally smaller tiles so a tile covers the same part of the screen
+STABLE_TILE_SIZE = 32
+# driver_capture decodes screenshots at half resolution
+DRIVER_CAPTURE_SCALE = 0.5
+# Tiles whose mean gray level moved by more than this many levels count as changed
+STABLE_TOLERANCE = 2
+# Consecutive agreeing samples (including the first) that make a screen stable
+STABLE_SAMPLES = 3
+SAMPLE_INTERVAL = 0.05
+STABLE_TIMEOUT = 10.0
+# A spinner is motion confined to at most this many tiles across that keeps
+# going for SPINNER_SAMPLES consecutive samples; it is seen at any level
+# change, below the tolerance too
+SPINNER_MAX_TILES = 4
+SPINNER_SAMPLES = 3
+
+
+class FrameStability:
+    """Running stability state of a sequence of frames
+
+    Each frame is reduced to a block-mean signature. A frame agrees with
+    the previous one when no tile moved by more than ``tolerance``; the
+    screen is stable after ``samples`` agreeing frames in a row. Motion
+    confined to a small compact area in every one of SPINNER_SAMPLES
+    consecutive frames is a loading spinner, and the screen is not stable
+    while it is visible, even if the motion stays within the tolerance.
+    Localized motion that has not lasted that long yet may still turn out
+    to be a spinner, so it holds the screen back as well.
+
+    ``tile_size`` is in device pixels and ``scale`` is the resolution of the
+    frames relative to the device screen.
+    """
+
+    def __init__(self, tolerance: float = STABLE_TOLERANCE, samples: int = STABLE_SAMPLES,
+                 tile_size: int = STABLE_TILE_SIZE, scale: float = 1.0):
+        self.tolerance = tolerance
+        self.samples = samples
+        self.tile_size = max(1, round(tile_size * scale))
+        self.signature = None
+        self.agreeing = 0
+        self.spinner_run = 0
+        self.spinner_seen = False
+
+    def update(self, frame: np.ndarray) -> bool:
+        """Add a frame; True once the screen is stable"""
+        signature = frame_signature(frame, self.tile_size).astype(np.int16)
+        if self.signature is None or signature.shape != self.signature.shape:
+            self.agreeing = 1
+            self.spinner_run = 0
+        else:
+            difference = np.abs(signature - self.signature)
+            self.agreeing = 1 if (difference > self.tolerance).any() else self.agreeing + 1
+
+            rows, cols = np.nonzero(difference)
+            localized = (len(rows) > 0 and rows.max() - rows.min() < SPINNER_MAX_TILES
+                         and cols.max() - cols.min() < SPINNER_MAX_TILES)
+            self.spinner_run = self.spinner_run + 1 if localized else 0
+            self.spinner_seen |= self.spinner_visible
+        self.signature = signature
+        return self.stable
+
+    @property
+    def spinner_visible(self) -> bool:
+        return self.spinner_run >= SPINNER_SAMPLES
+
+    @property
+    def stable(self) -> bool:
+        # A run of localized motion shorter than SPINNER_SAMPLES cannot be told
+        # apart from a spinner yet; waiting for it keeps a faint spinner from
+        # passing as stable before it has turned often enough to be recognized
+        return self.agreeing >= self.samples and self.spinner_run == 0
+
+
+async def wait_until_stable(capture: Callable[[], Optional[np.ndarray]], timeout: float = STABLE_TIMEOUT,
+                            tolerance: float = STABLE_TOLERANCE, samples: int = STABLE_SAMPLES,
+                            interval: float = SAMPLE_INTERVAL, executor: Optional[Executor] = None,
+                            scale: float = 1.0) -> Dict:
+    """Sample frames from ``capture`` until the screen is stable or ``timeout`` seconds pass
+
+    ``capture`` is a blocking callable returning a BGR or grayscale frame
+    (or None when a capture fails); it runs in ``executor`` (default: the
+    loop's default executor) so other devices keep working meanwhile.
+    ``scale`` is the frames' resolution relative to the device screen,
+    DRIVER_CAPTURE_SCALE for ``driver_capture``. Returns whether the screen
+    settled, the time waited, the number of frames sampled, whether a
+    spinner was seen and the last frame.
+    """
+    loop = asyncio.get_running_loop()
+    stability = FrameStability(tolerance, samples, scale=scale)
+    started = time.monotonic()
+    frames, frame = 0, None
+    while True:
+        sampled = time.monotonic()
+        captured = await loop.run_in_executor(executor, capture)
+        if captured is not None:
+            frame = captured
+            frames += 1
+            if stability.update(frame):
+                break
+        if time.monotonic() - started >= timeout:
+            break
+        await asyncio.sleep(max(0.0, interval - (time.monotonic() - sampled)))
+
+    return {
+        'stable': stability.stable,
+        'waited': time.monotonic() - started,
+        'samples': frames,
+        'spinner_seen': stability.spinner_seen,
+        'frame': frame,
+    }
+
+
+def driver_capture(driver) -> Callable[[], Optional[np.ndarray]]:
+    """Capture callable for an Appium driver, decoding straight to a DRIVER_CAPTURE_SCALE grayscale frame"""
+    def capture():
+        try:
+            return decode_image(driver.get_screenshot_as_png(), cv2.IMREAD_REDUCED_GRAYSCALE_2)
+        except Exception:
+            return None
+    return capture
+
+
+def main():
+    """Wait for a simulator or emulator screen to settle and report how long it took"""
+    parser = argparse.ArgumentParser(description='Wait until the device screen is stable')
+    parser.add_argument('--platform', choices=['ios', 'android'], default='ios')
+    parser.add_argument('--device', help='Simulator UDID or adb serial')
+    parser.add_argument('--timeout', type=float, default=STABLE_TIMEOUT)
+    parser.add_argument('--tolerance', type=float, default=STABLE_TOLERANCE)
+    parser.add_argument('--samples', type=int, default=STABLE_SAMPLES)
+    args = parser.parse_args()
+
+    screen_capture = ScreenCapture(args.platform, args.device)
+    result = asyncio.run(wait_until_stable(screen_capture.capture, args.timeout, args.tolerance, args.samples))
+    if result['samples'] == 0:
+        print(f"❌ Could not capture the screen: {screen_capture.last_error}")
+    elif result['stable']:
+        print(f"✅ Stable after {result['waited']:.2f} s ({result['samples']} samples)"
+              f"{', waited for a spinner' if result['spinner_seen'] else ''}")
+    else:
+        print(f"⏱️ Not stable after {result['waited']:.2f} s ({result['samples']} samples)"
+              f"{', a spinner kept turning' if result['spinner_seen'] else ''}")
+
+
+if __name__ == "__main__":
+    main()
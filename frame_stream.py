@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Streaming Frame Source for Project Watch Tower
+Keeps a long-lived screen recording pipe open and decodes it into a bounded,
+preallocated ring buffer of frames that consumers read by timestamp.
+"""
+
+import argparse
+import math
+import os
+import shlex
+import shutil
+import subprocess
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from capture import ScreenCapture
+
+# Command prefixes can be overridden, e.g. with stand-in scripts on Linux
+IDB_ENV = 'WATCHTOWER_IDB'
+ADB_ENV = 'WATCHTOWER_ADB'
+FFMPEG_ENV = 'WATCHTOWER_FFMPEG'
+
+DEFAULT_FPS = 15
+DEFAULT_POLL_INTERVAL = 0.1
+# The ring holds the frames of this many seconds a consumer may fall behind by,
+# and at least MIN_CAPACITY (a slot being written and one being read); each
+# full-resolution frame of a current phone is about 10 MB
+DEFAULT_MAX_LAG = 0.25
+MIN_CAPACITY = 3
+# screenrecord stops by itself after about three minutes, so an ended stream is
+# restarted; after MAX_STREAM_FAILURES restarts in a row that deliver no frames
+# the source polls instead
+MAX_STREAM_FAILURES = 3
+RESTART_DELAY = 0.5
+
+
+class FrameRingBuffer:
+    """Fixed-size ring of frames with monotonic timestamps
+
+    All frame storage is allocated up front. A writer reserves the oldest slot,
+    fills it in place and commits it with a timestamp; the slot is hidden from
+    readers while it is being overwritten. Readers get copies by default, so
+    the frames they hold stay valid after the ring wraps.
+    """
+
+    def __init__(self, capacity: int, shape: Tuple[int, ...], dtype=np.uint8):
+        self.capacity = capacity
+        self.shape = tuple(shape)
+        self.frames = np.zeros((capacity,) + self.shape, dtype=dtype)
+        self.timestamps = np.full(capacity, np.nan)
+        self.next_index = 0
+        self.frames_written = 0
+        self.condition = threading.Condition()
+
+    def reserve(self) -> Tuple[int, np.ndarray]:
+        """Claim the oldest slot for writing and return (index, writable frame view)"""
+        with self.condition:
+            index = self.next_index
+            self.timestamps[index] = np.nan
+            self.next_index = (index + 1) % self.capacity
+        return index, self.frames[index]
+
+    def commit(self, index: int, timestamp: Optional[float] = None):
+        """Publish a reserved slot"""
+        with self.condition:
+            self.timestamps[index] = time.monotonic() if timestamp is None else timestamp
+            self.frames_written += 1
+            self.condition.notify_all()
+
+    def push(self, frame: np.ndarray, timestamp: Optional[float] = None):
+        """Copy a frame into the ring"""
+        index, slot = self.reserve()
+        np.copyto(slot, frame)
+        self.commit(index, timestamp)
+
+    def _read(self, index: int, copy: bool) -> Tuple[float, np.ndarray]:
+        frame = self.frames[index]
+        return float(self.timestamps[index]), frame.copy() if copy else frame
+
+    def latest(self, after: Optional[float] = None, copy: bool = True) -> Optional[Tuple[float, np.ndarray]]:
+        """Newest frame, optionally only if it is newer than ``after``"""
+        with self.condition:
+            if np.all(np.isnan(self.timestamps)):
+                return None
+            index = int(np.nanargmax(self.timestamps))
+            if after is not None and not self.timestamps[index] > after:
+                return None
+            return self._read(index, copy)
+
+    def wait_latest(self, after: Optional[float], timeout: float, copy: bool = True) -> Optional[Tuple[float, np.ndarray]]:
+        """Block until a frame newer than ``after`` is available and return the newest one"""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while True:
+                frame = self.latest(after, copy)
+                remaining = deadline - time.monotonic()
+                if frame is not None or remaining <= 0:
+                    return frame
+                self.condition.wait(remaining)
+
+    def at(self, timestamp: float, copy: bool = True) -> Optional[Tuple[float, np.ndarray]]:
+        """Frame that was on screen at ``timestamp`` (the newest one not after it)"""
+        with self.condition:
+            valid = np.where(self.timestamps <= timestamp)[0]
+            if len(valid) == 0:
+                return None
+            index = int(valid[np.argmax(self.timestamps[valid])])
+            return self._read(index, copy)
+
+    def between(self, start: float, end: float, copy: bool = True) -> List[Tuple[float, np.ndarray]]:
+        """All buffered frames with start <= timestamp <= end, oldest first"""
+        with self.condition:
+            valid = np.where((self.timestamps >= start) & (self.timestamps <= end))[0]
+            order = valid[np.argsort(self.timestamps[valid])]
+            return [self._read(int(index), copy) for index in order]
+
+
+def _read_exact(stream, view: memoryview) -> bool:
+    """Fill ``view`` from a binary stream, returning False at end of stream"""
+    filled = 0
+    while filled < len(view):
+        count = stream.readinto(view[filled:])
+        if not count:
+            return False
+        filled += count
+    return True
+
+
+class FrameStream:
+    """Continuous frame source backed by a screen recording pipe
+
+    The recorder (``idb video-stream`` on iOS, ``adb exec-out screenrecord`` on
+    Android) emits H.264, which ffmpeg decodes to raw BGR frames read straight
+    into the ring buffer. A stream that ends is restarted. When the recorder
+    or ffmpeg is unavailable, or restarts keep failing, the source falls back
+    to polling in-memory screenshots. The ring holds ``capacity`` frames,
+    by default enough for a consumer ``max_lag`` seconds behind.
+    """
+
+    def __init__(self, platform: str = 'ios', device: Optional[str] = None,
+                 fps: int = DEFAULT_FPS, capacity: Optional[int] = None,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL, max_lag: float = DEFAULT_MAX_LAG):
+        self.platform = platform
+        self.device = device
+        self.fps = fps
+        self.capacity = capacity or max(MIN_CAPACITY, math.ceil(fps * max_lag) + 1)
+        self.poll_interval = poll_interval
+        self.screen_capture = ScreenCapture(platform, device)
+        self.buffer = None
+        self.mode = None
+        self.is_running = False
+        self.last_error = None
+        self.processes = []
+        self.thread = None
+        self.restarts = 0
+
+    def recorder_command(self) -> List[str]:
+        """Command that writes an H.264 elementary stream of the screen to stdout"""
+        if self.platform == 'ios':
+            idb = shlex.split(os.environ.get(IDB_ENV, 'idb'))
+            target = ['--udid', self.device] if self.device else []
+            return idb + ['video-stream', '--format', 'h264', '--fps', str(self.fps)] + target
+        adb = shlex.split(os.environ.get(ADB_ENV, 'adb'))
+        target = ['-s', self.device] if self.device else []
+        return adb + target + ['exec-out', 'screenrecord', '--output-format=h264', '-']
+
+    def decoder_command(self, width: int, height: int) -> List[str]:
+        """ffmpeg command that turns the H.264 stream into fixed-size raw BGR frames"""
+        ffmpeg = shlex.split(os.environ.get(FFMPEG_ENV, 'ffmpeg'))
+        return ffmpeg + [
+            '-loglevel', 'error', '-fflags', 'nobuffer', '-flags', 'low_delay',
+            '-f', 'h264', '-i', 'pipe:0',
+            '-vf', f'fps={self.fps},scale={width}:{height}',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24', 'pipe:1',
+        ]
+
+    def start(self) -> bool:
+        """Allocate the ring buffer from a first screenshot and start streaming"""
+        first = self.screen_capture.capture()
+        if first is None:
+            self.last_error = self.screen_capture.last_error
+            return False
+
+        self.buffer = FrameRingBuffer(self.capacity, first.shape)
+        self.buffer.push(first)
+        self.is_running = True
+
+        height, width = first.shape[:2]
+        if self._start_pipeline(width, height):
+            self.mode = 'stream'
+            target = self._read_stream
+        else:
+            self.mode = 'poll'
+            target = self._poll
+        self.thread = threading.Thread(target=target, daemon=True)
+        self.thread.start()
+        return True
+
+    def _start_pipeline(self, width: int, height: int) -> bool:
+        recorder_command = self.recorder_command()
+        decoder_command = self.decoder_command(width, height)
+        if shutil.which(recorder_command[0]) is None or shutil.which(decoder_command[0]) is None:
+            self.last_error = "Screen recorder or ffmpeg not found"
+            return False
+
+        try:
+            recorder = subprocess.Popen(recorder_command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            decoder = subprocess.Popen(decoder_command, stdin=recorder.stdout,
+                                       stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        except OSError as e:
+            self.last_error = str(e)
+            return False
+
+        # Only ffmpeg should hold the recorder's stdout, so it sees EOF when the recorder exits
+        recorder.stdout.close()
+        self.processes = [recorder, decoder]
+        if not self.is_running:
+            # Stopped while a restart was starting up
+            self._stop_pipeline()
+        return True
+
+    def _read_stream(self):
+        height, width = self.buffer.shape[:2]
+        failures = 0
+        while self.is_running:
+            delivered = self._read_frames(self.processes[-1])
+            self._stop_pipeline()
+            failures = 0 if delivered else failures + 1
+            while self.is_running and failures < MAX_STREAM_FAILURES:
+                time.sleep(RESTART_DELAY)
+                if self._start_pipeline(width, height):
+                    self.restarts += 1
+                    break
+                failures += 1
+            else:
+                break
+
+        if self.is_running:
+            self.last_error = f"Screen stream failed {failures} times in a row, falling back to polling"
+            self.mode = 'poll'
+            self._poll()
+
+    def _read_frames(self, decoder) -> int:
+        """Read decoded frames into the ring until the stream ends; returns how many arrived"""
+        frames = 0
+        # Closed here rather than in _stop_pipeline, which stop() may run while this thread reads
+        with decoder.stdout:
+            while self.is_running:
+                index, slot = self.buffer.reserve()
+                if not _read_exact(decoder.stdout, memoryview(slot).cast('B')):
+                    break
+                self.buffer.commit(index)
+                frames += 1
+        return frames
+
+    def _poll(self):
+        while self.is_running:
+            started = time.monotonic()
+            image = self.screen_capture.capture()
+            if image is not None and image.shape == self.buffer.shape:
+                self.buffer.push(image, started)
+            time.sleep(max(0.0, self.poll_interval - (time.monotonic() - started)))
+
+    def next_frame(self, after: Optional[float] = None, timeout: float = 1.0) -> Optional[Tuple[float, np.ndarray]]:
+        """Newest (timestamp, frame) captured after ``after``, waiting up to ``timeout`` seconds"""
+        if self.buffer is None:
+            return None
+        return self.buffer.wait_latest(after, timeout)
+
+    def _stop_pipeline(self):
+        for process in self.processes:
+            if process.poll() is None:
+                process.terminate()
+                try:
+                    process.wait(timeout=2)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+        self.processes = []
+
+    def stop(self):
+        """Stop the recorder and the reader thread"""
+        self.is_running = False
+        self._stop_pipeline()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+
+
+def main():
+    """Measure the observed frame rate of the streaming source"""
+    parser = argparse.ArgumentParser(description='Streaming frame source')
+    parser.add_argument('--platform', choices=['ios', 'android'], default='ios')
+    parser.add_argument('--device', help='Simulator UDID or adb serial')
+    parser.add_argument('--fps', type=int, default=DEFAULT_FPS)
+    parser.add_argument('--capacity', type=int, help='Frames in the ring buffer (default: from --max-lag)')
+    parser.add_argument('--max-lag', type=float, default=DEFAULT_MAX_LAG,
+                        help='Seconds a consumer may fall behind the stream')
+    parser.add_argument('--seconds', type=float, default=5.0)
+    args = parser.parse_args()
+
+    stream = FrameStream(args.platform, args.device, fps=args.fps, capacity=args.capacity, max_lag=args.max_lag)
+    if not stream.start():
+        print(f"❌ Could not start frame stream: {stream.last_error}")
+        return
+
+    print(f"🎥 Streaming in {stream.mode} mode ({stream.buffer.shape[1]}x{stream.buffer.shape[0]})")
+    start = time.monotonic()
+    written = stream.buffer.frames_written
+    time.sleep(args.seconds)
+    frames = stream.buffer.frames_written - written
+    elapsed = time.monotonic() - start
+    stream.stop()
+
+    print(f"   Frames: {frames} in {elapsed:.1f} s ({frames / elapsed:.1f} fps), "
+          f"{stream.buffer.capacity} buffered, {stream.restarts} stream restarts")
+    if stream.last_error:
+        print(f"   Note: {stream.last_error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,8 +13,104 @@ import os
 import sys
 from datetime import datetime
 
+from analysis_cache import get_analysis_cache
+from batch_analyzer import BatchAnalyzer
+from contrast_checker import ContrastChecker
+from region_stats import RegionStats
+from text_regions import TextRegionDetector
+
+# Bump when screenshot analysis output changes so cached analyses are not reused
+ANALYZER_VERSION = "4"
+ANALYSIS_NAMESPACE = "IndependentCodeFixer.analysis"
+
+# Shared by every analysis in this process, including batch workers
+text_detector = TextRegionDetector('gradient')
+contrast_checker = ContrastChecker()
+
+def detect_screenshot_issues(image):
+    """Detect layout, alignment and contrast issues in a decoded screenshot"""
+    height, width = image.shape[:2]
+    issues = []
+    
+    # Convert to different color spaces for analysis
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    
+    # 1. Check for text overflow
+    edges = cv2.Canny(gray, 50, 150)
+    horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (25, 1))
+    horizontal_lines = cv2.morphologyEx(edges, cv2.MORPH_OPEN, horizontal_kernel)
+    
+    horizontal_line_count = np.sum(horizontal_lines > 0)
+    
+    if horizontal_line_count > 50:
+        issues.append({
+            "type": "text_overflow",
+            "severity": "medium",
+            "description": f"Potential text overflow detected ({horizontal_line_count} horizontal lines)",
+            "location": "multiple areas"
+        })
+    
+    # 2. Check for button alignment issues
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    button_count = 0
+    button_areas = []
+    
+    for contour in contours:
+        area = cv2.contourArea(contour)
+        if 1000 < area < 10000:  # Button-sized areas
+            button_count += 1
+            button_areas.append(area)
+    
+    if button_count > 0:
+        if len(button_areas) > 1:
+            area_variance = np.var(button_areas)
+            if area_variance > 1000000:
+                issues.append({
+                    "type": "button_alignment",
+                    "severity": "low",
+                    "description": f"Button size inconsistency detected (variance: {area_variance})",
+                    "location": "button area"
+                })
+    
+    # 3. Check for color contrast issues
+    stats = RegionStats(gray)
+    brightness = stats.mean()
+    
+    if brightness < 50:
+        issues.append({
+            "type": "contrast",
+            "severity": "high",
+            "description": f"Very dark screen - potential visibility issues (brightness: {brightness:.1f})",
+            "location": "entire screen"
+        })
+    elif brightness > 200:
+        issues.append({
+            "type": "contrast",
+            "severity": "medium",
+            "description": f"Very bright screen - potential glare issues (brightness: {brightness:.1f})",
+            "location": "entire screen"
+        })
+    
+    # 4. Check text against WCAG contrast ratios. Photos and placeholder text fail
+    # too, so these findings are reported but never reach the automatic fixes
+    failures = contrast_checker.failures(stats, text_detector.detect(gray))
+    if failures:
+        worst = failures[0]
+        issues.append({
+            "type": "contrast",
+            "severity": "high" if worst["ratio"] < 3 else "medium",
+            "description": (f"{len(failures)} text regions below WCAG AA contrast "
+                            f"(worst {worst['ratio']:.2f}:1, needs {worst['required']:.1f}:1)"),
+            "location": f"({worst['x']}, {worst['y']}) {worst['width']}x{worst['height']}",
+            "elements": failures,
+            "report_only": True
+        })
+    
+    return {"issues": issues, "image_size": f"{width}x{height}"}
+
 class IndependentCodeFixer:
     def __init__(self):
+        self.analysis_cache = get_analysis_cache()
         self.fixes_applied = 0
         self.issues_found = 0
         self.is_running = False
@@ -35,19 +131,29 @@ class IndependentCodeFixer:
         
         print(f"🔍 Found {len(screenshot_files)} screenshots to analyze")
         
-        for filename in screenshot_files:
-            file_path = os.path.join(screenshots_dir, filename)
-            print(f"📸 Analyzing: {filename}")
-            
-            # Analyze the screenshot
-            analysis = self.analyze_screenshot(file_path)
+        # Decode and analyze across worker processes; fixes are applied as results complete.
+        # Unchanged screenshots are answered from the analysis cache, so no checkpoint is needed here.
+        batch = BatchAnalyzer(detect_screenshot_issues, ANALYSIS_NAMESPACE, ANALYZER_VERSION,
+                              checkpoint_path=None, cache=self.analysis_cache)
+        paths = [os.path.join(screenshots_dir, filename) for filename in screenshot_files]
+        
+        for record in batch.run(paths):
+            filename = os.path.basename(record['path'])
+            print(f"📸 Analyzed: {filename}")
             
-            if analysis['issues']:
-                print(f"   Issues found: {len(analysis['issues'])}")
+            if 'error' in record:
+                print(f"   ❌ Error analyzing screenshot: {record['error']}")
+            elif record['result']['issues']:
+                issues = record['result']['issues']
+                print(f"   Issues found: {len(issues)}")
                 # Apply fixes based on analysis
-                self.apply_fixes(analysis['issues'], filename)
+                self.apply_fixes(issues, filename)
             else:
                 print(f"   No issues found")
+        
+        stats = batch.stats
+        print(f"⚡ {stats['completed']} screenshots in {stats['elapsed']:.1f}s "
+              f"({stats['images_per_second']:.1f} images/s, {stats['cached']} from cache)")
     
     def analyze_screenshot(self, screenshot_path):
         """Analyze a screenshot for issues"""
@@ -55,89 +161,36 @@ class IndependentCodeFixer:
             return {"issues": [], "screen": "unknown"}
         
         try:
-            # Load image with OpenCV
-            image = cv2.imread(screenshot_path)
-            if image is None:
+            # Screenshots that were already analyzed are answered from the cache
+            cached = self.analysis_cache.get_or_compute_file(
+                screenshot_path, ANALYSIS_NAMESPACE, ANALYZER_VERSION, self.detect_issues
+            )
+            if cached is None:
                 return {"issues": [], "screen": "unknown"}
             
-            height, width = image.shape[:2]
-            issues = []
-            
-            # Convert to different color spaces for analysis
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            
-            # 1. Check for text overflow
-            edges = cv2.Canny(gray, 50, 150)
-            horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (25, 1))
-            horizontal_lines = cv2.morphologyEx(edges, cv2.MORPH_OPEN, horizontal_kernel)
-            
-            horizontal_line_count = np.sum(horizontal_lines > 0)
-            
-            if horizontal_line_count > 50:
-                issues.append({
-                    "type": "text_overflow",
-                    "severity": "medium",
-                    "description": f"Potential text overflow detected ({horizontal_line_count} horizontal lines)",
-                    "location": "multiple areas"
-                })
-            
-            # 2. Check for button alignment issues
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            button_count = 0
-            button_areas = []
-            
-            for contour in contours:
-                area = cv2.contourArea(contour)
-                if 1000 < area < 10000:  # Button-sized areas
-                    button_count += 1
-                    button_areas.append(area)
-            
-            if button_count > 0:
-                if len(button_areas) > 1:
-                    area_variance = np.var(button_areas)
-                    if area_variance > 1000000:
-                        issues.append({
-                            "type": "button_alignment",
-                            "severity": "low",
-                            "description": f"Button size inconsistency detected (variance: {area_variance})",
-                            "location": "button area"
-                        })
-            
-            # 3. Check for color contrast issues
-            mean_color = np.mean(image, axis=(0, 1))
-            brightness = np.mean(mean_color)
-            
-            if brightness < 50:
-                issues.append({
-                    "type": "contrast",
-                    "severity": "high",
-                    "description": f"Very dark screen - potential visibility issues (brightness: {brightness:.1f})",
-                    "location": "entire screen"
-                })
-            elif brightness > 200:
-                issues.append({
-                    "type": "contrast",
-                    "severity": "medium",
-                    "description": f"Very bright screen - potential glare issues (brightness: {brightness:.1f})",
-                    "location": "entire screen"
-                })
-            
             return {
-                "issues": issues,
+                "issues": cached["issues"],
                 "screen": "login_screen",
                 "analysis_time": datetime.now().isoformat(),
-                "image_size": f"{width}x{height}"
+                "image_size": cached["image_size"]
             }
             
         except Exception as e:
             print(f"❌ Error analyzing screenshot: {e}")
             return {"issues": [], "screen": "unknown", "error": str(e)}
     
+    def detect_issues(self, image):
+        """Detect layout, alignment and contrast issues in a decoded screenshot"""
+        return detect_screenshot_issues(image)
+    
     def apply_fixes(self, issues, filename):
         """Apply fixes based on detected issues"""
         print(f"🔧 Applying fixes for {len(issues)} issues from {filename}")
         
         for issue in issues:
+            if issue.get('report_only'):
+                print(f"   📋 Reported only: {issue['description']}")
+                continue
             if issue['type'] == 'text_overflow':
                 self.fix_text_overflow()
             elif issue['type'] == 'button_alignment':
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Layout Shift Meter for Project Watch Tower
+Cumulative layout shift of tracked UI elements: every frame in which elements
+move scores the share of the screen they disturbed times how far they moved,
+and the frame scores within each screen's loading window add up to its score.
+"""
+
+import argparse
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from box_set import union_area
+
+# A screen's score counts shifts up to this many seconds after it appeared
+LOADING_WINDOW = 5.0
+# A frame in which at least this share of the elements is new starts a new screen
+NEW_SCREEN_SHARE = 0.5
+MIN_SCREEN_ELEMENTS = 3
+# Web Vitals rating thresholds for cumulative layout shift
+GOOD_SHIFT = 0.1
+POOR_SHIFT = 0.25
+# Screens kept for the report of a long monitoring session
+MAX_SCREENS = 100
+
+
+def shift_rating(score: float) -> str:
+    """Web Vitals rating of a cumulative layout shift score"""
+    if score <= GOOD_SHIFT:
+        return 'good'
+    return 'needs_improvement' if score <= POOR_SHIFT else 'poor'
+
+
+def frame_shift(events: List[Dict], shape: Tuple[int, ...]) -> Dict:
+    """Layout shift of one frame from the tracker's ``moved`` events
+
+    The impact fraction is the share of the screen covered by the moved
+    elements before and after the move; the distance fraction is the
+    largest move over the larger screen dimension. The score is their
+    product, as in the Web Vitals definition.
+    """
+    moves = [event for event in events if event['event'] == 'moved']
+    if not moves:
+        return {'score': 0.0, 'impact': 0.0, 'distance': 0.0, 'moved': 0}
+
+    height, width = shape[:2]
+    before = np.array([[m['from']['x'], m['from']['y'], m['from']['width'], m['from']['height']] for m in moves])
+    after = np.array([[m['x'], m['y'], m['width'], m['height']] for m in moves])
+    impact = min(union_area(np.concatenate([before, after])) / float(width * height), 1.0)
+    distance = float(np.hypot(*(after[:, :2] - before[:, :2]).T).max()) / max(width, height)
+    return {'score': impact * distance, 'impact': impact, 'distance': distance, 'moved': len(moves)}
+
+
+class LayoutShiftMeter:
+    """Per-screen cumulative layout shift over a loading window
+
+    Fed with the element tracker's events frame by frame. A new screen
+    starts with the first frame, when the caller names a different screen,
+    or when most of a frame's elements are new; the moves in that first
+    frame belong to the transition and are not scored. Frame shifts in the
+    following LOADING_WINDOW seconds add to the screen's score.
+    """
+
+    def __init__(self, loading_window: float = LOADING_WINDOW):
+        self.loading_window = loading_window
+        self.screens = deque(maxlen=MAX_SCREENS)
+        self.screen_count = 0
+
+    def record(self, events: List[Dict], element_count: int, shape: Tuple[int, ...],
+               timestamp: Optional[float] = None, screen: Optional[str] = None) -> Dict:
+        """Score one analyzed frame and return the current screen's shift so far"""
+        timestamp = time.time() if timestamp is None else timestamp
+        appeared = sum(event['event'] == 'appeared' for event in events)
+        current = self.screens[-1] if self.screens else None
+        new_screen = (current is None or (screen is not None and screen != current['screen'])
+                      or (element_count >= MIN_SCREEN_ELEMENTS and appeared >= NEW_SCREEN_SHARE * element_count))
+        if new_screen:
+            self.screen_count += 1
+            current = {'screen': screen or f"screen_{self.screen_count}", 'started': timestamp,
+                       'score': 0.0, 'frames': 0, 'shifts': []}
+            self.screens.append(current)
+
+        current['frames'] += 1
+        elapsed = timestamp - current['started']
+        loading = elapsed <= self.loading_window
+        shift = frame_shift([] if new_screen else events, shape)
+        if loading and shift['score'] > 0:
+            current['score'] += shift['score']
+            current['shifts'].append({'time': round(elapsed, 3), 'score': round(shift['score'], 4),
+                                      'moved': shift['moved']})
+
+        return {
+            'screen': current['screen'],
+            'frame_score': round(shift['score'], 4),
+            'score': round(current['score'], 4),
+            'rating': shift_rating(current['score']),
+            'loading': loading,
+        }
+
+    def report(self) -> List[Dict]:
+        """Score, rating and individual shifts of every recorded screen"""
+        return [{
+            'screen': screen['screen'],
+            'score': round(screen['score'], 4),
+            'rating': shift_rating(screen['score']),
+            'frames': screen['frames'],
+            'shifts': list(screen['shifts']),
+        } for screen in self.screens]
+
+
+def main():
+    """Layout shift of a screenshot sequence captured at a fixed interval"""
+    from element_tracker import ElementTracker
+    from frame_analysis import FrameAnalysis, boxes_to_elements
+
+    parser = argparse.ArgumentParser(description='Cumulative layout shift of a screenshot sequence')
+    parser.add_argument('screenshots', nargs='+', help='Screenshots in capture order')
+    parser.add_argument('--interval', type=float, default=0.1, help='Seconds between screenshots')
+    parser.add_argument('--min-area', type=int, default=1000, help='Smallest element box area')
+    args = parser.parse_args()
+
+    tracker = ElementTracker()
+    meter = LayoutShiftMeter()
+    shift_ms = []
+    for i, path in enumerate(args.screenshots):
+        image = cv2.imread(path)
+        if image is None:
+            print(f"❌ Could not load {path}")
+            continue
+        boxes = FrameAnalysis(image).boxes
+        elements = boxes_to_elements(boxes[boxes[:, 2] * boxes[:, 3] >= args.min_area], type='element')
+
+        start = time.perf_counter()
+        events = tracker.update(elements, image)
+        shift = meter.record(events, len(elements), image.shape, timestamp=i * args.interval)
+        shift_ms.append((time.perf_counter() - start) * 1000)
+        print(f"🎞️ {path}: {shift['screen']} frame shift {shift['frame_score']:.4f}, "
+              f"cumulative {shift['score']:.4f} ({shift_ms[-1]:.1f} ms)")
+
+    for screen in meter.report():
+        icon = "✅" if screen['rating'] == 'good' else "🟡" if screen['rating'] == 'needs_improvement' else "🔴"
+        print(f"{icon} {screen['screen']}: layout shift {screen['score']:.4f} ({screen['rating']}), "
+              f"{len(screen['shifts'])} shifts in {screen['frames']} frames")
+    if shift_ms:
+        print(f"📊 Tracking and scoring: mean {np.mean(shift_ms):.1f} ms per frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ Live AI Dashboard for Project Watch Tower
 This shows you exactly what the AI is doing in real-time with full visibility.
 """
 
+import argparse
 import cv2
 import numpy as np
 import subprocess
@@ -15,11 +16,25 @@ from datetime import datetime
 from typing import Dict, List, Tuple, Optional
 import logging
 
+from analysis_cache import get_analysis_cache
+from capture import ScreenCapture
+from contrast_checker import ContrastChecker
+from element_tracker import ElementTracker, track_frame
+from layout_shift import LayoutShiftMeter
+from frame_analysis import (ANALYSIS_SCALES, DETECTOR_VERSION, FrameAnalysis, boxes_to_elements, button_boxes,
+                            input_field_boxes, text_region_boxes)
+
 class LiveAIDashboard:
-    def __init__(self):
+    def __init__(self, analysis_scale: float = 1.0):
         self.setup_logging()
+        self.analysis_scale = analysis_scale  # 1.0, 0.5 or 0.25 of device resolution
+        self.analysis_cache = get_analysis_cache()
+        self.screen_capture = ScreenCapture()
         self.screenshot_count = 0
         self.analysis_count = 0
+        self.element_tracker = ElementTracker()  # stable element IDs across analyzed frames
+        self.contrast_checker = ContrastChecker()
+        self.layout_shift = LayoutShiftMeter()  # per-screen shift while loading
         self.issues_found = 0
         self.start_time = datetime.now()
         self.session_data = {
@@ -69,34 +84,27 @@ class LiveAIDashboard:
             timestamp = datetime.now().strftime("%H:%M:%S")
             filename = f"/tmp/screenshot_{timestamp.replace(':', '')}.png"
             
-            result = subprocess.run([
-                'xcrun', 'simctl', 'io', 'booted', 'screenshot', filename
-            ], capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                screenshot = cv2.imread(filename)
-                if screenshot is not None:
-                    self.screenshot_count += 1
-                    self.session_data['screenshots'].append({
-                        'timestamp': timestamp,
-                        'filename': filename,
-                        'size': screenshot.shape
-                    })
-                    print(f"📸 Screenshot #{self.screenshot_count} captured at {timestamp}")
-                    return screenshot
-                else:
-                    print(f"❌ Failed to load screenshot: {filename}")
-                    return None
+            # Decode from simctl's stdout; the PNG is still kept for the session report
+            screenshot = self.screen_capture.capture(save_path=filename)
+            if screenshot is not None:
+                self.screenshot_count += 1
+                self.session_data['screenshots'].append({
+                    'timestamp': timestamp,
+                    'filename': filename,
+                    'size': screenshot.shape
+                })
+                print(f"📸 Screenshot #{self.screenshot_count} captured at {timestamp}")
+                return screenshot
             else:
-                print(f"❌ Screenshot capture failed: {result.stderr}")
+                print(f"❌ Screenshot capture failed: {self.screen_capture.last_error}")
                 return None
                 
         except Exception as e:
             print(f"❌ Error capturing screen: {e}")
             return None
     
-    def analyze_ui_elements(self, screenshot: np.ndarray) -> Dict:
-        """Analyze UI elements using computer vision"""
+    def analyze_ui_elements(self, screenshot: np.ndarray, scale: Optional[float] = None) -> Dict:
+        """Analyze UI elements using computer vision (scale defaults to analysis_scale)"""
         timestamp = datetime.now().strftime("%H:%M:%S")
         print(f"🧠 Starting AI analysis at {timestamp}...")
         
@@ -113,39 +121,24 @@ class LiveAIDashboard:
             height, width = screenshot.shape[:2]
             print(f"   📏 Analyzing image: {width}x{height} pixels")
             
-            # Convert to grayscale for text detection
-            gray = cv2.cvtColor(screenshot, cv2.COLOR_BGR2GRAY)
-            
-            # Detect text regions
-            text_regions = self.detect_text_regions(gray, width, height)
-            analysis['text_elements'] = text_regions
-            print(f"   📝 Text regions found: {len(text_regions)}")
-            
-            # Detect buttons
-            buttons = self.detect_buttons(screenshot)
-            analysis['buttons'] = buttons
-            print(f"   🔘 Buttons found: {len(buttons)}")
-            
-            # Detect input fields
-            input_fields = self.detect_input_fields(screenshot)
-            analysis['input_fields'] = input_fields
-            print(f"   📝 Input fields found: {len(input_fields)}")
-            
-            # Check for issues
-            issues = self.check_ui_issues(screenshot, analysis)
-            analysis['issues'] = issues
-            print(f"   ⚠️  Issues detected: {len(issues)}")
-            
-            # Generate recommendations
-            recommendations = self.generate_recommendations(issues)
-            analysis['recommendations'] = recommendations
+            # Identical frames are served from the analysis cache
+            analysis.update(self.detect_ui_elements(screenshot, scale))
+            # Issues of elements seen in earlier frames were already counted
+            new_issues = track_frame(self.element_tracker, self.layout_shift, self.contrast_checker,
+                                     screenshot, analysis)
+            issues = analysis['issues']
+            recommendations = analysis['recommendations']
+            print(f"   📝 Text regions found: {len(analysis['text_elements'])}")
+            print(f"   🔘 Buttons found: {len(analysis['buttons'])}")
+            print(f"   📝 Input fields found: {len(analysis['input_fields'])}")
+            print(f"   ⚠️  Issues detected: {len(issues)} ({len(new_issues)} new)")
             print(f"   💡 Recommendations: {len(recommendations)}")
             
             # Update session data
             self.analysis_count += 1
-            self.issues_found += len(issues)
+            self.issues_found += len(new_issues)
             self.session_data['analyses'].append(analysis)
-            self.session_data['issues'].extend(issues)
+            self.session_data['issues'].extend(new_issues)
             self.session_data['recommendations'].extend(recommendations)
             
             print(f"✅ Analysis #{self.analysis_count} completed!")
@@ -155,97 +148,66 @@ class LiveAIDashboard:
             print(f"❌ Error in analysis: {e}")
             return analysis
     
-    def detect_text_regions(self, gray_image: np.ndarray, width: int, height: int) -> List[Dict]:
-        """Detect text regions in the image"""
-        text_regions = []
+    def detect_ui_elements(self, screenshot: np.ndarray, scale: Optional[float] = None) -> Dict:
+        """Run every detector on the screenshot, reusing cached results for identical frames"""
+        scale = self.analysis_scale if scale is None else scale
+        return self.analysis_cache.get_or_compute(
+            screenshot, f"{self.__class__.__name__}.ui_elements@{scale}", DETECTOR_VERSION,
+            lambda: self._detect_ui_elements(screenshot, scale)
+        )
+    
+    def _detect_ui_elements(self, screenshot: np.ndarray, scale: float) -> Dict:
+        """Run every detector on one shared frame analysis"""
+        # Compute grayscale, edges and contours once for every detector
+        frame = FrameAnalysis(screenshot, scale=scale)
+        
+        detected = {
+            # Detect text regions
+            'text_elements': self.detect_text_regions(frame),
+            # Detect buttons
+            'buttons': self.detect_buttons(frame),
+            # Detect input fields
+            'input_fields': self.detect_input_fields(frame),
+        }
         
+        # Check for issues
+        detected['issues'] = self.check_ui_issues(frame, detected)
+        
+        # Generate recommendations
+        detected['recommendations'] = self.generate_recommendations(detected['issues'])
+        
+        return detected
+    
+    def detect_text_regions(self, frame: FrameAnalysis) -> List[Dict]:
+        """Detect text regions in the image"""
         try:
-            edges = cv2.Canny(gray_image, 50, 150)
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            for contour in contours:
-                x, y, w, h = cv2.boundingRect(contour)
-                area = w * h
-                
-                if (20 < w < width * 0.8 and 10 < h < height * 0.1 and area > 200):
-                    aspect_ratio = w / h if h > 0 else 0
-                    if 1 < aspect_ratio < 20:
-                        text_regions.append({
-                            'x': x, 'y': y, 'width': w, 'height': h,
-                            'area': area
-                        })
-            
-            return text_regions
-            
+            return boxes_to_elements(text_region_boxes(frame))
         except Exception as e:
             print(f"❌ Error detecting text: {e}")
             return []
     
-    def detect_buttons(self, image: np.ndarray) -> List[Dict]:
+    def detect_buttons(self, frame: FrameAnalysis) -> List[Dict]:
         """Detect button-like elements"""
-        buttons = []
-        
         try:
-            hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-            
-            # Look for blue and purple buttons
-            button_colors = [
-                ([100, 50, 50], [130, 255, 255]),  # Blue
-                ([140, 50, 50], [180, 255, 255]),  # Purple
-            ]
-            
-            for lower, upper in button_colors:
-                mask = cv2.inRange(hsv, np.array(lower), np.array(upper))
-                contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-                
-                for contour in contours:
-                    x, y, w, h = cv2.boundingRect(contour)
-                    area = w * h
-                    
-                    if (50 < w < 300 and 30 < h < 80 and area > 1500):
-                        buttons.append({
-                            'x': x, 'y': y, 'width': w, 'height': h,
-                            'area': area
-                        })
-            
-            return buttons
-            
+            return boxes_to_elements(button_boxes(frame))
         except Exception as e:
             print(f"❌ Error detecting buttons: {e}")
             return []
     
-    def detect_input_fields(self, image: np.ndarray) -> List[Dict]:
+    def detect_input_fields(self, frame: FrameAnalysis) -> List[Dict]:
         """Detect input field elements"""
-        input_fields = []
-        
         try:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            edges = cv2.Canny(gray, 50, 150)
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            for contour in contours:
-                x, y, w, h = cv2.boundingRect(contour)
-                area = w * h
-                aspect_ratio = w / h if h > 0 else 0
-                
-                if (100 < w < 400 and 30 < h < 60 and area > 3000 and 2 < aspect_ratio < 8):
-                    input_fields.append({
-                        'x': x, 'y': y, 'width': w, 'height': h,
-                        'area': area
-                    })
-            
-            return input_fields
-            
+            return boxes_to_elements(input_field_boxes(frame))
         except Exception as e:
             print(f"❌ Error detecting input fields: {e}")
             return []
     
-    def check_ui_issues(self, screenshot: np.ndarray, analysis: Dict) -> List[Dict]:
+    def check_ui_issues(self, frame: FrameAnalysis, analysis: Dict) -> List[Dict]:
         """Check for common UI issues"""
         issues = []
         
         try:
-            height, width = screenshot.shape[:2]
+            height, width = frame.height, frame.width
             
             # Check for text overflow
             for element in analysis['text_elements']:
@@ -255,6 +217,7 @@ class LiveAIDashboard:
                     issues.append({
                         'type': 'text_overflow',
                         'description': f'Text at ({element["x"]}, {element["y"]}) may be overflowing',
+                        'element': {k: element[k] for k in ('x', 'y', 'width', 'height')},
                         'severity': 'high'
                     })
             
@@ -269,6 +232,7 @@ class LiveAIDashboard:
                         issues.append({
                             'type': 'layout_spacing',
                             'description': f'Buttons too close (spacing: {spacing}px)',
+                            'element': {k: current[k] for k in ('x', 'y', 'width', 'height')},
                             'severity': 'medium'
                         })
             
@@ -345,6 +309,11 @@ class LiveAIDashboard:
         else:
             print(f"\n✅ NO ISSUES DETECTED!")
         
+        shift = analysis.get('layout_shift')
+        if shift and shift['score'] > 0:
+            print(f"\n📐 LAYOUT SHIFT ({shift['screen']}): {shift['score']:.4f} ({shift['rating']}), "
+                  f"this frame {shift['frame_score']:.4f}")
+        
         if analysis['recommendations']:
             print(f"\n💡 RECOMMENDATIONS ({len(analysis['recommendations'])}):")
             for i, rec in enumerate(analysis['recommendations'], 1):
@@ -366,7 +335,8 @@ class LiveAIDashboard:
             'screenshots': self.session_data['screenshots'],
             'analyses': self.session_data['analyses'],
             'issues': self.session_data['issues'],
-            'recommendations': self.session_data['recommendations']
+            'recommendations': self.session_data['recommendations'],
+            'layout_shift': self.layout_shift.report()
         }
         
         with open('ai_session_report.json', 'w') as f:
@@ -417,12 +387,17 @@ class LiveAIDashboard:
 
 def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description='Live AI dashboard')
+    parser.add_argument('--scale', type=float, default=1.0, choices=ANALYSIS_SCALES,
+                        help='Analysis resolution relative to the device screenshot')
+    args = parser.parse_args()
+    
     print("🤖 Live AI Dashboard for Project Watch Tower")
     print("=" * 50)
     print("This will show you exactly what the AI is doing!")
     print("=" * 50)
     
-    dashboard = LiveAIDashboard()
+    dashboard = LiveAIDashboard(analysis_scale=args.scale)
     dashboard.run_live_analysis()
 
 if __name__ == "__main__":
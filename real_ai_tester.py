@@ -14,6 +14,8 @@ from datetime import datetime
 import base64
 from flask_socketio import SocketIO
 
+from screen_classifier import get_screen_classifier
+
 class RealAITester:
     def __init__(self):
         self.simulator_device = None
@@ -165,6 +167,12 @@ class RealAITester:
     def detect_screen_type(self, image):
         """Detect what type of screen this is based on visual elements"""
         try:
+            screen_classifier = get_screen_classifier()
+            if screen_classifier is not None:
+                screen_type, _ = screen_classifier.predict(image)
+                return screen_type
+            
+            # Line-count heuristics until a classifier has been trained
             # Convert to HSV for color detection
             hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
             
@@ -12,10 +12,21 @@ import cv2
 import numpy as np
 import time
 
+from analysis_cache import get_analysis_cache
+from box_set import dedupe
+from frame_analysis import elements_to_boxes
+from contrast_checker import ContrastChecker
+from region_stats import RegionStats
+
+# Bump when perform_real_analysis output changes so cached analyses are not reused
+ANALYZER_VERSION = "4"
+
 class RealScreenshotSystem:
     def __init__(self):
         self.screenshots_dir = "real_screenshots"
         self.analysis_dir = "real_analysis"
+        self.analysis_cache = get_analysis_cache()
+        self.contrast_checker = ContrastChecker()
         self.ensure_directories()
         
     def ensure_directories(self):
@@ -106,16 +117,17 @@ class RealScreenshotSystem:
     def analyze_screenshot(self, image_path):
         """Analyze screenshot with REAL computer vision - NO MOCK DATA"""
         try:
-            # Load image with OpenCV
-            image = cv2.imread(image_path)
-            if image is None:
+            # REAL computer vision analysis, reused for screenshots already analyzed
+            cached = self.analysis_cache.get_or_compute_file(
+                image_path, "RealScreenshotSystem.analysis", ANALYZER_VERSION,
+                lambda image: {"shape": list(image.shape), "analysis": self.perform_real_analysis(image)}
+            )
+            if cached is None:
                 return {"success": False, "error": "Could not load image"}
             
             # Get image dimensions
-            height, width, channels = image.shape
-            
-            # REAL computer vision analysis
-            analysis = self.perform_real_analysis(image)
+            height, width, channels = cached["shape"]
+            analysis = cached["analysis"]
             
             # Create analysis report
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -152,20 +164,27 @@ class RealScreenshotSystem:
         # Convert to different color spaces for analysis
         gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         
+        # Integral images answer every region statistic below in constant time
+        stats = RegionStats(gray)
+        blue, green, red = cv2.mean(image)[:3]
+        text_regions = self.detect_text_regions(gray, stats)
+        
         # REAL analysis metrics
         analysis = {
-            "brightness": float(np.mean(gray)),
-            "contrast": float(np.std(gray)),
+            "brightness": stats.mean(),
+            "contrast": stats.std(),
             "color_distribution": {
-                "red": float(np.mean(image[:,:,2])),
-                "green": float(np.mean(image[:,:,1])),
-                "blue": float(np.mean(image[:,:,0]))
+                "red": red,
+                "green": green,
+                "blue": blue
             },
             "edge_density": self.calculate_edge_density(gray),
-            "text_regions": self.detect_text_regions(gray),
-            "button_regions": self.detect_button_regions(image),
+            "text_regions": text_regions,
+            "contrast_failures": self.contrast_checker.failures(stats, elements_to_boxes(text_regions)),
+            "button_regions": self.detect_button_regions(image, stats),
+            "brightness_heatmap": self.brightness_heatmap(stats),
             "layout_analysis": self.analyze_layout(image),
-            "ui_issues": self.detect_ui_issues(image)
+            "ui_issues": self.detect_ui_issues(image, stats)
         }
         
         return analysis
@@ -177,7 +196,7 @@ class RealScreenshotSystem:
         total_pixels = edges.shape[0] * edges.shape[1]
         return float(edge_pixels / total_pixels)
     
-    def detect_text_regions(self, gray_image):
+    def detect_text_regions(self, gray_image, stats=None):
         """Detect potential text regions using real computer vision"""
         # Use morphological operations to detect text-like regions
         kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
@@ -198,11 +217,16 @@ class RealScreenshotSystem:
                         "area": float(area), "aspect_ratio": float(aspect_ratio)
                     })
         
-        return text_regions
+        # Overlapping contours of the same text would inflate the region count
+        keep = dedupe(elements_to_boxes(text_regions))
+        text_regions = [text_regions[i] for i in keep]
+        return self.add_region_contrast(text_regions, stats or RegionStats(gray_image))
     
-    def detect_button_regions(self, image):
+    def detect_button_regions(self, image, stats=None):
         """Detect potential button regions using real computer vision"""
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if stats is None:
+            stats = RegionStats(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY))
+        gray = stats.gray
         
         # Detect rectangular regions
         edges = cv2.Canny(gray, 50, 150)
@@ -220,7 +244,28 @@ class RealScreenshotSystem:
                         "area": float(area), "aspect_ratio": float(aspect_ratio)
                     })
         
-        return button_regions
+        # Overlapping contours of the same button would inflate the region count
+        keep = dedupe(elements_to_boxes(button_regions))
+        button_regions = [button_regions[i] for i in keep]
+        return self.add_region_contrast(button_regions, stats)
+    
+    def add_region_contrast(self, regions, stats):
+        """Attach the mean brightness and contrast of each region, looked up in bulk"""
+        boxes = elements_to_boxes(regions)
+        for region, mean, contrast in zip(regions, stats.mean(boxes).tolist(), stats.std(boxes).tolist()):
+            region["brightness"] = mean
+            region["contrast"] = contrast
+        return regions
+    
+    def brightness_heatmap(self, stats, rows=16, cols=8):
+        """Mean brightness and contrast of each cell of a rows x cols grid"""
+        cells = stats.grid(rows, cols)
+        return {
+            "rows": rows,
+            "cols": cols,
+            "brightness": np.round(cells["mean"], 1).tolist(),
+            "contrast": np.round(cells["std"], 1).tolist()
+        }
     
     def analyze_layout(self, image):
         """Analyze overall layout structure using real computer vision"""
@@ -239,18 +284,15 @@ class RealScreenshotSystem:
             "layout_complexity": float(np.sum(horizontal_lines > 0) + np.sum(vertical_lines > 0))
         }
     
-    def detect_ui_issues(self, image):
+    def detect_ui_issues(self, image, stats=None):
         """Detect real UI issues using computer vision"""
         issues = []
-        height, width = image.shape[:2]
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if stats is None:
+            stats = RegionStats(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY))
         
         # Check for text overflow (elements extending beyond screen bounds)
         # This is a simplified check - in reality, you'd need more sophisticated detection
-        edge_pixels = np.sum(gray < 10)  # Very dark pixels
-        total_pixels = gray.shape[0] * gray.shape[1]
-        
-        if edge_pixels / total_pixels > 0.8:
+        if stats.dark_fraction() > 0.8:  # Very dark pixels
             issues.append({
                 "type": "contrast",
                 "severity": "high",
@@ -258,8 +300,7 @@ class RealScreenshotSystem:
             })
         
         # Check for very bright screens (potential loading screens)
-        bright_pixels = np.sum(gray > 240)
-        if bright_pixels / total_pixels > 0.7:
+        if stats.bright_fraction() > 0.7:
             issues.append({
                 "type": "brightness",
                 "severity": "medium",
@@ -316,6 +357,18 @@ class RealScreenshotSystem:
                 "value": text_regions
             })
         
+        # WCAG contrast recommendations based on REAL data
+        contrast_failures = analysis["contrast_failures"]
+        if contrast_failures:
+            worst = contrast_failures[0]
+            recommendations.append({
+                "type": "contrast",
+                "severity": "high" if worst["ratio"] < 3 else "medium",
+                "message": (f"{len(contrast_failures)} text regions are below WCAG AA contrast - worst "
+                            f"{worst['ratio']:.2f}:1 at ({worst['x']}, {worst['y']}), needs {worst['required']:.1f}:1"),
+                "value": len(contrast_failures)
+            })
+        
         # Button region recommendations based on REAL data
         button_regions = len(analysis["button_regions"])
         if button_regions == 0:
@@ -4,6 +4,7 @@ Real-Time AI Monitor for Project Watch Tower
 This system continuously monitors the app and analyzes every interaction in real-time.
 """
 
+import argparse
 import cv2
 import numpy as np
 import subprocess
@@ -21,15 +22,34 @@ from tkinter import ttk, scrolledtext
 from PIL import Image, ImageTk
 import io
 
+from analysis_cache import get_analysis_cache
+from capture import ScreenCapture
+from frame_stream import FrameStream
+from change_detector import ChangeDetector
+from contrast_checker import ContrastChecker
+from element_tracker import ElementTracker, track_frame
+from layout_shift import LayoutShiftMeter
+from frame_analysis import (ANALYSIS_SCALES, DETECTOR_VERSION, FrameAnalysis, boxes_to_elements, button_boxes,
+                            input_field_boxes, text_region_boxes)
+
 class RealTimeAIMonitor:
-    def __init__(self):
+    def __init__(self, analysis_scale: float = 1.0):
         self.setup_logging()
+        self.analysis_scale = analysis_scale  # 1.0, 0.5 or 0.25 of device resolution
+        self.analysis_cache = get_analysis_cache()
+        self.screen_capture = ScreenCapture()
+        self.frame_stream = FrameStream()
         self.setup_gui()
         self.is_monitoring = False
         self.screenshot_queue = queue.Queue()
         self.analysis_queue = queue.Queue()
-        self.previous_screenshot = None
+        self.change_detector = ChangeDetector()
+        self.changed_regions = None  # (x, y, w, h) boxes that changed in the last accepted frame
+        self.previous_frame = None  # FrameAnalysis of the last analyzed frame, patched after small changes
         self.tap_count = 0
+        self.element_tracker = ElementTracker()  # stable element IDs across analyzed frames
+        self.contrast_checker = ContrastChecker()
+        self.layout_shift = LayoutShiftMeter()  # per-screen shift while loading
         self.issues_found = 0
         self.fixes_applied = 0
         
@@ -185,21 +205,12 @@ class RealTimeAIMonitor:
     def capture_screen(self) -> np.ndarray:
         """Capture current screen of the iOS simulator"""
         try:
-            # Use xcrun simctl to capture screen
-            result = subprocess.run([
-                'xcrun', 'simctl', 'io', 'booted', 'screenshot', '/tmp/current_screen.png'
-            ], capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                # Load the screenshot
-                screenshot = cv2.imread('/tmp/current_screen.png')
-                if screenshot is not None:
-                    return screenshot
-                else:
-                    self.logger.error("Failed to load screenshot")
-                    return None
+            # Read the screenshot straight from simctl's stdout, no temporary file
+            screenshot = self.screen_capture.capture()
+            if screenshot is not None:
+                return screenshot
             else:
-                self.logger.error(f"Screenshot capture failed: {result.stderr}")
+                self.logger.error(f"Screenshot capture failed: {self.screen_capture.last_error}")
                 return None
                 
         except Exception as e:
@@ -208,38 +219,29 @@ class RealTimeAIMonitor:
     
     def detect_changes(self, current_screenshot: np.ndarray) -> bool:
         """Detect if there are significant changes between screenshots"""
-        if self.previous_screenshot is None:
-            self.previous_screenshot = current_screenshot
-            return True
+        first_frame = self.change_detector.signature is None
         
         try:
-            # Convert to grayscale for comparison
-            current_gray = cv2.cvtColor(current_screenshot, cv2.COLOR_BGR2GRAY)
-            previous_gray = cv2.cvtColor(self.previous_screenshot, cv2.COLOR_BGR2GRAY)
-            
-            # Calculate difference
-            diff = cv2.absdiff(current_gray, previous_gray)
-            
-            # Count non-zero pixels (changes)
-            changes = cv2.countNonZero(diff)
-            
-            # Consider it a change if more than 1000 pixels changed
-            threshold = 1000
-            has_changes = changes > threshold
-            
-            if has_changes:
-                self.previous_screenshot = current_screenshot
+            # Compare block-mean signatures; only moved tiles are diffed at full resolution
+            result = self.change_detector.update(current_screenshot)
+            if first_frame:
+                self.changed_regions = result['boxes']
+                return True
+            
+            if result['changed']:
+                self.changed_regions = result['boxes']
                 self.tap_count += 1
                 self.update_stats()
                 
-            return has_changes
+            return result['changed']
             
         except Exception as e:
             self.logger.error(f"Error detecting changes: {e}")
             return False
     
-    def analyze_ui_elements(self, screenshot: np.ndarray) -> Dict:
-        """Analyze UI elements using computer vision"""
+    def analyze_ui_elements(self, screenshot: np.ndarray, scale: Optional[float] = None,
+                            dirty_regions: Optional[np.ndarray] = None) -> Dict:
+        """Analyze UI elements using computer vision (scale defaults to analysis_scale)"""
         analysis = {
             'text_elements': [],
             'buttons': [],
@@ -252,31 +254,15 @@ class RealTimeAIMonitor:
         try:
             height, width = screenshot.shape[:2]
             
-            # Convert to grayscale for text detection
-            gray = cv2.cvtColor(screenshot, cv2.COLOR_BGR2GRAY)
-            
-            # Detect text regions
-            text_regions = self.detect_text_regions(gray, width, height)
-            analysis['text_elements'] = text_regions
-            
-            # Detect buttons
-            buttons = self.detect_buttons(screenshot)
-            analysis['buttons'] = buttons
-            
-            # Detect input fields
-            input_fields = self.detect_input_fields(screenshot)
-            analysis['input_fields'] = input_fields
-            
-            # Check for issues
-            issues = self.check_ui_issues(screenshot, analysis)
-            analysis['issues'] = issues
+            # Identical frames are served from the analysis cache
+            analysis.update(self.detect_ui_elements(screenshot, scale, dirty_regions))
+            # Issues of elements seen in earlier frames were already counted
+            new_issues = track_frame(self.element_tracker, self.layout_shift, self.contrast_checker,
+                                     screenshot, analysis)
+            issues = analysis['issues']
             
-            # Generate recommendations
-            recommendations = self.generate_recommendations(issues)
-            analysis['recommendations'] = recommendations
-            
-            if issues:
-                self.issues_found += len(issues)
+            if new_issues:
+                self.issues_found += len(new_issues)
                 self.update_stats()
             
             return analysis
@@ -285,103 +271,81 @@ class RealTimeAIMonitor:
             self.logger.error(f"Error analyzing UI elements: {e}")
             return analysis
     
-    def detect_text_regions(self, gray_image: np.ndarray, width: int, height: int) -> List[Dict]:
-        """Detect text regions in the image"""
-        text_regions = []
+    def detect_ui_elements(self, screenshot: np.ndarray, scale: Optional[float] = None,
+                           dirty_regions: Optional[np.ndarray] = None) -> Dict:
+        """Run every detector on the screenshot, reusing cached results for identical frames
+
+        ``dirty_regions`` are the device-pixel boxes that changed since the
+        previously analyzed frame; only those regions are re-analyzed.
+        """
+        scale = self.analysis_scale if scale is None else scale
+        # A cache hit skips the analysis, so the next frame cannot be patched from it
+        previous, self.previous_frame = self.previous_frame, None
+        
+        def analyze():
+            if previous is not None and dirty_regions is not None and previous.scale == scale:
+                frame = previous.patched(screenshot, dirty_regions)
+            else:
+                frame = FrameAnalysis(screenshot, scale=scale)
+            self.previous_frame = frame
+            return self._detect_ui_elements(frame, scale)
+        
+        return self.analysis_cache.get_or_compute(
+            screenshot, f"{self.__class__.__name__}.ui_elements@{scale}", DETECTOR_VERSION, analyze
+        )
+    
+    def _detect_ui_elements(self, screenshot, scale: float) -> Dict:
+        """Run every detector on one shared frame analysis"""
+        # Compute grayscale, edges and contours once for every detector
+        frame = FrameAnalysis.of(screenshot, scale=scale)
+        
+        detected = {
+            # Detect text regions
+            'text_elements': self.detect_text_regions(frame),
+            # Detect buttons
+            'buttons': self.detect_buttons(frame),
+            # Detect input fields
+            'input_fields': self.detect_input_fields(frame),
+        }
+        
+        # Check for issues
+        detected['issues'] = self.check_ui_issues(frame, detected)
+        
+        # Generate recommendations
+        detected['recommendations'] = self.generate_recommendations(detected['issues'])
         
+        return detected
+    
+    def detect_text_regions(self, frame: FrameAnalysis) -> List[Dict]:
+        """Detect text regions in the image"""
         try:
-            # Use edge detection to find text-like regions
-            edges = cv2.Canny(gray_image, 50, 150)
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            for contour in contours:
-                x, y, w, h = cv2.boundingRect(contour)
-                area = w * h
-                
-                # Filter for text-like regions
-                if (20 < w < width * 0.8 and 10 < h < height * 0.1 and area > 200):
-                    aspect_ratio = w / h if h > 0 else 0
-                    if 1 < aspect_ratio < 20:
-                        text_regions.append({
-                            'x': x, 'y': y, 'width': w, 'height': h,
-                            'area': area,
-                            'type': 'text_region'
-                        })
-            
-            return text_regions
-            
+            return boxes_to_elements(text_region_boxes(frame), type='text_region')
         except Exception as e:
             self.logger.error(f"Error detecting text regions: {e}")
             return []
     
-    def detect_buttons(self, image: np.ndarray) -> List[Dict]:
+    def detect_buttons(self, frame: FrameAnalysis) -> List[Dict]:
         """Detect button-like elements"""
-        buttons = []
-        
         try:
-            # Convert to HSV for better color detection
-            hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-            
-            # Define button colors
-            button_colors = [
-                ([100, 50, 50], [130, 255, 255]),  # Blue
-                ([140, 50, 50], [180, 255, 255]),  # Purple
-            ]
-            
-            for lower, upper in button_colors:
-                mask = cv2.inRange(hsv, np.array(lower), np.array(upper))
-                contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-                
-                for contour in contours:
-                    x, y, w, h = cv2.boundingRect(contour)
-                    area = w * h
-                    
-                    if (50 < w < 300 and 30 < h < 80 and area > 1500):
-                        buttons.append({
-                            'x': x, 'y': y, 'width': w, 'height': h,
-                            'area': area,
-                            'type': 'button'
-                        })
-            
-            return buttons
-            
+            return boxes_to_elements(button_boxes(frame), type='button')
         except Exception as e:
             self.logger.error(f"Error detecting buttons: {e}")
             return []
     
-    def detect_input_fields(self, image: np.ndarray) -> List[Dict]:
+    def detect_input_fields(self, frame: FrameAnalysis) -> List[Dict]:
         """Detect input field elements"""
-        input_fields = []
-        
         try:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            edges = cv2.Canny(gray, 50, 150)
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            for contour in contours:
-                x, y, w, h = cv2.boundingRect(contour)
-                area = w * h
-                aspect_ratio = w / h if h > 0 else 0
-                
-                if (100 < w < 400 and 30 < h < 60 and area > 3000 and 2 < aspect_ratio < 8):
-                    input_fields.append({
-                        'x': x, 'y': y, 'width': w, 'height': h,
-                        'area': area,
-                        'type': 'input_field'
-                    })
-            
-            return input_fields
-            
+            return boxes_to_elements(input_field_boxes(frame), type='input_field')
         except Exception as e:
             self.logger.error(f"Error detecting input fields: {e}")
             return []
     
-    def check_ui_issues(self, screenshot: np.ndarray, analysis: Dict) -> List[Dict]:
+    def check_ui_issues(self, frame: FrameAnalysis, analysis: Dict) -> List[Dict]:
         """Check for common UI issues"""
         issues = []
         
         try:
-            height, width = screenshot.shape[:2]
+            height, width = frame.height, frame.width
             
             # Check for text overflow
             for element in analysis['text_elements']:
@@ -391,6 +355,7 @@ class RealTimeAIMonitor:
                     issues.append({
                         'type': 'text_overflow',
                         'description': f'Text element at ({element["x"]}, {element["y"]}) may be overflowing',
+                        'element': {k: element[k] for k in ('x', 'y', 'width', 'height')},
                         'severity': 'high'
                     })
             
@@ -405,6 +370,7 @@ class RealTimeAIMonitor:
                         issues.append({
                             'type': 'layout_spacing',
                             'description': f'Buttons too close together (spacing: {spacing}px)',
+                            'element': {k: current[k] for k in ('x', 'y', 'width', 'height')},
                             'severity': 'medium'
                         })
             
@@ -498,6 +464,10 @@ class RealTimeAIMonitor:
             else:
                 analysis_text += "✅ No issues detected!\n\n"
             
+            shift = analysis.get('layout_shift')
+            if shift and shift['score'] > 0:
+                analysis_text += f"📐 Layout Shift ({shift['screen']}): {shift['score']:.4f} ({shift['rating']})\n\n"
+            
             if analysis['recommendations']:
                 analysis_text += f"💡 Recommendations ({len(analysis['recommendations'])}):\n"
                 for i, rec in enumerate(analysis['recommendations'], 1):
@@ -518,18 +488,29 @@ class RealTimeAIMonitor:
     
     def monitoring_loop(self):
         """Main monitoring loop that runs in a separate thread"""
+        # Frames come from a long-lived screen stream instead of a capture per poll
+        if not self.frame_stream.start():
+            self.logger.error(f"Could not start screen capture: {self.frame_stream.last_error}")
+            self.root.after(0, self.stop_monitoring)
+            return
+        self.logger.info(f"Frame source: {self.frame_stream.mode}")
+        last_timestamp = None
+        
         while self.is_monitoring:
             try:
-                # Capture screenshot
-                screenshot = self.capture_screen()
+                # Wait for the newest frame we have not seen yet
+                frame = self.frame_stream.next_frame(after=last_timestamp, timeout=1.0)
                 
-                if screenshot is not None:
+                if frame is not None:
+                    last_timestamp, screenshot = frame
+                    
                     # Check for changes
                     if self.detect_changes(screenshot):
                         self.logger.info(f"Change detected! Tap #{self.tap_count}")
                         
                         # Analyze the screenshot
-                        analysis = self.analyze_ui_elements(screenshot)
+                        # Only the regions that changed since the last analysis are re-analyzed
+                        analysis = self.analyze_ui_elements(screenshot, dirty_regions=self.changed_regions)
                         
                         # Update GUI in main thread
                         self.root.after(0, lambda: self.update_gui(screenshot, analysis))
@@ -537,12 +518,11 @@ class RealTimeAIMonitor:
                         # Log analysis
                         self.logger.info(f"Analysis complete: {len(analysis['issues'])} issues found")
                 
-                # Wait before next check
-                time.sleep(0.5)  # Check every 500ms
-                
             except Exception as e:
                 self.logger.error(f"Error in monitoring loop: {e}")
                 time.sleep(1)
+        
+        self.frame_stream.stop()
     
     def start_monitoring(self):
         """Start the AI monitoring"""
@@ -587,13 +567,18 @@ class RealTimeAIMonitor:
 
 def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description='Real-time AI monitor')
+    parser.add_argument('--scale', type=float, default=1.0, choices=ANALYSIS_SCALES,
+                        help='Analysis resolution relative to the device screenshot')
+    args = parser.parse_args()
+    
     print("🤖 Real-Time AI Monitor for Project Watch Tower")
     print("=" * 50)
     print("This will open a GUI window where you can see the AI working in real-time!")
     print("Make sure your iOS simulator is running with the app installed.")
     print("=" * 50)
     
-    monitor = RealTimeAIMonitor()
+    monitor = RealTimeAIMonitor(analysis_scale=args.scale)
     monitor.run()
 
 if __name__ == "__main__":
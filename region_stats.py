@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Region Statistics for Project Watch Tower
+Builds integral images of a grayscale frame once, so the mean, variance and
+share of dark or bright pixels of any rectangle or grid cell cost O(1).
+"""
+
+import argparse
+import time
+from functools import cached_property
+from typing import Dict, Union
+
+import cv2
+import numpy as np
+
+# Gray levels counted as "very dark" and "very bright" pixels
+DARK_LEVEL = 10
+BRIGHT_LEVEL = 240
+
+Boxes = Union[None, tuple, list, np.ndarray]
+
+
+def grid_boxes(width: int, height: int, rows: int, cols: int) -> np.ndarray:
+    """(rows * cols, 4) boxes tiling a frame, row-major, with edges spread as evenly as possible"""
+    xs = np.linspace(0, width, cols + 1).round().astype(np.int64)
+    ys = np.linspace(0, height, rows + 1).round().astype(np.int64)
+    x0, y0 = np.meshgrid(xs[:-1], ys[:-1])
+    x1, y1 = np.meshgrid(xs[1:], ys[1:])
+    return np.stack([x0, y0, x1 - x0, y1 - y0], axis=-1).reshape(-1, 4)
+
+
+class RegionStats:
+    """Constant-time statistics over rectangles of one grayscale frame
+
+    The sum and squared-sum integral images are built on construction; the
+    dark and bright pixel counts are built on first use. Every query takes a
+    single (x, y, w, h) box, an (N, 4) box array or ``None`` for the whole
+    frame, and returns a float or an array to match. Boxes are clipped to the
+    frame; empty boxes report zeros.
+    """
+
+    def __init__(self, gray: np.ndarray, dark_level: int = DARK_LEVEL, bright_level: int = BRIGHT_LEVEL):
+        if gray.ndim == 3:
+            gray = cv2.cvtColor(gray, cv2.COLOR_BGR2GRAY)
+        self.gray = gray
+        self.height, self.width = gray.shape[:2]
+        self.dark_level = dark_level
+        self.bright_level = bright_level
+        # 32-bit sums are exact and cheaper while a full-white 8-bit frame cannot overflow them
+        exact_int = gray.dtype == np.uint8 and gray.size * 255 < 2 ** 31
+        self.sums, self.squares = cv2.integral2(gray, sdepth=cv2.CV_32S if exact_int else cv2.CV_64F,
+                                                sqdepth=cv2.CV_64F)
+
+    @cached_property
+    def dark_counts(self) -> np.ndarray:
+        return cv2.integral((self.gray < self.dark_level).view(np.uint8))
+
+    @cached_property
+    def bright_counts(self) -> np.ndarray:
+        return cv2.integral((self.gray > self.bright_level).view(np.uint8))
+
+    def _clip(self, boxes: Boxes):
+        """Corner indices of the boxes clipped to the frame, and whether one box was given"""
+        if boxes is None:
+            boxes = (0, 0, self.width, self.height)
+        boxes = np.asarray(boxes, dtype=np.int64)
+        single = boxes.ndim == 1
+        boxes = boxes.reshape(-1, 4)
+        x0 = boxes[:, 0].clip(0, self.width)
+        y0 = boxes[:, 1].clip(0, self.height)
+        x1 = (boxes[:, 0] + boxes[:, 2]).clip(x0, self.width)
+        y1 = (boxes[:, 1] + boxes[:, 3]).clip(y0, self.height)
+        return (x0, y0, x1, y1), single
+
+    @staticmethod
+    def _sum(integral: np.ndarray, corners) -> np.ndarray:
+        x0, y0, x1, y1 = corners
+        return (integral[y1, x1] - integral[y0, x1] - integral[y1, x0] + integral[y0, x0]).astype(np.float64)
+
+    @staticmethod
+    def _result(values: np.ndarray, single: bool):
+        return float(values[0]) if single else values
+
+    def _per_pixel(self, integral: np.ndarray, boxes: Boxes):
+        corners, single = self._clip(boxes)
+        x0, y0, x1, y1 = corners
+        pixels = ((x1 - x0) * (y1 - y0)).astype(np.float64)
+        values = np.divide(self._sum(integral, corners), pixels, out=np.zeros_like(pixels), where=pixels > 0)
+        return values, single
+
+    def area(self, boxes: Boxes = None):
+        """Number of frame pixels inside each box"""
+        corners, single = self._clip(boxes)
+        x0, y0, x1, y1 = corners
+        return self._result(((x1 - x0) * (y1 - y0)).astype(np.float64), single)
+
+    def total(self, boxes: Boxes = None):
+        """Sum of gray levels inside each box"""
+        corners, single = self._clip(boxes)
+        return self._result(self._sum(self.sums, corners), single)
+
+    def mean(self, boxes: Boxes = None):
+        """Mean gray level"""
+        return self._result(*self._per_pixel(self.sums, boxes))
+
+    def _variance(self, boxes: Boxes):
+        mean, single = self._per_pixel(self.sums, boxes)
+        squares, _ = self._per_pixel(self.squares, boxes)
+        # Rounding can push a flat region's variance a hair below zero
+        return np.maximum(squares - mean * mean, 0.0), single
+
+    def variance(self, boxes: Boxes = None):
+        """Gray-level variance, E[x^2] - E[x]^2"""
+        return self._result(*self._variance(boxes))
+
+    def std(self, boxes: Boxes = None):
+        """Gray-level standard deviation, the contrast measure used by the reports"""
+        variance, single = self._variance(boxes)
+        return self._result(np.sqrt(variance), single)
+
+    def dark_fraction(self, boxes: Boxes = None):
+        """Share of pixels darker than dark_level"""
+        return self._result(*self._per_pixel(self.dark_counts, boxes))
+
+    def bright_fraction(self, boxes: Boxes = None):
+        """Share of pixels brighter than bright_level"""
+        return self._result(*self._per_pixel(self.bright_counts, boxes))
+
+    def region(self, boxes: Boxes = None) -> Dict:
+        """All statistics for the given boxes"""
+        return {
+            'mean': self.mean(boxes),
+            'std': self.std(boxes),
+            'dark_fraction': self.dark_fraction(boxes),
+            'bright_fraction': self.bright_fraction(boxes),
+        }
+
+    def grid(self, rows: int, cols: int) -> Dict[str, np.ndarray]:
+        """Statistics of every cell of a rows x cols grid, each as a (rows, cols) array"""
+        stats = self.region(grid_boxes(self.width, self.height, rows, cols))
+        return {key: values.reshape(rows, cols) for key, values in stats.items()}
+
+
+def main():
+    """Compare integral-image statistics with full-frame NumPy reductions"""
+    parser = argparse.ArgumentParser(description='Integral-image region statistics')
+    parser.add_argument('screenshot', help='Screenshot file')
+    parser.add_argument('--grid', type=int, nargs=2, default=(16, 8), metavar=('ROWS', 'COLS'))
+    args = parser.parse_args()
+
+    image = cv2.imread(args.screenshot)
+    if image is None:
+        print(f"❌ Could not load {args.screenshot}")
+        return
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    rows, cols = args.grid
+
+    start = time.perf_counter()
+    stats = RegionStats(gray)
+    whole = stats.region()
+    build_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    cells = stats.grid(rows, cols)
+    grid_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for x, y, w, h in grid_boxes(stats.width, stats.height, rows, cols).tolist():
+        cell = gray[y:y + h, x:x + w]
+        np.mean(cell), np.std(cell), np.sum(cell < DARK_LEVEL), np.sum(cell > BRIGHT_LEVEL)
+    numpy_ms = (time.perf_counter() - start) * 1000
+
+    print(f"📊 {args.screenshot} ({stats.width}x{stats.height})")
+    print(f"   Whole frame: mean {whole['mean']:.1f} (NumPy {np.mean(gray):.1f}), "
+          f"std {whole['std']:.1f} (NumPy {np.std(gray):.1f}), "
+          f"dark {whole['dark_fraction']:.1%}, bright {whole['bright_fraction']:.1%}")
+    print(f"   Integral images + whole-frame stats: {build_ms:.1f} ms")
+    print(f"   {rows}x{cols} grid from integrals: {grid_ms:.2f} ms, with NumPy per cell: {numpy_ms:.1f} ms")
+    darkest = np.unravel_index(np.argmin(cells['mean']), cells['mean'].shape)
+    print(f"   Darkest cell: row {darkest[0]}, col {darkest[1]} (mean {cells['mean'][darkest]:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Screen Type Classifier for Project Watch Tower
+Nearest-centroid classifier over a fixed-length feature vector of a
+screenshot, trained offline from labeled screenshots and stored as a small
+.npz file.
+"""
+
+import argparse
+import hashlib
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from frame_analysis import downsample
+from region_stats import RegionStats
+
+DEFAULT_MODEL = "screen_classifier.npz"
+UNKNOWN_SCREEN = "unknown_screen"
+# Predictions below this confidence are reported as UNKNOWN_SCREEN
+MIN_CONFIDENCE = 0.5
+# Bump when screen_features changes; models trained on other features are rejected
+FEATURE_VERSION = 1
+
+# Frames are reduced to this fixed size before feature extraction, so every
+# device resolution yields the same vector
+FEATURE_SIZE = (96, 192)
+GRID_ROWS, GRID_COLS = 16, 8
+EDGE_ROWS, EDGE_COLS = 4, 2
+HUE_BINS = 8
+# Line kernels in feature pixels (the 25-pixel device kernels of the old heuristics)
+LINE_KERNEL = 6
+
+
+def screen_features(image: np.ndarray) -> np.ndarray:
+    """Fixed-length float32 description of a BGR screenshot's layout, texture and color
+
+    Brightness and contrast of a 16x8 grid, edge density of a 4x2 grid, the
+    share of horizontal and vertical line pixels, a saturation-weighted hue
+    histogram and the mean color.
+    """
+    # Halve repeatedly first; a single large INTER_AREA resize is much slower
+    factor = 1.0
+    while image.shape[1] * factor / 2 >= FEATURE_SIZE[0] and image.shape[0] * factor / 2 >= FEATURE_SIZE[1]:
+        factor /= 2
+    small = cv2.resize(downsample(image, factor), FEATURE_SIZE, interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    cells = RegionStats(gray).grid(GRID_ROWS, GRID_COLS)
+    edges = cv2.Canny(gray, 50, 150)
+    edge_stats = RegionStats(edges)
+    edge_density = edge_stats.grid(EDGE_ROWS, EDGE_COLS)['mean'] / 255
+    horizontal = cv2.morphologyEx(edges, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (LINE_KERNEL, 1)))
+    vertical = cv2.morphologyEx(edges, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, LINE_KERNEL)))
+    lines = np.array([cv2.countNonZero(horizontal), cv2.countNonZero(vertical)]) / gray.size
+
+    hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+    hue = np.bincount((hsv[..., 0].ravel().astype(np.int64) * HUE_BINS) // 180,
+                      weights=hsv[..., 1].ravel().astype(np.float64), minlength=HUE_BINS)
+    hue /= 255 * gray.size
+
+    return np.concatenate([
+        cells['mean'].ravel() / 255, cells['std'].ravel() / 128, edge_density.ravel(),
+        lines, hue, np.array(cv2.mean(small)[:3]) / 255,
+    ]).astype(np.float32)
+
+
+class ScreenClassifier:
+    """Nearest-centroid screen classifier with a softmax confidence
+
+    Features are standardized with the training mean and spread; each class
+    is the centroid of its standardized training vectors. The confidence is
+    a softmax over negative mean squared distances to the centroids,
+    scaled by the typical distance of training vectors to their own centroid.
+    """
+
+    def __init__(self, classes: Sequence[str], centroids: np.ndarray, mean: np.ndarray, spread: np.ndarray,
+                 temperature: float, feature_version: int = FEATURE_VERSION):
+        if feature_version != FEATURE_VERSION:
+            raise ValueError(f"Model uses feature version {feature_version}, expected {FEATURE_VERSION}")
+        self.classes = list(classes)
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.spread = np.asarray(spread, dtype=np.float32)
+        self.temperature = float(temperature)
+        self.model_id = hashlib.sha256(self.centroids.tobytes() + self.spread.tobytes()).hexdigest()[:12]
+
+    @classmethod
+    def train(cls, features: np.ndarray, labels: Sequence[str]) -> 'ScreenClassifier':
+        """Fit centroids to (N, D) feature vectors and their labels"""
+        features = np.asarray(features, dtype=np.float32)
+        classes, index = np.unique(np.asarray(labels), return_inverse=True)
+        mean = features.mean(axis=0)
+        # Constant features would divide by zero; leave them unscaled
+        spread = features.std(axis=0)
+        spread[spread < 1e-6] = 1.0
+        standardized = (features - mean) / spread
+
+        counts = np.bincount(index, minlength=len(classes)).astype(np.float32)
+        centroids = np.zeros((len(classes), features.shape[1]), dtype=np.float32)
+        np.add.at(centroids, index, standardized)
+        centroids /= counts[:, None]
+        own = ((standardized - centroids[index]) ** 2).mean(axis=1)
+        return cls(classes.tolist(), centroids, mean, spread, max(float(own.mean()), 1e-3))
+
+    @classmethod
+    def load(cls, path: str) -> 'ScreenClassifier':
+        with np.load(path) as model:
+            return cls(model['classes'].tolist(), model['centroids'], model['mean'], model['spread'],
+                       float(model['temperature']), int(model['feature_version']))
+
+    def save(self, path: str):
+        np.savez_compressed(path, classes=np.array(self.classes), centroids=self.centroids, mean=self.mean,
+                            spread=self.spread, temperature=self.temperature, feature_version=FEATURE_VERSION)
+
+    def probabilities(self, features: np.ndarray) -> np.ndarray:
+        """Class probabilities for one (D,) or many (N, D) feature vectors"""
+        standardized = (np.asarray(features, dtype=np.float32) - self.mean) / self.spread
+        distances = ((standardized[..., None, :] - self.centroids) ** 2).mean(axis=-1)
+        logits = -distances / self.temperature
+        logits -= logits.max(axis=-1, keepdims=True)
+        weights = np.exp(logits)
+        return weights / weights.sum(axis=-1, keepdims=True)
+
+    def predict_features(self, features: np.ndarray, min_confidence: float = MIN_CONFIDENCE) -> Tuple[str, float]:
+        """Screen type and confidence for one feature vector"""
+        probabilities = self.probabilities(features)
+        best = int(np.argmax(probabilities))
+        confidence = float(probabilities[best])
+        return (self.classes[best] if confidence >= min_confidence else UNKNOWN_SCREEN), confidence
+
+    def predict(self, image: np.ndarray, min_confidence: float = MIN_CONFIDENCE) -> Tuple[str, float]:
+        """Screen type and confidence for a BGR screenshot"""
+        return self.predict_features(screen_features(image), min_confidence)
+
+
+_classifiers: Dict[str, Optional[ScreenClassifier]] = {}
+_classifiers_lock = threading.Lock()
+
+
+def get_screen_classifier(path: Optional[str] = None) -> Optional[ScreenClassifier]:
+    """Process-wide classifier loaded once per model file; None when no usable model exists"""
+    path = path or os.environ.get('WATCHTOWER_SCREEN_MODEL', DEFAULT_MODEL)
+    with _classifiers_lock:
+        if path not in _classifiers:
+            classifier = None
+            if os.path.exists(path):
+                try:
+                    classifier = ScreenClassifier.load(path)
+                except (OSError, KeyError, ValueError) as e:
+                    print(f"⚠️ Ignoring screen classifier {path}: {e}")
+            _classifiers[path] = classifier
+        return _classifiers[path]
+
+
+def load_labeled_screenshots(directory: str) -> Tuple[np.ndarray, List[str], List[str]]:
+    """Feature vectors, labels and paths of screenshots stored as <directory>/<label>/<file>"""
+    from batch_analyzer import find_screenshots
+
+    features, labels, paths = [], [], []
+    for label in sorted(os.listdir(directory)):
+        for path in find_screenshots(os.path.join(directory, label)):
+            image = cv2.imread(path)
+            if image is None:
+                print(f"   ⚠️ Could not load {path}")
+                continue
+            features.append(screen_features(image))
+            labels.append(label)
+            paths.append(path)
+    return np.array(features, dtype=np.float32).reshape(len(features), -1), labels, paths
+
+
+def leave_one_out_accuracy(features: np.ndarray, labels: Sequence[str]) -> float:
+    """Accuracy when each screenshot is classified against centroids computed without it"""
+    classifier = ScreenClassifier.train(features, labels)
+    classes = np.array(classifier.classes)
+    index = np.searchsorted(classes, np.asarray(labels))
+    standardized = (features - classifier.mean) / classifier.spread
+    counts = np.bincount(index, minlength=len(classes))
+
+    # Remove each vector from its own centroid; singleton classes cannot be held out
+    distances = ((standardized[:, None, :] - classifier.centroids[None]) ** 2).mean(axis=-1)
+    rows = np.arange(len(features))
+    held_out = counts[index] > 1
+    own = (counts[index, None] * classifier.centroids[index] - standardized) / np.maximum(counts[index] - 1, 1)[:, None]
+    distances[rows, index] = np.where(held_out, ((standardized - own) ** 2).mean(axis=1), np.inf)
+    return float(np.mean(np.argmin(distances, axis=1) == index))
+
+
+def main():
+    """Train, evaluate or apply the screen classifier"""
+    parser = argparse.ArgumentParser(description='Screen type classifier')
+    parser.add_argument('command', choices=['train', 'predict'], help='Train from labeled folders or classify files')
+    parser.add_argument('paths', nargs='+', help='train: directory of <label>/ folders; predict: screenshots')
+    parser.add_argument('--model', default=DEFAULT_MODEL, help='Model file')
+    parser.add_argument('--min-confidence', type=float, default=MIN_CONFIDENCE)
+    args = parser.parse_args()
+
+    if args.command == 'train':
+        features, labels, _ = load_labeled_screenshots(args.paths[0])
+        if len(set(labels)) < 2:
+            print(f"❌ Need screenshots of at least two screen types in {args.paths[0]}/<label>/")
+            return
+        classifier = ScreenClassifier.train(features, labels)
+        classifier.save(args.model)
+        print(f"✅ Trained on {len(labels)} screenshots of {len(classifier.classes)} screen types: "
+              f"{', '.join(classifier.classes)}")
+        print(f"   Leave-one-out accuracy: {leave_one_out_accuracy(features, labels):.1%}")
+        print(f"   Saved {args.model} ({os.path.getsize(args.model) / 1024:.1f} KB, model {classifier.model_id})")
+        return
+
+    classifier = get_screen_classifier(args.model)
+    if classifier is None:
+        print(f"❌ No screen classifier at {args.model}; train one first")
+        return
+    for path in args.paths:
+        image = cv2.imread(path)
+        if image is None:
+            print(f"❌ Could not load {path}")
+            continue
+        start = time.perf_counter()
+        features = screen_features(image)
+        features_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        screen, confidence = classifier.predict_features(features, args.min_confidence)
+        predict_ms = (time.perf_counter() - start) * 1000
+        print(f"📱 {path}: {screen} ({confidence:.0%}), features {features_ms:.1f} ms, prediction {predict_ms:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,9 +15,44 @@ from datetime import datetime
 from typing import Dict, List, Tuple, Optional
 import logging
 
+from capture import ScreenCapture, decode_image
+from frame_analysis import FrameAnalysis, range_masks
+
+# Page classifiers: the contour shape that identifies each page (open ranges
+# over x, y, w, h, area and aspect) and (minimum count, confidence) tiers.
+# Add a page by adding an entry here.
+PAGE_CLASSIFIERS = {
+    'home_screen': {
+        # Content cards
+        'shape': {'w': (100, 400), 'h': (80, 200), 'area': (8000, None), 'aspect': (1.5, 3)},
+        'confidence': ((3, 0.8), (2, 0.6), (1, 0.4)),
+    },
+    'more_section': {
+        # Settings list items
+        'shape': {'w': (200, 400), 'h': (40, 80), 'area': (8000, None), 'aspect': (3, 8)},
+        'confidence': ((4, 0.8), (2, 0.6), (1, 0.4)),
+    },
+    'friend_section': {
+        # Circular friend avatars
+        'shape': {'w': (40, 80), 'h': (40, 80), 'area': (1600, None), 'aspect': (0.8, 1.2)},
+        'confidence': ((3, 0.8), (2, 0.6), (1, 0.4)),
+    },
+    'movie_recommendation': {
+        # Movie posters (typically 2:3 aspect ratio)
+        'shape': {'w': (80, 200), 'h': (120, 300), 'area': (9600, None), 'aspect': (0.6, 0.8)},
+        'confidence': ((3, 0.8), (2, 0.6), (1, 0.4)),
+    },
+    'watch_party': {
+        # Party control buttons
+        'shape': {'w': (60, 120), 'h': (60, 120), 'area': (3600, None), 'aspect': (0.8, 1.2)},
+        'confidence': ((3, 0.8), (2, 0.6), (1, 0.4)),
+    },
+}
+
 class SmartAIFixer:
     def __init__(self):
         self.setup_logging()
+        self.screen_capture = ScreenCapture()
         self.pages = {
             'home_screen': {'issues': 0, 'recommendations': []},
             'more_section': {'issues': 0, 'recommendations': []},
@@ -54,22 +89,13 @@ class SmartAIFixer:
         print("🤖" + "="*80 + "🤖")
         print()
         
-    def detect_current_page(self, screenshot: np.ndarray) -> str:
+    def detect_current_page(self, screenshot) -> str:
         """Detect which page the user is currently on"""
         try:
-            height, width = screenshot.shape[:2]
-            
-            # Convert to grayscale for analysis
-            gray = cv2.cvtColor(screenshot, cv2.COLOR_BGR2GRAY)
+            frame = FrameAnalysis.of(screenshot)
             
-            # Look for specific UI elements that identify each page
-            page_indicators = {
-                'home_screen': self.detect_home_indicators(gray),
-                'more_section': self.detect_more_indicators(gray),
-                'friend_section': self.detect_friend_indicators(gray),
-                'movie_recommendation': self.detect_movie_indicators(gray),
-                'watch_party': self.detect_watch_party_indicators(gray)
-            }
+            # Score every page classifier against the same contour table
+            page_indicators = self.score_pages(frame)
             
             # Find the page with the highest confidence
             best_page = max(page_indicators.items(), key=lambda x: x[1])
@@ -83,180 +109,24 @@ class SmartAIFixer:
             self.logger.error(f"Error detecting page: {e}")
             return 'unknown'
     
-    def detect_home_indicators(self, gray_image: np.ndarray) -> float:
-        """Detect home screen indicators"""
-        confidence = 0.0
-        
-        try:
-            # Look for common home screen elements
-            # This would include navigation tabs, main content areas, etc.
-            # For now, we'll use a simple heuristic based on image analysis
-            
-            # Check for typical home screen patterns
-            edges = cv2.Canny(gray_image, 50, 150)
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            # Count rectangular regions that might be content cards
-            card_count = 0
-            for contour in contours:
-                x, y, w, h = cv2.boundingRect(contour)
-                area = w * h
-                aspect_ratio = w / h if h > 0 else 0
-                
-                # Look for card-like shapes
-                if (100 < w < 400 and 80 < h < 200 and area > 8000 and 1.5 < aspect_ratio < 3):
-                    card_count += 1
-            
-            # Home screen typically has multiple content cards
-            if card_count >= 3:
-                confidence = 0.8
-            elif card_count >= 2:
-                confidence = 0.6
-            elif card_count >= 1:
-                confidence = 0.4
-                
-        except Exception as e:
-            self.logger.error(f"Error detecting home indicators: {e}")
-            
-        return confidence
-    
-    def detect_more_indicators(self, gray_image: np.ndarray) -> float:
-        """Detect more section indicators"""
-        confidence = 0.0
-        
-        try:
-            # Look for settings/profile related elements
-            # This would include lists, settings icons, profile elements
-            
-            edges = cv2.Canny(gray_image, 50, 150)
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            # Count list-like elements
-            list_count = 0
-            for contour in contours:
-                x, y, w, h = cv2.boundingRect(contour)
-                area = w * h
-                aspect_ratio = w / h if h > 0 else 0
-                
-                # Look for list item shapes
-                if (200 < w < 400 and 40 < h < 80 and area > 8000 and 3 < aspect_ratio < 8):
-                    list_count += 1
-            
-            if list_count >= 4:
-                confidence = 0.8
-            elif list_count >= 2:
-                confidence = 0.6
-            elif list_count >= 1:
-                confidence = 0.4
-                
-        except Exception as e:
-            self.logger.error(f"Error detecting more indicators: {e}")
-            
-        return confidence
-    
-    def detect_friend_indicators(self, gray_image: np.ndarray) -> float:
-        """Detect friend section indicators"""
-        confidence = 0.0
-        
-        try:
-            # Look for friend-related elements
-            # This would include user avatars, friend lists, social elements
-            
-            edges = cv2.Canny(gray_image, 50, 150)
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            # Count circular/avatar-like elements
-            avatar_count = 0
-            for contour in contours:
-                x, y, w, h = cv2.boundingRect(contour)
-                area = w * h
-                aspect_ratio = w / h if h > 0 else 0
-                
-                # Look for circular avatar shapes
-                if (40 < w < 80 and 40 < h < 80 and area > 1600 and 0.8 < aspect_ratio < 1.2):
-                    avatar_count += 1
-            
-            if avatar_count >= 3:
-                confidence = 0.8
-            elif avatar_count >= 2:
-                confidence = 0.6
-            elif avatar_count >= 1:
-                confidence = 0.4
-                
-        except Exception as e:
-            self.logger.error(f"Error detecting friend indicators: {e}")
-            
-        return confidence
+    def count_page_shapes(self, frame: FrameAnalysis) -> Dict[str, int]:
+        """Count contours matching each page's characteristic shape"""
+        rules = [classifier['shape'] for classifier in PAGE_CLASSIFIERS.values()]
+        counts = range_masks(frame.features, rules).sum(axis=1)
+        return dict(zip(PAGE_CLASSIFIERS, counts.tolist()))
     
-    def detect_movie_indicators(self, gray_image: np.ndarray) -> float:
-        """Detect movie recommendation indicators"""
-        confidence = 0.0
-        
-        try:
-            # Look for movie-related elements
-            # This would include movie posters, recommendation cards, rating elements
-            
-            edges = cv2.Canny(gray_image, 50, 150)
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            # Count poster-like elements
-            poster_count = 0
-            for contour in contours:
-                x, y, w, h = cv2.boundingRect(contour)
-                area = w * h
-                aspect_ratio = w / h if h > 0 else 0
-                
-                # Look for movie poster shapes (typically 2:3 aspect ratio)
-                if (80 < w < 200 and 120 < h < 300 and area > 9600 and 0.6 < aspect_ratio < 0.8):
-                    poster_count += 1
-            
-            if poster_count >= 3:
-                confidence = 0.8
-            elif poster_count >= 2:
-                confidence = 0.6
-            elif poster_count >= 1:
-                confidence = 0.4
-                
-        except Exception as e:
-            self.logger.error(f"Error detecting movie indicators: {e}")
-            
-        return confidence
-    
-    def detect_watch_party_indicators(self, gray_image: np.ndarray) -> float:
-        """Detect watch party indicators"""
-        confidence = 0.0
-        
-        try:
-            # Look for watch party elements
-            # This would include party controls, video elements, chat areas
-            
-            edges = cv2.Canny(gray_image, 50, 150)
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            # Count control-like elements
-            control_count = 0
-            for contour in contours:
-                x, y, w, h = cv2.boundingRect(contour)
-                area = w * h
-                aspect_ratio = w / h if h > 0 else 0
-                
-                # Look for control button shapes
-                if (60 < w < 120 and 60 < h < 120 and area > 3600 and 0.8 < aspect_ratio < 1.2):
-                    control_count += 1
-            
-            if control_count >= 3:
-                confidence = 0.8
-            elif control_count >= 2:
-                confidence = 0.6
-            elif control_count >= 1:
-                confidence = 0.4
-                
-        except Exception as e:
-            self.logger.error(f"Error detecting watch party indicators: {e}")
-            
-        return confidence
+    def score_pages(self, frame: FrameAnalysis) -> Dict[str, float]:
+        """Map shape counts to a confidence score for every page"""
+        scores = {}
+        for page, count in self.count_page_shapes(frame).items():
+            scores[page] = 0.0
+            for min_count, confidence in PAGE_CLASSIFIERS[page]['confidence']:
+                if count >= min_count:
+                    scores[page] = confidence
+                    break
+        return scores
     
-    def analyze_page_specific_issues(self, screenshot: np.ndarray, page: str) -> Dict:
+    def analyze_page_specific_issues(self, screenshot, page: str) -> Dict:
         """Analyze issues specific to the current page"""
         analysis = {
             'page': page,
@@ -266,21 +136,22 @@ class SmartAIFixer:
         }
         
         try:
-            height, width = screenshot.shape[:2]
+            # Share one frame analysis across the page-specific checks
+            frame = FrameAnalysis.of(screenshot)
             
             # Page-specific issue detection
             if page == 'home_screen':
-                analysis = self.analyze_home_screen_issues(screenshot, analysis)
+                analysis = self.analyze_home_screen_issues(frame, analysis)
             elif page == 'more_section':
-                analysis = self.analyze_more_section_issues(screenshot, analysis)
+                analysis = self.analyze_more_section_issues(frame, analysis)
             elif page == 'friend_section':
-                analysis = self.analyze_friend_section_issues(screenshot, analysis)
+                analysis = self.analyze_friend_section_issues(frame, analysis)
             elif page == 'movie_recommendation':
-                analysis = self.analyze_movie_recommendation_issues(screenshot, analysis)
+                analysis = self.analyze_movie_recommendation_issues(frame, analysis)
             elif page == 'watch_party':
-                analysis = self.analyze_watch_party_issues(screenshot, analysis)
+                analysis = self.analyze_watch_party_issues(frame, analysis)
             else:
-                analysis = self.analyze_generic_issues(screenshot, analysis)
+                analysis = self.analyze_generic_issues(frame, analysis)
             
             # Update page statistics
             self.pages[page]['issues'] += len(analysis['issues'])
@@ -297,18 +168,8 @@ class SmartAIFixer:
         """Analyze home screen specific issues"""
         try:
             # Check for missing content cards
-            gray = cv2.cvtColor(screenshot, cv2.COLOR_BGR2GRAY)
-            edges = cv2.Canny(gray, 50, 150)
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            card_count = 0
-            for contour in contours:
-                x, y, w, h = cv2.boundingRect(contour)
-                area = w * h
-                aspect_ratio = w / h if h > 0 else 0
-                
-                if (100 < w < 400 and 80 < h < 200 and area > 8000 and 1.5 < aspect_ratio < 3):
-                    card_count += 1
+            frame = FrameAnalysis.of(screenshot)
+            card_count = self.count_page_shapes(frame)['home_screen']
             
             if card_count < 3:
                 analysis['issues'].append({
@@ -346,18 +207,8 @@ class SmartAIFixer:
         """Analyze more section specific issues"""
         try:
             # Check for missing settings options
-            gray = cv2.cvtColor(screenshot, cv2.COLOR_BGR2GRAY)
-            edges = cv2.Canny(gray, 50, 150)
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            list_count = 0
-            for contour in contours:
-                x, y, w, h = cv2.boundingRect(contour)
-                area = w * h
-                aspect_ratio = w / h if h > 0 else 0
-                
-                if (200 < w < 400 and 40 < h < 80 and area > 8000 and 3 < aspect_ratio < 8):
-                    list_count += 1
+            frame = FrameAnalysis.of(screenshot)
+            list_count = self.count_page_shapes(frame)['more_section']
             
             if list_count < 4:
                 analysis['issues'].append({
@@ -381,18 +232,8 @@ class SmartAIFixer:
         """Analyze friend section specific issues"""
         try:
             # Check for missing friend avatars
-            gray = cv2.cvtColor(screenshot, cv2.COLOR_BGR2GRAY)
-            edges = cv2.Canny(gray, 50, 150)
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            avatar_count = 0
-            for contour in contours:
-                x, y, w, h = cv2.boundingRect(contour)
-                area = w * h
-                aspect_ratio = w / h if h > 0 else 0
-                
-                if (40 < w < 80 and 40 < h < 80 and area > 1600 and 0.8 < aspect_ratio < 1.2):
-                    avatar_count += 1
+            frame = FrameAnalysis.of(screenshot)
+            avatar_count = self.count_page_shapes(frame)['friend_section']
             
             if avatar_count < 3:
                 analysis['issues'].append({
@@ -416,18 +257,8 @@ class SmartAIFixer:
         """Analyze movie recommendation specific issues"""
         try:
             # Check for missing movie posters
-            gray = cv2.cvtColor(screenshot, cv2.COLOR_BGR2GRAY)
-            edges = cv2.Canny(gray, 50, 150)
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            poster_count = 0
-            for contour in contours:
-                x, y, w, h = cv2.boundingRect(contour)
-                area = w * h
-                aspect_ratio = w / h if h > 0 else 0
-                
-                if (80 < w < 200 and 120 < h < 300 and area > 9600 and 0.6 < aspect_ratio < 0.8):
-                    poster_count += 1
+            frame = FrameAnalysis.of(screenshot)
+            poster_count = self.count_page_shapes(frame)['movie_recommendation']
             
             if poster_count < 3:
                 analysis['issues'].append({
@@ -451,18 +282,8 @@ class SmartAIFixer:
         """Analyze watch party specific issues"""
         try:
             # Check for missing party controls
-            gray = cv2.cvtColor(screenshot, cv2.COLOR_BGR2GRAY)
-            edges = cv2.Canny(gray, 50, 150)
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            control_count = 0
-            for contour in contours:
-                x, y, w, h = cv2.boundingRect(contour)
-                area = w * h
-                aspect_ratio = w / h if h > 0 else 0
-                
-                if (60 < w < 120 and 60 < h < 120 and area > 3600 and 0.8 < aspect_ratio < 1.2):
-                    control_count += 1
+            frame = FrameAnalysis.of(screenshot)
+            control_count = self.count_page_shapes(frame)['watch_party']
             
             if control_count < 3:
                 analysis['issues'].append({
@@ -486,22 +307,16 @@ class SmartAIFixer:
         """Analyze generic issues for unknown pages"""
         try:
             # Check for basic UI issues
-            height, width = screenshot.shape[:2]
+            frame = FrameAnalysis.of(screenshot)
+            height, width = frame.height, frame.width
             
             # Check for text overflow
-            gray = cv2.cvtColor(screenshot, cv2.COLOR_BGR2GRAY)
-            edges = cv2.Canny(gray, 50, 150)
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            text_regions = []
-            for contour in contours:
-                x, y, w, h = cv2.boundingRect(contour)
-                area = w * h
-                
-                if (20 < w < width * 0.8 and 10 < h < height * 0.1 and area > 200):
-                    aspect_ratio = w / h if h > 0 else 0
-                    if 1 < aspect_ratio < 20:
-                        text_regions.append({'x': x, 'y': y, 'width': w, 'height': h})
+            text_mask = range_masks(frame.features, [{
+                'w': (20, width * 0.8), 'h': (10, height * 0.1),
+                'area': (200, None), 'aspect': (1, 20),
+            }])[0]
+            text_regions = [{'x': x, 'y': y, 'width': w, 'height': h}
+                            for x, y, w, h in frame.boxes[text_mask].tolist()]
             
             # Check for text overflow
             for text in text_regions:
@@ -529,21 +344,14 @@ class SmartAIFixer:
         """Detect if navigation elements are present"""
         try:
             # Look for bottom navigation or tab bar
-            height, width = screenshot.shape[:2]
-            bottom_region = screenshot[int(height * 0.9):, :]
-            
-            gray = cv2.cvtColor(bottom_region, cv2.COLOR_BGR2GRAY)
-            edges = cv2.Canny(gray, 50, 150)
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            frame = FrameAnalysis.of(screenshot)
+            top = int(frame.height * 0.9)
+            bottom_region = frame.crop(0, top, frame.width, frame.height - top)
             
             # Count potential navigation items
-            nav_count = 0
-            for contour in contours:
-                x, y, w, h = cv2.boundingRect(contour)
-                area = w * h
-                
-                if (40 < w < 100 and 40 < h < 100 and area > 1600):
-                    nav_count += 1
+            nav_count = int(range_masks(bottom_region.features, [{
+                'w': (40, 100), 'h': (40, 100), 'area': (1600, None),
+            }])[0].sum())
             
             return nav_count >= 3  # Expect at least 3 navigation items
             
@@ -686,20 +494,19 @@ class SmartAIFixer:
         
         try:
             while True:
-                # Capture screenshot
-                result = subprocess.run([
-                    'xcrun', 'simctl', 'io', 'booted', 'screenshot', '/tmp/current_screen.png'
-                ], capture_output=True, text=True)
+                # Capture screenshot straight from simctl's stdout
+                data = self.screen_capture.capture_bytes()
                 
-                if result.returncode == 0:
-                    screenshot = cv2.imread('/tmp/current_screen.png')
+                if data is not None:
+                    screenshot = decode_image(data)
                     if screenshot is not None:
                         # Detect current page
-                        page = self.detect_current_page(screenshot)
+                        frame = FrameAnalysis(screenshot)
+                        page = self.detect_current_page(frame)
                         print(f"📱 Current Page: {page.replace('_', ' ').title()}")
                         
                         # Analyze page-specific issues
-                        analysis = self.analyze_page_specific_issues(screenshot, page)
+                        analysis = self.analyze_page_specific_issues(frame, page)
                         
                         if analysis['issues']:
                             print(f"   ⚠️  Found {len(analysis['issues'])} issues")
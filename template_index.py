@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Template Index for Project Watch Tower
+Loads element templates once, pre-scales them for the resolutions of the
+devices under test and finds them in screenshots, first near where each was
+last found and otherwise over the whole frame, coarse to fine.
+"""
+
+import argparse
+import os
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from frame_analysis import downsample
+
+# Template sizes tried relative to the device the template was cut from
+TEMPLATE_SCALES = (0.5, 0.75, 1.0, 1.25, 1.5, 2.0)
+# Whole-frame searches run first on the frame reduced by the smallest of these
+# scales that keeps the template's shorter side at MIN_COARSE_SIDE pixels
+COARSE_SCALES = (0.25, 0.5)
+MIN_COARSE_SIDE = 16
+# The best COARSE_PEAKS separate positions of each scale whose coarse score is
+# within REFINE_SLACK of the threshold are refined at full resolution (at least
+# the best one), within REFINE_PAD reduced pixels
+COARSE_PEAKS = 3
+REFINE_SLACK = 0.1
+REFINE_PAD = 3
+# The predicted region is the last match grown by this share of its size, at least ROI_MIN_MARGIN pixels
+ROI_MARGIN = 0.5
+ROI_MIN_MARGIN = 32
+MATCH_THRESHOLD = 0.8
+
+
+def _match(gray: np.ndarray, template: np.ndarray,
+           region: Optional[Tuple[int, int, int, int]] = None) -> Tuple[float, Optional[Tuple[int, int]]]:
+    """Best normalized correlation of a template within an (x0, y0, x1, y1) region and its top-left corner"""
+    x0, y0, x1, y1 = region if region is not None else (0, 0, gray.shape[1], gray.shape[0])
+    x0, y0 = max(int(x0), 0), max(int(y0), 0)
+    x1, y1 = min(int(x1), gray.shape[1]), min(int(y1), gray.shape[0])
+    height, width = template.shape[:2]
+    if x1 - x0 < width or y1 - y0 < height:
+        return -1.0, None
+    result = cv2.matchTemplate(gray[y0:y1, x0:x1], template, cv2.TM_CCOEFF_NORMED)
+    # Flat templates or regions give undefined correlations
+    result[~np.isfinite(result)] = -1.0
+    _, score, _, location = cv2.minMaxLoc(result)
+    return float(score), (location[0] + x0, location[1] + y0)
+
+
+def _peaks(gray: np.ndarray, template: np.ndarray, count: int) -> List[Tuple[float, Tuple[int, int]]]:
+    """Up to count best correlations of a template at positions at least half a template apart"""
+    height, width = template.shape[:2]
+    if gray.shape[0] < height or gray.shape[1] < width:
+        return []
+    result = cv2.matchTemplate(gray, template, cv2.TM_CCOEFF_NORMED)
+    result[~np.isfinite(result)] = -1.0
+    peaks = []
+    for _ in range(count):
+        _, score, _, (x, y) = cv2.minMaxLoc(result)
+        if score <= -1.0:
+            break
+        peaks.append((float(score), (x, y)))
+        result[max(y - height // 2, 0):y + height // 2 + 1, max(x - width // 2, 0):x + width // 2 + 1] = -1.0
+    return peaks
+
+
+class TemplateIndex:
+    """Preprocessed templates matched against one decoded frame at a time
+
+    Each template is read once (again only when its file changes) and kept
+    in grayscale at every scale of TEMPLATE_SCALES, both at full and at
+    a reduced resolution. A search first tries the region around the
+    template's last match at the scale it matched at. Otherwise every scale
+    is matched against a reduced frame and the best candidates are refined
+    at full resolution; each reduced frame is built once per frame and
+    shared by all templates searched in it.
+    """
+
+    def __init__(self, threshold: float = MATCH_THRESHOLD, scales: Sequence[float] = TEMPLATE_SCALES):
+        self.threshold = threshold
+        self.scales = tuple(scales)
+        self.templates: Dict[str, Dict] = {}
+        self.last_matches: Dict[str, Dict] = {}
+        self.stats = {'roi_hits': 0, 'frame_searches': 0, 'misses': 0}
+
+    def add(self, name: str, template: np.ndarray, path: Optional[str] = None, mtime: Optional[float] = None):
+        """Index a template image under a name"""
+        if template.ndim == 3:
+            template = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
+        levels = []
+        for scale in self.scales:
+            full = template if scale == 1.0 else cv2.resize(
+                template, None, fx=scale, fy=scale,
+                interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+            if min(full.shape[:2]) < 1:
+                continue
+            factor = next((f for f in COARSE_SCALES if min(full.shape[:2]) * f >= MIN_COARSE_SIDE), 1.0)
+            coarse = full if factor == 1.0 else cv2.resize(full, None, fx=factor, fy=factor,
+                                                           interpolation=cv2.INTER_AREA)
+            levels.append({'scale': scale, 'full': full, 'coarse': coarse, 'factor': factor})
+        self.templates[name] = {'name': name, 'path': path, 'mtime': mtime, 'levels': levels}
+        self.last_matches.pop(name, None)
+
+    def load(self, path: str) -> str:
+        """Index a template file under its path, reading it only if new or modified"""
+        mtime = os.path.getmtime(path)
+        entry = self.templates.get(path)
+        if entry is None or entry['mtime'] != mtime:
+            template = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+            if template is None:
+                raise ValueError(f"Could not load template {path}")
+            self.add(path, template, path, mtime)
+        return path
+
+    def find(self, gray: np.ndarray, name: str) -> Optional[Dict]:
+        """Best match of one template in a grayscale frame, or None below the threshold"""
+        return self._find(gray, name, lambda factor: downsample(gray, factor))
+
+    def _find(self, gray: np.ndarray, name: str, reduced: Callable[[float], np.ndarray]) -> Optional[Dict]:
+        entry = self.templates[name]
+        last = self.last_matches.get(name)
+        if last is not None:
+            level = next(level for level in entry['levels'] if level['scale'] == last['scale'])
+            bounds = last['bounds']
+            margin_x = max(ROI_MIN_MARGIN, bounds['width'] * ROI_MARGIN)
+            margin_y = max(ROI_MIN_MARGIN, bounds['height'] * ROI_MARGIN)
+            region = (bounds['x'] - margin_x, bounds['y'] - margin_y,
+                      bounds['x'] + bounds['width'] + margin_x, bounds['y'] + bounds['height'] + margin_y)
+            score, location = _match(gray, level['full'], region)
+            if score >= self.threshold:
+                self.stats['roi_hits'] += 1
+                return self._record(name, level, score, location, 'roi')
+
+        self.stats['frame_searches'] += 1
+        candidates = []
+        for level in entry['levels']:
+            frame = gray if level['factor'] == 1.0 else reduced(level['factor'])
+            candidates.extend((score, level, location) for score, location in _peaks(frame, level['coarse'], COARSE_PEAKS))
+
+        # Coarse scores of different scales are not comparable enough to pick one; refine the plausible ones
+        candidates.sort(key=lambda candidate: -candidate[0])
+        plausible = [c for c in candidates if c[0] >= self.threshold - REFINE_SLACK] or candidates[:1]
+        best_score, best_level, best_location = -1.0, None, None
+        for score, level, (x, y) in plausible:
+            if level['factor'] != 1.0:
+                pad = REFINE_PAD / level['factor']
+                height, width = level['full'].shape[:2]
+                x, y = x / level['factor'], y / level['factor']
+                score, location = _match(gray, level['full'], (x - pad, y - pad, x + width + pad, y + height + pad))
+            else:
+                location = (x, y)
+            if location is not None and score > best_score:
+                best_score, best_level, best_location = score, level, location
+        if best_location is None or best_score < self.threshold:
+            self.stats['misses'] += 1
+            self.last_matches.pop(name, None)
+            return None
+        return self._record(name, best_level, best_score, best_location, 'frame')
+
+    def find_all(self, image: np.ndarray, names: Optional[Sequence[str]] = None) -> Dict[str, Optional[Dict]]:
+        """Matches of many templates (default: all) in one decoded frame"""
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        # Reduced frames are built on the first whole-frame search that needs them and shared by the rest
+        reduced_frames = {}
+
+        def reduced(factor):
+            if factor not in reduced_frames:
+                reduced_frames[factor] = downsample(gray, factor)
+            return reduced_frames[factor]
+
+        return {name: self._find(gray, name, reduced) for name in (self.templates if names is None else names)}
+
+    def _record(self, name: str, level: Dict, score: float, location: Tuple[int, int], search: str) -> Dict:
+        height, width = level['full'].shape[:2]
+        match = {
+            'name': name,
+            'location': location,
+            'confidence': score,
+            'scale': level['scale'],
+            'bounds': {'x': location[0], 'y': location[1], 'width': width, 'height': height},
+            'search': search,
+        }
+        self.last_matches[name] = match
+        return match
+
+
+def main():
+    """Find templates in screenshots, reporting where and how each was found"""
+    parser = argparse.ArgumentParser(description='Multi-scale template search')
+    parser.add_argument('screenshots', nargs='+', help='Screenshot files, searched in order')
+    parser.add_argument('--template', action='append', required=True, help='Template file (repeatable)')
+    parser.add_argument('--threshold', type=float, default=MATCH_THRESHOLD)
+    args = parser.parse_args()
+
+    index = TemplateIndex(args.threshold)
+    templates: List[str] = [index.load(path) for path in args.template]
+    for path in args.screenshots:
+        image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            print(f"❌ Could not load {path}")
+            continue
+        start = time.perf_counter()
+        matches = index.find_all(image, templates)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        found = sum(match is not None for match in matches.values())
+        print(f"🔍 {path}: {found}/{len(templates)} templates found ({elapsed_ms:.1f} ms)")
+        for name, match in matches.items():
+            if match is None:
+                print(f"   ❌ {name}")
+            else:
+                print(f"   ✅ {name}: ({match['location'][0]}, {match['location'][1]}) at {match['scale']}x, "
+                      f"confidence {match['confidence']:.2f} ({match['search']})")
+    print(f"📊 Region hits: {index.stats['roi_hits']}, frame searches: {index.stats['frame_searches']}, "
+          f"misses: {index.stats['misses']}")
+
+
+if __name__ == "__main__":
+    main()
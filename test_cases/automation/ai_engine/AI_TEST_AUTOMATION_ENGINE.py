@@ -27,8 +27,13 @@ from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass, asdict
+from contextlib import asynccontextmanager
 from enum import Enum
 import uuid
+import functools
+import hashlib
+import heapq
+import statistics
 
 # Computer Vision & AI Libraries
 try:
@@ -65,6 +70,47 @@ import queue
 from flask import Flask, jsonify, request, render_template_string
 import socketio
 
+# Shared screenshot analysis helpers live at the repository root
+REPO_ROOT = Path(__file__).resolve().parents[3]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from analysis_cache import get_analysis_cache
+from frame_analysis import FrameAnalysis, to_device_boxes
+from text_regions import TextRegionDetector
+from box_set import dedupe
+from visual_regression import VisualRegression
+from screen_classifier import get_screen_classifier
+from template_index import TemplateIndex
+from accessibility_tree import HybridElementSource
+from frame_stability import DRIVER_CAPTURE_SCALE, driver_capture, wait_until_stable
+
+# Bump when screen layout analysis output changes so cached analyses are not reused
+LAYOUT_ANALYZER_VERSION = "3"
+
+# The event loop is sampled this often; a wake-up later than LOOP_LAG_WARNING
+# seconds means blocking work ran on the loop and held up every device
+LOOP_LAG_INTERVAL = 0.05
+LOOP_LAG_WARNING = 0.1
+
+# A test's expected duration is the median of its last HISTORY_RUNS executions;
+# tests that never ran take the median of their category, or DEFAULT_TEST_DURATION
+HISTORY_RUNS = 5
+DEFAULT_TEST_DURATION = 10.0
+# Value of a test for time-budgeted runs: its priority's weight, raised by the
+# chance that it fails (from its recent runs) and by how long it has not run,
+# both saturating at 1; tests that never ran count as stale and uncertain
+PRIORITY_VALUES = {1: 8.0, 2: 4.0, 3: 2.0, 4: 1.0}
+FAILURE_WEIGHT = 2.0
+STALENESS_WEIGHT = 1.0
+STALE_HOURS = 7 * 24
+# The budget is split into this many cells for the knapsack; durations round up to whole cells
+BUDGET_CELLS = 1000
+
+# Bump when test execution changes so cached test results are not reused
+TEST_RESULT_CACHE_VERSION = "1"
+HASH_CHUNK_BYTES = 1024 * 1024
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -137,34 +183,45 @@ class DeviceConfig:
 class AIVisualRecognition:
     """AI-powered visual element detection and recognition"""
     
-    def __init__(self):
-        self.template_cache = {}
+    def __init__(self, analysis_scale: float = 1.0, text_backend: str = 'mser',
+                 screen_model: Optional[str] = None, confidence_threshold: float = 0.8):
         self.element_history = {}
-        self.confidence_threshold = 0.8
+        # Worker processes build their own recognizer from these
+        self.settings = {'analysis_scale': analysis_scale, 'text_backend': text_backend,
+                         'screen_model': screen_model, 'confidence_threshold': confidence_threshold}
+        self.confidence_threshold = confidence_threshold
+        # Templates are read and pre-scaled once, then searched near their last match first
+        self.template_cache = TemplateIndex(confidence_threshold)
+        self.analysis_scale = analysis_scale
+        self.analysis_cache = get_analysis_cache()
+        # Built once and reused for every screenshot
+        self.text_detector = TextRegionDetector(text_backend)
+        # Trained screen classifier, loaded once; None until one is trained
+        self.screen_classifier = get_screen_classifier(screen_model)
         
     def detect_elements(self, screenshot_path: str) -> List[Dict]:
         """Detect UI elements in screenshot using computer vision"""
         try:
             # Load screenshot
             image = cv2.imread(screenshot_path)
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
             
             # Detect buttons using edge detection
-            edges = cv2.Canny(gray, 50, 150)
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            frame = FrameAnalysis(image)
+            areas = np.fromiter(map(cv2.contourArea, frame.contours), dtype=np.float64, count=len(frame.contours))
+            boxes = frame.boxes[areas > 1000]  # Filter small elements
+            
+            # Overlapping outlines of the same element become one element
+            boxes = boxes[dedupe(boxes)]
             
             elements = []
-            for contour in contours:
-                area = cv2.contourArea(contour)
-                if area > 1000:  # Filter small elements
-                    x, y, w, h = cv2.boundingRect(contour)
-                    element = {
-                        'type': 'button',
-                        'bounds': {'x': x, 'y': y, 'width': w, 'height': h},
-                        'confidence': 0.85,
-                        'center': {'x': x + w//2, 'y': y + h//2}
-                    }
-                    elements.append(element)
+            for x, y, w, h in boxes.tolist():
+                element = {
+                    'type': 'button',
+                    'bounds': {'x': x, 'y': y, 'width': w, 'height': h},
+                    'confidence': 0.85,
+                    'center': {'x': x + w//2, 'y': y + h//2}
+                }
+                elements.append(element)
             
             return elements
         except Exception as e:
@@ -173,113 +230,126 @@ class AIVisualRecognition:
     
     def find_element_by_template(self, screenshot_path: str, template_path: str) -> Optional[Dict]:
         """Find element using template matching"""
+        return self.find_elements_by_template(screenshot_path, [template_path]).get(template_path)
+    
+    def find_elements_by_template(self, screenshot_path: str, template_paths: List[str]) -> Dict[str, Optional[Dict]]:
+        """Find several template elements in one decoded screenshot, at any of the indexed scales"""
         try:
-            # Load images
-            screenshot = cv2.imread(screenshot_path, 0)
-            template = cv2.imread(template_path, 0)
+            screenshot = cv2.imread(screenshot_path, cv2.IMREAD_GRAYSCALE)
+            if screenshot is None:
+                raise ValueError(f"Could not load screenshot {screenshot_path}")
             
-            # Template matching
-            result = cv2.matchTemplate(screenshot, template, cv2.TM_CCOEFF_NORMED)
-            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
-            
-            if max_val >= self.confidence_threshold:
-                h, w = template.shape
-                return {
-                    'location': max_loc,
-                    'confidence': max_val,
-                    'bounds': {'x': max_loc[0], 'y': max_loc[1], 'width': w, 'height': h}
-                }
-            return None
+            names = [self.template_cache.load(path) for path in template_paths]
+            return self.template_cache.find_all(screenshot, names)
         except Exception as e:
             logger.error(f"Template matching error: {e}")
-            return None
+            return {}
     
-    def analyze_screen_layout(self, screenshot_path: str) -> Dict:
-        """Analyze screen layout and structure"""
+    def analyze_screen_layout(self, screenshot_path: str, scale: Optional[float] = None) -> Dict:
+        """Analyze screen layout and structure
+        
+        The analysis runs at ``scale`` (default: analysis_scale) of the device
+        resolution; pixel thresholds are scaled to match and every region is
+        reported in device pixels.
+        """
         try:
-            image = cv2.imread(screenshot_path)
-            height, width = image.shape[:2]
-            
-            # Detect text regions
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            text_regions = self._detect_text_regions(gray)
-            
-            # Detect navigation elements
-            nav_elements = self._detect_navigation_elements(gray)
-            
-            # Detect content areas
-            content_areas = self._detect_content_areas(gray)
-            
-            return {
-                'dimensions': {'width': width, 'height': height},
-                'text_regions': text_regions,
-                'navigation': nav_elements,
-                'content_areas': content_areas,
-                'layout_type': self._classify_layout(text_regions, nav_elements, content_areas)
-            }
+            scale = self.analysis_scale if scale is None else scale
+            # Retraining the classifier changes layout types, so the model is part of the key
+            model_id = self.screen_classifier.model_id if self.screen_classifier is not None else "heuristic"
+            layout = self.analysis_cache.get_or_compute_file(
+                screenshot_path, f"AIVisualRecognition.layout@{scale}/{self.text_detector.backend}/{model_id}",
+                LAYOUT_ANALYZER_VERSION,
+                lambda image: self._analyze_layout(image, scale)
+            )
+            if layout is None:
+                raise ValueError(f"Could not load screenshot {screenshot_path}")
+            return layout
         except Exception as e:
             logger.error(f"Screen layout analysis error: {e}")
             return {}
     
-    def _detect_text_regions(self, gray_image):
-        """Detect text regions in image"""
-        # Use MSER (Maximally Stable Extremal Regions) for text detection
-        mser = cv2.MSER_create()
-        regions, _ = mser.detectRegions(gray_image)
+    def _analyze_layout(self, image, scale: float) -> Dict:
+        """Analyze the layout of a decoded screenshot"""
+        frame = FrameAnalysis(image, scale=scale)
+        width, height = frame.width, frame.height
+        
+        # Detect text regions
+        gray = frame.gray
+        text_regions = self._detect_text_regions(gray, scale)
+        
+        # Detect navigation elements
+        nav_elements = self._detect_navigation_elements(gray, scale)
         
-        text_regions = []
-        for region in regions:
-            if len(region) > 10:  # Filter small regions
-                hull = cv2.convexHull(region)
-                x, y, w, h = cv2.boundingRect(hull)
-                text_regions.append({'x': x, 'y': y, 'width': w, 'height': h})
+        # Detect content areas
+        content_areas = self._detect_content_areas(gray, scale)
         
-        return text_regions
+        layout_type, confidence = self._classify_layout(frame.image, text_regions, nav_elements, content_areas)
+        return {
+            'dimensions': {'width': width, 'height': height},
+            'text_regions': text_regions,
+            'navigation': nav_elements,
+            'content_areas': content_areas,
+            'layout_type': layout_type,
+            'layout_confidence': confidence
+        }
     
-    def _detect_navigation_elements(self, gray_image):
+    def _detect_text_regions(self, gray_image, scale: float = 1.0):
+        """Detect text lines in image"""
+        boxes = self.text_detector.detect(gray_image, scale)
+        
+        return [{'x': x, 'y': y, 'width': w, 'height': h}
+                for x, y, w, h in to_device_boxes(boxes, scale).tolist()]
+    
+    def _detect_navigation_elements(self, gray_image, scale: float = 1.0):
         """Detect navigation elements like tabs, buttons"""
         # Detect horizontal lines (potential tab bars)
-        horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (40, 1))
+        kernel_width = max(1, int(round(40 * scale)))
+        horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (kernel_width, 1))
         horizontal_lines = cv2.morphologyEx(gray_image, cv2.MORPH_OPEN, horizontal_kernel)
         
         # Find contours
         contours, _ = cv2.findContours(horizontal_lines, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         
         nav_elements = []
-        for contour in contours:
-            x, y, w, h = cv2.boundingRect(contour)
+        boxes = to_device_boxes([cv2.boundingRect(contour) for contour in contours], scale)
+        for x, y, w, h in boxes.tolist():
             if w > 200 and h < 100:  # Likely navigation bar
                 nav_elements.append({'type': 'navigation_bar', 'x': x, 'y': y, 'width': w, 'height': h})
         
         return nav_elements
     
-    def _detect_content_areas(self, gray_image):
+    def _detect_content_areas(self, gray_image, scale: float = 1.0):
         """Detect main content areas"""
         # Use adaptive thresholding to find content blocks
-        adaptive_thresh = cv2.adaptiveThreshold(gray_image, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+        block_size = max(3, int(round(11 * scale)) | 1)
+        adaptive_thresh = cv2.adaptiveThreshold(gray_image, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, block_size, 2)
         
         # Find contours
         contours, _ = cv2.findContours(adaptive_thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         
         content_areas = []
         for contour in contours:
-            area = cv2.contourArea(contour)
+            area = cv2.contourArea(contour) / (scale * scale)
             if area > 5000:  # Large content areas
-                x, y, w, h = cv2.boundingRect(contour)
+                x, y, w, h = to_device_boxes(cv2.boundingRect(contour), scale)[0].tolist()
                 content_areas.append({'x': x, 'y': y, 'width': w, 'height': h, 'area': area})
         
         return content_areas
     
-    def _classify_layout(self, text_regions, nav_elements, content_areas):
-        """Classify the type of screen layout"""
+    def _classify_layout(self, image, text_regions, nav_elements, content_areas) -> Tuple[str, Optional[float]]:
+        """Classify the type of screen layout, with the classifier's confidence when one is trained"""
+        if self.screen_classifier is not None:
+            return self.screen_classifier.predict(image, self.confidence_threshold)
+        
+        # Element-count heuristics until a classifier has been trained
         if len(nav_elements) > 0:
-            return "navigation_screen"
+            return "navigation_screen", None
         elif len(content_areas) > 3:
-            return "content_heavy_screen"
+            return "content_heavy_screen", None
         elif len(text_regions) > 10:
-            return "text_heavy_screen"
+            return "text_heavy_screen", None
         else:
-            return "simple_screen"
+            return "simple_screen", None
 
 class BehavioralLearning:
     """Machine learning component for learning user behavior patterns"""
@@ -496,13 +566,538 @@ class DeviceManager:
         self.drivers.clear()
         self.device_locks.clear()
 
+class DevicePool:
+    """Leases devices to tests, queueing tests until a device they support is free
+    
+    Idle devices wait in one asyncio.Queue per device type. A test takes a
+    device from the queue of any type it supports and returns it when it is
+    done, so each device runs one test at a time and no device idles while
+    tests are waiting. Busy time per device is recorded for utilization.
+    """
+    
+    def __init__(self, device_manager: DeviceManager):
+        self.device_manager = device_manager
+        self.queues: Dict[DeviceType, asyncio.Queue] = {}
+        self.usage: Dict[str, Dict] = {}
+        self.started = time.time()
+        for device_id, config in device_manager.devices.items():
+            self.queues.setdefault(config.device_type, asyncio.Queue()).put_nowait(device_id)
+            self.usage[device_id] = {'tests': 0, 'busy_time': 0.0}
+    
+    async def acquire(self, device_types: Optional[List[DeviceType]] = None) -> Optional[str]:
+        """Wait for an idle device of one of the types (any type if none given); None if no such device exists"""
+        queues = [self.queues[t] for t in (device_types or list(self.queues)) if t in self.queues]
+        if not queues:
+            return None
+        for queue in queues:
+            if not queue.empty():
+                return queue.get_nowait()
+        if len(queues) == 1:
+            return await queues[0].get()
+        
+        getters = [asyncio.ensure_future(queue.get()) for queue in queues]
+        try:
+            await asyncio.wait(getters, return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            # Devices delivered while the test was being cancelled all go back
+            for device_id in self._stop_getters(getters):
+                self._return(device_id)
+            raise
+        # Several queues can deliver in the same step; keep one device and put the others back
+        leased = self._stop_getters(getters)
+        for device_id in leased[1:]:
+            self._return(device_id)
+        return leased[0]
+    
+    @staticmethod
+    def _stop_getters(getters: List[asyncio.Future]) -> List[str]:
+        """Cancel the pending queue getters and return the devices the others delivered"""
+        for getter in getters:
+            getter.cancel()
+        return [getter.result() for getter in getters if getter.done() and not getter.cancelled()]
+    
+    def _return(self, device_id: str):
+        self.queues[self.device_manager.devices[device_id].device_type].put_nowait(device_id)
+    
+    @asynccontextmanager
+    async def lease(self, device_types: Optional[List[DeviceType]] = None):
+        """Hold a device for the duration of the block; yields None if no device of the types exists"""
+        device_id = await self.acquire(device_types)
+        started = time.time()
+        try:
+            yield device_id
+        finally:
+            if device_id is not None:
+                self.usage[device_id]['tests'] += 1
+                self.usage[device_id]['busy_time'] += time.time() - started
+                self._return(device_id)
+    
+    def utilization(self) -> Dict[str, Dict]:
+        """Tests run, busy seconds and busy share of the pool's lifetime per device"""
+        elapsed = max(time.time() - self.started, 1e-9)
+        return {
+            device_id: {
+                'tests': usage['tests'],
+                'busy_time': round(usage['busy_time'], 3),
+                'utilization': round(usage['busy_time'] / elapsed, 3)
+            }
+            for device_id, usage in self.usage.items()
+        }
+
+class TestScheduler:
+    """Orders tests by priority and expected duration from past executions
+    
+    Tests run priority tier by priority tier; within a tier the longest
+    expected tests go first. The device pool hands each test the first free
+    device it supports, so this order is longest-processing-time-first list
+    scheduling, which keeps the run's makespan within 4/3 of the optimum.
+    The same greedy placement over the expected durations predicts the
+    run's wall time. For time-budgeted runs it picks the most valuable
+    subset of tests that fits the budget.
+    """
+    
+    def __init__(self, db_path: str, history_runs: int = HISTORY_RUNS,
+                 default_duration: float = DEFAULT_TEST_DURATION):
+        self.db_path = db_path
+        self.history_runs = history_runs
+        self.default_duration = default_duration
+    
+    def load_history(self) -> Dict[str, Dict]:
+        """Median duration, failure rate and hours since the last run over each test's recent runs that did not skip"""
+        recent: Dict[str, List[Tuple[str, float, float]]] = {}
+        try:
+            conn = sqlite3.connect(self.db_path)
+            rows = conn.execute('''
+                SELECT test_case_id, status, execution_time, (julianday('now') - julianday(timestamp)) * 24
+                FROM test_executions
+                WHERE status IN (?, ?) AND execution_time > 0
+                ORDER BY timestamp DESC, rowid DESC
+            ''', (TestStatus.PASSED.value, TestStatus.FAILED.value)).fetchall()
+            conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"No test timing history: {e}")
+            return {}
+        
+        for test_id, status, execution_time, age_hours in rows:
+            runs = recent.setdefault(test_id, [])
+            if len(runs) < self.history_runs:
+                runs.append((status, execution_time, age_hours))
+        return {
+            test_id: {
+                'duration': statistics.median(run[1] for run in runs),
+                'runs': len(runs),
+                'failures': sum(run[0] == TestStatus.FAILED.value for run in runs),
+                'hours_since_run': runs[0][2]
+            }
+            for test_id, runs in recent.items()
+        }
+    
+    def estimate(self, test_cases: List[TestCase], history: Dict[str, Dict]) -> Dict[str, float]:
+        """Expected duration of every test, from its history or its category's"""
+        durations = {test_id: entry['duration'] for test_id, entry in history.items()}
+        by_category: Dict[str, List[float]] = {}
+        for test_case in test_cases:
+            if test_case.id in durations:
+                by_category.setdefault(test_case.category, []).append(durations[test_case.id])
+        overall = statistics.median(durations.values()) if durations else self.default_duration
+        category_medians = {category: statistics.median(values) for category, values in by_category.items()}
+        return {
+            test_case.id: durations.get(test_case.id, category_medians.get(test_case.category, overall))
+            for test_case in test_cases
+        }
+    
+    def order(self, test_cases: List[TestCase], estimates: Dict[str, float]) -> List[TestCase]:
+        """Priority tiers first to last, longest expected test first within a tier"""
+        return sorted(test_cases, key=lambda tc: (tc.priority.value, -estimates[tc.id]))
+    
+    def predict(self, test_cases: List[TestCase], estimates: Dict[str, float],
+                devices: Dict[str, DeviceType]) -> Dict:
+        """Wall time and per-device load when tests take the first free device they support, in order"""
+        free_at = {device_id: 0.0 for device_id in devices}
+        # One heap of (free time, device) per device type; a test takes the earliest of its types
+        heaps: Dict[DeviceType, List] = {}
+        for device_id, device_type in devices.items():
+            heaps.setdefault(device_type, []).append((0.0, device_id))
+        
+        for test_case in test_cases:
+            types = [t for t in (test_case.device_types or list(heaps)) if t in heaps]
+            if not types:
+                continue
+            device_type = min(types, key=lambda t: heaps[t][0])
+            start, device_id = heapq.heappop(heaps[device_type])
+            free_at[device_id] = start + estimates[test_case.id]
+            heapq.heappush(heaps[device_type], (free_at[device_id], device_id))
+        
+        return {
+            'wall_time': max(free_at.values(), default=0.0),
+            'device_load': {device_id: round(load, 3) for device_id, load in free_at.items()}
+        }
+    
+    def value(self, test_case: TestCase, history: Dict[str, Dict]) -> float:
+        """Worth of running a test now, from its priority, failure rate and time since it last ran"""
+        entry = history.get(test_case.id)
+        if entry is None:
+            failure_chance, staleness = 0.5, 1.0
+        else:
+            # Laplace estimate, so a couple of passes do not rule a test out
+            failure_chance = (entry['failures'] + 1) / (entry['runs'] + 2)
+            staleness = min(entry['hours_since_run'] / STALE_HOURS, 1.0)
+        return PRIORITY_VALUES[test_case.priority.value] * (
+            1 + FAILURE_WEIGHT * failure_chance + STALENESS_WEIGHT * staleness)
+    
+    def select(self, test_cases: List[TestCase], budget: float,
+               history: Optional[Dict[str, Dict]] = None) -> Tuple[List[TestCase], List[Dict]]:
+        """Tests of the highest total value whose expected durations fit in ``budget`` seconds of device time
+        
+        A 0/1 knapsack solved by dynamic programming over BUDGET_CELLS cells
+        of the budget, one vectorized pass per test. Durations round up to
+        whole cells, so the selection never overruns the budget. At most
+        BUDGET_CELLS // w tests of w cells fit, so only that many of the most
+        valuable ones per size enter the table. Returns the selected tests in
+        their given order and the deferred ones, most valuable first.
+        """
+        if not budget > 0:
+            raise ValueError(f"Time budget must be positive, got {budget}")
+        history = self.load_history() if history is None else history
+        # One entry per list position, so tests sharing an id stay aligned with their values
+        estimate_by_id = self.estimate(test_cases, history)
+        estimates = np.array([estimate_by_id[test_case.id] for test_case in test_cases], dtype=np.float64)
+        values = np.array([self.value(test_case, history) for test_case in test_cases], dtype=np.float64)
+        chosen = np.zeros(len(test_cases), dtype=bool)
+        
+        if estimates.sum() <= budget:
+            chosen[:] = True
+        else:
+            weights = np.maximum(np.ceil(estimates / (budget / BUDGET_CELLS) - 1e-9), 1).astype(int)
+            by_size: Dict[int, List[int]] = {}
+            for i in np.lexsort((-values, weights)):
+                if weights[i] <= BUDGET_CELLS and len(by_size.setdefault(weights[i], [])) < BUDGET_CELLS // weights[i]:
+                    by_size[weights[i]].append(i)
+            candidates = [i for indices in by_size.values() for i in indices]
+            
+            best = np.zeros(BUDGET_CELLS + 1)
+            taken = np.zeros((len(candidates), BUDGET_CELLS + 1), dtype=bool)
+            for row, i in enumerate(candidates):
+                weight = weights[i]
+                with_test = best[:BUDGET_CELLS + 1 - weight] + values[i]
+                np.greater(with_test, best[weight:], out=taken[row, weight:])
+                np.maximum(best[weight:], with_test, out=best[weight:])
+            
+            remaining = BUDGET_CELLS
+            for row in range(len(candidates) - 1, -1, -1):
+                if taken[row, remaining]:
+                    chosen[candidates[row]] = True
+                    remaining -= weights[candidates[row]]
+        
+        selected = [tc for tc, keep in zip(test_cases, chosen) if keep]
+        deferred_indices = np.flatnonzero(~chosen)
+        deferred_indices = deferred_indices[np.argsort(-values[deferred_indices], kind='stable')]
+        deferred = [{'id': test_cases[i].id, 'priority': test_cases[i].priority.name,
+                     'estimate': estimate, 'value': value}
+                    for i, estimate, value in zip(deferred_indices.tolist(),
+                                                  np.round(estimates[deferred_indices], 3).tolist(),
+                                                  np.round(values[deferred_indices], 3).tolist())]
+        return selected, deferred
+    
+    def plan(self, test_cases: List[TestCase], devices: Dict[str, DeviceType],
+             parallel: bool = True, history: Optional[Dict[str, Dict]] = None) -> Tuple[List[TestCase], Dict]:
+        """Ordered tests and the predicted wall time of running them"""
+        history = self.load_history() if history is None else history
+        estimates = self.estimate(test_cases, history)
+        ordered = self.order(test_cases, estimates)
+        if parallel:
+            prediction = self.predict(ordered, estimates, devices)
+        else:
+            # One test at a time: every test that has a device adds its full duration
+            device_types = set(devices.values())
+            wall_time = sum(estimates[tc.id] for tc in ordered
+                            if not tc.device_types or device_types.intersection(tc.device_types))
+            prediction = {'wall_time': wall_time, 'device_load': {}}
+        prediction['estimates'] = estimates
+        return ordered, prediction
+
+def _build_files(path: str) -> List[str]:
+    if os.path.isdir(path):
+        return sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+    return [path]
+
+def app_build_stamp(path: str) -> Tuple[int, int, int]:
+    """Newest modification time, total size and file count of an app build, to tell when to rehash it"""
+    stats = [os.stat(file_path) for file_path in _build_files(path)]
+    return (max((st.st_mtime_ns for st in stats), default=0), sum(st.st_size for st in stats), len(stats))
+
+def app_build_hash(path: str) -> Optional[str]:
+    """Content hash of an app build: an .apk or .ipa file or an .app bundle directory; None if missing"""
+    if not path or not os.path.exists(path):
+        return None
+    
+    digest = hashlib.sha256()
+    for file_path in _build_files(path):
+        # Bundle layout matters as well as content
+        digest.update(os.path.relpath(file_path, path).encode())
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+class TestResultCache:
+    """Passed test results reused while the app build, the test and the device are unchanged
+    
+    Results are keyed by the hash of the app binary, the hash of the test
+    case definition and the device profile (type, platform, OS version and
+    model). A test is reused when any device it could run on has a result
+    under the current build. Failures are never cached, so they always
+    rerun. Results of flaky categories expire after ``flaky_ttl_hours``;
+    without a configured app binary nothing can be proven unchanged and the
+    cache stays off.
+    """
+    
+    def __init__(self, db_path: str, app_binary: Optional[str] = None, flaky_categories: Optional[List[str]] = None,
+                 flaky_ttl_hours: float = 12.0):
+        self.db_path = db_path
+        self.app_binary = app_binary
+        self.flaky_categories = set(flaky_categories or [])
+        self.flaky_ttl = flaky_ttl_hours * 3600
+        self.app_hash = None
+        self.app_stamp = None
+        
+        conn = sqlite3.connect(db_path)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS test_result_cache (
+                key TEXT PRIMARY KEY,
+                test_case_id TEXT NOT NULL,
+                app_hash TEXT NOT NULL,
+                device_profile TEXT NOT NULL,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        ''')
+        conn.commit()
+        conn.close()
+    
+    def current_app_hash(self) -> Optional[str]:
+        """Hash of the configured app binary, recomputed only when its files' times, sizes or count change"""
+        if not self.app_binary or not os.path.exists(self.app_binary):
+            return None
+        stamp = app_build_stamp(self.app_binary)
+        if self.app_stamp != stamp:
+            self.app_hash = app_build_hash(self.app_binary)
+            self.app_stamp = stamp
+        return self.app_hash
+    
+    @staticmethod
+    def test_hash(test_case: TestCase) -> str:
+        """Hash of what defines a test case, not of its run state"""
+        definition = {
+            'version': TEST_RESULT_CACHE_VERSION,
+            'id': test_case.id,
+            'name': test_case.name,
+            'description': test_case.description,
+            'category': test_case.category,
+            'priority': test_case.priority.value,
+            'device_types': sorted(t.value for t in test_case.device_types),
+            'expected_result': test_case.expected_result
+        }
+        return hashlib.sha256(json.dumps(definition, sort_keys=True).encode()).hexdigest()
+    
+    @staticmethod
+    def device_profile(config: DeviceConfig) -> str:
+        return f"{config.device_type.value}/{config.platform_name} {config.platform_version}/{config.device_name}"
+    
+    @staticmethod
+    def _key(app_hash: str, test_hash: str, device_profile: str) -> str:
+        return hashlib.sha256(f"{app_hash}|{test_hash}|{device_profile}".encode()).hexdigest()
+    
+    def lookup(self, test_cases: List[TestCase], devices: Dict[str, DeviceConfig]) -> Tuple[Dict[str, Dict], List[TestCase]]:
+        """Reusable results by test id and the tests that still have to run"""
+        app_hash = self.current_app_hash()
+        if app_hash is None:
+            return {}, list(test_cases)
+        
+        try:
+            conn = sqlite3.connect(self.db_path)
+            rows = conn.execute('SELECT key, result, created_at FROM test_result_cache WHERE app_hash = ?',
+                                (app_hash,)).fetchall()
+            conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Test result cache unavailable: {e}")
+            return {}, list(test_cases)
+        entries = {key: (result, created_at) for key, result, created_at in rows}
+        
+        now = time.time()
+        cached, remaining = {}, []
+        for test_case in test_cases:
+            test_hash = self.test_hash(test_case)
+            profiles = {self.device_profile(config) for config in devices.values()
+                        if not test_case.device_types or config.device_type in test_case.device_types}
+            hits = [entries[key] for key in (self._key(app_hash, test_hash, profile) for profile in profiles)
+                    if key in entries]
+            if test_case.category in self.flaky_categories:
+                hits = [hit for hit in hits if now - hit[1] <= self.flaky_ttl]
+            if not hits:
+                remaining.append(test_case)
+                continue
+            
+            result_json, created_at = max(hits, key=lambda hit: hit[1])
+            result = json.loads(result_json)
+            result['status'] = TestStatus(result['status'])
+            result['cached'] = True
+            result['cached_at'] = datetime.fromtimestamp(created_at).isoformat()
+            cached[test_case.id] = result
+        return cached, remaining
+    
+    def store(self, test_cases: List[TestCase], results: Dict[str, Dict], devices: Dict[str, DeviceConfig]):
+        """Remember the passed results of tests that just ran under the current build"""
+        app_hash = self.current_app_hash()
+        if app_hash is None:
+            return
+        
+        rows = []
+        for test_case in test_cases:
+            result = results.get(test_case.id)
+            if (not isinstance(result, dict) or result.get('cached') or result.get('status') != TestStatus.PASSED
+                    or result.get('device_id') not in devices):
+                continue
+            profile = self.device_profile(devices[result['device_id']])
+            rows.append((self._key(app_hash, self.test_hash(test_case), profile), test_case.id, app_hash, profile,
+                         json.dumps(dict(result, status=result['status'].value), default=str), time.time()))
+        
+        try:
+            conn = sqlite3.connect(self.db_path)
+            # Results of earlier builds can never match again once a new build has run
+            conn.execute('DELETE FROM test_result_cache WHERE app_hash != ?', (app_hash,))
+            conn.executemany('INSERT OR REPLACE INTO test_result_cache VALUES (?, ?, ?, ?, ?, ?)', rows)
+            conn.commit()
+            conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Error storing cached test results: {e}")
+
+# Recognizer of an ExecutionLayer worker process, built once by _init_cv_worker
+_cv_worker = None
+
+def _init_cv_worker(settings: Dict):
+    global _cv_worker
+    # One analysis per process at a time; OpenCV's own thread pool would oversubscribe the cores
+    cv2.setNumThreads(1)
+    _cv_worker = AIVisualRecognition(**settings)
+
+def _run_cv(method: str, *args):
+    """Worker entry point for ExecutionLayer.run_cv"""
+    return getattr(_cv_worker, method)(*args)
+
+class ExecutionLayer:
+    """Keeps blocking work off the event loop so devices run concurrently
+    
+    Driver calls (screenshots, page sources, stability captures) and other
+    blocking calls that hold state run on a bounded thread pool; screenshot
+    analysis runs on a process pool with its own limit, each worker holding
+    a recognizer built from the same settings. With ``cv_workers=0`` analysis
+    runs on the thread pool instead. While a suite runs, the loop's wake-up
+    lag is sampled to show whether anything still blocks it.
+    """
+    
+    def __init__(self, visual_recognition: AIVisualRecognition, io_workers: int = 8, cv_workers: Optional[int] = None):
+        self.visual_recognition = visual_recognition
+        self.io_pool = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix='driver-io')
+        self.cv_pool = None
+        if cv_workers != 0:
+            self.cv_pool = ProcessPoolExecutor(max_workers=cv_workers or os.cpu_count() or 1,
+                                               initializer=_init_cv_worker,
+                                               initargs=(visual_recognition.settings,))
+        self.lag_task = None
+        self.lag_expected = None
+        self.lag = {'samples': 0, 'total': 0.0, 'max': 0.0, 'stalls': 0}
+    
+    async def run_blocking(self, func, *args, **kwargs):
+        """Run a blocking call on the I/O thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.io_pool, functools.partial(func, *args, **kwargs))
+    
+    async def run_cv(self, method: str, *args):
+        """Run an AIVisualRecognition method on the analysis process pool"""
+        if self.cv_pool is None:
+            return await self.run_blocking(getattr(self.visual_recognition, method), *args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.cv_pool, _run_cv, method, *args)
+    
+    def run_cv_sync(self, method: str, *args):
+        """Run an AIVisualRecognition method on the analysis process pool from a worker thread"""
+        if self.cv_pool is None:
+            return getattr(self.visual_recognition, method)(*args)
+        return self.cv_pool.submit(_run_cv, method, *args).result()
+    
+    def start_lag_monitor(self):
+        """Start sampling event-loop lag on the running loop"""
+        if self.lag_task is None:
+            self.lag = {'samples': 0, 'total': 0.0, 'max': 0.0, 'stalls': 0}
+            self.lag_expected = asyncio.get_running_loop().time() + LOOP_LAG_INTERVAL
+            self.lag_task = asyncio.create_task(self._monitor_lag())
+    
+    async def stop_lag_monitor(self) -> Dict:
+        """Stop sampling and return the lag statistics"""
+        if self.lag_task is not None:
+            # A stall still in progress (the loop has not woken the monitor yet) counts too
+            lag = asyncio.get_running_loop().time() - self.lag_expected
+            if lag > 0:
+                self._record_lag(lag)
+            self.lag_task.cancel()
+            try:
+                await self.lag_task
+            except asyncio.CancelledError:
+                pass
+            self.lag_task = None
+        return self.lag_stats()
+    
+    async def _monitor_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self.lag_expected = loop.time() + LOOP_LAG_INTERVAL
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            self._record_lag(max(0.0, loop.time() - self.lag_expected))
+    
+    def _record_lag(self, lag: float):
+        self.lag['samples'] += 1
+        self.lag['total'] += lag
+        self.lag['max'] = max(self.lag['max'], lag)
+        if lag > LOOP_LAG_WARNING:
+            self.lag['stalls'] += 1
+            logger.warning(f"Event loop blocked for {lag * 1000:.0f} ms")
+    
+    def lag_stats(self) -> Dict:
+        """Mean and worst loop lag in milliseconds and the number of stalls"""
+        return {
+            'samples': self.lag['samples'],
+            'mean_lag_ms': round(self.lag['total'] / max(self.lag['samples'], 1) * 1000, 2),
+            'max_lag_ms': round(self.lag['max'] * 1000, 2),
+            'stalls': self.lag['stalls']
+        }
+    
+    def shutdown(self):
+        """Stop both pools"""
+        self.io_pool.shutdown(wait=False, cancel_futures=True)
+        if self.cv_pool is not None:
+            self.cv_pool.shutdown(wait=False, cancel_futures=True)
+
 class TestExecutor:
     """Executes test cases with AI-powered automation"""
     
-    def __init__(self, device_manager: DeviceManager, visual_recognition: AIVisualRecognition, behavioral_learning: BehavioralLearning):
+    def __init__(self, device_manager: DeviceManager, visual_recognition: AIVisualRecognition, behavioral_learning: BehavioralLearning,
+                 visual_regression: Optional['VisualRegression'] = None, page_source_dir: Optional[str] = None,
+                 stability_timeout: float = 10.0, stability_samples: int = 3,
+                 execution: Optional[ExecutionLayer] = None):
         self.device_manager = device_manager
         self.visual_recognition = visual_recognition
         self.behavioral_learning = behavioral_learning
+        self.visual_regression = visual_regression or VisualRegression()
+        # Driver calls and screenshot analysis run off the event loop
+        self.execution = execution or ExecutionLayer(visual_recognition)
+        # Elements come from the Appium accessibility tree; CV detection only when it is missing or sparse.
+        # Lookups run on an I/O thread, which hands detection to the analysis processes
+        self.element_source = HybridElementSource(
+            functools.partial(self.execution.run_cv_sync, 'detect_elements'), page_source_dir)
+        # Steps capture once the screen has settled instead of after a fixed sleep
+        self.stability_timeout = stability_timeout
+        self.stability_samples = stability_samples
         self.test_results = {}
         self.execution_queue = queue.Queue()
         
@@ -510,17 +1105,29 @@ class TestExecutor:
         """Execute a suite of test cases"""
         logger.info(f"Starting execution of {len(test_cases)} test cases")
         
-        if parallel_execution:
-            return await self._execute_parallel(test_cases)
-        else:
-            return await self._execute_sequential(test_cases)
+        started = time.time()
+        self.execution.start_lag_monitor()
+        try:
+            if parallel_execution:
+                summary = await self._execute_parallel(test_cases)
+            else:
+                summary = await self._execute_sequential(test_cases)
+        finally:
+            event_loop = await self.execution.stop_lag_monitor()
+        
+        # Summed test time over wall time shows how well device time overlapped
+        summary['wall_time'] = time.time() - started
+        summary['event_loop'] = event_loop
+        return summary
     
     async def _execute_parallel(self, test_cases: List[TestCase]) -> Dict:
         """Execute test cases in parallel across multiple devices"""
+        # Tests queue for devices, so as many run at once as there are devices
+        pool = DevicePool(self.device_manager)
         tasks = []
         
         for test_case in test_cases:
-            task = asyncio.create_task(self._execute_single_test(test_case))
+            task = asyncio.create_task(self._execute_single_test(test_case, pool))
             tasks.append(task)
         
         results = await asyncio.gather(*tasks, return_exceptions=True)
@@ -532,6 +1139,7 @@ class TestExecutor:
             'failed': 0,
             'skipped': 0,
             'execution_time': 0,
+            'device_utilization': {},
             'results': {}
         }
         
@@ -554,15 +1162,17 @@ class TestExecutor:
                 
                 summary['execution_time'] += result.get('execution_time', 0)
         
+        summary['device_utilization'] = pool.utilization()
         return summary
     
     async def _execute_sequential(self, test_cases: List[TestCase]) -> Dict:
         """Execute test cases sequentially"""
+        pool = DevicePool(self.device_manager)
         results = {}
         total_time = 0
         
         for test_case in test_cases:
-            result = await self._execute_single_test(test_case)
+            result = await self._execute_single_test(test_case, pool)
             results[test_case.id] = result
             total_time += result.get('execution_time', 0)
         
@@ -572,27 +1182,34 @@ class TestExecutor:
             'failed': sum(1 for r in results.values() if r['status'] == TestStatus.FAILED),
             'skipped': sum(1 for r in results.values() if r['status'] == TestStatus.SKIPPED),
             'execution_time': total_time,
+            'device_utilization': pool.utilization(),
             'results': results
         }
     
-    async def _execute_single_test(self, test_case: TestCase) -> Dict:
-        """Execute a single test case"""
-        start_time = time.time()
+    async def _execute_single_test(self, test_case: TestCase, pool: DevicePool) -> Dict:
+        """Execute a single test case on a device leased from the pool"""
+        queued = time.time()
+        start_time = queued
+        device_id = None
         
         try:
-            # Get available device
-            device_id = await self.device_manager.get_available_device()
-            if not device_id:
-                return {
-                    'status': TestStatus.SKIPPED,
-                    'error': 'No available devices',
-                    'execution_time': 0
-                }
-            
-            # Execute test steps
-            result = await self._run_test_steps(device_id, test_case)
-            
-            execution_time = time.time() - start_time
+            # Wait for a free device of a supported type instead of skipping the test
+            async with pool.lease(test_case.device_types) as device_id:
+                if not device_id:
+                    return {
+                        'status': TestStatus.SKIPPED,
+                        'error': 'No devices of the required type',
+                        'execution_time': 0
+                    }
+                
+                # Execution time excludes the time spent waiting for the device
+                start_time = time.time()
+                queue_time = start_time - queued
+                
+                # Execute test steps
+                result = await self._run_test_steps(device_id, test_case)
+                
+                execution_time = time.time() - start_time
             
             # Record interaction for learning
             self.behavioral_learning.record_interaction({
@@ -603,6 +1220,8 @@ class TestExecutor:
             })
             
             result['execution_time'] = execution_time
+            result['queue_time'] = queue_time
+            result['device_id'] = device_id
             return result
             
         except Exception as e:
@@ -612,7 +1231,8 @@ class TestExecutor:
             return {
                 'status': TestStatus.FAILED,
                 'error': str(e),
-                'execution_time': execution_time
+                'execution_time': execution_time,
+                'device_id': device_id
             }
     
     async def _run_test_steps(self, device_id: str, test_case: TestCase) -> Dict:
@@ -638,61 +1258,90 @@ class TestExecutor:
                 'error': str(e)
             }
     
+    async def _wait_for_screen(self, device_id: str) -> Dict:
+        """Wait until the device screen stops changing and no spinner is turning"""
+        driver = self.device_manager.drivers.get(device_id)
+        if driver is None:
+            return {'stable': False, 'waited': 0.0, 'samples': 0, 'spinner_seen': False}
+        
+        settled = await wait_until_stable(driver_capture(driver), timeout=self.stability_timeout,
+                                          samples=self.stability_samples, executor=self.execution.io_pool,
+                                          scale=DRIVER_CAPTURE_SCALE)
+        if not settled['stable']:
+            logger.warning(f"Screen on {device_id} still changing after {settled['waited']:.1f}s")
+        return settled
+    
     async def _run_auth_test(self, device_id: str, test_case: TestCase) -> Dict:
         """Run authentication-related tests"""
-        # Simulate authentication test execution
-        await asyncio.sleep(0.5)  # Simulate test execution time
+        await self._wait_for_screen(device_id)
         
         # Take screenshot for analysis
-        screenshot_path = self.device_manager.take_screenshot(device_id)
-        
-        # Analyze screen layout
-        layout_analysis = self.visual_recognition.analyze_screen_layout(screenshot_path)
+        screenshot_path = await self.execution.run_blocking(self.device_manager.take_screenshot, device_id)
+        found = await self.execution.run_blocking(self.element_source.elements, device_id,
+                                                  self.device_manager.drivers.get(device_id), screenshot_path)
         
         # Simulate test logic based on test case
         if "login" in test_case.name.lower():
-            # Look for login elements
-            if layout_analysis.get('layout_type') == 'simple_screen':
-                return {'status': TestStatus.PASSED, 'screenshot': screenshot_path}
+            # Look for login elements; the layout is only analyzed when the tree cannot tell
+            if found['source'] == 'accessibility':
+                login_detected = bool(found['table'].find('type', 'input_field'))
+            else:
+                layout_analysis = await self.execution.run_cv('analyze_screen_layout', screenshot_path)
+                login_detected = layout_analysis.get('layout_type') in ('simple_screen', 'login_screen')
+            if login_detected:
+                return {'status': TestStatus.PASSED, 'screenshot': screenshot_path, 'element_source': found['source']}
             else:
                 return {'status': TestStatus.FAILED, 'error': 'Login screen not detected'}
         
-        return {'status': TestStatus.PASSED, 'screenshot': screenshot_path}
+        return {'status': TestStatus.PASSED, 'screenshot': screenshot_path, 'element_source': found['source']}
     
     async def _run_home_test(self, device_id: str, test_case: TestCase) -> Dict:
         """Run home screen tests"""
-        await asyncio.sleep(0.3)
-        screenshot_path = self.device_manager.take_screenshot(device_id)
+        await self._wait_for_screen(device_id)
+        screenshot_path = await self.execution.run_blocking(self.device_manager.take_screenshot, device_id)
         
-        # Detect elements on home screen
-        elements = self.visual_recognition.detect_elements(screenshot_path)
+        # Elements on home screen, from the accessibility tree when it is complete
+        found = await self.execution.run_blocking(self.element_source.elements, device_id,
+                                                  self.device_manager.drivers.get(device_id), screenshot_path)
+        elements = found['elements']
         
         if len(elements) > 0:
-            return {'status': TestStatus.PASSED, 'screenshot': screenshot_path, 'elements_found': len(elements)}
+            return {'status': TestStatus.PASSED, 'screenshot': screenshot_path, 'elements_found': len(elements),
+                    'element_source': found['source']}
         else:
             return {'status': TestStatus.FAILED, 'error': 'No UI elements detected on home screen'}
     
     async def _run_watch_party_test(self, device_id: str, test_case: TestCase) -> Dict:
         """Run watch party tests"""
-        await asyncio.sleep(0.8)  # Watch party tests take longer
-        screenshot_path = self.device_manager.take_screenshot(device_id)
+        await self._wait_for_screen(device_id)  # Watch party screens load video, so they settle later
+        screenshot_path = await self.execution.run_blocking(self.device_manager.take_screenshot, device_id)
         
         return {'status': TestStatus.PASSED, 'screenshot': screenshot_path}
     
     async def _run_theme_test(self, device_id: str, test_case: TestCase) -> Dict:
         """Run theme-related tests"""
-        await asyncio.sleep(0.2)
-        screenshot_path = self.device_manager.take_screenshot(device_id)
+        await self._wait_for_screen(device_id)
+        screenshot_path = await self.execution.run_blocking(self.device_manager.take_screenshot, device_id)
         
         # Analyze colors in screenshot for theme testing
-        layout_analysis = self.visual_recognition.analyze_screen_layout(screenshot_path)
-        
-        return {'status': TestStatus.PASSED, 'screenshot': screenshot_path, 'layout': layout_analysis}
+        layout_analysis = await self.execution.run_cv('analyze_screen_layout', screenshot_path)
+        
+        # Compare against the golden for this screen, device and theme
+        theme = 'dark' if 'dark' in test_case.name.lower() else 'light'
+        regression = await self.execution.run_blocking(self.visual_regression.compare, screenshot_path,
+                                                       test_case.id, device_id, theme)
+        result = {'screenshot': screenshot_path, 'layout': layout_analysis, 'regression': regression}
+        
+        if regression['passed']:
+            return dict(result, status=TestStatus.PASSED)
+        error = regression.get('error') or (f"{regression['failed_tiles']} tiles differ from the {theme} golden "
+                                            f"(min SSIM {regression['min_ssim']:.3f}), diff: {regression['diff_path']}")
+        return dict(result, status=TestStatus.FAILED, error=error)
     
     async def _run_generic_test(self, device_id: str, test_case: TestCase) -> Dict:
         """Run generic test case"""
-        await asyncio.sleep(0.4)
-        screenshot_path = self.device_manager.take_screenshot(device_id)
+        await self._wait_for_screen(device_id)
+        screenshot_path = await self.execution.run_blocking(self.device_manager.take_screenshot, device_id)
         
         return {'status': TestStatus.PASSED, 'screenshot': screenshot_path}
 
@@ -851,9 +1500,15 @@ class TestReporter:
                 'passed': test_results.get('passed', 0),
                 'failed': test_results.get('failed', 0),
                 'skipped': test_results.get('skipped', 0),
+                'cached': test_results.get('cached', 0),
                 'pass_rate': round((test_results.get('passed', 0) / test_results.get('total', 1) * 100), 2),
-                'execution_time': test_results.get('execution_time', 0)
+                'execution_time': test_results.get('execution_time', 0),
+                'wall_time': test_results.get('wall_time', 0),
+                'predicted_wall_time': test_results.get('predicted_wall_time', 0)
             },
+            'time_budget': test_results.get('time_budget'),
+            'device_utilization': test_results.get('device_utilization', {}),
+            'event_loop': test_results.get('event_loop', {}),
             'results': test_results.get('results', {}),
             'environment': {
                 'platform': sys.platform,
@@ -874,15 +1529,43 @@ class AITestAutomationEngine:
     def __init__(self, config_path: str = "test_config.json"):
         self.config = self._load_config(config_path)
         self.device_manager = DeviceManager()
-        self.visual_recognition = AIVisualRecognition()
+        self.visual_recognition = AIVisualRecognition(
+            analysis_scale=self.config.get('ai_settings', {}).get('analysis_scale', 1.0),
+            text_backend=self.config.get('ai_settings', {}).get('text_backend', 'mser'),
+            screen_model=self.config.get('ai_settings', {}).get('screen_model', 'screen_classifier.npz'),
+            confidence_threshold=self.config.get('ai_settings', {}).get('confidence_threshold', 0.8)
+        )
         self.behavioral_learning = BehavioralLearning()
+        regression_settings = self.config.get('regression_settings', {})
         self.test_executor = TestExecutor(
             self.device_manager, 
             self.visual_recognition, 
-            self.behavioral_learning
+            self.behavioral_learning,
+            VisualRegression(
+                golden_dir=regression_settings.get('golden_dir', 'golden_screenshots'),
+                ssim_threshold=regression_settings.get('ssim_threshold', 0.97),
+                ignore=regression_settings.get('ignore_regions', ['status_bar'])
+            ),
+            page_source_dir=self.config.get('ai_settings', {}).get('page_source_dir'),
+            stability_timeout=self.config.get('test_settings', {}).get('stability_timeout', 10.0),
+            stability_samples=self.config.get('test_settings', {}).get('stability_samples', 3),
+            execution=ExecutionLayer(
+                self.visual_recognition,
+                io_workers=self.config.get('test_settings', {}).get('driver_io_workers', 8),
+                cv_workers=self.config.get('test_settings', {}).get('cv_workers')
+            )
         )
         self.reporter = TestReporter()
         self.test_database = self._initialize_database()
+        # Orders each run from the execution times recorded in the database
+        self.scheduler = TestScheduler(self.test_database)
+        cache_settings = self.config.get('cache_settings', {})
+        self.result_cache = TestResultCache(
+            self.test_database,
+            app_binary=cache_settings.get('app_binary'),
+            flaky_categories=cache_settings.get('flaky_categories', ['watch_party']),
+            flaky_ttl_hours=cache_settings.get('flaky_ttl_hours', 12.0)
+        )
         
     def _load_config(self, config_path: str) -> Dict:
         """Load configuration from JSON file"""
@@ -910,12 +1593,30 @@ class AITestAutomationEngine:
                 "parallel_execution": True,
                 "max_retry_attempts": 3,
                 "screenshot_on_failure": True,
-                "generate_reports": True
+                "generate_reports": True,
+                "stability_timeout": 10.0,
+                "stability_samples": 3,
+                "driver_io_workers": 8,
+                "cv_workers": None
             },
             "ai_settings": {
                 "confidence_threshold": 0.8,
+                "analysis_scale": 1.0,
+                "text_backend": "mser",
+                "screen_model": "screen_classifier.npz",
+                "page_source_dir": None,
                 "learning_enabled": True,
                 "adaptive_testing": True
+            },
+            "regression_settings": {
+                "golden_dir": "golden_screenshots",
+                "ssim_threshold": 0.97,
+                "ignore_regions": ["status_bar"]
+            },
+            "cache_settings": {
+                "app_binary": None,
+                "flaky_categories": ["watch_party"],
+                "flaky_ttl_hours": 12.0
             }
         }
         
@@ -1061,8 +1762,12 @@ class AITestAutomationEngine:
         
         return test_cases
     
-    async def run_test_suite(self, test_filter: Dict = None) -> Dict:
-        """Run complete test suite with AI automation"""
+    async def run_test_suite(self, test_filter: Dict = None, force_rerun: bool = False) -> Dict:
+        """Run complete test suite with AI automation
+        
+        Tests that passed on the current app build and an equivalent device
+        are reused from the result cache unless ``force_rerun`` is set.
+        """
         logger.info("Starting AI-powered test suite execution...")
         
         # Load test cases
@@ -1072,15 +1777,47 @@ class AITestAutomationEngine:
         if test_filter:
             filtered_tests = self._apply_test_filters(all_test_cases, test_filter)
         else:
-            filtered_tests = all_test_cases[:50]  # Limit for demo
-        
-        logger.info(f"Executing {len(filtered_tests)} test cases")
+            filtered_tests = all_test_cases
+        
+        # Unchanged build, test and device: the last passing result still holds
+        device_configs = dict(self.device_manager.devices)
+        cached = {}
+        if not force_rerun:
+            cached, filtered_tests = self.result_cache.lookup(filtered_tests, device_configs)
+            if cached:
+                logger.info(f"Reusing {len(cached)} cached results for the unchanged build")
+        
+        history = self.scheduler.load_history()
+        time_budget = (test_filter or {}).get('time_budget')
+        if time_budget is not None:
+            # Only the most valuable tests whose expected durations fit in the device time budget
+            planning_started = time.perf_counter()
+            filtered_tests, deferred = self.scheduler.select(filtered_tests, time_budget, history)
+            logger.info(f"Time budget {time_budget:.0f}s: running {len(filtered_tests)} tests, deferring "
+                        f"{len(deferred)} (planned in {(time.perf_counter() - planning_started) * 1000:.1f} ms)")
+        
+        # Priority tiers first, longest expected tests first within a tier
+        parallel_execution = self.config.get('test_settings', {}).get('parallel_execution', True)
+        devices = {device_id: config.device_type for device_id, config in self.device_manager.devices.items()}
+        filtered_tests, prediction = self.scheduler.plan(filtered_tests, devices, parallel_execution, history)
+        
+        logger.info(f"Executing {len(filtered_tests)} test cases, predicted wall time {prediction['wall_time']:.1f}s")
         
         # Execute tests
         results = await self.test_executor.execute_test_suite(
             filtered_tests, 
-            parallel_execution=self.config.get('test_settings', {}).get('parallel_execution', True)
+            parallel_execution=parallel_execution
         )
+        self.result_cache.store(filtered_tests, results['results'], device_configs)
+        self._merge_cached_results(results, cached)
+        results['predicted_wall_time'] = prediction['wall_time']
+        if time_budget is not None:
+            results['time_budget'] = {
+                'budget': time_budget,
+                'planned_device_time': round(sum(prediction['estimates'].values()), 3),
+                'deferred': deferred
+            }
+        logger.info(f"Wall time: predicted {prediction['wall_time']:.1f}s, actual {results['wall_time']:.1f}s")
         
         # Generate reports
         if self.config.get('test_settings', {}).get('generate_reports', True):
@@ -1099,6 +1836,15 @@ class AITestAutomationEngine:
         
         return results
     
+    def _merge_cached_results(self, results: Dict, cached: Dict[str, Dict]):
+        """Count reused results into a suite summary"""
+        results['cached'] = len(cached)
+        for test_id, result in cached.items():
+            results['results'][test_id] = result
+            results['total'] += 1
+            if result['status'] == TestStatus.PASSED:
+                results['passed'] += 1
+    
     def _apply_test_filters(self, test_cases: List[TestCase], filters: Dict) -> List[TestCase]:
         """Apply filters to test cases"""
         filtered = test_cases
@@ -1114,7 +1860,8 @@ class AITestAutomationEngine:
             filtered = [tc for tc in filtered if device_type in tc.device_types]
         
         if 'limit' in filters:
-            filtered = filtered[:filters['limit']]
+            # The limit keeps the most important tests (file order within a priority)
+            filtered = sorted(filtered, key=lambda tc: tc.priority.value)[:filters['limit']]
         
         return filtered
     
@@ -1125,13 +1872,17 @@ class AITestAutomationEngine:
             cursor = conn.cursor()
             
             for test_id, result in results.get('results', {}).items():
+                # Reused results did not run, so they stay out of the timing history
+                if result.get('cached'):
+                    continue
                 cursor.execute('''
                     INSERT INTO test_executions 
-                    (id, test_case_id, status, execution_time, error_message, screenshot_path)
-                    VALUES (?, ?, ?, ?, ?, ?)
+                    (id, test_case_id, device_id, status, execution_time, error_message, screenshot_path)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
                 ''', (
                     str(uuid.uuid4()),
                     test_id,
+                    result.get('device_id'),
                     result.get('status', TestStatus.FAILED).value,
                     result.get('execution_time', 0),
                     result.get('error', ''),
@@ -1251,6 +2002,7 @@ class AITestAutomationEngine:
     def cleanup(self):
         """Cleanup resources"""
         self.device_manager.cleanup()
+        self.test_executor.execution.shutdown()
         logger.info("AI Test Automation Engine cleanup completed")
 
 # CLI Interface
@@ -1258,11 +2010,21 @@ async def main():
     """Main CLI interface for the AI Test Automation Engine"""
     import argparse
     
+    def positive_seconds(value: str) -> float:
+        """argparse type for a duration that must be greater than zero"""
+        seconds = float(value)
+        if not seconds > 0:
+            raise argparse.ArgumentTypeError(f"must be a positive number of seconds, got {value}")
+        return seconds
+    
     parser = argparse.ArgumentParser(description='FWB AI Test Automation Engine')
     parser.add_argument('--config', default='test_config.json', help='Configuration file path')
     parser.add_argument('--category', help='Filter tests by category')
     parser.add_argument('--priority', type=int, help='Filter tests by priority (1-4)')
-    parser.add_argument('--limit', type=int, default=50, help='Limit number of tests')
+    parser.add_argument('--limit', type=int, help='Run only this many tests, most important first')
+    parser.add_argument('--force-rerun', action='store_true', help='Run every test even if a cached result applies')
+    parser.add_argument('--time-budget', type=positive_seconds,
+                        help='Run the most valuable tests that fit in this many seconds of device time')
     parser.add_argument('--dashboard', action='store_true', help='Start web dashboard')
     parser.add_argument('--port', type=int, default=8080, help='Dashboard port')
     
@@ -1283,9 +2045,10 @@ async def main():
             await engine.start_web_dashboard(args.port)
         else:
             # Run tests
-            test_filter = {
-                'limit': args.limit
-            }
+            test_filter = {}
+            
+            if args.limit:
+                test_filter['limit'] = args.limit
             
             if args.category:
                 test_filter['category'] = args.category
@@ -1293,15 +2056,34 @@ async def main():
             if args.priority:
                 test_filter['priority'] = args.priority
             
-            results = await engine.run_test_suite(test_filter)
+            if args.time_budget is not None:
+                test_filter['time_budget'] = args.time_budget
+            
+            results = await engine.run_test_suite(test_filter, force_rerun=args.force_rerun)
             
             print(f"\n🎬 FWB Test Execution Summary:")
             print(f"Total Tests: {results.get('total', 0)}")
             print(f"Passed: {results.get('passed', 0)}")
             print(f"Failed: {results.get('failed', 0)}")
             print(f"Skipped: {results.get('skipped', 0)}")
+            print(f"Reused From Cache: {results.get('cached', 0)}")
             print(f"Pass Rate: {results.get('passed', 0) / results.get('total', 1) * 100:.1f}%")
             print(f"Execution Time: {results.get('execution_time', 0):.2f}s")
+            print(f"Wall Time: {results.get('wall_time', 0):.2f}s "
+                  f"(predicted {results.get('predicted_wall_time', 0):.2f}s)")
+            if 'event_loop' in results:
+                print(f"Event Loop Lag: mean {results['event_loop']['mean_lag_ms']:.1f} ms, "
+                      f"max {results['event_loop']['max_lag_ms']:.1f} ms, {results['event_loop']['stalls']} stalls")
+            
+            if 'time_budget' in results:
+                budget = results['time_budget']
+                print(f"\n⏱️ Time Budget: {budget['planned_device_time']:.0f}s of {budget['budget']:.0f}s device time planned, "
+                      f"{len(budget['deferred'])} tests deferred")
+                for entry in budget['deferred'][:10]:
+                    print(f"   ⏭️ {entry['id']} ({entry['priority']}, ~{entry['estimate']:.1f}s, value {entry['value']:.2f})")
+            
+            for device_id, usage in results.get('device_utilization', {}).items():
+                print(f"📱 {device_id}: {usage['tests']} tests, {usage['utilization'] * 100:.0f}% busy")
             
             if 'reports' in results:
                 print(f"\n📊 Reports Generated:")
@@ -13,12 +13,18 @@ import os
 from datetime import datetime
 import threading
 import sys
+import asyncio
+
+from capture import ScreenCapture
+from frame_stability import wait_until_stable
+from screen_classifier import get_screen_classifier
 
 class SimulatorTester:
     def __init__(self):
         self.test_results = []
         self.screenshots_dir = "test_screenshots"
         self.running = False
+        self.screen_capture = ScreenCapture('ios')
         
         # Create screenshots directory
         os.makedirs(self.screenshots_dir, exist_ok=True)
@@ -48,6 +54,12 @@ class SimulatorTester:
             print(f"❌ Screenshot error: {e}")
             return None
     
+    def wait_for_screen(self):
+        """Wait until the simulator screen stops changing instead of pausing a fixed time"""
+        result = asyncio.run(wait_until_stable(self.screen_capture.capture))
+        if not result['stable']:
+            print(f"      ⏱️ Screen still changing after {result['waited']:.1f}s")
+    
     def analyze_screenshot(self, screenshot_path):
         """Analyze screenshot using computer vision"""
         if not screenshot_path or not os.path.exists(screenshot_path):
@@ -91,6 +103,10 @@ class SimulatorTester:
                 "total_contours": len(contours)
             }
             
+            screen_classifier = get_screen_classifier()
+            if screen_classifier is not None:
+                analysis["screen_type"], analysis["screen_confidence"] = screen_classifier.predict(img)
+            
             return analysis
             
         except Exception as e:
@@ -101,6 +117,10 @@ class SimulatorTester:
         """Detect current app state from analysis"""
         if not analysis:
             return "unknown"
+        
+        # A trained screen classifier replaces the element-count heuristics
+        if "screen_type" in analysis:
+            return analysis["screen_type"]
             
         ui_elements = analysis.get("ui_elements", 0)
         text_regions = analysis.get("text_regions", 0)
@@ -153,7 +173,7 @@ class SimulatorTester:
                     self.test_results.append(result)
                     print(f"      State: {state}, Theme: {analysis['theme']}, UI Elements: {analysis['ui_elements']}")
                     
-            time.sleep(2)  # Wait between tests
+            self.wait_for_screen()  # Let the screen settle between tests
     
     def run_ui_tests(self):
         """Run UI/UX tests"""
@@ -189,7 +209,7 @@ class SimulatorTester:
                     self.test_results.append(result)
                     print(f"      Brightness: {analysis['brightness']:.1f}, Theme: {analysis['theme']}")
                     
-            time.sleep(1.5)
+            self.wait_for_screen()
     
     def run_performance_tests(self):
         """Run performance tests"""
@@ -223,7 +243,7 @@ class SimulatorTester:
                 self.test_results.append(result)
                 print(f"      Capture Time: {capture_time:.2f}s")
                 
-            time.sleep(1)
+            self.wait_for_screen()
     
     def generate_report(self):
         """Generate comprehensive test report"""
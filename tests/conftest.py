@@ -0,0 +1,41 @@
+"""
+Shared pytest setup for Project Watch Tower's Python modules
+The analysis modules live at the repository root and the engine under
+test_cases/automation/ai_engine; both are put on the import path here.
+"""
+
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENGINE_DIR = os.path.join(REPO_ROOT, 'test_cases', 'automation', 'ai_engine')
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+for path in (REPO_ROOT, ENGINE_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+@pytest.fixture
+def read_fixture():
+    """Text of a file in tests/fixtures"""
+    def read(name: str) -> str:
+        with open(os.path.join(FIXTURES_DIR, name), encoding='utf-8') as f:
+            return f.read()
+    return read
+
+
+@pytest.fixture(scope='session')
+def engine(tmp_path_factory):
+    """The AI test automation engine module, skipping when its dependencies are not installed"""
+    for dependency in ('requests', 'psutil', 'flask', 'socketio'):
+        pytest.importorskip(dependency)
+    # Importing the engine opens its log file in the working directory
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp('engine'))
+    try:
+        return pytest.importorskip('AI_TEST_AUTOMATION_ENGINE')
+    finally:
+        os.chdir(cwd)
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Stand-in for `xcrun simctl` and `adb` in the capture tests
+Writes the file named by FAKE_CAPTURE_OUTPUT to stdout, prints
+FAKE_CAPTURE_STDERR to stderr and exits with FAKE_CAPTURE_EXIT (default 0).
+The arguments it was called with are appended to FAKE_CAPTURE_ARGS if set.
+"""
+
+import os
+import sys
+
+
+def main():
+    args_path = os.environ.get('FAKE_CAPTURE_ARGS')
+    if args_path:
+        with open(args_path, 'a', encoding='utf-8') as f:
+            f.write(' '.join(sys.argv[1:]) + '\n')
+
+    output = os.environ.get('FAKE_CAPTURE_OUTPUT')
+    if output:
+        with open(output, 'rb') as f:
+            sys.stdout.buffer.write(f.read())
+    stderr = os.environ.get('FAKE_CAPTURE_STDERR')
+    if stderr:
+        sys.stderr.write(stderr)
+    return int(os.environ.get('FAKE_CAPTURE_EXIT', '0'))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Stand-in for ffmpeg in the frame stream tests
+Writes raw BGR frames of the size in its scale=W:H argument and exits
+part-way through one more frame. FAKE_DECODER_FRAMES is a comma-separated
+frame count per run (the last count repeats); runs are counted in the
+FAKE_DECODER_RUNS file. Frame k of a run is filled with 10 * (k + 1).
+"""
+
+import os
+import re
+import sys
+
+
+def main():
+    width, height = map(int, re.search(r'scale=(\d+):(\d+)', ' '.join(sys.argv)).groups())
+    runs_path = os.environ['FAKE_DECODER_RUNS']
+    with open(runs_path, 'a+', encoding='utf-8') as f:
+        f.seek(0)
+        run = len(f.read().splitlines())
+        f.write(f"{run}\n")
+
+    counts = [int(count) for count in os.environ.get('FAKE_DECODER_FRAMES', '1').split(',')]
+    frame_size = width * height * 3
+    for k in range(counts[min(run, len(counts) - 1)]):
+        sys.stdout.buffer.write(bytes([10 * (k + 1)]) * frame_size)
+    sys.stdout.buffer.write(b'\xff' * (frame_size // 2))
+    sys.stdout.buffer.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
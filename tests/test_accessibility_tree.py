@@ -0,0 +1,175 @@
+"""Tests for accessibility_tree: page source parsing, locator queries and the CV fallback"""
+
+import cv2
+import numpy as np
+import pytest
+
+from accessibility_tree import ElementTable, HybridElementSource
+
+SPARSE_PAGE_SOURCE = """<?xml version="1.0" encoding="UTF-8"?>
+<AppiumAUT>
+  <XCUIElementTypeApplication type="XCUIElementTypeApplication" name="fwb" label="fwb" enabled="true" visible="true" x="0" y="0" width="390" height="844">
+    <XCUIElementTypeOther type="XCUIElementTypeOther" enabled="true" visible="true" x="0" y="0" width="390" height="844"/>
+  </XCUIElementTypeApplication>
+</AppiumAUT>
+"""
+
+
+class FakeDriver:
+    """Driver double that serves a page source and counts the fetches"""
+
+    def __init__(self, page_source=None, error=None):
+        self.source = page_source
+        self.error = error
+        self.fetches = 0
+
+    @property
+    def page_source(self):
+        self.fetches += 1
+        if self.error is not None:
+            raise self.error
+        return self.source
+
+
+def write_screen(path, shade: int) -> str:
+    """Save a 1170x2532 screenshot with a shaded panel, to tell screens apart"""
+    image = np.full((2532, 1170, 3), 255, dtype=np.uint8)
+    image[600:1400, 100:1070] = shade
+    cv2.imwrite(str(path), image)
+    return str(path)
+
+
+@pytest.fixture
+def ios_table(read_fixture):
+    return ElementTable.parse(read_fixture('xcuitest_sign_in.xml'))
+
+
+@pytest.fixture
+def android_table(read_fixture):
+    return ElementTable.parse(read_fixture('uiautomator2_sign_in.xml'))
+
+
+def test_parse_xcuitest_types_and_bounds(ios_table):
+    by_id = {e['id']: e for e in ios_table.elements if e['id']}
+    assert by_id['email_field']['type'] == 'input_field'
+    assert by_id['password_field']['type'] == 'input_field'
+    assert by_id['sign_in_button']['type'] == 'button'
+    assert by_id['Welcome Back!']['type'] == 'text'
+    assert by_id['sign_in_button']['bounds'] == {'x': 24, 'y': 364, 'width': 342, 'height': 52}
+    assert by_id['sign_in_button']['center'] == {'x': 195, 'y': 390}
+    assert by_id['sign_up_button']['enabled'] is False
+    assert by_id['forgot_password_button']['visible'] is False
+
+
+def test_parse_xcuitest_scales_points_to_screenshot_pixels(read_fixture):
+    table = ElementTable.parse(read_fixture('xcuitest_sign_in.xml'), screen_width=1170)
+    button = table.first('id', 'sign_in_button')
+    assert button['bounds'] == {'x': 72, 'y': 1092, 'width': 1026, 'height': 156}
+
+
+def test_parse_uiautomator2_types_and_bounds(android_table):
+    # The <hierarchy> root is not an element; the window is the first one
+    assert android_table.elements[0]['class'] == 'android.widget.FrameLayout'
+    sign_in = android_table.first('id', 'com.fwb.app.fwb:id/sign_in')
+    assert sign_in['type'] == 'button'
+    assert sign_in['label'] == 'sign_in_button'
+    assert sign_in['bounds'] == {'x': 66, 'y': 1001, 'width': 948, 'height': 143}
+    assert android_table.first('label', 'Show password')['type'] == 'button'
+    assert android_table.first('text', 'Welcome Back!')['type'] == 'text'
+
+
+def test_labeled_and_complete(ios_table, android_table):
+    assert [e['id'] for e in ios_table.labeled] == [
+        'Welcome Back!', 'email_field', 'password_field', 'sign_in_button', 'sign_up_button']
+    assert ios_table.complete
+    assert android_table.complete
+    assert not ElementTable.parse(SPARSE_PAGE_SOURCE).complete
+
+
+def test_find_by_accessibility_id_matches_id_or_label(ios_table, android_table):
+    assert [e['id'] for e in ios_table.find('accessibility_id', 'Sign In')] == ['sign_in_button']
+    assert [e['id'] for e in ios_table.find('accessibility_id', 'SIGN_IN_BUTTON')] == ['sign_in_button']
+    assert [e['id'] for e in android_table.find('accessibility_id', 'sign_in_button')] == [
+        'com.fwb.app.fwb:id/sign_in']
+
+
+def test_find_returns_visible_elements_in_document_order(ios_table, android_table):
+    assert [e['id'] for e in ios_table.find('type', 'button')] == ['sign_in_button', 'sign_up_button']
+    # The hidden "Forgot password?" button is left out
+    assert [e['label'] for e in android_table.find('text_contains', 'password')] == ['password_field', 'Show password']
+    assert ios_table.find('id', 'forgot_password_button') == []
+    assert ios_table.first('id', 'missing') is None
+
+
+def test_find_rejects_unknown_strategy(ios_table):
+    with pytest.raises(ValueError):
+        ios_table.find('xpath', '//XCUIElementTypeButton')
+
+
+def test_hybrid_answers_from_tree_and_fetches_once_per_screen(tmp_path, read_fixture):
+    detected = []
+    source = HybridElementSource(lambda path: detected.append(path) or [])
+    driver = FakeDriver(read_fixture('xcuitest_sign_in.xml'))
+    screen = write_screen(tmp_path / 'sign_in.png', 200)
+
+    first = source.elements('sim-1', driver, screen)
+    again = source.elements('sim-1', driver, screen)
+    assert first['source'] == again['source'] == 'accessibility'
+    assert [e['id'] for e in first['elements']][-2:] == ['sign_in_button', 'sign_up_button']
+    assert first['elements'][0]['bounds']['width'] == 1026
+    assert driver.fetches == 1
+    assert source.stats == {'tree_fetches': 1, 'cache_hits': 1, 'cv_fallbacks': 0}
+    assert detected == []
+
+    source.elements('sim-1', driver, write_screen(tmp_path / 'next.png', 40))
+    assert driver.fetches == 2
+
+
+def test_hybrid_falls_back_to_cv_for_sparse_or_missing_trees(tmp_path):
+    cv_elements = [{'x': 10, 'y': 20, 'width': 100, 'height': 40, 'type': 'button'}]
+    detected = []
+    source = HybridElementSource(lambda path: detected.append(path) or cv_elements)
+    screen = write_screen(tmp_path / 'flutter.png', 120)
+
+    sparse = source.elements('sim-1', FakeDriver(SPARSE_PAGE_SOURCE), screen)
+    assert sparse['source'] == 'cv'
+    assert sparse['elements'] == cv_elements
+    assert sparse['table'] is not None
+
+    failing = source.elements('emu-1', FakeDriver(error=RuntimeError('session gone')), screen)
+    assert failing['source'] == 'cv'
+    assert failing['table'] is None
+    assert detected == [screen, screen]
+    assert source.stats['cv_fallbacks'] == 2
+
+
+def test_hybrid_find_uses_tree_locators_and_cv_types(tmp_path, read_fixture):
+    screen = write_screen(tmp_path / 'screen.png', 200)
+    tree = HybridElementSource(lambda path: [])
+    found = tree.find('emu-1', FakeDriver(read_fixture('uiautomator2_sign_in.xml')), screen,
+                      'accessibility_id', 'sign_in_button')
+    assert found['id'] == 'com.fwb.app.fwb:id/sign_in'
+
+    cv_button = {'x': 10, 'y': 20, 'width': 100, 'height': 40, 'type': 'button'}
+    cv = HybridElementSource(lambda path: [cv_button])
+    assert cv.find('sim-1', None, screen, 'type', 'button') == cv_button
+    assert cv.find('sim-1', None, screen, 'accessibility_id', 'sign_in_button') is None
+
+
+def test_hybrid_invalidate_refetches_unchanged_screen(tmp_path, read_fixture):
+    source = HybridElementSource(lambda path: [])
+    driver = FakeDriver(read_fixture('xcuitest_sign_in.xml'))
+    screen = write_screen(tmp_path / 'sign_in.png', 200)
+    source.elements('sim-1', driver, screen)
+    source.invalidate('sim-1')
+    source.elements('sim-1', driver, screen)
+    assert driver.fetches == 2
+
+
+def test_hybrid_records_page_sources(tmp_path, read_fixture):
+    record_dir = tmp_path / 'page_sources'
+    source = HybridElementSource(lambda path: [], record_dir=str(record_dir))
+    source.elements('sim-1', FakeDriver(read_fixture('xcuitest_sign_in.xml')), write_screen(tmp_path / 's.png', 200))
+    recorded = list(record_dir.iterdir())
+    assert len(recorded) == 1
+    assert ElementTable.parse(recorded[0].read_text(encoding='utf-8')).complete
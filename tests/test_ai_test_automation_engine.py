@@ -0,0 +1,397 @@
+"""Tests for the engine's device pool, execution layer, test scheduling and test result cache"""
+
+import asyncio
+import itertools
+import threading
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+
+def make_test(engine, test_id, priority='MEDIUM', category='ui', device_types=()):
+    return engine.TestCase(
+        id=test_id, name=test_id.replace('_', ' '), description=f'Checks {test_id}', category=category,
+        priority=engine.TestPriority[priority], status=engine.TestStatus.PENDING,
+        device_types=list(device_types), expected_result='passes'
+    )
+
+
+def history_entry(duration, runs=5, failures=0, hours_since_run=1.0):
+    return {'duration': duration, 'runs': runs, 'failures': failures, 'hours_since_run': hours_since_run}
+
+
+@pytest.fixture
+def scheduler(engine, tmp_path):
+    return engine.TestScheduler(str(tmp_path / 'results.db'))
+
+
+def test_estimate_falls_back_to_category_then_overall_median(engine, scheduler):
+    tests = [make_test(engine, 'a', category='auth'), make_test(engine, 'b', category='auth'),
+             make_test(engine, 'c', category='chat'), make_test(engine, 'd', category='auth')]
+    history = {'a': history_entry(4.0), 'b': history_entry(8.0), 'c': history_entry(30.0)}
+    estimates = scheduler.estimate(tests + [make_test(engine, 'e', category='maps')], history)
+    assert estimates == {'a': 4.0, 'b': 8.0, 'c': 30.0, 'd': 6.0, 'e': 8.0}
+    assert scheduler.estimate(tests, {})['a'] == engine.DEFAULT_TEST_DURATION
+
+
+def test_order_runs_priority_tiers_then_longest_first(engine, scheduler):
+    tests = [make_test(engine, 'short_low', 'LOW'), make_test(engine, 'short_critical', 'CRITICAL'),
+             make_test(engine, 'long_low', 'LOW'), make_test(engine, 'long_critical', 'CRITICAL')]
+    estimates = {'short_low': 1.0, 'short_critical': 2.0, 'long_low': 9.0, 'long_critical': 5.0}
+    assert [tc.id for tc in scheduler.order(tests, estimates)] == [
+        'long_critical', 'short_critical', 'long_low', 'short_low']
+
+
+def test_select_keeps_everything_that_fits(engine, scheduler):
+    tests = [make_test(engine, f't{i}') for i in range(4)]
+    history = {tc.id: history_entry(10.0) for tc in tests}
+    selected, deferred = scheduler.select(tests, 40.0, history)
+    assert selected == tests
+    assert deferred == []
+
+
+def test_select_finds_the_most_valuable_subset(engine, scheduler):
+    priorities = ['CRITICAL', 'HIGH', 'MEDIUM', 'LOW']
+    durations = [12, 7, 30, 5, 18, 9, 25, 3, 14, 21]
+    tests = [make_test(engine, f't{i}', priorities[i % 4]) for i in range(len(durations))]
+    history = {tc.id: history_entry(float(d), failures=i % 3, hours_since_run=24.0 * i)
+               for i, (tc, d) in enumerate(zip(tests, durations))}
+    values = {tc.id: scheduler.value(tc, history) for tc in tests}
+    # Whole-second durations are whole cells of a 100 s budget, so the knapsack is exact
+    budget = 100.0
+
+    selected, deferred = scheduler.select(tests, budget, history)
+    best = max(sum(values[tc.id] for tc in subset)
+               for size in range(len(tests) + 1) for subset in itertools.combinations(tests, size)
+               if sum(history[tc.id]['duration'] for tc in subset) <= budget)
+    assert sum(history[tc.id]['duration'] for tc in selected) <= budget
+    assert sum(values[tc.id] for tc in selected) == pytest.approx(best)
+    # Selected tests keep their given order; deferred ones come most valuable first
+    assert selected == [tc for tc in tests if tc in selected]
+    assert {d['id'] for d in deferred} == {tc.id for tc in tests if tc not in selected}
+    assert [d['value'] for d in deferred] == sorted((d['value'] for d in deferred), reverse=True)
+
+
+def test_select_keeps_duplicate_ids_aligned(engine, scheduler):
+    tests = [make_test(engine, 'login', 'CRITICAL'), make_test(engine, 'avatar', 'LOW'),
+             make_test(engine, 'login', 'CRITICAL'), make_test(engine, 'logout', 'LOW')]
+    history = {'login': history_entry(5.0), 'avatar': history_entry(50.0), 'logout': history_entry(1.0)}
+    selected, deferred = scheduler.select(tests, 12.0, history)
+    assert [tc.id for tc in selected] == ['login', 'login', 'logout']
+    assert [(d['id'], d['estimate']) for d in deferred] == [('avatar', 50.0)]
+
+
+@pytest.mark.parametrize('budget', [0, -5.0, float('nan')])
+def test_select_rejects_budgets_that_are_not_positive(engine, scheduler, budget):
+    with pytest.raises(ValueError):
+        scheduler.select([make_test(engine, 'a')], budget, {})
+
+
+@pytest.fixture
+def app_binary(tmp_path):
+    app = tmp_path / 'Runner.app'
+    (app / 'Frameworks').mkdir(parents=True)
+    (app / 'Runner').write_bytes(b'binary v1')
+    (app / 'Frameworks' / 'App').write_bytes(b'flutter v1')
+    return app
+
+
+@pytest.fixture
+def devices(engine):
+    return {
+        'sim-1': engine.DeviceConfig('sim-1', engine.DeviceType.IOS_SIMULATOR, 'iOS', '17.0', 'iPhone 15'),
+        'emu-1': engine.DeviceConfig('emu-1', engine.DeviceType.ANDROID_EMULATOR, 'Android', '14', 'Pixel 7',
+                                     automation_name='UiAutomator2'),
+    }
+
+
+def passed(engine, device_id, **extra):
+    return dict({'status': engine.TestStatus.PASSED, 'device_id': device_id, 'execution_time': 1.5}, **extra)
+
+
+def test_result_cache_is_off_without_an_app_binary(engine, tmp_path, devices):
+    cache = engine.TestResultCache(str(tmp_path / 'results.db'))
+    tests = [make_test(engine, 'a')]
+    cache.store(tests, {'a': passed(engine, 'sim-1')}, devices)
+    assert cache.lookup(tests, devices) == ({}, tests)
+
+
+def test_result_cache_reuses_passed_results_of_unchanged_builds(engine, tmp_path, app_binary, devices):
+    cache = engine.TestResultCache(str(tmp_path / 'results.db'), str(app_binary))
+    tests = [make_test(engine, 'login'), make_test(engine, 'chat')]
+    failed = {'status': engine.TestStatus.FAILED, 'device_id': 'sim-1'}
+    cache.store(tests, {'login': passed(engine, 'sim-1'), 'chat': failed}, devices)
+
+    cached, remaining = cache.lookup(tests, devices)
+    assert list(cached) == ['login']
+    assert cached['login']['status'] == engine.TestStatus.PASSED
+    assert cached['login']['cached'] is True
+    assert remaining == [tests[1]]
+
+
+def test_result_cache_misses_after_a_rebuild(engine, tmp_path, app_binary, devices):
+    cache = engine.TestResultCache(str(tmp_path / 'results.db'), str(app_binary))
+    tests = [make_test(engine, 'login')]
+    cache.store(tests, {'login': passed(engine, 'sim-1')}, devices)
+    (app_binary / 'Frameworks' / 'App').write_bytes(b'flutter v2 with a fix')
+    assert cache.lookup(tests, devices) == ({}, tests)
+
+
+def test_result_cache_misses_when_the_test_changes(engine, tmp_path, app_binary, devices):
+    cache = engine.TestResultCache(str(tmp_path / 'results.db'), str(app_binary))
+    cache.store([make_test(engine, 'login')], {'login': passed(engine, 'sim-1')}, devices)
+    changed = make_test(engine, 'login')
+    changed.expected_result = 'shows the home screen'
+    assert cache.lookup([changed], devices) == ({}, [changed])
+
+
+def test_result_cache_needs_a_compatible_device(engine, tmp_path, app_binary, devices):
+    cache = engine.TestResultCache(str(tmp_path / 'results.db'), str(app_binary))
+    tests = [make_test(engine, 'login')]
+    cache.store(tests, {'login': passed(engine, 'sim-1')}, devices)
+    android_only = {'emu-1': devices['emu-1']}
+    assert cache.lookup(tests, android_only) == ({}, tests)
+    assert list(cache.lookup(tests, {'sim-1': devices['sim-1']})[0]) == ['login']
+
+
+def test_result_cache_expires_flaky_categories(engine, tmp_path, app_binary, devices):
+    cache = engine.TestResultCache(str(tmp_path / 'results.db'), str(app_binary),
+                                   flaky_categories=['network'], flaky_ttl_hours=-1)
+    tests = [make_test(engine, 'upload', category='network'), make_test(engine, 'login')]
+    cache.store(tests, {'upload': passed(engine, 'sim-1'), 'login': passed(engine, 'sim-1')}, devices)
+    cached, remaining = cache.lookup(tests, devices)
+    assert list(cached) == ['login']
+    assert remaining == [tests[0]]
+
+
+@pytest.fixture
+def device_manager(engine):
+    manager = engine.DeviceManager()
+    manager.devices = {
+        device_id: engine.DeviceConfig(device_id, device_type, platform, version, name)
+        for device_id, device_type, platform, version, name in [
+            ('sim-1', engine.DeviceType.IOS_SIMULATOR, 'iOS', '17.0', 'iPhone 15'),
+            ('sim-2', engine.DeviceType.IOS_SIMULATOR, 'iOS', '17.0', 'iPhone 15 Pro'),
+            ('emu-1', engine.DeviceType.ANDROID_EMULATOR, 'Android', '14', 'Pixel 7'),
+        ]
+    }
+    return manager
+
+
+@pytest.fixture
+def test_executor(engine, device_manager, tmp_path, monkeypatch):
+    """TestExecutor whose test steps take 50 ms and record how many run at once"""
+    monkeypatch.setenv('WATCHTOWER_ANALYSIS_CACHE', str(tmp_path / 'analysis_cache.db'))
+    recognition = engine.AIVisualRecognition()
+    executor = engine.TestExecutor(device_manager, recognition, engine.BehavioralLearning(),
+                                   execution=engine.ExecutionLayer(recognition, cv_workers=0))
+    executor.running = []
+    executor.most_running = 0
+
+    async def run_test_steps(device_id, test_case):
+        assert device_id not in executor.running
+        executor.running.append(device_id)
+        executor.most_running = max(executor.most_running, len(executor.running))
+        await asyncio.sleep(0.05)
+        executor.running.remove(device_id)
+        return {'status': engine.TestStatus.PASSED}
+
+    executor._run_test_steps = run_test_steps
+    yield executor
+    executor.execution.shutdown()
+
+
+def test_tests_queue_for_busy_devices_instead_of_skipping(engine, test_executor):
+    ios = [engine.DeviceType.IOS_SIMULATOR]
+    tests = [make_test(engine, f'ios_{i}', device_types=ios) for i in range(5)]
+    summary = asyncio.run(test_executor.execute_test_suite(tests))
+    assert (summary['passed'], summary['skipped'], summary['failed']) == (5, 0, 0)
+    # Two iOS simulators, so two tests at a time and the rest wait their turn
+    assert test_executor.most_running == 2
+    assert {r['device_id'] for r in summary['results'].values()} == {'sim-1', 'sim-2'}
+    assert max(r['queue_time'] for r in summary['results'].values()) >= 0.1
+    utilization = summary['device_utilization']
+    assert utilization['sim-1']['tests'] + utilization['sim-2']['tests'] == 5
+    assert utilization['emu-1']['tests'] == 0
+
+
+def test_concurrency_matches_the_device_count(engine, test_executor):
+    tests = [make_test(engine, f't{i}') for i in range(7)]
+    summary = asyncio.run(test_executor.execute_test_suite(tests))
+    assert summary['passed'] == 7
+    assert test_executor.most_running == 3
+
+
+def test_tests_without_a_device_of_their_type_are_skipped(engine, test_executor):
+    tests = [make_test(engine, 'real_iphone', device_types=[engine.DeviceType.IOS_DEVICE])]
+    summary = asyncio.run(test_executor.execute_test_suite(tests))
+    assert summary['skipped'] == 1
+    assert summary['results']['real_iphone']['error'] == 'No devices of the required type'
+
+
+def idle_devices(pool):
+    return sorted(device_id for queue in pool.queues.values() for device_id in queue._queue)
+
+
+def test_lease_returns_the_device_when_the_test_raises(engine, device_manager):
+    async def run():
+        pool = engine.DevicePool(device_manager)
+        with pytest.raises(RuntimeError):
+            async with pool.lease([engine.DeviceType.ANDROID_EMULATOR]) as device_id:
+                assert device_id == 'emu-1'
+                assert 'emu-1' not in idle_devices(pool)
+                raise RuntimeError('driver session lost')
+        return pool
+
+    pool = asyncio.run(run())
+    assert idle_devices(pool) == ['emu-1', 'sim-1', 'sim-2']
+    assert pool.usage['emu-1']['tests'] == 1
+
+
+def test_lease_returns_the_device_when_the_test_is_cancelled(engine, device_manager):
+    async def run():
+        pool = engine.DevicePool(device_manager)
+        started = asyncio.Event()
+
+        async def hold():
+            async with pool.lease([engine.DeviceType.ANDROID_EMULATOR]):
+                started.set()
+                await asyncio.sleep(10)
+
+        task = asyncio.create_task(hold())
+        await started.wait()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return pool
+
+    assert idle_devices(asyncio.run(run())) == ['emu-1', 'sim-1', 'sim-2']
+
+
+def test_cancelled_wait_for_several_types_keeps_no_device(engine, device_manager):
+    both = [engine.DeviceType.IOS_SIMULATOR, engine.DeviceType.ANDROID_EMULATOR]
+
+    async def run():
+        pool = engine.DevicePool(device_manager)
+        held = [await pool.acquire(both) for _ in range(3)]
+        waiting = asyncio.create_task(pool.acquire(both))
+        await asyncio.sleep(0.01)
+        # Both devices come back in the same step, then the waiting test is cancelled
+        pool._return(held[0])
+        pool._return(held[2])
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        pool._return(held[1])
+        return pool
+
+    assert idle_devices(asyncio.run(run())) == ['emu-1', 'sim-1', 'sim-2']
+
+
+def test_utilization_reports_busy_time_per_device(engine, device_manager):
+    async def run():
+        pool = engine.DevicePool(device_manager)
+
+        async def test(seconds):
+            async with pool.lease([engine.DeviceType.IOS_SIMULATOR]):
+                await asyncio.sleep(seconds)
+
+        await asyncio.gather(test(0.1), test(0.05), test(0.05))
+        return pool.utilization()
+
+    utilization = asyncio.run(run())
+    ios = [utilization['sim-1'], utilization['sim-2']]
+    assert sorted(u['tests'] for u in ios) == [1, 2]
+    # One simulator ran the 100 ms test, the other the two 50 ms tests back to back
+    assert [u['busy_time'] for u in ios] == pytest.approx([0.1, 0.1], abs=0.03)
+    assert all(0.5 < u['utilization'] <= 1.0 for u in ios)
+    assert utilization['emu-1'] == {'tests': 0, 'busy_time': 0.0, 'utilization': 0.0}
+
+
+@pytest.fixture
+def recognition(engine, tmp_path, monkeypatch):
+    monkeypatch.setenv('WATCHTOWER_ANALYSIS_CACHE', str(tmp_path / 'analysis_cache.db'))
+    return engine.AIVisualRecognition()
+
+
+def io_threads():
+    return [thread for thread in threading.enumerate() if thread.name.startswith('driver-io')]
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return condition()
+
+
+def test_blocking_calls_leave_the_event_loop_responsive(engine, recognition):
+    layer = engine.ExecutionLayer(recognition, io_workers=4, cv_workers=0)
+
+    async def run():
+        layer.start_lag_monitor()
+        started = time.monotonic()
+        names = await asyncio.gather(*(layer.run_blocking(lambda: time.sleep(0.3) or threading.current_thread().name)
+                                       for _ in range(4)))
+        elapsed = time.monotonic() - started
+        return names, elapsed, await layer.stop_lag_monitor()
+
+    try:
+        names, elapsed, lag = asyncio.run(run())
+    finally:
+        layer.shutdown()
+    # Four 300 ms calls overlap on the I/O threads and the monitor keeps waking on time
+    assert all(name.startswith('driver-io') for name in names)
+    assert elapsed < 0.6
+    assert lag['samples'] >= 4
+    assert lag['stalls'] == 0
+    assert lag['max_lag_ms'] < engine.LOOP_LAG_WARNING * 1000
+
+
+def test_lag_monitor_reports_a_blocked_loop(engine, recognition):
+    layer = engine.ExecutionLayer(recognition, cv_workers=0)
+
+    async def run():
+        layer.start_lag_monitor()
+        await asyncio.sleep(0.12)
+        time.sleep(0.3)
+        return await layer.stop_lag_monitor()
+
+    try:
+        lag = asyncio.run(run())
+    finally:
+        layer.shutdown()
+    assert lag['stalls'] == 1
+    assert lag['max_lag_ms'] >= 200
+
+
+def test_analysis_runs_on_the_thread_pool_without_cv_workers(engine, recognition):
+    layer = engine.ExecutionLayer(recognition, cv_workers=0)
+    recognition.worker_name = lambda: threading.current_thread().name
+    try:
+        assert layer.cv_pool is None
+        assert asyncio.run(layer.run_cv('worker_name')).startswith('driver-io')
+        assert layer.run_cv_sync('worker_name') == threading.current_thread().name
+    finally:
+        layer.shutdown()
+
+
+def test_analysis_processes_match_in_process_analysis_and_stop_on_shutdown(engine, recognition, tmp_path):
+    screenshot = np.full((640, 360, 3), 245, dtype=np.uint8)
+    screenshot[100:148, 40:320] = (200, 80, 30)
+    screenshot[300:350, 40:320] = 120
+    path = str(tmp_path / 'screen.png')
+    cv2.imwrite(path, screenshot)
+
+    threads_before = len(io_threads())
+    layer = engine.ExecutionLayer(recognition, io_workers=2, cv_workers=2)
+    try:
+        offloaded = asyncio.run(layer.run_cv('detect_elements', path))
+        assert offloaded == recognition.detect_elements(path)
+        assert asyncio.run(layer.run_blocking(layer.run_cv_sync, 'detect_elements', path)) == offloaded
+        processes = list(layer.cv_pool._processes.values())
+        assert processes
+    finally:
+        layer.shutdown()
+    assert wait_for(lambda: not any(process.is_alive() for process in processes))
+    assert wait_for(lambda: len(io_threads()) <= threads_before)
@@ -0,0 +1,129 @@
+"""Tests for batch_analyzer: checkpoint resume, stale records and stopping"""
+
+import json
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from analysis_cache import AnalysisCache
+from batch_analyzer import BatchAnalyzer, find_screenshots
+
+ANALYZED = []
+
+
+def mean_gray(image: np.ndarray) -> dict:
+    """Module-level analyzer, so worker processes can run it too"""
+    ANALYZED.append(int(image[0, 0, 0]))
+    return {'mean': int(image.mean())}
+
+
+@pytest.fixture
+def screenshots(tmp_path):
+    directory = tmp_path / 'screenshots'
+    directory.mkdir()
+    for i in range(5):
+        cv2.imwrite(str(directory / f'screen_{i}.png'), np.full((40, 30, 3), 10 * (i + 1), dtype=np.uint8))
+    (directory / 'notes.txt').write_text('not a screenshot')
+    ANALYZED.clear()
+    return find_screenshots(str(directory))
+
+
+def analyzer(tmp_path, namespace='gray', version='1', **options):
+    """Analyzer with a memory-only cache, so only the checkpoint carries results between runs"""
+    return BatchAnalyzer(mean_gray, namespace, version, checkpoint_path=str(tmp_path / 'checkpoint.jsonl'),
+                         cache=AnalysisCache(None), **options)
+
+
+def test_find_screenshots_lists_images_by_name(screenshots, tmp_path):
+    assert [os.path.basename(path) for path in screenshots] == [f'screen_{i}.png' for i in range(5)]
+    assert find_screenshots(str(tmp_path / 'missing')) == []
+
+
+def test_stop_takes_effect_between_files_of_a_single_chunk(screenshots, tmp_path):
+    batch = analyzer(tmp_path)
+    records = []
+    for record in batch.run(screenshots):
+        records.append(record)
+        if len(records) == 2:
+            batch.stop()
+    assert [record['result']['mean'] for record in records] == [10, 20]
+    assert ANALYZED == [10, 20]
+    assert batch.stats['completed'] == 2
+    assert len((tmp_path / 'checkpoint.jsonl').read_text().splitlines()) == 2
+
+
+def test_interrupted_run_resumes_from_the_checkpoint(screenshots, tmp_path):
+    first = analyzer(tmp_path)
+    for record in first.run(screenshots):
+        if record['path'] == screenshots[1]:
+            first.stop()
+    ANALYZED.clear()
+
+    second = analyzer(tmp_path)
+    records = list(second.run(screenshots))
+    assert [record['source'] for record in records] == ['checkpoint'] * 2 + ['analyzed'] * 3
+    assert [record['result']['mean'] for record in records] == [10, 20, 30, 40, 50]
+    assert ANALYZED == [30, 40, 50]
+    assert (second.stats['resumed'], second.stats['analyzed']) == (2, 3)
+
+    # A killed run can leave a partial last line behind
+    with open(tmp_path / 'checkpoint.jsonl', 'a') as f:
+        f.write('{"path": "/tmp/screen_9.png", "mtime')
+    assert [record['source'] for record in analyzer(tmp_path).run(screenshots)] == ['checkpoint'] * 5
+
+    # restart ignores the checkpoint
+    ANALYZED.clear()
+    list(analyzer(tmp_path).run(screenshots, restart=True))
+    assert ANALYZED == [10, 20, 30, 40, 50]
+
+
+@pytest.mark.parametrize('namespace, version', [('gray', '2'), ('contrast', '1')])
+def test_checkpoint_of_another_analyzer_or_version_is_stale(screenshots, tmp_path, namespace, version):
+    list(analyzer(tmp_path).run(screenshots))
+    ANALYZED.clear()
+    records = list(analyzer(tmp_path, namespace, version).run(screenshots))
+    assert {record['source'] for record in records} == {'analyzed'}
+    assert {(record['namespace'], record['version']) for record in records} == {(namespace, version)}
+    assert len(ANALYZED) == 5
+
+    # Both analyzers' records now sit in the checkpoint; the latest one of a file wins
+    lines = [json.loads(line) for line in (tmp_path / 'checkpoint.jsonl').read_text().splitlines()]
+    assert len(lines) == 10
+    assert {record['source'] for record in analyzer(tmp_path, namespace, version).run(screenshots)} == {'checkpoint'}
+
+
+def test_changed_file_is_analyzed_again(screenshots, tmp_path):
+    list(analyzer(tmp_path).run(screenshots))
+    ANALYZED.clear()
+    cv2.imwrite(screenshots[2], np.full((40, 30, 3), 99, dtype=np.uint8))
+    os.utime(screenshots[2], ns=(0, 0))
+    records = {record['path']: record for record in analyzer(tmp_path).run(screenshots)}
+    assert records[screenshots[2]]['source'] == 'analyzed'
+    assert records[screenshots[2]]['result'] == {'mean': 99}
+    assert ANALYZED == [99]
+
+
+def test_cache_answers_files_it_has_seen(screenshots, tmp_path):
+    cache = AnalysisCache(None)
+    kwargs = {'checkpoint_path': None, 'cache': cache}
+    list(BatchAnalyzer(mean_gray, 'gray', '1', **kwargs).run(screenshots))
+    ANALYZED.clear()
+    records = list(BatchAnalyzer(mean_gray, 'gray', '1', **kwargs).run(screenshots))
+    assert {record['source'] for record in records} == {'cache'}
+    assert ANALYZED == []
+
+
+def test_worker_processes_analyze_several_chunks(screenshots, tmp_path):
+    broken = tmp_path / 'screenshots' / 'screen_5.png'
+    broken.write_bytes(b'not a png')
+    batch = analyzer(tmp_path, workers=2, chunk_size=2)
+    records = {os.path.basename(record['path']): record for record in batch.run(screenshots + [str(broken)])}
+    assert {name: record.get('result', {}).get('mean') for name, record in records.items()} == {
+        'screen_0.png': 10, 'screen_1.png': 20, 'screen_2.png': 30, 'screen_3.png': 40, 'screen_4.png': 50,
+        'screen_5.png': None}
+    assert records['screen_5.png']['error'] == 'Could not decode image'
+    assert (batch.stats['analyzed'], batch.stats['failed']) == (6, 1)
+    # The analyses ran in the workers
+    assert ANALYZED == []
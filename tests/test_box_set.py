@@ -0,0 +1,68 @@
+"""Tests for box_set: overlap measures, NMS, containment, dedupe and merging"""
+
+import numpy as np
+import pytest
+
+from box_set import (_loop_nms, box_iou, contained_mask, dedupe, intersection_areas, merge_boxes, nms,
+                     overlap_groups, overlapping_pairs, union_area)
+
+
+def random_boxes(count: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    xy = rng.integers(0, 400, size=(count, 2))
+    wh = rng.integers(10, 120, size=(count, 2))
+    return np.hstack([xy, wh]).astype(np.int32)
+
+
+def test_box_iou_and_intersections():
+    a = np.array([[0, 0, 10, 10]])
+    b = np.array([[5, 0, 10, 10], [20, 20, 5, 5], [0, 0, 10, 10]])
+    assert intersection_areas(a, b).tolist() == [[50, 0, 100]]
+    assert box_iou(a, b) == pytest.approx(np.array([[50 / 150, 0, 1]]))
+
+
+def test_box_iou_of_empty_boxes_is_zero():
+    assert box_iou(np.array([[0, 0, 0, 0]]), np.array([[0, 0, 0, 0]])).tolist() == [[0.0]]
+
+
+def test_union_area_counts_overlaps_once():
+    assert union_area(np.zeros((0, 4))) == 0.0
+    assert union_area(np.array([[0, 0, 10, 10], [5, 5, 10, 10]])) == 175.0
+    assert union_area(np.array([[0, 0, 10, 10], [2, 2, 3, 3]])) == 100.0
+
+
+def test_overlapping_pairs_matches_dense_matrix():
+    boxes = random_boxes(150)
+    a, b, inter = overlapping_pairs(boxes)
+    dense = intersection_areas(boxes, boxes)
+    expected = {(i, j) for i, j in zip(*np.nonzero(np.triu(dense, 1) > 0))}
+    assert set(zip(a.tolist(), b.tolist())) == expected
+    assert inter.tolist() == dense[a, b].tolist()
+
+
+def test_nms_keeps_the_larger_duplicate_in_original_order():
+    boxes = np.array([[100, 100, 50, 50], [0, 0, 40, 40], [2, 2, 40, 40], [300, 0, 10, 10]])
+    assert nms(boxes).tolist() == [0, 1, 3]
+    assert nms(boxes, scores=np.array([0, 0, 1, 0])).tolist() == [0, 2, 3]
+
+
+def test_nms_matches_loop_reference():
+    boxes = random_boxes(200, seed=3)
+    assert nms(boxes).tolist() == sorted(_loop_nms(boxes))
+
+
+def test_contained_mask_and_dedupe():
+    boxes = np.array([[0, 0, 100, 100], [10, 10, 20, 20], [90, 90, 40, 40], [0, 0, 100, 100]])
+    # The inner box and the later copy of the outer box are redundant; the straddling box is not
+    assert contained_mask(boxes).tolist() == [False, True, False, True]
+    assert dedupe(boxes).tolist() == [0, 2]
+    assert dedupe(boxes[:1]).tolist() == [0]
+    assert dedupe(np.zeros((0, 4))).tolist() == []
+
+
+def test_overlap_groups_and_merge_boxes():
+    boxes = np.array([[0, 0, 10, 10], [200, 0, 10, 10], [8, 8, 10, 10], [16, 16, 10, 10]])
+    assert overlap_groups(boxes).tolist() == [0, 1, 0, 0]
+    assert merge_boxes(boxes).tolist() == [[0, 0, 26, 26], [200, 0, 10, 10]]
+    # Slight overlaps stay apart above an IoU threshold
+    assert merge_boxes(boxes, iou_threshold=0.5).tolist() == boxes.tolist()
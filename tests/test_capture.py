@@ -0,0 +1,107 @@
+"""Tests for capture: in-memory screenshots from a stand-in simctl/adb"""
+
+import os
+import shlex
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+from capture import ADB_ENV, SIMCTL_ENV, ScreenCapture, capture_command
+
+FAKE_TOOL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'fake_capture_tool.py')
+
+
+@pytest.fixture
+def fake_tool(monkeypatch, tmp_path):
+    """Point both capture tools at the stand-in script; returns a function setting what it does"""
+    command = f"{shlex.quote(sys.executable)} {shlex.quote(FAKE_TOOL)}"
+    monkeypatch.setenv(SIMCTL_ENV, command)
+    monkeypatch.setenv(ADB_ENV, command)
+    args_path = tmp_path / 'args.txt'
+    monkeypatch.setenv('FAKE_CAPTURE_ARGS', str(args_path))
+
+    def configure(output: bytes = b'', exit_code: int = 0, stderr: str = ''):
+        output_path = tmp_path / 'output.bin'
+        output_path.write_bytes(output)
+        monkeypatch.setenv('FAKE_CAPTURE_OUTPUT', str(output_path))
+        monkeypatch.setenv('FAKE_CAPTURE_EXIT', str(exit_code))
+        monkeypatch.setenv('FAKE_CAPTURE_STDERR', stderr)
+        return args_path
+    return configure
+
+
+@pytest.fixture
+def screenshot():
+    image = np.zeros((80, 60, 3), dtype=np.uint8)
+    image[10:30, 5:55] = (255, 128, 0)
+    return image
+
+
+def png_bytes(image: np.ndarray) -> bytes:
+    ok, encoded = cv2.imencode('.png', image)
+    assert ok
+    return encoded.tobytes()
+
+
+def test_capture_command_targets_the_device(monkeypatch):
+    monkeypatch.delenv(SIMCTL_ENV, raising=False)
+    monkeypatch.delenv(ADB_ENV, raising=False)
+    assert capture_command('ios') == ['xcrun', 'simctl', 'io', 'booted', 'screenshot', '-']
+    assert capture_command('android', 'emulator-5554') == ['adb', '-s', 'emulator-5554', 'exec-out', 'screencap', '-p']
+    with pytest.raises(ValueError):
+        capture_command('windows')
+
+
+@pytest.mark.parametrize('platform, device, expected_args', [
+    ('ios', None, 'io booted screenshot -'),
+    ('android', 'emulator-5554', '-s emulator-5554 exec-out screencap -p'),
+])
+def test_capture_decodes_stdout(fake_tool, screenshot, platform, device, expected_args):
+    args_path = fake_tool(png_bytes(screenshot))
+    capture = ScreenCapture(platform, device)
+    image = capture.capture()
+    assert np.array_equal(image, screenshot)
+    assert capture.last_error is None
+    assert args_path.read_text().splitlines() == [expected_args]
+
+
+def test_capture_saves_the_original_png_only_when_asked(fake_tool, screenshot, tmp_path):
+    data = png_bytes(screenshot)
+    fake_tool(data)
+    save_path = tmp_path / 'screen.png'
+    ScreenCapture('ios').capture(save_path=str(save_path))
+    assert save_path.read_bytes() == data
+
+
+def test_capture_reports_a_failing_tool(fake_tool, screenshot):
+    fake_tool(png_bytes(screenshot), exit_code=1, stderr='No devices are booted.')
+    capture = ScreenCapture('ios')
+    assert capture.capture() is None
+    assert capture.last_error == 'No devices are booted.'
+
+    fake_tool(exit_code=3)
+    assert capture.capture() is None
+    assert capture.last_error == 'exit code 3'
+
+
+def test_capture_reports_empty_stdout(fake_tool):
+    fake_tool(b'')
+    capture = ScreenCapture('android')
+    assert capture.capture() is None
+    assert capture.last_error == 'exit code 0'
+
+
+def test_capture_reports_stdout_that_is_not_an_image(fake_tool):
+    fake_tool(b'error: device offline\n')
+    capture = ScreenCapture('android')
+    assert capture.capture() is None
+    assert capture.last_error == 'Could not decode screenshot'
+
+
+def test_capture_reports_a_missing_tool(monkeypatch, tmp_path):
+    monkeypatch.setenv(SIMCTL_ENV, str(tmp_path / 'missing-simctl'))
+    capture = ScreenCapture('ios')
+    assert capture.capture() is None
+    assert capture.last_error
@@ -0,0 +1,68 @@
+"""Tests for change_detector: signatures and reported screen changes"""
+
+import numpy as np
+import pytest
+
+from change_detector import ChangeDetector, block_means, frame_signature
+
+
+def screen(height: int = 640, width: int = 360) -> np.ndarray:
+    image = np.full((height, width, 3), 240, dtype=np.uint8)
+    image[40:80, 20:340] = 30
+    return image
+
+
+def test_block_means_pads_partial_edge_blocks():
+    gray = np.arange(30, dtype=np.uint8).reshape(5, 6)
+    means = block_means(gray, 4)
+    assert means.shape == (2, 2)
+    assert means[0, 0] == pytest.approx(gray[:4, :4].mean(), abs=1)
+
+
+def test_frame_signature_has_one_value_per_tile():
+    assert frame_signature(screen(), 32).shape == (20, 12)
+    assert frame_signature(screen(645, 361), 32).shape == (21, 12)
+
+
+def test_first_frame_is_a_full_change():
+    result = ChangeDetector().update(screen())
+    assert result['changed']
+    assert result['boxes'].tolist() == [[0, 0, 360, 640]]
+
+
+def test_identical_and_tiny_changes_are_not_reported():
+    detector = ChangeDetector()
+    detector.update(screen())
+    assert not detector.update(screen())['changed']
+
+    blinking_cursor = screen()
+    blinking_cursor[300:310, 100:102] = 0
+    result = detector.update(blinking_cursor)
+    assert not result['changed']
+    assert len(result['boxes']) == 0
+
+
+def test_changed_region_is_reported_in_device_pixels():
+    detector = ChangeDetector()
+    detector.update(screen())
+    dialog = screen()
+    dialog[200:360, 60:300] = 90
+    result = detector.update(dialog)
+    assert result['changed']
+    assert result['changed_pixels'] == 160 * 240
+    assert result['boxes'].tolist() == [[60, 200, 240, 160]]
+    # The reference advanced, so the same frame is no change
+    assert not detector.update(dialog)['changed']
+
+
+def test_reset_and_resolution_change_report_full_frames():
+    detector = ChangeDetector()
+    detector.update(screen())
+    assert detector.update(screen(320, 180))['changed']
+    detector.reset()
+    assert detector.update(screen(320, 180))['boxes'].tolist() == [[0, 0, 180, 320]]
+
+
+def test_tile_size_must_fit_cells():
+    with pytest.raises(ValueError):
+        ChangeDetector(tile_size=30, cell_size=4)
@@ -0,0 +1,72 @@
+"""Tests for contrast_checker: WCAG luminance and ratios and the two-tone text estimate"""
+
+import numpy as np
+import pytest
+
+from contrast_checker import AA_LARGE, AA_NORMAL, ContrastChecker, contrast_ratio, srgb_to_luminance
+from region_stats import RegionStats
+
+
+def test_luminance_matches_the_wcag_formula():
+    assert srgb_to_luminance(0) == 0.0
+    assert srgb_to_luminance(255) == pytest.approx(1.0)
+    # Below the 0.04045 knee the curve is linear, above it a 2.4 power
+    assert srgb_to_luminance(10) == pytest.approx(10 / 255 / 12.92)
+    assert srgb_to_luminance(128) == pytest.approx(0.2158605, abs=1e-6)
+    assert srgb_to_luminance([0, 255]).tolist() == pytest.approx([0.0, 1.0])
+
+
+@pytest.mark.parametrize('foreground, background, ratio', [
+    (0, 255, 21.0),          # black on white
+    (255, 255, 1.0),         # no contrast
+    (0x76, 255, 4.54),       # #767676, the lightest gray passing AA on white
+    (0x77, 255, 4.48),       # #777777 just fails it
+    (0x59, 255, 7.0),        # #595959, the AAA threshold
+])
+def test_contrast_ratio_matches_wcag_reference_values(foreground, background, ratio):
+    measured = contrast_ratio(srgb_to_luminance(foreground), srgb_to_luminance(background))
+    assert measured == pytest.approx(ratio, abs=0.01)
+    assert contrast_ratio(srgb_to_luminance(background), srgb_to_luminance(foreground)) == measured
+
+
+def text_screen(foreground: int, background: int, box, stroke_share: float = 0.3) -> np.ndarray:
+    """Background with vertical text-like strokes covering ``stroke_share`` of the box"""
+    image = np.full((200, 300), background, dtype=np.uint8)
+    x, y, w, h = box
+    stroke_columns = np.arange(w) % 10 < round(10 * stroke_share)
+    image[y:y + h, x:x + w][:, stroke_columns] = foreground
+    return image
+
+
+@pytest.mark.parametrize('foreground, background', [(40, 235), (230, 20), (150, 200)])
+def test_two_tone_estimate_recovers_both_tones(foreground, background):
+    box = (50, 60, 120, 30)
+    measured = ContrastChecker().measure(RegionStats(text_screen(foreground, background, box)), [box])
+    assert measured['background'][0] == pytest.approx(background)
+    assert measured['foreground'][0] == pytest.approx(foreground, abs=0.5)
+    expected = contrast_ratio(srgb_to_luminance(foreground), srgb_to_luminance(background))
+    assert measured['ratio'][0] == pytest.approx(expected, rel=0.01)
+
+
+def test_estimate_does_not_depend_on_the_stroke_share():
+    box = (50, 60, 120, 30)
+    estimates = [ContrastChecker().measure(RegionStats(text_screen(60, 240, box, share)), [box])['foreground'][0]
+                 for share in (0.1, 0.3, 0.5, 0.7)]
+    assert estimates == pytest.approx([60.0] * 4, abs=0.5)
+
+
+def test_large_text_has_the_lower_requirement_and_failures_come_worst_first():
+    dim, faint, crisp, large = (20, 20, 100, 20), (20, 60, 100, 20), (20, 100, 100, 20), (150, 20, 120, 80)
+    image = np.full((200, 300), 250, dtype=np.uint8)
+    for (x, y, w, h), level in [(dim, 150), (faint, 200), (crisp, 30), (large, 140)]:
+        image[y:y + h, x:x + w] = text_screen(level, 250, (x, y, w, h))[y:y + h, x:x + w]
+    checker = ContrastChecker()
+    stats = RegionStats(image)
+
+    measured = checker.measure(stats, [dim, faint, crisp, large])
+    assert measured['required'].tolist() == [AA_NORMAL, AA_NORMAL, AA_NORMAL, AA_LARGE]
+    assert measured['passes'].tolist() == [False, False, True, True]
+    failures = checker.failures(stats, [dim, faint, crisp, large])
+    assert [(f['x'], f['y']) for f in failures] == [(20, 60), (20, 20)]
+    assert failures[0]['ratio'] < failures[1]['ratio'] < AA_NORMAL
+    assert checker.failures(stats, np.zeros((0, 4))) == []
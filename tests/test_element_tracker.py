@@ -0,0 +1,151 @@
+"""Tests for element_tracker: track IDs, events, reused analysis and issue expiry"""
+
+import numpy as np
+import pytest
+
+from element_tracker import MAX_MISSED_FRAMES, ElementTracker
+
+
+def element(x, y, width, height, type='button'):
+    return {'x': x, 'y': y, 'width': width, 'height': height, 'type': type}
+
+
+def render(elements, shades=None) -> np.ndarray:
+    """White screen with each element drawn as a two-tone box; ``shades`` overrides the dark half"""
+    image = np.full((640, 360, 3), 250, dtype=np.uint8)
+    for i, e in enumerate(elements):
+        dark = (shades or {}).get(i, 40 + 50 * i)
+        image[e['y']:e['y'] + e['height'], e['x']:e['x'] + e['width']] = 200
+        image[e['y']:e['y'] + e['height'], e['x']:e['x'] + e['width'] // 2] = dark
+    return image
+
+
+@pytest.fixture
+def screen():
+    return [element(40, 100, 120, 48), element(40, 300, 280, 56, 'input_field'), element(200, 100, 120, 48)]
+
+
+def update(tracker, elements, shades=None):
+    elements = [dict(e) for e in elements]
+    events = tracker.update(elements, render(elements, shades))
+    return elements, events
+
+
+def test_new_elements_get_ids_that_persist(screen):
+    tracker = ElementTracker()
+    first, events = update(tracker, screen)
+    assert [e['track_id'] for e in first] == [1, 2, 3]
+    assert [(event['event'], event['track_id'], event['type']) for event in events] == [
+        ('appeared', 1, 'button'), ('appeared', 2, 'input_field'), ('appeared', 3, 'button')]
+
+    # Order of the detections does not matter
+    again, events = update(tracker, screen[::-1])
+    assert [e['track_id'] for e in again] == [3, 2, 1]
+    assert events == []
+    assert len(tracker.tracks) == 3
+
+
+def test_moved_element_keeps_its_id(screen):
+    tracker = ElementTracker()
+    update(tracker, screen)
+    moved = [element(40, 420, 120, 48)] + screen[1:]
+    elements, events = update(tracker, moved)
+    assert [e['track_id'] for e in elements] == [1, 2, 3]
+    assert events == [{'event': 'moved', 'track_id': 1, 'type': 'button', 'frame': 2,
+                       'x': 40, 'y': 420, 'width': 120, 'height': 48,
+                       'from': {'x': 40, 'y': 100, 'width': 120, 'height': 48}}]
+    assert tracker.stats['moved'] == 1
+
+
+def test_elements_of_another_type_do_not_continue_a_track(screen):
+    tracker = ElementTracker()
+    update(tracker, screen)
+    elements, events = update(tracker, [element(40, 100, 120, 48, 'text')] + screen[1:])
+    assert elements[0]['track_id'] == 4
+    assert [event['event'] for event in events] == ['appeared']
+
+
+def test_disappears_after_the_missed_frames(screen):
+    tracker = ElementTracker()
+    update(tracker, screen)
+    for _ in range(MAX_MISSED_FRAMES):
+        _, events = update(tracker, screen[1:])
+        assert events == []
+    _, events = update(tracker, screen[1:])
+    assert [(event['event'], event['track_id'], event['frames_seen']) for event in events] == [('disappeared', 1, 1)]
+    assert 1 not in tracker.tracks
+
+    # Coming back later starts a new track
+    elements, events = update(tracker, screen)
+    assert elements[0]['track_id'] == 4
+    assert [event['event'] for event in events] == ['appeared']
+
+
+def test_briefly_missed_element_keeps_its_id(screen):
+    tracker = ElementTracker()
+    update(tracker, screen)
+    update(tracker, screen[1:])
+    elements, events = update(tracker, screen)
+    assert [e['track_id'] for e in elements] == [1, 2, 3]
+    assert events == []
+
+
+def test_carry_forward_reuses_results_of_unchanged_elements(screen):
+    tracker = ElementTracker()
+    computed = []
+
+    def compute(elements):
+        computed.append([e['track_id'] for e in elements])
+        return [f"result {e['track_id']}" for e in elements]
+
+    elements, _ = update(tracker, screen)
+    assert tracker.carry_forward(elements, 'contrast', compute) == ['result 1', 'result 2', 'result 3']
+    elements, _ = update(tracker, screen)
+    assert tracker.carry_forward(elements, 'contrast', compute) == ['result 1', 'result 2', 'result 3']
+    assert computed == [[1, 2, 3]]
+
+    # A restyled element keeps its track but is analysed again; so is a moved one
+    elements, _ = update(tracker, [element(40, 420, 120, 48)] + screen[1:], shades={2: 10})
+    tracker.carry_forward(elements, 'contrast', compute)
+    assert computed == [[1, 2, 3], [1, 3]]
+    assert tracker.stats['reused'] == 4
+    assert tracker.stats['computed'] == 5
+
+
+def test_new_issues_reports_element_issues_once_per_track(screen):
+    tracker = ElementTracker()
+
+    def issues_for(elements):
+        button = elements[0]
+        return [{'type': 'low_contrast', 'description': f"Text at ({button['x']}, {button['y']})",
+                 'element': {k: button[k] for k in ('x', 'y', 'width', 'height')}},
+                {'type': 'slow_render', 'description': 'Frame took 40 ms'}]
+
+    elements, _ = update(tracker, screen)
+    assert len(tracker.new_issues(issues_for(elements), elements)) == 2
+    elements, _ = update(tracker, screen)
+    assert tracker.new_issues(issues_for(elements), elements) == []
+
+    # The element moves: its issue has a new description but the same track
+    elements, _ = update(tracker, [element(40, 420, 120, 48)] + screen[1:])
+    assert tracker.new_issues(issues_for(elements), elements) == []
+
+
+def test_new_issues_expire_after_the_missed_frames(screen):
+    tracker = ElementTracker()
+    issue = [{'type': 'slow_render', 'description': 'Frame took 40 ms'}]
+    elements, _ = update(tracker, screen)
+    assert tracker.new_issues(issue, elements) == issue
+    for _ in range(MAX_MISSED_FRAMES):
+        elements, _ = update(tracker, screen)
+        tracker.new_issues([], elements)
+    elements, _ = update(tracker, screen)
+    assert tracker.new_issues(issue, elements) == []
+    assert tracker.reported_issues
+
+    for _ in range(MAX_MISSED_FRAMES + 1):
+        elements, _ = update(tracker, screen)
+        tracker.new_issues([], elements)
+    assert tracker.reported_issues == {}
+    elements, _ = update(tracker, screen)
+    assert tracker.new_issues(issue, elements) == issue
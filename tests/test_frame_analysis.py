@@ -0,0 +1,72 @@
+"""Tests for frame_analysis: dirty-region patching against full analyses"""
+
+import numpy as np
+import pytest
+
+from change_detector import ChangeDetector
+from frame_analysis import FrameAnalysis
+
+
+def base_screen() -> np.ndarray:
+    image = np.full((640, 360, 3), 245, dtype=np.uint8)
+    image[40:80, 24:336] = 40       # title bar
+    image[120:160, 24:200] = 90     # text line
+    image[200:250, 24:336] = 120    # input field
+    return image
+
+
+def add_button(image: np.ndarray, x: int, y: int) -> np.ndarray:
+    image = image.copy()
+    image[y:y + 48, x:x + 140] = (200, 80, 30)
+    return image
+
+
+def add_dots(image: np.ndarray, x: int, y: int) -> np.ndarray:
+    """Sixteen dark dots in one 32 px tile, one per 4x4 cell, so each cell moves by less than the tolerance"""
+    image = image.copy()
+    for k in range(16):
+        image[y + 4 * (k // 8) + k % 4, x + 4 * (k % 8) + 1] = 55
+    return image
+
+
+def sorted_boxes(boxes: np.ndarray) -> list:
+    return sorted(map(tuple, np.asarray(boxes).tolist()))
+
+
+def screen_sequence():
+    screen = base_screen()
+    yield screen
+    # A button appears; dots far from it change their cells by less than the tolerance
+    screen = add_dots(add_button(screen, 180, 400), 64, 512)
+    yield screen
+    # The button moves
+    screen[400:448, 180:320] = 245
+    screen = add_button(screen, 40, 300)
+    yield screen
+    # The text line gets longer and a dialog covers the bottom
+    screen[120:160, 200:300] = 90
+    screen[480:600, 20:340] = 60
+    yield screen
+
+
+@pytest.mark.parametrize('scale', [1.0, 0.5])
+def test_patched_analysis_matches_full_analysis_over_a_sequence(scale):
+    detector = ChangeDetector()
+    analysis = None
+    for step, screen in enumerate(screen_sequence()):
+        change = detector.update(screen)
+        assert change['changed'], f"step {step} should be a reported change"
+        if analysis is None:
+            analysis = FrameAnalysis(screen, scale=scale)
+        else:
+            analysis = analysis.patched(screen, change['boxes'])
+        assert sorted_boxes(analysis.boxes) == sorted_boxes(FrameAnalysis(screen, scale=scale).boxes), step
+
+
+def test_sub_tolerance_cells_of_an_accepted_change_are_dirty():
+    detector = ChangeDetector()
+    detector.update(base_screen())
+    change = detector.update(add_dots(add_button(base_screen(), 180, 400), 64, 512))
+    # Only the button is above the tolerance, but the dots are reported as well
+    assert change['changed_pixels'] == 140 * 48
+    assert sorted_boxes(change['boxes']) == [(64, 512, 32, 8), (180, 400, 140, 48)]
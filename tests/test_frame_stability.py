@@ -0,0 +1,111 @@
+"""Tests for frame_stability: settling, spinner detection and the async wait"""
+
+import asyncio
+import itertools
+
+import numpy as np
+import pytest
+
+from frame_stability import FrameStability, wait_until_stable
+
+
+def base_screen() -> np.ndarray:
+    image = np.full((640, 360, 3), 245, dtype=np.uint8)
+    image[40:80, 24:336] = 40       # title bar
+    image[200:250, 24:336] = 120    # input field
+    return image
+
+
+def other_screen() -> np.ndarray:
+    image = np.full((640, 360, 3), 30, dtype=np.uint8)
+    image[300:500, 40:320] = 200    # dialog
+    return image
+
+
+def spinner_frames():
+    """A faint dot turning around the corner shared by four tiles, always within the tolerance"""
+    corners = [(312, 152), (312, 168), (328, 168), (328, 152)]
+    for y, x in itertools.cycle(corners):
+        image = base_screen()
+        image[y - 4:y + 4, x - 4:x + 4] = 225
+        yield image
+
+
+def test_settles_after_the_configured_number_of_samples():
+    stability = FrameStability(samples=3)
+    assert [stability.update(base_screen()) for _ in range(4)] == [False, False, True, True]
+    assert not stability.spinner_seen
+
+
+def test_full_screen_change_resets_the_count():
+    stability = FrameStability(samples=3)
+    for _ in range(3):
+        stability.update(base_screen())
+    assert stability.stable
+    assert not stability.update(other_screen())
+    assert stability.agreeing == 1
+    assert [stability.update(other_screen()) for _ in range(2)] == [False, True]
+
+
+def test_spinner_keeps_the_screen_unstable():
+    stability = FrameStability(samples=3)
+    frames = spinner_frames()
+    results = [stability.update(next(frames)) for _ in range(10)]
+    # The dot never moves a tile past the tolerance, so only the spinner rule holds the screen back
+    assert stability.agreeing == 10
+    assert not any(results)
+    assert stability.spinner_visible
+    assert stability.spinner_seen
+
+    # Once it stops turning the screen is stable again
+    last = next(frames)
+    stability.update(last)
+    assert stability.update(last)
+
+
+def test_tiles_follow_the_frame_scale():
+    assert FrameStability(scale=0.5).tile_size == 16
+    stability = FrameStability(samples=2, scale=0.5)
+    half = base_screen()[::2, ::2]
+    assert [stability.update(half) for _ in range(2)] == [False, True]
+    assert stability.signature.shape == (20, 12)
+
+
+def stub_capture(frames):
+    """Blocking capture callable that replays ``frames`` and then repeats the last one"""
+    frames = iter(frames)
+    last = [None]
+
+    def capture():
+        last[0] = next(frames, last[0])
+        return last[0]
+    return capture
+
+
+def test_wait_until_stable_returns_once_settled():
+    capture = stub_capture([other_screen(), base_screen(), None, base_screen(), base_screen()])
+    result = asyncio.run(wait_until_stable(capture, timeout=5.0, interval=0.0))
+    assert result['stable']
+    assert result['samples'] == 4
+    assert not result['spinner_seen']
+    assert np.array_equal(result['frame'], base_screen())
+
+
+def test_wait_until_stable_gives_up_after_the_timeout():
+    frames = itertools.cycle([base_screen(), other_screen()])
+    result = asyncio.run(wait_until_stable(lambda: next(frames), timeout=0.2, interval=0.01))
+    assert not result['stable']
+    assert result['waited'] == pytest.approx(0.2, abs=0.15)
+    assert result['samples'] > 1
+
+
+def test_wait_until_stable_reports_a_spinner_and_failed_captures():
+    frames = spinner_frames()
+    spinning = asyncio.run(wait_until_stable(lambda: next(frames), timeout=0.2, interval=0.01))
+    assert not spinning['stable']
+    assert spinning['spinner_seen']
+
+    failing = asyncio.run(wait_until_stable(lambda: None, timeout=0.05, interval=0.01))
+    assert failing['samples'] == 0
+    assert failing['frame'] is None
+    assert not failing['stable']
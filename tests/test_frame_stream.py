@@ -0,0 +1,154 @@
+"""Tests for frame_stream: the ring buffer and restarts of a stand-in recording pipe"""
+
+import os
+import shlex
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+import frame_stream
+from capture import SIMCTL_ENV
+from frame_stream import FFMPEG_ENV, IDB_ENV, FrameRingBuffer, FrameStream
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def frame(value: int) -> np.ndarray:
+    return np.full((4, 6, 3), value, dtype=np.uint8)
+
+
+def values(frames) -> list:
+    return [(timestamp, int(image[0, 0, 0])) for timestamp, image in frames]
+
+
+@pytest.fixture
+def ring():
+    ring = FrameRingBuffer(3, (4, 6, 3))
+    for timestamp in (1.0, 2.0, 3.0):
+        ring.push(frame(int(timestamp * 10)), timestamp)
+    return ring
+
+
+def test_empty_ring_has_no_frames():
+    ring = FrameRingBuffer(3, (4, 6, 3))
+    assert ring.latest() is None
+    assert ring.at(10.0) is None
+    assert ring.between(0.0, 10.0) == []
+
+
+def test_latest_only_returns_newer_frames(ring):
+    assert values([ring.latest()]) == [(3.0, 30)]
+    assert values([ring.latest(after=2.5)]) == [(3.0, 30)]
+    assert ring.latest(after=3.0) is None
+
+
+def test_reserved_slot_is_hidden_until_committed(ring):
+    index, slot = ring.reserve()
+    # The oldest frame is being overwritten
+    assert values(ring.between(0.0, 10.0)) == [(2.0, 20), (3.0, 30)]
+    assert ring.at(1.5) is None
+    slot[:] = 40
+    ring.commit(index, 4.0)
+    assert values(ring.between(0.0, 10.0)) == [(2.0, 20), (3.0, 30), (4.0, 40)]
+    assert values([ring.latest()]) == [(4.0, 40)]
+    assert ring.frames_written == 4
+
+
+def test_at_and_between_select_by_timestamp(ring):
+    assert values([ring.at(2.5)]) == [(2.0, 20)]
+    assert values([ring.at(3.0)]) == [(3.0, 30)]
+    assert values(ring.between(1.5, 3.0)) == [(2.0, 20), (3.0, 30)]
+    assert ring.between(3.5, 9.0) == []
+
+
+def test_reads_are_copies_unless_asked_otherwise(ring):
+    _, copied = ring.latest()
+    _, view = ring.latest(copy=False)
+    ring.push(frame(99), 4.0)
+    ring.push(frame(99), 5.0)
+    ring.push(frame(99), 6.0)
+    assert int(copied[0, 0, 0]) == 30
+    assert int(view[0, 0, 0]) == 99
+
+
+def test_wait_latest_wakes_on_commit_or_times_out(ring):
+    assert ring.wait_latest(after=3.0, timeout=0.05) is None
+    writer = threading.Timer(0.05, ring.push, (frame(40), 4.0))
+    writer.start()
+    assert values([ring.wait_latest(after=3.0, timeout=2.0)]) == [(4.0, 40)]
+    writer.join()
+
+
+@pytest.fixture
+def stand_ins(monkeypatch, tmp_path):
+    """Screenshots, the recorder and ffmpeg replaced by the fixture scripts"""
+    screenshot = np.full((80, 60, 3), 200, dtype=np.uint8)
+    _, encoded = cv2.imencode('.png', screenshot)
+    (tmp_path / 'screen.png').write_bytes(encoded.tobytes())
+    python = shlex.quote(sys.executable)
+    monkeypatch.setenv(SIMCTL_ENV, f"{python} {shlex.quote(os.path.join(FIXTURES_DIR, 'fake_capture_tool.py'))}")
+    monkeypatch.setenv(IDB_ENV, f"{python} {shlex.quote(os.path.join(FIXTURES_DIR, 'fake_capture_tool.py'))}")
+    monkeypatch.setenv(FFMPEG_ENV, f"{python} {shlex.quote(os.path.join(FIXTURES_DIR, 'fake_frame_decoder.py'))}")
+    monkeypatch.setenv('FAKE_CAPTURE_OUTPUT', str(tmp_path / 'screen.png'))
+    monkeypatch.setenv('FAKE_DECODER_RUNS', str(tmp_path / 'decoder_runs.txt'))
+    monkeypatch.setattr(frame_stream, 'RESTART_DELAY', 0.01)
+    return tmp_path / 'decoder_runs.txt'
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return condition()
+
+
+def test_stream_restarts_a_recording_that_ends(stand_ins, monkeypatch):
+    monkeypatch.setenv('FAKE_DECODER_FRAMES', '2')
+    stream = FrameStream('ios', fps=15, capacity=8)
+    try:
+        assert stream.start()
+        assert stream.mode == 'stream'
+        assert wait_for(lambda: stream.restarts >= 2)
+        assert stream.mode == 'stream'
+    finally:
+        stream.stop()
+    # Decoded frames of a run are 10 and 20; the half frame a decoder left behind is never published
+    decoded = [int(image[0, 0, 0]) for _, image in stream.buffer.between(0.0, float('inf'))]
+    assert set(decoded) <= {200, 10, 20}
+    assert 20 in decoded
+    assert stream.processes == []
+
+
+def test_stream_falls_back_to_polling_when_restarts_deliver_nothing(stand_ins, monkeypatch):
+    monkeypatch.setenv('FAKE_DECODER_FRAMES', '3,0')
+    stream = FrameStream('ios', fps=15, capacity=16, poll_interval=0.01)
+    try:
+        assert stream.start()
+        assert wait_for(lambda: stream.mode == 'poll')
+        assert stream.restarts == frame_stream.MAX_STREAM_FAILURES
+        assert 'falling back to polling' in stream.last_error
+        written = stream.buffer.frames_written
+        assert wait_for(lambda: stream.buffer.frames_written > written)
+        timestamp, image = stream.next_frame()
+        assert image.shape == (80, 60, 3)
+        assert int(image[0, 0, 0]) == 200
+    finally:
+        stream.stop()
+    assert len(stand_ins.read_text().splitlines()) == frame_stream.MAX_STREAM_FAILURES + 1
+
+
+def test_missing_recorder_polls_from_the_start(stand_ins, monkeypatch, tmp_path):
+    monkeypatch.setenv(IDB_ENV, str(tmp_path / 'missing-idb'))
+    stream = FrameStream('ios', poll_interval=0.01)
+    try:
+        assert stream.start()
+        assert stream.mode == 'poll'
+        assert stream.last_error == "Screen recorder or ffmpeg not found"
+        assert stream.next_frame(after=stream.buffer.latest()[0], timeout=2.0) is not None
+    finally:
+        stream.stop()
+    assert not stand_ins.exists()
@@ -0,0 +1,92 @@
+"""Tests for layout_shift: frame scores, transition frames and the loading window"""
+
+import pytest
+
+from layout_shift import LayoutShiftMeter, frame_shift, shift_rating
+
+SHAPE = (800, 400, 3)
+
+
+def moved(x, y, width, height, from_x, from_y, track_id=1):
+    return {'event': 'moved', 'track_id': track_id, 'x': x, 'y': y, 'width': width, 'height': height,
+            'from': {'x': from_x, 'y': from_y, 'width': width, 'height': height}}
+
+
+def appeared(track_id):
+    return {'event': 'appeared', 'track_id': track_id, 'x': 0, 'y': 0, 'width': 10, 'height': 10}
+
+
+def test_frame_score_is_impact_times_distance():
+    # A full-width 100 px banner pushed down by 100 px disturbs 200 of 800 rows
+    shift = frame_shift([moved(0, 200, 400, 100, 0, 100)], SHAPE)
+    assert shift['impact'] == pytest.approx(0.25)
+    assert shift['distance'] == pytest.approx(100 / 800)
+    assert shift['score'] == pytest.approx(0.25 * 0.125)
+    assert shift['moved'] == 1
+
+
+def test_overlapping_moves_count_their_union_and_the_largest_distance():
+    events = [moved(0, 150, 400, 100, 0, 100, 1), moved(0, 260, 200, 40, 0, 250, 2), appeared(3)]
+    shift = frame_shift(events, SHAPE)
+    # Rows 100-250 of the banner and rows 250-300 of the half-width button
+    assert shift['impact'] == pytest.approx((400 * 150 + 200 * 50) / (400 * 800))
+    assert shift['distance'] == pytest.approx(50 / 800)
+    assert shift['moved'] == 2
+
+
+def test_frame_without_moves_scores_nothing():
+    assert frame_shift([appeared(1)], SHAPE) == {'score': 0.0, 'impact': 0.0, 'distance': 0.0, 'moved': 0}
+
+
+@pytest.mark.parametrize('score, rating', [(0.0, 'good'), (0.1, 'good'), (0.2, 'needs_improvement'),
+                                           (0.25, 'needs_improvement'), (0.3, 'poor')])
+def test_rating_uses_the_web_vitals_thresholds(score, rating):
+    assert shift_rating(score) == rating
+
+
+def test_moves_within_the_loading_window_add_up():
+    meter = LayoutShiftMeter(loading_window=5.0)
+    banner = moved(0, 200, 400, 100, 0, 100)
+    first = meter.record([appeared(1), appeared(2), appeared(3)], 3, SHAPE, timestamp=10.0)
+    assert (first['screen'], first['score'], first['loading']) == ('screen_1', 0.0, True)
+
+    meter.record([banner], 3, SHAPE, timestamp=11.0)
+    second = meter.record([banner], 3, SHAPE, timestamp=15.0)
+    assert second['frame_score'] == pytest.approx(0.0312, abs=1e-4)
+    assert second['score'] == pytest.approx(0.0625)
+    assert second['rating'] == 'good'
+
+    # After the window the screen is loaded and later moves are not layout shifts
+    late = meter.record([banner], 3, SHAPE, timestamp=15.5)
+    assert late['loading'] is False
+    assert late['frame_score'] > 0
+    assert late['score'] == pytest.approx(0.0625)
+    assert meter.report() == [{'screen': 'screen_1', 'score': 0.0625, 'rating': 'good', 'frames': 4,
+                               'shifts': [{'time': 1.0, 'score': 0.0312, 'moved': 1},
+                                          {'time': 5.0, 'score': 0.0312, 'moved': 1}]}]
+
+
+def test_moves_of_a_transition_frame_are_not_scored():
+    meter = LayoutShiftMeter()
+    banner = moved(0, 200, 400, 100, 0, 100)
+    # The first frame of a session is a transition, even if something moved in it
+    assert meter.record([banner], 1, SHAPE, timestamp=0.0)['score'] == 0.0
+
+    # Most elements are new: another screen slid in, carrying the banner with it
+    navigated = meter.record([banner, appeared(2), appeared(3)], 4, SHAPE, timestamp=1.0)
+    assert navigated['screen'] == 'screen_2'
+    assert (navigated['frame_score'], navigated['score']) == (0.0, 0.0)
+
+    # A named screen change starts a new screen as well
+    named = meter.record([banner], 4, SHAPE, timestamp=2.0, screen='settings')
+    assert (named['screen'], named['score']) == ('settings', 0.0)
+    assert meter.record([banner], 4, SHAPE, timestamp=3.0, screen='settings')['score'] > 0
+    assert [screen['screen'] for screen in meter.report()] == ['screen_1', 'screen_2', 'settings']
+
+
+def test_few_new_elements_do_not_start_a_new_screen():
+    meter = LayoutShiftMeter()
+    meter.record([appeared(i) for i in range(6)], 6, SHAPE, timestamp=0.0)
+    result = meter.record([appeared(7), moved(0, 200, 400, 100, 0, 100)], 7, SHAPE, timestamp=0.5)
+    assert result['screen'] == 'screen_1'
+    assert result['score'] > 0
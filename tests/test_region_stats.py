@@ -0,0 +1,66 @@
+"""Tests for region_stats: integral-image statistics against direct NumPy reductions"""
+
+import numpy as np
+import pytest
+
+from region_stats import RegionStats, grid_boxes
+
+
+@pytest.fixture
+def gray():
+    return np.random.default_rng(7).integers(0, 256, size=(97, 131), dtype=np.uint8)
+
+
+def test_grid_boxes_tile_the_frame():
+    boxes = grid_boxes(131, 97, 3, 4)
+    assert boxes.shape == (12, 4)
+    assert boxes[:, 2].reshape(3, 4).sum(axis=1).tolist() == [131] * 3
+    assert boxes[:, 3].reshape(3, 4).sum(axis=0).tolist() == [97] * 4
+    assert (boxes[:, 2] * boxes[:, 3]).sum() == 131 * 97
+
+
+def test_box_statistics_match_numpy(gray):
+    boxes = np.array([[0, 0, 131, 97], [10, 5, 40, 30], [100, 60, 31, 37]])
+    stats = RegionStats(gray)
+    for (x, y, w, h), mean, std, dark, bright in zip(boxes, stats.mean(boxes), stats.std(boxes),
+                                                      stats.dark_fraction(boxes), stats.bright_fraction(boxes)):
+        region = gray[y:y + h, x:x + w].astype(np.float64)
+        assert mean == pytest.approx(region.mean())
+        assert std == pytest.approx(region.std())
+        assert dark == pytest.approx((region < 10).mean())
+        assert bright == pytest.approx((region > 240).mean())
+
+
+def test_single_box_and_whole_frame_return_floats(gray):
+    stats = RegionStats(gray)
+    assert isinstance(stats.mean((10, 5, 40, 30)), float)
+    assert stats.mean() == pytest.approx(gray.mean())
+    assert stats.total() == pytest.approx(gray.sum(dtype=np.float64))
+    assert stats.area() == gray.size
+
+
+def test_boxes_are_clipped_and_empty_boxes_report_zero(gray):
+    stats = RegionStats(gray)
+    assert stats.mean((120, 90, 50, 50)) == pytest.approx(gray[90:, 120:].mean())
+    assert stats.area((120, 90, 50, 50)) == 11 * 7
+    assert stats.mean((200, 200, 10, 10)) == 0.0
+    assert stats.std((5, 5, 0, 8)) == 0.0
+
+
+def test_flat_region_has_zero_variance():
+    stats = RegionStats(np.full((20, 20), 77, dtype=np.uint8))
+    assert stats.variance() == 0.0
+    assert stats.mean() == 77.0
+
+
+def test_bgr_frames_are_converted_to_gray():
+    bgr = np.zeros((10, 10, 3), dtype=np.uint8)
+    bgr[..., 1] = 255
+    assert RegionStats(bgr).mean() == pytest.approx(150, abs=1)
+
+
+def test_grid_matches_region(gray):
+    stats = RegionStats(gray)
+    grid = stats.grid(3, 4)
+    assert grid['mean'].shape == (3, 4)
+    assert grid['mean'].ravel() == pytest.approx(stats.mean(grid_boxes(131, 97, 3, 4)))
@@ -0,0 +1,108 @@
+"""Tests for template_index: region-first search, whole-frame fallback and multi-scale matching"""
+
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+import template_index
+from template_index import TemplateIndex
+
+
+def icon() -> np.ndarray:
+    """Distinctive 48x48 grayscale icon"""
+    noise = np.random.default_rng(7).integers(0, 256, (48, 48)).astype(np.uint8)
+    return cv2.GaussianBlur(noise, (5, 5), 0)
+
+
+def frame_with(template: np.ndarray, x: int, y: int, scale: float = 1.0) -> np.ndarray:
+    """720x400 frame with unrelated texture and the template pasted at (x, y), resized by scale"""
+    frame = np.tile(np.linspace(200, 240, 400, dtype=np.float32), (720, 1)).astype(np.uint8)
+    clutter = np.random.default_rng(3).integers(0, 256, (120, 300)).astype(np.uint8)
+    frame[560:680, 50:350] = cv2.GaussianBlur(clutter, (5, 5), 0)
+    pasted = template if scale == 1.0 else cv2.resize(template, None, fx=scale, fy=scale,
+                                                      interpolation=cv2.INTER_LINEAR)
+    frame[y:y + pasted.shape[0], x:x + pasted.shape[1]] = pasted
+    return frame
+
+
+@pytest.fixture
+def index():
+    index = TemplateIndex()
+    index.add('settings_icon', icon())
+    return index
+
+
+def test_first_search_covers_the_frame_then_the_last_region_is_tried_first(index):
+    frame = frame_with(icon(), 120, 200)
+    first = index.find(frame, 'settings_icon')
+    assert (first['search'], first['location'], first['scale']) == ('frame', (120, 200), 1.0)
+    assert first['confidence'] > 0.99
+
+    # A small move stays inside the predicted region
+    again = index.find(frame_with(icon(), 140, 190), 'settings_icon')
+    assert (again['search'], again['location']) == ('roi', (140, 190))
+    assert index.stats == {'roi_hits': 1, 'frame_searches': 1, 'misses': 0}
+
+
+def test_search_falls_back_to_the_whole_frame_when_the_region_misses(index):
+    index.find(frame_with(icon(), 120, 200), 'settings_icon')
+    moved = index.find(frame_with(icon(), 300, 480), 'settings_icon')
+    assert (moved['search'], moved['location']) == ('frame', (300, 480))
+    assert index.stats == {'roi_hits': 0, 'frame_searches': 2, 'misses': 0}
+
+
+def test_template_is_found_at_another_device_scale(index):
+    match = index.find(frame_with(icon(), 100, 240, scale=1.5), 'settings_icon')
+    assert match['scale'] == 1.5
+    assert match['bounds']['width'] == match['bounds']['height'] == 72
+    assert abs(match['location'][0] - 100) <= 1 and abs(match['location'][1] - 240) <= 1
+
+    # The next frame is searched at the same scale around the last match
+    assert index.find(frame_with(icon(), 110, 250, scale=1.5), 'settings_icon')['search'] == 'roi'
+
+
+def test_missing_template_forgets_its_last_match(index):
+    index.find(frame_with(icon(), 120, 200), 'settings_icon')
+    blank = np.tile(np.linspace(200, 240, 400, dtype=np.float32), (720, 1)).astype(np.uint8)
+    assert index.find(blank, 'settings_icon') is None
+    assert 'settings_icon' not in index.last_matches
+    assert index.find(frame_with(icon(), 120, 200), 'settings_icon')['search'] == 'frame'
+    assert index.stats['misses'] == 1
+
+
+def test_find_all_reduces_each_frame_once(index, monkeypatch):
+    flipped = cv2.flip(icon(), 1)
+    index.add('back_icon', flipped)
+    frame = frame_with(icon(), 120, 200)
+    frame[300:348, 250:298] = flipped
+
+    calls = []
+    original = template_index.downsample
+    monkeypatch.setattr(template_index, 'downsample', lambda image, factor: calls.append(factor) or original(image, factor))
+    matches = index.find_all(cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR))
+    assert matches['settings_icon']['location'] == (120, 200)
+    assert matches['back_icon']['location'] == (250, 300)
+    # Both templates were searched at coarse factors 0.25 and 0.5, each built once
+    assert sorted(calls) == [0.25, 0.5]
+
+
+def test_load_reads_a_template_file_only_when_it_changes(tmp_path, monkeypatch):
+    path = str(tmp_path / 'icon.png')
+    cv2.imwrite(path, icon())
+    index = TemplateIndex()
+    reads = []
+    original = cv2.imread
+    monkeypatch.setattr(template_index.cv2, 'imread', lambda *args: reads.append(args[0]) or original(*args))
+    assert index.load(path) == path
+    index.load(path)
+    assert reads == [path]
+
+    cv2.imwrite(path, cv2.flip(icon(), 0))
+    os.utime(path, (1, 1))
+    index.load(path)
+    assert reads == [path, path]
+    (tmp_path / 'broken.png').write_bytes(b'not an image')
+    with pytest.raises(ValueError):
+        index.load(str(tmp_path / 'broken.png'))
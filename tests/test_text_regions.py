@@ -0,0 +1,71 @@
+"""Tests for text_regions: text lines from both backends, in device pixels at any analysis scale"""
+
+import cv2
+import numpy as np
+import pytest
+
+from frame_analysis import downsample
+from text_regions import TextRegionDetector, boxes_mask
+
+# OpenCV 5's MSER finds no regions in flat synthetic frames; requirements.txt pins OpenCV 4.8
+BACKENDS = [
+    pytest.param('mser', marks=pytest.mark.skipif(int(cv2.__version__.split('.')[0]) >= 5,
+                                                 reason='MSER needs the pinned OpenCV 4')),
+    'gradient',
+]
+LINES = [("Welcome Back", (40, 120), 1.0), ("Sign in to continue", (40, 220), 0.8)]
+
+
+def sign_in_screen() -> np.ndarray:
+    """Grayscale screen with two lines of dark text and a flat bar that is not text"""
+    image = np.full((720, 400), 245, dtype=np.uint8)
+    for text, origin, font_scale in LINES:
+        cv2.putText(image, text, origin, cv2.FONT_HERSHEY_SIMPLEX, font_scale, 30, 2, cv2.LINE_AA)
+    image[400:460, 40:360] = 90
+    return image
+
+
+def ink_boxes(image: np.ndarray) -> np.ndarray:
+    """Bounding box of the dark pixels of each text line"""
+    boxes = []
+    for _, (_, baseline), _ in LINES:
+        ys, xs = np.nonzero(image[baseline - 40:baseline + 20] < 200)
+        boxes.append((xs.min(), ys.min() + baseline - 40, xs.max() - xs.min() + 1, ys.max() - ys.min() + 1))
+    return np.array(boxes)
+
+
+@pytest.mark.parametrize('scale', [1.0, 0.5])
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_finds_each_text_line_in_device_pixels(backend, scale):
+    screen = sign_in_screen()
+    boxes = TextRegionDetector(backend).detect(downsample(screen, scale), scale)
+    device_boxes = boxes[np.argsort(boxes[:, 1])] / scale
+
+    # One box per line, the bar left out, edges within a couple of analysis pixels of the ink
+    expected = ink_boxes(screen)
+    assert len(device_boxes) == len(expected)
+    corners = np.hstack([device_boxes[:, :2], device_boxes[:, :2] + device_boxes[:, 2:]])
+    expected_corners = np.hstack([expected[:, :2], expected[:, :2] + expected[:, 2:]])
+    assert np.abs(corners - expected_corners).max() <= 3 / scale
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_blank_screen_has_no_text(backend):
+    blank = np.full((720, 400), 245, dtype=np.uint8)
+    blank[400:460, 40:360] = 90
+    detector = TextRegionDetector(backend)
+    assert len(detector.detect(blank)) == 0
+    assert len(detector.detect(downsample(blank, 0.5), 0.5)) == 0
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        TextRegionDetector('tesseract')
+
+
+def test_boxes_mask_covers_boxes_clipped_to_the_image():
+    mask = boxes_mask(np.array([[2, 1, 3, 2], [4, 2, 10, 10]]), (6, 8))
+    expected = np.zeros((6, 8), dtype=np.uint8)
+    expected[1:3, 2:5] = 1
+    expected[2:6, 4:8] = 1
+    assert np.array_equal(mask, expected)
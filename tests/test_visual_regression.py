@@ -0,0 +1,108 @@
+"""Tests for visual_regression: baselines, the identical-frame exit, ignore regions and heatmaps"""
+
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+import visual_regression
+from visual_regression import VisualRegression
+
+
+def screen() -> np.ndarray:
+    """390x844 sign-in screen with a textured card, a button and a status bar clock"""
+    image = np.full((844, 390, 3), 245, dtype=np.uint8)
+    image[120:420, 24:366] = np.random.default_rng(0).integers(180, 230, (300, 342, 3), dtype=np.uint8)
+    image[480:536, 40:350] = (200, 80, 30)
+    cv2.putText(image, "9:41", (20, 34), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
+    return image
+
+
+def save(tmp_path, name: str, image: np.ndarray) -> str:
+    path = str(tmp_path / f'{name}.png')
+    cv2.imwrite(path, image)
+    return path
+
+
+@pytest.fixture
+def regression(tmp_path):
+    return VisualRegression(golden_dir=str(tmp_path / 'goldens'), diff_dir=str(tmp_path / 'diffs'))
+
+
+@pytest.fixture
+def golden(regression, tmp_path):
+    result = regression.compare(save(tmp_path, 'golden', screen()), 'sign_in', 'iPhone 15', 'light')
+    assert result['status'] == 'baseline_created'
+    return result
+
+
+def test_first_capture_becomes_the_baseline(regression, golden, tmp_path):
+    assert golden['passed']
+    base = regression.golden_base('sign_in', 'iPhone 15', 'light')
+    assert base == str(tmp_path / 'goldens' / 'iPhone_15' / 'light' / 'sign_in')
+    assert golden['golden'] == base + '.png'
+    assert all(os.path.exists(base + ext) for ext in ('.png', '.npz', '.json'))
+
+    strict = VisualRegression(golden_dir=str(tmp_path / 'goldens'), record_missing=False)
+    missing = strict.compare(save(tmp_path, 'home', screen()), 'home', 'iPhone 15', 'light')
+    assert (missing['status'], missing['passed']) == ('missing_golden', False)
+    assert not strict.has_golden('home', 'iPhone 15', 'light')
+
+
+def test_identical_capture_returns_before_any_ssim(regression, golden, tmp_path, monkeypatch):
+    def no_ssim(*args):
+        raise AssertionError("SSIM computed for an identical frame")
+
+    monkeypatch.setattr(visual_regression, 'tile_ssim', no_ssim)
+    result = regression.compare(save(tmp_path, 'again', screen()), 'sign_in', 'iPhone 15', 'light')
+    assert (result['status'], result['passed']) == ('passed', True)
+    assert (result['changed_tiles'], result['min_ssim'], result['diff_path']) == (0, 1.0, None)
+
+
+def test_status_bar_changes_are_ignored(regression, golden, tmp_path):
+    later = screen()
+    later[10:45, 10:120] = 245
+    cv2.putText(later, "10:02", (20, 34), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
+    path = save(tmp_path, 'later', later)
+
+    result = regression.compare(path, 'sign_in', 'iPhone 15', 'light')
+    assert result['passed']
+    assert result['changed_tiles'] == 0
+
+    unmasked = VisualRegression(golden_dir=regression.golden_dir, diff_dir=regression.diff_dir, ignore=())
+    result = unmasked.compare(path, 'sign_in', 'iPhone 15', 'light')
+    assert not result['passed']
+    assert all(region['y'] < 64 for region in result['regions'])
+
+
+def test_explicit_ignore_boxes_mask_their_area(regression, golden, tmp_path):
+    restyled = screen()
+    restyled[480:536, 40:350] = (30, 160, 30)
+    path = save(tmp_path, 'restyled', restyled)
+    assert not regression.compare(path, 'sign_in', 'iPhone 15', 'light')['passed']
+    assert regression.compare(path, 'sign_in', 'iPhone 15', 'light', ignore=[(40, 480, 310, 56)])['passed']
+
+
+def test_real_difference_fails_with_a_heatmap(regression, golden, tmp_path):
+    restyled = screen()
+    restyled[480:536, 40:350] = (30, 160, 30)
+    result = regression.compare(save(tmp_path, 'restyled', restyled), 'sign_in', 'iPhone 15', 'light')
+    assert (result['status'], result['passed']) == ('failed', False)
+    assert result['failed_tiles'] > 0
+
+    # The failed tiles merge into one device-pixel region around the button
+    assert len(result['regions']) == 1
+    region = result['regions'][0]
+    assert region['x'] <= 40 and region['x'] + region['width'] >= 350
+    assert region['y'] <= 480 and region['y'] + region['height'] >= 536
+
+    assert result['diff_path'] == str(tmp_path / 'diffs' / 'iPhone_15' / 'light' / 'sign_in_diff.png')
+    heatmap = cv2.imread(result['diff_path'])
+    assert heatmap.shape == (422, 195, 3)
+
+
+def test_capture_of_another_size_is_reported(regression, golden, tmp_path):
+    result = regression.compare(save(tmp_path, 'small', screen()[:800]), 'sign_in', 'iPhone 15', 'light')
+    assert (result['status'], result['passed']) == ('size_mismatch', False)
+    assert result['error'] == "Capture is 390x800, golden is 390x844"
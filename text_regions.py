@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Text Region Engine for Project Watch Tower
+Finds text lines in a grayscale screenshot with a reusable MSER detector or a
+faster morphological-gradient pass, grouping character boxes into lines in bulk.
+"""
+
+import argparse
+import glob
+import time
+from typing import List
+
+import cv2
+import numpy as np
+
+from frame_analysis import downsample
+
+BACKENDS = ('mser', 'gradient')
+
+# Thresholds in device pixels; they are scaled with the analysis scale
+MIN_REGION_PIXELS = 10
+# MSER's own area limit counts pixels of the analyzed image, so larger regions
+# are dropped here at the device-pixel limit (MSER's default max_area)
+MAX_REGION_PIXELS = 14400
+MAX_CHAR_HEIGHT = 80
+MIN_LINE_HEIGHT = 6
+MIN_LINE_WIDTH = 8
+# Characters and words closer than this on the same row belong to one line
+LINE_GAP = 20
+# Share of a gradient line box that must be edge pixels
+MIN_GRADIENT_FILL = 0.25
+
+
+def boxes_mask(boxes: np.ndarray, shape) -> np.ndarray:
+    """uint8 mask covering every (x, y, w, h) box, rasterized with one 2-D prefix sum"""
+    height, width = shape[:2]
+    boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+    x0 = boxes[:, 0].clip(0, width)
+    y0 = boxes[:, 1].clip(0, height)
+    x1 = (boxes[:, 0] + boxes[:, 2]).clip(0, width)
+    y1 = (boxes[:, 1] + boxes[:, 3]).clip(0, height)
+
+    # +1/-1 at the corners of each box; the running sums count covering boxes per pixel
+    corners = np.zeros((height + 1, width + 1), dtype=np.int32)
+    np.add.at(corners, (y0, x0), 1)
+    np.add.at(corners, (y0, x1), -1)
+    np.add.at(corners, (y1, x0), -1)
+    np.add.at(corners, (y1, x1), 1)
+    coverage = corners.cumsum(axis=0).cumsum(axis=1)[:height, :width]
+    return (coverage > 0).view(np.uint8)
+
+
+def line_boxes(mask: np.ndarray, gap: int) -> np.ndarray:
+    """Join mask blobs that are less than ``gap`` apart on a row and box each line"""
+    if gap > 1:
+        # A horizontal closing only fills gaps between pixels of the same row,
+        # so the lines do not grow past their outermost characters
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (gap, 1))
+        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    return stats[1:count, :4].astype(np.int32)
+
+
+def box_sums(integral: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    """Sum of the integrated image over each box, read from its integral image"""
+    x0, y0 = boxes[:, 0], boxes[:, 1]
+    x1, y1 = x0 + boxes[:, 2], y0 + boxes[:, 3]
+    return integral[y1, x1] - integral[y0, x1] - integral[y1, x0] + integral[y0, x0]
+
+
+class TextRegionDetector:
+    """Text line detector with a choice of backend
+
+    ``mser`` keeps one MSER detector for its lifetime and takes the region
+    bounding boxes it already computes, so no per-region work happens in
+    Python. ``gradient`` thresholds the morphological gradient instead, which
+    is several times faster and finds similar lines on flat UI screenshots.
+    Both backends merge overlapping and adjacent character boxes into text
+    lines and return (x, y, w, h) boxes in the pixels of the given image.
+    """
+
+    def __init__(self, backend: str = 'mser', line_gap: int = LINE_GAP):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown text region backend: {backend}")
+        self.backend = backend
+        self.line_gap = line_gap
+        self.mser = cv2.MSER_create() if backend == 'mser' else None
+        self.gradient_kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+
+    def detect(self, gray: np.ndarray, scale: float = 1.0) -> np.ndarray:
+        """Text line boxes in a grayscale image analyzed at ``scale`` of the device resolution"""
+        gap = max(1, int(round(self.line_gap * scale)))
+        if self.backend == 'mser':
+            boxes = self._mser_lines(gray, scale, gap)
+        else:
+            boxes = self._gradient_lines(gray, scale, gap)
+
+        keep = ((boxes[:, 3] >= MIN_LINE_HEIGHT * scale) &
+                (boxes[:, 2] >= MIN_LINE_WIDTH * scale))
+        return boxes[keep]
+
+    def _mser_lines(self, gray: np.ndarray, scale: float, gap: int) -> np.ndarray:
+        regions, boxes = self.mser.detectRegions(gray)
+        if len(regions) == 0:
+            return np.zeros((0, 4), dtype=np.int32)
+
+        # The returned boxes are the regions' bounding rectangles, which is what a
+        # convex hull followed by boundingRect produced for each region
+        sizes = np.fromiter(map(len, regions), dtype=np.int64, count=len(regions))
+        keep = ((sizes > MIN_REGION_PIXELS * scale * scale) & (sizes <= MAX_REGION_PIXELS * scale * scale) &
+                (boxes[:, 3] <= MAX_CHAR_HEIGHT * scale))
+        return line_boxes(boxes_mask(boxes[keep], gray.shape), gap)
+
+    def _gradient_lines(self, gray: np.ndarray, scale: float, gap: int) -> np.ndarray:
+        gradient = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, self.gradient_kernel)
+        _, edges = cv2.threshold(gradient, 0, 1, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+        boxes = line_boxes(edges, gap)
+
+        # Text lines are short and densely stroked; large outlines and sparse frames are not
+        fill = box_sums(cv2.integral(edges), boxes) / np.maximum(boxes[:, 2] * boxes[:, 3], 1)
+        keep = (boxes[:, 3] <= MAX_CHAR_HEIGHT * scale) & (fill >= MIN_GRADIENT_FILL)
+        return boxes[keep]
+
+
+def _legacy_mser(gray: np.ndarray, scale: float) -> List:
+    """The engine's previous detector: a new MSER per call and a hull per region"""
+    mser = cv2.MSER_create()
+    regions, _ = mser.detectRegions(gray)
+    return [cv2.boundingRect(cv2.convexHull(region))
+            for region in regions if len(region) > MIN_REGION_PIXELS * scale * scale]
+
+
+def _centres_inside(boxes: np.ndarray, others: np.ndarray) -> float:
+    """Share of boxes whose centre lies in one of the other boxes"""
+    if len(boxes) == 0:
+        return 1.0
+    cx = boxes[:, 0] + boxes[:, 2] / 2
+    cy = boxes[:, 1] + boxes[:, 3] / 2
+    inside = ((cx[:, None] >= others[None, :, 0]) & (cx[:, None] < others[None, :, 0] + others[None, :, 2]) &
+              (cy[:, None] >= others[None, :, 1]) & (cy[:, None] < others[None, :, 1] + others[None, :, 3]))
+    return float(np.mean(inside.any(axis=1)))
+
+
+def main():
+    """Benchmark the text region backends on stored screenshots"""
+    parser = argparse.ArgumentParser(description='Benchmark text region backends')
+    parser.add_argument('screenshots', nargs='*', help='Screenshots (default: real_screenshots/*.png)')
+    parser.add_argument('--scale', type=float, default=1.0, help='Analysis scale')
+    parser.add_argument('--repeat', type=int, default=5, help='Timing iterations')
+    args = parser.parse_args()
+
+    paths = args.screenshots or sorted(glob.glob('real_screenshots/*.png'))
+    detectors = {backend: TextRegionDetector(backend) for backend in BACKENDS}
+
+    def timed(fn):
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            result = fn()
+        return result, (time.perf_counter() - start) / args.repeat * 1000
+
+    for path in paths:
+        image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            print(f"❌ Could not load {path}")
+            continue
+        gray = downsample(image, args.scale)
+
+        print(f"📸 {path} ({image.shape[1]}x{image.shape[0]} at scale {args.scale})")
+        legacy, legacy_ms = timed(lambda: _legacy_mser(gray, args.scale))
+        print(f"   Legacy MSER + hull loop: {len(legacy)} regions, {legacy_ms:.1f} ms")
+
+        lines = {}
+        for backend, detector in detectors.items():
+            lines[backend], backend_ms = timed(lambda: detector.detect(gray, args.scale))
+            print(f"   {backend}: {len(lines[backend])} text lines, {backend_ms:.1f} ms")
+
+        print(f"   mser lines inside gradient lines: {_centres_inside(lines['mser'], lines['gradient']):.0%}, "
+              f"gradient lines inside mser lines: {_centres_inside(lines['gradient'], lines['mser']):.0%}")
+
+
+if __name__ == "__main__":
+    main()
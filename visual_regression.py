@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Visual Regression Engine for Project Watch Tower
+Keeps golden screenshots per screen, device and theme and compares new
+captures against them tile by tile with SSIM on downsampled frames, writing a
+diff heatmap for every failed comparison.
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+import cv2
+import numpy as np
+
+from box_set import merge_boxes
+from frame_analysis import downsample
+
+GOLDEN_DIR = "golden_screenshots"
+DIFF_DIR = "regression_diffs"
+# Frames are compared at this share of the device resolution, in tiles of this
+# many comparison pixels
+COMPARE_SCALE = 0.5
+TILE_SIZE = 32
+# A changed tile fails below this SSIM, or when any channel mean moves by more
+# than COLOR_TOLERANCE levels (SSIM alone misses pure hue changes)
+SSIM_THRESHOLD = 0.97
+COLOR_TOLERANCE = 6.0
+# Regions that change between captures without being regressions, as
+# fractions of the frame: the status bar holds the clock, battery and signal
+IGNORE_PRESETS = {
+    'status_bar': (0.0, 0.0, 1.0, 0.06),
+}
+DEFAULT_IGNORE = ('status_bar',)
+
+# SSIM stabilizing constants for 8-bit images
+_C1 = (0.01 * 255) ** 2
+_C2 = (0.03 * 255) ** 2
+
+IgnoreRegion = Union[str, Sequence[int]]
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', str(name)) or '_'
+
+
+def _init_worker():
+    # One comparison per process at a time; OpenCV's own thread pool would oversubscribe the cores
+    cv2.setNumThreads(1)
+
+
+def ignore_boxes(regions: Iterable[IgnoreRegion], width: int, height: int) -> np.ndarray:
+    """Device-pixel (x, y, w, h) boxes for preset names and explicit boxes"""
+    boxes = []
+    for region in regions:
+        if isinstance(region, str):
+            if region not in IGNORE_PRESETS:
+                raise ValueError(f"Unknown ignore region: {region}")
+            fx, fy, fw, fh = IGNORE_PRESETS[region]
+            boxes.append((round(fx * width), round(fy * height), round(fw * width), round(fh * height)))
+        else:
+            boxes.append(tuple(int(v) for v in region))
+    return np.array(boxes, dtype=np.int64).reshape(-1, 4)
+
+
+def tile_ssim(golden: np.ndarray, candidate: np.ndarray) -> np.ndarray:
+    """SSIM of each pair of (K, T, T) grayscale tiles, computed over whole tiles at once"""
+    x = golden.reshape(len(golden), -1).astype(np.float32)
+    y = candidate.reshape(len(candidate), -1).astype(np.float32)
+    mean_x = x.mean(axis=1)
+    mean_y = y.mean(axis=1)
+    var_x = x.var(axis=1)
+    var_y = y.var(axis=1)
+    cov = (x * y).mean(axis=1) - mean_x * mean_y
+    return (((2 * mean_x * mean_y + _C1) * (2 * cov + _C2)) /
+            ((mean_x ** 2 + mean_y ** 2 + _C1) * (var_x + var_y + _C2)))
+
+
+class VisualRegression:
+    """Golden-baseline screenshot comparison
+
+    Goldens live under ``golden_dir/<device>/<theme>/<screen>``: the full
+    capture as a PNG, a compressed copy downsampled to the comparison scale
+    (so a comparison decodes only the new capture), and a JSON file with the
+    ignore regions chosen at approval. Ignored regions are copied from the
+    golden into the candidate before comparing, so they always match.
+
+    Tiles whose pixels are identical pass without further work, and a frame
+    with no changed tiles returns before any SSIM is computed.
+    """
+
+    def __init__(self, golden_dir: str = GOLDEN_DIR, diff_dir: str = DIFF_DIR,
+                 scale: float = COMPARE_SCALE, tile_size: int = TILE_SIZE,
+                 ssim_threshold: float = SSIM_THRESHOLD, color_tolerance: float = COLOR_TOLERANCE,
+                 ignore: Sequence[IgnoreRegion] = DEFAULT_IGNORE, record_missing: bool = True):
+        self.golden_dir = golden_dir
+        self.diff_dir = diff_dir
+        self.scale = scale
+        self.tile_size = tile_size
+        self.ssim_threshold = ssim_threshold
+        self.color_tolerance = color_tolerance
+        self.ignore = list(ignore)
+        self.record_missing = record_missing
+
+    def settings(self) -> Dict:
+        """Constructor arguments, for rebuilding this engine in a worker process"""
+        return {
+            'golden_dir': self.golden_dir, 'diff_dir': self.diff_dir, 'scale': self.scale,
+            'tile_size': self.tile_size, 'ssim_threshold': self.ssim_threshold,
+            'color_tolerance': self.color_tolerance, 'ignore': self.ignore,
+            'record_missing': self.record_missing,
+        }
+
+    def golden_base(self, screen: str, device: str, theme: str) -> str:
+        """Golden path without extension for a screen, device and theme"""
+        return os.path.join(self.golden_dir, _safe_name(device), _safe_name(theme), _safe_name(screen))
+
+    def has_golden(self, screen: str, device: str, theme: str) -> bool:
+        return os.path.exists(self.golden_base(screen, device, theme) + '.png')
+
+    def approve(self, screenshot_path: str, screen: str, device: str, theme: str,
+                ignore: Sequence[IgnoreRegion] = ()) -> Optional[str]:
+        """Store a capture as the golden for its screen, device and theme"""
+        image = cv2.imread(screenshot_path)
+        if image is None:
+            return None
+        base = self.golden_base(screen, device, theme)
+        os.makedirs(os.path.dirname(base), exist_ok=True)
+        shutil.copyfile(screenshot_path, base + '.png')
+        self._save_reduced(base, image)
+        with open(base + '.json', 'w') as f:
+            json.dump({
+                'screen': screen, 'device': device, 'theme': theme,
+                'width': image.shape[1], 'height': image.shape[0],
+                'ignore': [region if isinstance(region, str) else list(region) for region in ignore],
+                'source': screenshot_path,
+                'approved_at': datetime.now().isoformat()
+            }, f, indent=2)
+        return base + '.png'
+
+    def _save_reduced(self, base: str, image: np.ndarray) -> np.ndarray:
+        reduced = downsample(image, self.scale)
+        np.savez_compressed(base + '.npz', image=reduced, scale=self.scale,
+                            width=image.shape[1], height=image.shape[0])
+        return reduced
+
+    def _load_golden(self, base: str):
+        """Reduced golden image, device size and metadata, rebuilding the reduced copy when stale"""
+        with open(base + '.json') as f:
+            metadata = json.load(f)
+        try:
+            if os.path.getmtime(base + '.npz') >= os.path.getmtime(base + '.png'):
+                with np.load(base + '.npz') as stored:
+                    if float(stored['scale']) == self.scale:
+                        return stored['image'], (int(stored['width']), int(stored['height'])), metadata
+        except (OSError, ValueError, KeyError):
+            pass
+        image = cv2.imread(base + '.png')
+        if image is None:
+            return None, None, metadata
+        return self._save_reduced(base, image), (image.shape[1], image.shape[0]), metadata
+
+    def compare(self, screenshot_path: str, screen: str, device: str, theme: str,
+                ignore: Sequence[IgnoreRegion] = ()) -> Dict:
+        """Compare a capture with its golden; records it as the golden when none exists"""
+        start = time.perf_counter()
+        result = {'screen': screen, 'device': device, 'theme': theme, 'screenshot': screenshot_path,
+                  'passed': False, 'diff_path': None}
+
+        base = self.golden_base(screen, device, theme)
+        if not self.has_golden(screen, device, theme):
+            if self.record_missing and self.approve(screenshot_path, screen, device, theme, ignore):
+                result.update(status='baseline_created', passed=True, golden=base + '.png')
+            else:
+                result.update(status='missing_golden')
+            result['elapsed_ms'] = (time.perf_counter() - start) * 1000
+            return result
+
+        image = cv2.imread(screenshot_path)
+        golden, golden_size, metadata = self._load_golden(base)
+        result['golden'] = base + '.png'
+        if image is None or golden is None:
+            result.update(status='error', error="Could not load screenshot or golden")
+        elif (image.shape[1], image.shape[0]) != golden_size:
+            result.update(status='size_mismatch',
+                          error=f"Capture is {image.shape[1]}x{image.shape[0]}, golden is "
+                                f"{golden_size[0]}x{golden_size[1]}")
+        else:
+            regions = self.ignore + list(metadata.get('ignore', [])) + list(ignore)
+            summary, candidate, dissimilarity = self._compare_tiles(
+                golden, downsample(image, self.scale), golden_size, regions)
+            result.update(summary)
+            if not result['passed']:
+                result['diff_path'] = self.write_heatmap(candidate, dissimilarity, result['regions'],
+                                                         screen, device, theme)
+        result['elapsed_ms'] = (time.perf_counter() - start) * 1000
+        return result
+
+    def _compare_tiles(self, golden: np.ndarray, candidate: np.ndarray, device_size, regions):
+        """Summary, masked candidate and (rows, cols) tile dissimilarity for two reduced frames"""
+        candidate = candidate.copy()
+        height, width = candidate.shape[:2]
+        for x, y, w, h in ignore_boxes(regions, *device_size).tolist():
+            # Cover every comparison pixel the device box touches
+            x0, y0 = max(int(x * self.scale), 0), max(int(y * self.scale), 0)
+            x1, y1 = min(int(np.ceil((x + w) * self.scale)), width), min(int(np.ceil((y + h) * self.scale)), height)
+            candidate[y0:y1, x0:x1] = golden[y0:y1, x0:x1]
+
+        tile = self.tile_size
+        rows, cols = -(-height // tile), -(-width // tile)
+        tiles = rows * cols
+        summary = {'status': 'passed', 'passed': True, 'tiles': tiles, 'changed_tiles': 0,
+                   'failed_tiles': 0, 'min_ssim': 1.0, 'regions': []}
+        if np.array_equal(golden, candidate):
+            return summary, candidate, None
+
+        # Pad both frames identically to whole tiles, then view them as (rows, cols, T, T, C)
+        pad = ((0, rows * tile - height), (0, cols * tile - width), (0, 0))
+        golden_tiles = np.pad(golden, pad).reshape(rows, tile, cols, tile, -1).swapaxes(1, 2)
+        candidate_tiles = np.pad(candidate, pad).reshape(rows, tile, cols, tile, -1).swapaxes(1, 2)
+        changed = np.flatnonzero((golden_tiles != candidate_tiles).any(axis=(2, 3, 4)))
+
+        golden_changed = golden_tiles.reshape(tiles, tile, tile, -1)[changed]
+        candidate_changed = candidate_tiles.reshape(tiles, tile, tile, -1)[changed]
+        channels = golden_changed.shape[-1]
+        if channels == 3:
+            weights = np.array([0.114, 0.587, 0.299], dtype=np.float32)
+            ssim = tile_ssim(golden_changed @ weights, candidate_changed @ weights)
+        else:
+            ssim = tile_ssim(golden_changed[..., 0], candidate_changed[..., 0])
+        color_shift = np.abs(golden_changed.mean(axis=(1, 2), dtype=np.float32) -
+                             candidate_changed.mean(axis=(1, 2), dtype=np.float32)).max(axis=1)
+        failed = (ssim < self.ssim_threshold) | (color_shift > self.color_tolerance)
+
+        dissimilarity = np.zeros(tiles, dtype=np.float32)
+        dissimilarity[changed] = np.maximum(1 - ssim, np.minimum(color_shift / 255 * 4, 1))
+
+        passed = not failed.any()
+        summary.update(status='passed' if passed else 'failed', passed=passed,
+                       changed_tiles=int(len(changed)), failed_tiles=int(failed.sum()),
+                       min_ssim=float(ssim.min()),
+                       regions=self._failed_regions(changed[failed], cols, device_size))
+        return summary, candidate, dissimilarity.reshape(rows, cols)
+
+    def _failed_regions(self, failed_tiles: np.ndarray, cols: int, device_size) -> List[Dict]:
+        """Failed tiles as device-pixel boxes, with neighbouring tiles merged into one region"""
+        if len(failed_tiles) == 0:
+            return []
+        edge = self.tile_size / self.scale
+        x0 = np.round(failed_tiles % cols * edge)
+        y0 = np.round(failed_tiles // cols * edge)
+        x1 = np.minimum(np.round((failed_tiles % cols + 1) * edge), device_size[0])
+        y1 = np.minimum(np.round((failed_tiles // cols + 1) * edge), device_size[1])
+        # Neighbouring tiles only touch, so grow them by a pixel to merge them, then shrink back
+        merged = merge_boxes(np.stack([x0, y0, x1 - x0 + 1, y1 - y0 + 1], axis=1).astype(np.int64))
+        merged[:, 2:] -= 1
+        return [dict(zip(('x', 'y', 'width', 'height'), box)) for box in merged.tolist()]
+
+    def write_heatmap(self, candidate: np.ndarray, dissimilarity: np.ndarray, regions: List[Dict],
+                      screen: str, device: str, theme: str) -> str:
+        """Overlay per-tile dissimilarity on the capture and outline failed regions"""
+        height, width = candidate.shape[:2]
+        heat = cv2.resize(dissimilarity, (dissimilarity.shape[1] * self.tile_size,
+                                          dissimilarity.shape[0] * self.tile_size),
+                          interpolation=cv2.INTER_NEAREST)[:height, :width]
+        colored = cv2.applyColorMap(np.clip(heat * 255, 0, 255).astype(np.uint8), cv2.COLORMAP_JET)
+        base = candidate if candidate.ndim == 3 else cv2.cvtColor(candidate, cv2.COLOR_GRAY2BGR)
+        overlay = np.where((heat > 0)[..., None], cv2.addWeighted(base, 0.4, colored, 0.6, 0), base // 2)
+        for region in regions:
+            x0, y0 = int(region['x'] * self.scale), int(region['y'] * self.scale)
+            x1 = int((region['x'] + region['width']) * self.scale)
+            y1 = int((region['y'] + region['height']) * self.scale)
+            cv2.rectangle(overlay, (x0, y0), (x1 - 1, y1 - 1), (0, 0, 255), 2)
+
+        directory = os.path.join(self.diff_dir, _safe_name(device), _safe_name(theme))
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{_safe_name(screen)}_diff.png")
+        cv2.imwrite(path, overlay)
+        return path
+
+    def compare_all(self, items: Sequence[Dict], workers: Optional[int] = None) -> List[Dict]:
+        """Compare many captures, each a dict of path, screen, device and theme, across processes"""
+        workers = min(workers or os.cpu_count() or 1, len(items))
+        if workers <= 1:
+            return [_compare_item(self.settings(), item) for item in items]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            settings = [self.settings()] * len(items)
+            return list(pool.map(_compare_item, settings, items, chunksize=max(1, len(items) // (workers * 4))))
+
+
+def _compare_item(settings: Dict, item: Dict) -> Dict:
+    """Worker entry point for compare_all"""
+    return VisualRegression(**settings).compare(item['path'], item['screen'], item['device'], item['theme'],
+                                                item.get('ignore', ()))
+
+
+def main():
+    """Approve or compare a directory of screenshots, one screen per file name"""
+    from batch_analyzer import find_screenshots
+
+    parser = argparse.ArgumentParser(description='Golden-baseline visual regression')
+    parser.add_argument('command', choices=['approve', 'compare'], help='Store goldens or compare against them')
+    parser.add_argument('directory', help='Directory of screenshots')
+    parser.add_argument('--device', default='default', help='Device the screenshots were taken on')
+    parser.add_argument('--theme', default='light', help='Theme the screenshots were taken in')
+    parser.add_argument('--golden-dir', default=GOLDEN_DIR, help='Golden screenshot directory')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    paths = find_screenshots(args.directory)
+    if not paths:
+        print(f"❌ No screenshots found in {args.directory}")
+        return
+    regression = VisualRegression(golden_dir=args.golden_dir, record_missing=False)
+    screens = [os.path.splitext(os.path.basename(path))[0] for path in paths]
+
+    start = time.perf_counter()
+    if args.command == 'approve':
+        approved = sum(regression.approve(path, screen, args.device, args.theme) is not None
+                       for path, screen in zip(paths, screens))
+        print(f"✅ Approved {approved} goldens for {args.device}/{args.theme} "
+              f"in {time.perf_counter() - start:.1f} s")
+        return
+
+    items = [{'path': path, 'screen': screen, 'device': args.device, 'theme': args.theme}
+             for path, screen in zip(paths, screens)]
+    results = regression.compare_all(items, args.workers)
+    elapsed = time.perf_counter() - start
+
+    for result in results:
+        if not result['passed']:
+            detail = result.get('error') or (f"{result['failed_tiles']}/{result['tiles']} tiles, "
+                                             f"min SSIM {result['min_ssim']:.3f}, diff: {result['diff_path']}")
+            print(f"   ❌ {result['screen']}: {result['status']} ({detail})")
+    passed = sum(result['passed'] for result in results)
+    identical = sum(result.get('changed_tiles') == 0 for result in results)
+    print(f"📊 {passed}/{len(results)} screens match their goldens ({identical} pixel-identical outside ignored regions)")
+    print(f"   Compared in {elapsed:.1f} s ({len(results) / elapsed:.1f} screens/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,8 @@ from flask import Flask, render_template, jsonify, request, send_file
 from flask_socketio import SocketIO, emit
 import webbrowser
 from real_screenshot_system import RealScreenshotSystem
+from batch_analyzer import BatchAnalyzer, find_screenshots
+from independent_code_fixer import ANALYSIS_NAMESPACE, ANALYZER_VERSION, detect_screenshot_issues
 
 class AITestingDashboard:
     def __init__(self):
@@ -53,6 +55,11 @@ class AITestingDashboard:
             }
         }
         
+        # Batch analysis of screenshot backlogs, run in a background thread
+        self.batch_analyzer = None
+        self.batch_thread = None
+        self.batch_status = {'running': False, 'directory': None, 'issues_found': 0, 'stats': {}}
+        
         self.setup_routes()
         self.setup_socket_events()
         
@@ -218,6 +225,46 @@ class AITestingDashboard:
             except Exception as e:
                 return jsonify({"status": "error", "message": str(e)})
         
+        @self.app.route('/api/start_batch_analysis', methods=['POST'])
+        def start_batch_analysis():
+            """Analyze every screenshot in a directory across worker processes"""
+            try:
+                data = request.get_json(silent=True) or {}
+                directory = data.get('directory', 'ai_screenshots')
+                
+                if self.batch_thread is not None and self.batch_thread.is_alive():
+                    return jsonify({"status": "error", "message": "Batch analysis already running"})
+                
+                paths = find_screenshots(directory)
+                if not paths:
+                    return jsonify({"status": "error", "message": f"No screenshots found in {directory}"})
+                
+                self.batch_analyzer = BatchAnalyzer(detect_screenshot_issues, ANALYSIS_NAMESPACE, ANALYZER_VERSION,
+                                                    workers=data.get('workers'))
+                self.batch_thread = threading.Thread(
+                    target=self.run_batch_analysis, args=(directory, paths, bool(data.get('restart'))), daemon=True
+                )
+                self.batch_status = {'running': True, 'directory': directory, 'issues_found': 0, 'stats': {}}
+                self.batch_thread.start()
+                
+                self.add_activity(f"⚡ Batch analysis started - {len(paths)} screenshots in {directory}", "success")
+                return jsonify({"status": "success", "message": f"Analyzing {len(paths)} screenshots"})
+            except Exception as e:
+                return jsonify({"status": "error", "message": str(e)})
+        
+        @self.app.route('/api/stop_batch_analysis', methods=['POST'])
+        def stop_batch_analysis():
+            """Stop batch analysis; the next run resumes from its checkpoint"""
+            if self.batch_analyzer is None or not self.batch_status['running']:
+                return jsonify({"status": "error", "message": "No batch analysis running"})
+            self.batch_analyzer.stop()
+            return jsonify({"status": "success", "message": "Stopping batch analysis"})
+        
+        @self.app.route('/api/batch_analysis', methods=['GET'])
+        def get_batch_analysis():
+            """Progress and throughput of the current or last batch analysis"""
+            return jsonify(self.batch_status)
+        
         @self.app.route('/api/take_manual_screenshot', methods=['POST'])
         def take_manual_screenshot():
             """Take a manual screenshot and analyze it"""
@@ -327,6 +374,32 @@ class AITestingDashboard:
         self.socketio.emit('activity_update', activity)
         self.socketio.emit('dashboard_data', self.dashboard_data)
     
+    def run_batch_analysis(self, directory, paths, restart=False):
+        """Stream batch analysis results to the dashboard as they complete"""
+        try:
+            for record in self.batch_analyzer.run(paths, restart=restart):
+                issues = len(record['result']['issues']) if 'result' in record else 0
+                self.batch_status['issues_found'] += issues
+                self.batch_status['stats'] = dict(self.batch_analyzer.stats)
+                self.socketio.emit('batch_result', {
+                    'filename': os.path.basename(record['path']),
+                    'source': record['source'],
+                    'issues': issues,
+                    'error': record.get('error'),
+                    'stats': self.batch_status['stats']
+                })
+            
+            stats = self.batch_analyzer.stats
+            self.add_activity(
+                f"⚡ Batch analysis of {directory} finished - {stats['completed']}/{stats['total']} screenshots, "
+                f"{self.batch_status['issues_found']} issues, {stats['images_per_second']:.1f} images/s",
+                "success"
+            )
+        except Exception as e:
+            self.add_activity(f"❌ Batch analysis failed: {e}", "error")
+        finally:
+            self.batch_status['running'] = False
+    
     def update_dashboard_with_real_analysis(self, analysis_report):
         """Update dashboard with real analysis data"""
         try: